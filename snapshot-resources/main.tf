@@ -4,6 +4,8 @@ module "iam" {
   tags                                    = var.tags
   snapshot_cross_region_copy_function_arn = module.lambda.snapshot_cross_region_copy_function.arn
   snapshot_cleaner_function_arn           = module.lambda.snapshot_cleaner_function.arn
+  hydration_enabled                       = var.hydration_enabled
+  hydration_secret_arn                    = var.hydration_secret_arn
 }
 
 module "lambda" {
@@ -24,6 +26,28 @@ module "lambda" {
   route53_hosted_zone_id                = module.route53.route53_hosted_zone_id
   route53_database_record_ttl           = module.route53.route53_database_record.ttl
   route53_database_record_name          = module.route53.route53_database_record.name
+  snapshot_scheduling_mode              = var.snapshot_scheduling_mode
+  snapshot_idle_write_factor            = var.snapshot_idle_write_factor
+  snapshot_idle_baseline_seconds        = var.snapshot_idle_baseline_seconds
+  snapshot_max_interval_seconds         = var.snapshot_max_interval_seconds
+  standby_enabled                       = var.standby_enabled
+  standby_max_staleness_seconds         = var.standby_max_staleness_seconds
+  standby_refresh_interval_seconds      = var.standby_refresh_interval_seconds
+  standby_manager_lambda_role_arn       = module.iam.standby_manager_lambda_role_arn
+  hydration_enabled                     = var.hydration_enabled
+  hydration_lambda_role_arn             = module.iam.hydration_lambda_role_arn
+  hydration_secret_arn                  = var.hydration_secret_arn
+  hydration_databases                   = var.hydration_databases
+  hydration_hot_tables                  = var.hydration_hot_tables
+  hydration_workers                     = var.hydration_workers
+  hydration_cutover_percent             = var.hydration_cutover_percent
+  hydration_max_wait_seconds            = var.hydration_max_wait_seconds
+  restore_profile                       = var.restore_profile
+  restore_overrides                     = var.restore_overrides
+  restore_fast_instance_class           = var.restore_fast_instance_class
+  restore_downsize_apply_immediately    = var.restore_downsize_apply_immediately
+  pitr_enabled                          = var.pitr_enabled
+  pitr_min_rpo_gain_seconds             = var.pitr_min_rpo_gain_seconds
   providers = {
     aws.dr = aws.dr
   }
@@ -44,6 +68,29 @@ module "eventbridge" {
   rds_instance_id                          = data.aws_db_instance.primary_db.id
   rds_failure_alarm_name                   = module.cloudwatch.rds_failure_alarm_name
   sns_rds_restore_topic_arn                = module.sns.sns_rds_restore_topic_arn
+  standby_enabled                          = var.standby_enabled
+  standby_manager_function_arn             = var.standby_enabled ? module.lambda.standby_manager_function.arn : null
+  standby_manager_function_name            = var.standby_enabled ? module.lambda.standby_manager_function.function_name : null
+  standby_instance_prefix                  = module.lambda.standby_instance_prefix
+  hydration_enabled                        = var.hydration_enabled
+  hydrate_restored_instance_function_arn   = var.hydration_enabled ? module.lambda.hydrate_restored_instance_function.arn : null
+  hydrate_restored_instance_function_name  = var.hydration_enabled ? module.lambda.hydrate_restored_instance_function.function_name : null
+  restore_downsize_enabled                 = var.restore_profile == "fast_then_downsize"
+  restore_rds_function_arn                 = module.lambda.restore_rds_function.arn
+  restore_rds_function_name                = module.lambda.restore_rds_function.function_name
+  snapshot_schedule_expression             = var.snapshot_schedule_expression
+
+  providers = {
+    aws.dr = aws.dr
+  }
+}
+
+module "backup_replication" {
+  source                 = "./modules/backup_replication"
+  count                  = var.pitr_enabled ? 1 : 0
+  source_db_instance_arn = data.aws_db_instance.primary_db.db_instance_arn
+  retention_period       = var.backup_replication_retention_days
+  kms_key_arn            = var.backup_replication_kms_key_arn
 
   providers = {
     aws.dr = aws.dr
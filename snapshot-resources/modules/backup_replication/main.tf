@@ -0,0 +1,8 @@
+# Continuously replicates the primary's automated backups (snapshots and
+# transaction logs) into the DR region, for point-in-time restores there
+resource "aws_db_instance_automated_backups_replication" "primary" {
+  provider               = aws.dr
+  source_db_instance_arn = var.source_db_instance_arn
+  retention_period       = var.retention_period
+  kms_key_id             = var.kms_key_arn != "" ? var.kms_key_arn : null
+}
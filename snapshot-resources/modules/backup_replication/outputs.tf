@@ -0,0 +1,4 @@
+output "automated_backups_arn" {
+  description = "The ARN of the replicated automated backups in the DR region."
+  value       = aws_db_instance_automated_backups_replication.primary.id
+}
@@ -0,0 +1,15 @@
+variable "source_db_instance_arn" {
+  description = "The ARN of the primary RDS instance whose automated backups are replicated."
+  type        = string
+}
+
+variable "retention_period" {
+  description = "Days the replicated automated backups are kept in the DR region."
+  type        = number
+}
+
+variable "kms_key_arn" {
+  description = "The ARN of a KMS key in the DR region to encrypt the replicated backups with; required when the primary is encrypted."
+  type        = string
+  default     = ""
+}
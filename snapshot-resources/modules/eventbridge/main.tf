@@ -1,7 +1,7 @@
 resource "aws_cloudwatch_event_rule" "schedule_snapshot" {
   name                = "${var.project_name}-schedule-snapshot"
-  description         = "Trigger RDS manual snapshot creation every 5 minutes"
-  schedule_expression = "rate(5 minutes)"
+  description         = "Trigger RDS manual snapshot creation (${var.snapshot_schedule_expression})"
+  schedule_expression = var.snapshot_schedule_expression
   tags = merge(
     var.tags,
     {
@@ -103,15 +103,18 @@ resource "aws_lambda_permission" "allow_eventbridge_clean_snapshots" {
 resource "aws_cloudwatch_event_rule" "rds_snapshot_restoration_completed" {
   provider    = aws.dr
   name        = "${var.project_name}-rds-snapshot-restoration-event"
-  description = "Triggers when RDS restoration from snapshot is completes"
+  description = "Triggers when RDS restoration from snapshot or to a point in time completes"
 
   event_pattern = jsonencode({
     source      = ["aws.rds"]
     detail-type = ["RDS DB Instance Event"]
     detail = {
-      EventCategories = ["restoration"]
-      SourceType      = ["DB_INSTANCE"]
-      Message         = [{ "prefix" : "Restored from snapshot" }]
+      EventCategories  = ["restoration"]
+      SourceType       = ["DB_INSTANCE"]
+      # From a snapshot (RDS-EVENT-0043) or to a point in time (RDS-EVENT-0019)
+      Message          = [{ "prefix" : "Restored from snapshot" }, { "prefix" : "Restored from DB instance" }]
+      # Warm standby refreshes are neither failovers nor worth a notification
+      SourceIdentifier = [{ "anything-but" : { "prefix" : var.standby_instance_prefix } }]
     }
   })
 
@@ -139,6 +142,42 @@ resource "aws_lambda_permission" "allow_restoration_event" {
   source_arn    = aws_cloudwatch_event_rule.rds_snapshot_restoration_completed.arn
 }
 
+resource "aws_cloudwatch_event_target" "trigger_hydration_lambda" {
+  count     = var.hydration_enabled ? 1 : 0
+  provider  = aws.dr
+  rule      = aws_cloudwatch_event_rule.rds_snapshot_restoration_completed.name
+  target_id = "TriggerHydrationLambda"
+  arn       = var.hydrate_restored_instance_function_arn
+}
+
+resource "aws_lambda_permission" "allow_hydration_restoration_event" {
+  count         = var.hydration_enabled ? 1 : 0
+  provider      = aws.dr
+  statement_id  = "AllowExecutionFromRestorationEvent"
+  action        = "lambda:InvokeFunction"
+  function_name = var.hydrate_restored_instance_function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.rds_snapshot_restoration_completed.arn
+}
+
+resource "aws_cloudwatch_event_target" "trigger_restore_downsize" {
+  count     = var.restore_downsize_enabled ? 1 : 0
+  provider  = aws.dr
+  rule      = aws_cloudwatch_event_rule.rds_snapshot_restoration_completed.name
+  target_id = "TriggerRestoreDownsize"
+  arn       = var.restore_rds_function_arn
+}
+
+resource "aws_lambda_permission" "allow_restore_downsize_restoration_event" {
+  count         = var.restore_downsize_enabled ? 1 : 0
+  provider      = aws.dr
+  statement_id  = "AllowExecutionFromRestorationEvent"
+  action        = "lambda:InvokeFunction"
+  function_name = var.restore_rds_function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.rds_snapshot_restoration_completed.arn
+}
+
 resource "aws_cloudwatch_event_target" "notify_sns_on_restoration" {
   provider  = aws.dr
   rule      = aws_cloudwatch_event_rule.rds_snapshot_restoration_completed.name
@@ -152,7 +191,101 @@ resource "aws_cloudwatch_event_target" "notify_sns_on_restoration" {
     }
 
     input_template = <<TEMPLATE
-"The RDS instance has been successfully restored from a snapshot. <message>. Database: <dbInstance>; Time: ${formatdate("YYYY-MM-DD hh:mm:ss", timestamp())}"
+"The RDS instance has been successfully restored. <message>. Database: <dbInstance>; Time: ${formatdate("YYYY-MM-DD hh:mm:ss", timestamp())}"
 TEMPLATE
   }
 }
+
+# Warm standby: refreshed on a schedule, as new DR snapshots land and as its restores complete
+
+resource "aws_cloudwatch_event_rule" "standby_refresh_schedule" {
+  count               = var.standby_enabled ? 1 : 0
+  provider            = aws.dr
+  name                = "${var.project_name}-standby-refresh-schedule"
+  description         = "Advance the warm standby refresh every 5 minutes"
+  schedule_expression = "rate(5 minutes)"
+  tags = merge(
+    var.tags,
+    {
+      Name = "${var.project_name}-standby-refresh-schedule"
+    }
+  )
+}
+
+resource "aws_cloudwatch_event_target" "standby_refresh_schedule_target" {
+  count     = var.standby_enabled ? 1 : 0
+  provider  = aws.dr
+  rule      = aws_cloudwatch_event_rule.standby_refresh_schedule[0].name
+  target_id = "TriggerStandbyManager"
+  arn       = var.standby_manager_function_arn
+}
+
+resource "aws_lambda_permission" "allow_standby_refresh_schedule" {
+  count         = var.standby_enabled ? 1 : 0
+  provider      = aws.dr
+  statement_id  = "AllowExecutionFromStandbySchedule"
+  action        = "lambda:InvokeFunction"
+  function_name = var.standby_manager_function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.standby_refresh_schedule[0].arn
+}
+
+resource "aws_cloudwatch_event_target" "standby_snapshot_finished_target" {
+  count     = var.standby_enabled ? 1 : 0
+  provider  = aws.dr
+  rule      = aws_cloudwatch_event_rule.cross_region_snapshot_finished_event.name
+  target_id = "TriggerStandbyManager"
+  arn       = var.standby_manager_function_arn
+}
+
+resource "aws_lambda_permission" "allow_standby_snapshot_finished" {
+  count         = var.standby_enabled ? 1 : 0
+  provider      = aws.dr
+  statement_id  = "AllowExecutionFromSnapshotFinishedEvent"
+  action        = "lambda:InvokeFunction"
+  function_name = var.standby_manager_function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.cross_region_snapshot_finished_event.arn
+}
+
+resource "aws_cloudwatch_event_rule" "standby_restoration_completed" {
+  count       = var.standby_enabled ? 1 : 0
+  provider    = aws.dr
+  name        = "${var.project_name}-standby-restoration-event"
+  description = "Triggers when a warm standby restore from snapshot completes"
+
+  event_pattern = jsonencode({
+    source      = ["aws.rds"]
+    detail-type = ["RDS DB Instance Event"]
+    detail = {
+      EventCategories  = ["restoration"]
+      SourceType       = ["DB_INSTANCE"]
+      SourceIdentifier = [{ "prefix" : var.standby_instance_prefix }]
+    }
+  })
+
+  tags = merge(
+    var.tags,
+    {
+      Name = "${var.project_name}-standby-restoration-event"
+    }
+  )
+}
+
+resource "aws_cloudwatch_event_target" "standby_restoration_completed_target" {
+  count     = var.standby_enabled ? 1 : 0
+  provider  = aws.dr
+  rule      = aws_cloudwatch_event_rule.standby_restoration_completed[0].name
+  target_id = "TriggerStandbyManager"
+  arn       = var.standby_manager_function_arn
+}
+
+resource "aws_lambda_permission" "allow_standby_restoration_completed" {
+  count         = var.standby_enabled ? 1 : 0
+  provider      = aws.dr
+  statement_id  = "AllowExecutionFromStandbyRestorationEvent"
+  action        = "lambda:InvokeFunction"
+  function_name = var.standby_manager_function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.standby_restoration_completed[0].arn
+}
@@ -61,4 +61,69 @@ variable "rds_failure_alarm_name" {
 variable "sns_rds_restore_topic_arn" {
   description = "SNS topic arn for RDS restoration"
   type = string
-}
\ No newline at end of file
+}
+
+variable "standby_enabled" {
+  description = "Whether the warm standby manager is deployed and should be triggered."
+  type        = bool
+  default     = false
+}
+
+variable "standby_manager_function_arn" {
+  description = "The ARN of the Lambda function that keeps the warm standby restored from the latest DR snapshot."
+  type        = string
+  default     = null
+}
+
+variable "standby_manager_function_name" {
+  description = "The name of the Lambda function that keeps the warm standby restored from the latest DR snapshot."
+  type        = string
+  default     = null
+}
+
+variable "standby_instance_prefix" {
+  description = "Identifier prefix of the warm standby instances, whose restores must not trigger the DNS update or the restoration notification."
+  type        = string
+}
+
+variable "hydration_enabled" {
+  description = "Whether the post-restore hydration Lambda function is deployed and should be triggered."
+  type        = bool
+  default     = false
+}
+
+variable "hydrate_restored_instance_function_arn" {
+  description = "The ARN of the Lambda function that hydrates the storage of a snapshot-restored instance."
+  type        = string
+  default     = null
+}
+
+variable "hydrate_restored_instance_function_name" {
+  description = "The name of the Lambda function that hydrates the storage of a snapshot-restored instance."
+  type        = string
+  default     = null
+}
+
+variable "restore_downsize_enabled" {
+  description = "Whether restores use the fast_then_downsize profile, whose downsize starts on the restore-complete event."
+  type        = bool
+  default     = false
+}
+
+variable "restore_rds_function_arn" {
+  description = "The ARN of the Lambda function that restores RDS instances from DR snapshots."
+  type        = string
+  default     = null
+}
+
+variable "restore_rds_function_name" {
+  description = "The name of the Lambda function that restores RDS instances from DR snapshots."
+  type        = string
+  default     = null
+}
+
+variable "snapshot_schedule_expression" {
+  description = "The schedule expression of the snapshot creator."
+  type        = string
+  default     = "rate(5 minutes)"
+}
@@ -43,6 +43,13 @@ resource "aws_iam_role_policy" "creator_lambda_policy" {
         ],
         Resource = "*"
       },
+      {
+        Effect = "Allow",
+        Action = [
+          "cloudwatch:GetMetricData"
+        ],
+        Resource = "*"
+      },
       local.cloudwatch_logs_policy
     ]
   })
@@ -77,6 +84,7 @@ resource "aws_iam_role_policy" "copy_lambda_policy" {
         Action = [
           "rds:CopyDBSnapshot",
           "rds:DescribeDBSnapshots",
+          "rds:DescribeDBInstances",
           "rds:AddTagsToResource",
           "rds:ListTagsForResource"
         ],
@@ -153,11 +161,29 @@ resource "aws_iam_role_policy" "restore_rds_lambda_policy" {
         Effect = "Allow",
         Action = [
           "rds:RestoreDBInstanceFromDBSnapshot",
+          "rds:RestoreDBInstanceToPointInTime",
           "rds:DescribeDBSnapshots",
+          "rds:DescribeDBInstances",
+          "rds:DescribeDBInstanceAutomatedBackups",
           "rds:AddTagsToResource"
         ],
         Resource = "*"
       },
+      {
+        # Downsizing a fast_then_downsize restore; only the restored instance
+        Effect = "Allow",
+        Action = [
+          "rds:ModifyDBInstance",
+          "rds:RemoveTagsFromResource"
+        ],
+        Resource = "arn:aws:rds:*:*:db:restored-instance"
+      },
+      {
+        # Failover to the warm standby hands over to the Route53 updater
+        Effect   = "Allow",
+        Action   = "lambda:InvokeFunction",
+        Resource = "arn:aws:lambda:*:*:function:${var.project_name}-route53-update-record"
+      },
       local.cloudwatch_logs_policy
     ]
   })
@@ -199,3 +225,104 @@ resource "aws_iam_role_policy" "route53_update_record_lambda_policy" {
     ]
   })
 }
+
+resource "aws_iam_role" "standby_manager_lambda_role" {
+  name = "${var.project_name}-standby-manager-role"
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [{
+      Action    = "sts:AssumeRole",
+      Effect    = "Allow",
+      Principal = { Service = "lambda.amazonaws.com" }
+    }]
+  })
+  tags = merge(
+    var.tags,
+    {
+      Name = "${var.project_name}-standby-manager-role"
+    }
+  )
+}
+
+resource "aws_iam_role_policy" "standby_manager_lambda_policy" {
+  name = "${var.project_name}-standby-manager-lambda-policy"
+  role = aws_iam_role.standby_manager_lambda_role.id
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect = "Allow",
+        Action = [
+          "rds:RestoreDBInstanceFromDBSnapshot",
+          "rds:DescribeDBSnapshots",
+          "rds:DescribeDBInstances",
+          "rds:AddTagsToResource"
+        ],
+        Resource = "*"
+      },
+      {
+        # Only the standby slots may be deleted
+        Effect   = "Allow",
+        Action   = "rds:DeleteDBInstance",
+        Resource = "arn:aws:rds:*:*:db:${var.project_name}-standby-*"
+      },
+      local.cloudwatch_logs_policy
+    ]
+  })
+}
+
+resource "aws_iam_role" "hydration_lambda_role" {
+  count = var.hydration_enabled ? 1 : 0
+  name  = "${var.project_name}-hydration-role"
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [{
+      Action    = "sts:AssumeRole",
+      Effect    = "Allow",
+      Principal = { Service = "lambda.amazonaws.com" }
+    }]
+  })
+  tags = merge(
+    var.tags,
+    {
+      Name = "${var.project_name}-hydration-role"
+    }
+  )
+}
+
+resource "aws_iam_role_policy" "hydration_lambda_policy" {
+  count = var.hydration_enabled ? 1 : 0
+  name  = "${var.project_name}-hydration-lambda-policy"
+  role  = aws_iam_role.hydration_lambda_role[0].id
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect   = "Allow",
+        Action   = "rds:DescribeDBInstances",
+        Resource = "*"
+      },
+      {
+        # Hydration progress is kept in the restored instance's tags
+        Effect   = "Allow",
+        Action   = "rds:AddTagsToResource",
+        Resource = "arn:aws:rds:*:*:db:restored-instance"
+      },
+      {
+        Effect   = "Allow",
+        Action   = "secretsmanager:GetSecretValue",
+        Resource = var.hydration_secret_arn
+      },
+      {
+        # Continues in a fresh invocation and hands the DNS cutover to the Route53 updater
+        Effect = "Allow",
+        Action = "lambda:InvokeFunction",
+        Resource = [
+          "arn:aws:lambda:*:*:function:${var.project_name}-hydrate-restored-instance",
+          "arn:aws:lambda:*:*:function:${var.project_name}-route53-update-record"
+        ]
+      },
+      local.cloudwatch_logs_policy
+    ]
+  })
+}
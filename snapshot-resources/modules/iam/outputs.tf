@@ -22,3 +22,13 @@ output "route53_update_record_lambda_role_arn" {
   description = "IAM Role ARN for the Lambda function that updates route53 DNS records"
   value       = aws_iam_role.route53_update_record_lambda_role.arn
 }
+
+output "standby_manager_lambda_role_arn" {
+  description = "IAM Role ARN for the Lambda function that keeps the warm standby restored from the latest DR snapshot."
+  value       = aws_iam_role.standby_manager_lambda_role.arn
+}
+
+output "hydration_lambda_role_arn" {
+  description = "IAM Role ARN for the Lambda function that hydrates a snapshot-restored instance, or null when hydration is disabled."
+  value       = one(aws_iam_role.hydration_lambda_role[*].arn)
+}
@@ -17,3 +17,15 @@ variable "snapshot_cleaner_function_arn" {
   description = "The ARN of the Lambda function that manages snapshot retention by cleaning up old snapshots."
   type        = string
 }
+
+variable "hydration_enabled" {
+  description = "Whether the post-restore hydration Lambda function is deployed."
+  type        = bool
+  default     = false
+}
+
+variable "hydration_secret_arn" {
+  description = "The ARN of the Secrets Manager secret with the credentials the hydration Lambda function reads the restored database with."
+  type        = string
+  default     = ""
+}
@@ -0,0 +1,304 @@
+import os
+import json
+import time
+import logging
+
+from dr_common import get_client
+from hydration import order_key, plan_database, prioritise, resume_index, run_items
+from metrics import instrument_handler, metrics
+from postgres_probe import PostgresConnection
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+HYDRATION_SECRET_ARN = os.getenv('HYDRATION_SECRET_ARN', '')
+HYDRATION_DATABASES = [name.strip() for name in os.getenv('HYDRATION_DATABASES', 'postgres').split(',') if name.strip()]
+# Read first, in this order: 'table' or 'schema.table', comma separated
+HYDRATION_HOT_TABLES = [name.strip() for name in os.getenv('HYDRATION_HOT_TABLES', '').split(',') if name.strip()]
+HYDRATION_WORKERS = int(os.getenv('HYDRATION_WORKERS', '4'))
+HYDRATION_CHUNK_MB = int(os.getenv('HYDRATION_CHUNK_MB', '256'))
+HYDRATION_STATEMENT_TIMEOUT_SECONDS = int(os.getenv('HYDRATION_STATEMENT_TIMEOUT_SECONDS', '60'))
+# Percentage of the database read before DNS is switched; 0 switches on restore
+HYDRATION_CUTOVER_PERCENT = float(os.getenv('HYDRATION_CUTOVER_PERCENT', '0'))
+# Switch DNS after this long even when the threshold has not been reached
+HYDRATION_MAX_WAIT_SECONDS = int(os.getenv('HYDRATION_MAX_WAIT_SECONDS', '900'))
+ROUTE53_UPDATE_FUNCTION = os.getenv('ROUTE53_UPDATE_FUNCTION', '')
+
+# Restore complete: from a snapshot, or to a point in time
+RESTORE_COMPLETE_EVENT_IDS = ('RDS-EVENT-0043', 'RDS-EVENT-0019')
+
+# Time kept free at the end of an invocation to finish reads in flight and hand over
+STOP_MARGIN_SECONDS = HYDRATION_STATEMENT_TIMEOUT_SECONDS + 30
+
+# Progress recorded on the restored instance, so a retried invocation resumes
+# where the failed one stopped instead of starting over from its event
+STATE_TAGS = {
+    'started_at': 'HydrationStartedAt',
+    'invocations': 'HydrationInvocations',
+    'bytes_read': 'HydrationBytesRead',
+    'failed_items': 'HydrationFailedItems',
+    'cutover': 'HydrationCutover',
+    'cursor': 'HydrationCursor'
+}
+# HydrationCursor once every relation has been read
+CURSOR_DONE = 'done'
+
+
+def get_credentials():
+    secret = json.loads(get_client('secretsmanager').get_secret_value(SecretId=HYDRATION_SECRET_ARN)['SecretString'])
+    return secret['username'], secret['password']
+
+
+def connector(host, port, user, password):
+    def connect(database):
+        connection = PostgresConnection(host, port, timeout=HYDRATION_STATEMENT_TIMEOUT_SECONDS + 10)
+        try:
+            connection.negotiate_ssl()
+            connection.startup(user, password, database, application_name='dr-hydration')
+            connection.query_rows(f"SET statement_timeout = {HYDRATION_STATEMENT_TIMEOUT_SECONDS * 1000}")
+        except Exception:
+            connection.close()
+            raise
+        return connection
+    return connect
+
+
+def plan(connect):
+    """All work items across HYDRATION_DATABASES, in hydration order."""
+    items = []
+    for database in HYDRATION_DATABASES:
+        connection = connect(database)
+        try:
+            database_items, method = plan_database(
+                connection, database, HYDRATION_HOT_TABLES, chunk_bytes=HYDRATION_CHUNK_MB * 1024 * 1024)
+        finally:
+            connection.close()
+        logger.info(f"Database {database}: {len(database_items)} reads, "
+                    f"{sum(item['bytes'] for item in database_items) / 2**20:.0f} MiB, using {method}")
+        items.extend(database_items)
+    return prioritise(items, HYDRATION_HOT_TABLES)
+
+
+def initial_state(event):
+    """
+    State for the restore-complete event of 'restored-instance', or None for
+    events this function ignores.
+    """
+    detail = event.get('detail', {})
+    if detail.get('EventID') not in RESTORE_COMPLETE_EVENT_IDS:
+        logger.info(f"Ignoring event with ID: {detail.get('EventID')}")
+        return None
+    instance_name = detail.get('Tags', {}).get('Name', '')
+    if instance_name != 'restored-instance':
+        logger.info(f"Skipping hydration: instance tag Name = {instance_name}")
+        return None
+    return {
+        'db_instance_id': detail['SourceIdentifier'],
+        'started_at': time.time(),
+        # order_key of the next item to read; None before the first read
+        'cursor': None,
+        'done': False,
+        'bytes_read': 0,
+        'failed_items': 0,
+        'invocations': 0,
+        # Without a threshold route53_update_record switches DNS on the restore event
+        'cutover': HYDRATION_CUTOVER_PERCENT <= 0
+    }
+
+
+def encode_cursor(state):
+    if state['done']:
+        return CURSOR_DONE
+    if state['cursor'] is None:
+        return ''
+    rank, database, oid, first_block = state['cursor']
+    # Database last, since it is the only part that may contain ':'
+    return f"{rank}:{oid}:{first_block}:{database}"
+
+
+def save_state(rds, db_instance, state):
+    """Record the hydration progress in the tags of the restored instance."""
+    values = {
+        'started_at': repr(state['started_at']),
+        'invocations': str(state['invocations']),
+        'bytes_read': str(state['bytes_read']),
+        'failed_items': str(state['failed_items']),
+        'cutover': str(state['cutover']).lower(),
+        'cursor': encode_cursor(state)
+    }
+    rds.add_tags_to_resource(
+        ResourceName=db_instance['DBInstanceArn'],
+        Tags=[{'Key': STATE_TAGS[key], 'Value': value} for key, value in values.items()]
+    )
+
+
+def load_state(db_instance):
+    """The progress recorded on the restored instance, or None before the first save."""
+    tags = {tag['Key']: tag['Value'] for tag in db_instance.get('TagList', [])}
+    if STATE_TAGS['invocations'] not in tags:
+        return None
+    cursor = tags.get(STATE_TAGS['cursor'], '')
+    if cursor and cursor != CURSOR_DONE:
+        rank, oid, first_block, database = cursor.split(':', 3)
+        cursor = [int(rank), database, int(oid), int(first_block)]
+    return {
+        'started_at': float(tags[STATE_TAGS['started_at']]),
+        'invocations': int(tags[STATE_TAGS['invocations']]),
+        'bytes_read': int(tags[STATE_TAGS['bytes_read']]),
+        'failed_items': int(tags[STATE_TAGS['failed_items']]),
+        'cutover': tags[STATE_TAGS['cutover']] == 'true',
+        'cursor': cursor if cursor and cursor != CURSOR_DONE else None,
+        'done': cursor == CURSOR_DONE
+    }
+
+
+def cut_over(state):
+    get_client('lambda').invoke(
+        FunctionName=ROUTE53_UPDATE_FUNCTION,
+        InvocationType='Event',
+        Payload=json.dumps({'source': 'dr.hydration', 'db_instance_id': state['db_instance_id']})
+    )
+    state['cutover'] = True
+    waited = time.time() - state['started_at']
+    logger.info(f"Hydrated {state['bytes_read'] / 2**20:.0f} MiB in {waited:.0f}s, switching DNS to {state['db_instance_id']}")
+    metrics.add('HydrationCutovers')
+    metrics.put('HydrationCutoverWaitSeconds', waited, 'Seconds')
+
+
+def hydrate(state, items, connect, stop_at):
+    """
+    Read items from state['cursor'] until done or time.monotonic() reaches
+    stop_at, switching DNS as soon as the cutover threshold or wait is reached.
+    """
+    total_bytes = sum(item['bytes'] for item in items)
+    threshold_bytes = total_bytes * HYDRATION_CUTOVER_PERCENT / 100
+    cutover_at = time.monotonic() + state['started_at'] + HYDRATION_MAX_WAIT_SECONDS - time.time()
+    next_item = resume_index(items, state['cursor'], HYDRATION_HOT_TABLES) if state['cursor'] else 0
+
+    while next_item < len(items) and time.monotonic() < stop_at:
+        if not state['cutover'] and (state['bytes_read'] >= threshold_bytes or time.monotonic() >= cutover_at):
+            cut_over(state)
+
+        if state['cutover']:
+            deadline, byte_budget = stop_at, None
+        else:
+            deadline, byte_budget = min(stop_at, cutover_at), threshold_bytes - state['bytes_read']
+
+        result = run_items(connect, items, next_item, HYDRATION_WORKERS, deadline, byte_budget)
+        next_item = result['next_item']
+        if next_item < len(items):
+            state['cursor'] = list(order_key(items[next_item], HYDRATION_HOT_TABLES))
+        state['bytes_read'] += result['bytes_read']
+        state['failed_items'] += result['failed_items']
+
+        throughput = result['bytes_read'] / result['seconds'] if result['seconds'] else 0
+        logger.info(f"Hydration progress {state['bytes_read'] / 2**20:.0f}/{total_bytes / 2**20:.0f} MiB "
+                    f"({percent(state['bytes_read'], total_bytes):.1f}%), item {next_item}/{len(items)}, "
+                    f"{throughput / 2**20:.1f} MiB/s over {HYDRATION_WORKERS} workers, {state['failed_items']} failed reads")
+        metrics.add('HydrationBytesRead', result['bytes_read'], 'Bytes')
+        metrics.put('HydrationThroughput', throughput, 'Bytes/Second')
+
+    done = state['done'] = next_item >= len(items)
+    # A finished or failed hydration never holds back DNS
+    if not state['cutover'] and (done or time.monotonic() >= cutover_at):
+        cut_over(state)
+    metrics.put('HydrationProgress', percent(state['bytes_read'], total_bytes), 'Percent')
+    return done, total_bytes
+
+
+def percent(part, whole):
+    return part / whole * 100 if whole else 100.0
+
+
+@instrument_handler
+def lambda_handler(event, context):
+    """
+    Warm a snapshot-restored instance by reading its relations in parallel, so
+    the blocks it loads lazily from S3 are fetched before applications need them.
+    Starts on the restore-complete event and continues in fresh invocations
+    until every relation has been read. With HYDRATION_CUTOVER_PERCENT set it
+    also switches DNS once that share of the data has been read.
+    """
+    state = None
+    rds = db_instance = None
+    try:
+        state = event['state'] if event.get('source') == 'dr.hydration' else initial_state(event)
+        if state is None:
+            return {
+                'statusCode': 200,
+                'body': json.dumps({'message': 'Skipped non-target event'})
+            }
+
+        required_env_vars = ['DR_REGION', 'HYDRATION_SECRET_ARN', 'ROUTE53_UPDATE_FUNCTION']
+        missing_vars = [var for var in required_env_vars if not os.getenv(var)]
+        if missing_vars:
+            raise ValueError(
+                f"Missing environment variables: {', '.join(missing_vars)}")
+
+        rds = get_client('rds', region_name=os.environ['DR_REGION'])
+        db_instance = rds.describe_db_instances(DBInstanceIdentifier=state['db_instance_id'])['DBInstances'][0]
+        # A retry of this or an earlier invocation carries an older state than the instance
+        saved = load_state(db_instance)
+        if saved and saved['invocations'] >= state['invocations']:
+            state.update(saved)
+            logger.info(f"Resuming hydration of {state['db_instance_id']} after invocation {saved['invocations']}")
+        if state['done']:
+            logger.info(f"Hydration of {state['db_instance_id']} already finished")
+            return {
+                'statusCode': 200,
+                'body': json.dumps({'db_instance_id': state['db_instance_id'], 'done': True, 'cutover': state['cutover']})
+            }
+        state['invocations'] += 1
+
+        user, password = get_credentials()
+        connect = connector(db_instance['Endpoint']['Address'], db_instance['Endpoint']['Port'], user, password)
+
+        remaining_seconds = context.get_remaining_time_in_millis() / 1000 if context else 900
+        stop_at = time.monotonic() + remaining_seconds - STOP_MARGIN_SECONDS
+
+        items = plan(connect)
+        done, total_bytes = hydrate(state, items, connect, stop_at)
+        progress = round(percent(state['bytes_read'], total_bytes), 1)
+        save_state(rds, db_instance, state)
+
+        if not done:
+            # Carry on in a fresh invocation with a full time budget
+            get_client('lambda').invoke(
+                FunctionName=context.function_name,
+                InvocationType='Event',
+                Payload=json.dumps({'source': 'dr.hydration', 'state': state})
+            )
+            logger.info(f"Continuing hydration of {state['db_instance_id']} at {progress}% in a new invocation")
+        else:
+            elapsed = time.time() - state['started_at']
+            logger.info(f"Hydration of {state['db_instance_id']} finished in {elapsed:.0f}s "
+                        f"over {state['invocations']} invocations: {progress}% read, {state['failed_items']} failed reads")
+            metrics.add('HydrationsCompleted')
+            metrics.put('HydrationSeconds', elapsed, 'Seconds')
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'db_instance_id': state['db_instance_id'],
+                'done': done,
+                'progress_percent': progress,
+                'bytes_read': state['bytes_read'],
+                'total_bytes': total_bytes,
+                'failed_items': state['failed_items'],
+                'cutover': state['cutover']
+            })
+        }
+
+    except Exception as e:
+        logger.error(f"Hydration failed: {str(e)}", exc_info=True)
+        metrics.add('HydrationErrors')
+        if state and not state['cutover'] and ROUTE53_UPDATE_FUNCTION:
+            # The restored instance serves better cold than not at all
+            cut_over(state)
+        if db_instance:
+            # The async retry resumes from here, already cut over
+            try:
+                save_state(rds, db_instance, state)
+            except Exception as save_error:
+                logger.warning(f"Could not record the hydration progress: {save_error}")
+        raise
@@ -0,0 +1,173 @@
+import bisect
+import logging
+import threading
+import time
+
+from postgres_probe import PostgresProbeError, PostgresServerError
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Every relation with storage outside the catalogs; indexes are attributed to
+# their table so a hot table brings its indexes along
+RELATIONS_SQL = """
+SELECT c.oid, n.nspname, coalesce(t.relname, c.relname), c.relkind,
+       quote_ident(n.nspname) || '.' || quote_ident(c.relname),
+       pg_relation_size(c.oid) / current_setting('block_size')::int
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_index i ON i.indexrelid = c.oid
+LEFT JOIN pg_class t ON t.oid = i.indrelid
+WHERE c.relkind IN ('r', 'm', 'i', 't')
+  AND c.relpersistence = 'p'
+  AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+  AND pg_relation_size(c.oid) > 0
+"""
+
+# pg_prewarm reads block ranges, so large relations are split into chunks;
+# without it only tables can be read, whole, with a sequential scan
+METHOD_PREWARM = 'prewarm'
+METHOD_SCAN = 'scan'
+
+
+def enable_prewarm(connection):
+    """Return True when pg_prewarm is installed or could be installed in the connected database."""
+    if connection.query_scalar("SELECT count(*) FROM pg_extension WHERE extname = 'pg_prewarm'") != '0':
+        return True
+    try:
+        connection.query_rows('CREATE EXTENSION IF NOT EXISTS pg_prewarm')
+        return True
+    except PostgresServerError as e:
+        logger.warning(f"pg_prewarm unavailable, falling back to sequential scans: {e}")
+        return False
+
+
+def hot_rank(hot_tables, schema, table):
+    """Position of the table in the hot-table list ('table' or 'schema.table'), or None."""
+    for rank, name in enumerate(hot_tables):
+        if name in (table, f"{schema}.{table}"):
+            return rank
+    return None
+
+
+def plan_database(connection, database, hot_tables=(), chunk_bytes=256 * 1024 * 1024):
+    """
+    List the reads that hydrate one database, as work items with the SQL to run.
+    Returns (items, method).
+    """
+    block_size = int(connection.query_scalar("SELECT current_setting('block_size')"))
+    method = METHOD_PREWARM if enable_prewarm(connection) else METHOD_SCAN
+    chunk_blocks = max(chunk_bytes // block_size, 1)
+
+    items = []
+    for oid, schema, table, kind, qualified, blocks in connection.query_rows(RELATIONS_SQL):
+        blocks = int(blocks)
+        rank = hot_rank(hot_tables, schema, table)
+        item = {
+            'database': database,
+            'relation': qualified,
+            'hot': rank,
+            'oid': int(oid)
+        }
+        if method == METHOD_PREWARM:
+            for first_block in range(0, blocks, chunk_blocks):
+                last_block = min(first_block + chunk_blocks, blocks) - 1
+                items.append(dict(
+                    item,
+                    first_block=first_block,
+                    bytes=(last_block - first_block + 1) * block_size,
+                    sql=f"SELECT pg_prewarm({oid}::regclass, 'read', 'main', {first_block}, {last_block})"
+                ))
+        elif kind in ('r', 'm'):
+            items.append(dict(
+                item,
+                first_block=0,
+                bytes=blocks * block_size,
+                sql=f"SELECT count(*) FROM ONLY {qualified}"
+            ))
+    return items, method
+
+
+def order_key(item, hot_tables=()):
+    """
+    Position of the item in hydration order: hot tables first in their
+    configured order, then every other relation by database and oid. Only
+    the configuration and relation identity count, never relation sizes, so
+    the key of the next item is a cursor that stays valid while relations
+    grow or appear between invocations.
+    """
+    return (
+        item['hot'] if item['hot'] is not None else len(hot_tables),
+        item['database'],
+        item['oid'],
+        item['first_block']
+    )
+
+
+def prioritise(items, hot_tables=()):
+    return sorted(items, key=lambda item: order_key(item, hot_tables))
+
+
+def resume_index(items, cursor, hot_tables=()):
+    """Index of the first prioritised item at or after the cursor, an order_key."""
+    return bisect.bisect_left([order_key(item, hot_tables) for item in items], tuple(cursor))
+
+
+def run_items(connect, items, start, workers, deadline, byte_budget=None):
+    """
+    Run items[start:] on up to `workers` connections in parallel, handing out
+    items in order until all are done, time.monotonic() passes deadline or
+    byte_budget bytes have been handed out. Items in flight are finished, so
+    every item before the returned next_item has been attempted.
+
+    connect(database) returns a started PostgresConnection.
+    """
+    lock = threading.Lock()
+    started = time.monotonic()
+    progress = {'next_item': start, 'handed_out_bytes': 0, 'bytes_read': 0, 'items_read': 0, 'failed_items': 0}
+
+    def take():
+        with lock:
+            if progress['next_item'] >= len(items) or time.monotonic() >= deadline:
+                return None
+            if byte_budget is not None and progress['handed_out_bytes'] >= byte_budget:
+                return None
+            item = items[progress['next_item']]
+            progress['next_item'] += 1
+            progress['handed_out_bytes'] += item['bytes']
+            return item
+
+    def work():
+        connections = {}
+        try:
+            while True:
+                item = take()
+                if item is None:
+                    return
+                try:
+                    if item['database'] not in connections:
+                        connections[item['database']] = connect(item['database'])
+                    connections[item['database']].query_rows(item['sql'])
+                    with lock:
+                        progress['bytes_read'] += item['bytes']
+                        progress['items_read'] += 1
+                except (OSError, PostgresProbeError) as e:
+                    logger.warning(f"Failed to read {item['database']}/{item['relation']} from block {item['first_block']}: {e}")
+                    with lock:
+                        progress['failed_items'] += 1
+                    # A broken connection is replaced on the next item
+                    if not isinstance(e, PostgresServerError) and item['database'] in connections:
+                        connections.pop(item['database']).close()
+        finally:
+            for connection in connections.values():
+                connection.close()
+
+    threads = [threading.Thread(target=work) for _ in range(max(workers, 1))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    progress.pop('handed_out_bytes')
+    progress['seconds'] = time.monotonic() - started
+    return progress
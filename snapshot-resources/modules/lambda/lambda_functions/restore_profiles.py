@@ -0,0 +1,245 @@
+import os
+import logging
+
+from dr_common import get_client
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# minimal: the historical db.t3.micro single-AZ restore
+# match_source: the primary's instance class, Multi-AZ and storage
+# fast_then_downsize: a larger single-AZ instance for the restore and the first
+# load, brought back to the primary's size afterwards
+PROFILE_MINIMAL = 'minimal'
+PROFILE_MATCH_SOURCE = 'match_source'
+PROFILE_FAST_THEN_DOWNSIZE = 'fast_then_downsize'
+PROFILES = (PROFILE_MINIMAL, PROFILE_MATCH_SOURCE, PROFILE_FAST_THEN_DOWNSIZE)
+
+MINIMAL_INSTANCE_CLASS = 'db.t3.micro'
+
+# Sizing of the primary, recorded on every DR snapshot by the copy Lambda so
+# a restore never has to reach the (possibly failed) primary region
+SIZING_TAGS = {
+    'instance_class': 'SourceInstanceClass',
+    'multi_az': 'SourceMultiAZ',
+    'storage_type': 'SourceStorageType',
+    'allocated_storage': 'SourceAllocatedStorage',
+    'iops': 'SourceIops',
+    'storage_throughput': 'SourceStorageThroughput'
+}
+
+# Pending downsize of a fast_then_downsize restore, applied once it is available
+DOWNSIZE_CLASS_TAG = 'DownsizeInstanceClass'
+DOWNSIZE_MULTI_AZ_TAG = 'DownsizeMultiAZ'
+
+# Instance sizes in increasing order, for stepping up a class
+INSTANCE_SIZES = ['micro', 'small', 'medium', 'large', 'xlarge', '2xlarge', '4xlarge', '8xlarge',
+                  '12xlarge', '16xlarge', '24xlarge', '32xlarge']
+
+# gp3 below this size has fixed baseline IOPS and throughput that cannot be set
+GP3_PROVISIONED_MIN_GIB = 400
+
+
+def source_sizing(db_instance):
+    """Sizing of an instance as returned by describe_db_instances."""
+    return {
+        'instance_class': db_instance['DBInstanceClass'],
+        'multi_az': db_instance.get('MultiAZ', False),
+        'storage_type': db_instance.get('StorageType'),
+        'allocated_storage': db_instance.get('AllocatedStorage'),
+        'iops': db_instance.get('Iops'),
+        'storage_throughput': db_instance.get('StorageThroughput')
+    }
+
+
+def sizing_tags(sizing):
+    """Snapshot tags recording the sizing; unknown values are left out."""
+    tags = []
+    for key, tag in SIZING_TAGS.items():
+        value = sizing.get(key)
+        if value is not None:
+            tags.append({'Key': tag, 'Value': str(value).lower() if isinstance(value, bool) else str(value)})
+    return tags
+
+
+def snapshot_sizing(snapshot):
+    """
+    Sizing recorded on a DR snapshot. Storage falls back to the snapshot's own
+    attributes; the instance class and Multi-AZ are None when untagged.
+    """
+    tags = {tag['Key']: tag['Value'] for tag in snapshot.get('TagList', [])}
+
+    def number(key, fallback):
+        value = tags.get(SIZING_TAGS[key])
+        return int(value) if value else fallback
+
+    multi_az = tags.get(SIZING_TAGS['multi_az'])
+    return {
+        'instance_class': tags.get(SIZING_TAGS['instance_class']),
+        'multi_az': multi_az == 'true' if multi_az else None,
+        'storage_type': tags.get(SIZING_TAGS['storage_type']) or snapshot.get('StorageType'),
+        'allocated_storage': number('allocated_storage', snapshot.get('AllocatedStorage')),
+        'iops': number('iops', snapshot.get('Iops')),
+        'storage_throughput': number('storage_throughput', snapshot.get('StorageThroughput'))
+    }
+
+
+def backup_sizing(backup):
+    """
+    Sizing of replicated automated backups. They carry the source's current
+    storage but neither its instance class nor Multi-AZ, which are None.
+    """
+    return {
+        'instance_class': None,
+        'multi_az': None,
+        'storage_type': backup.get('StorageType'),
+        'allocated_storage': backup.get('AllocatedStorage'),
+        'iops': backup.get('Iops'),
+        'storage_throughput': backup.get('StorageThroughput')
+    }
+
+
+def restore_overrides():
+    """Explicit sizing from RESTORE_* variables, taking precedence over the source sizing."""
+    multi_az = os.getenv('RESTORE_MULTI_AZ', '').lower()
+    iops = os.getenv('RESTORE_IOPS')
+    storage_throughput = os.getenv('RESTORE_STORAGE_THROUGHPUT')
+    return {
+        'instance_class': os.getenv('RESTORE_INSTANCE_CLASS') or None,
+        'multi_az': multi_az == 'true' if multi_az else None,
+        'storage_type': os.getenv('RESTORE_STORAGE_TYPE') or None,
+        'iops': int(iops) if iops else None,
+        'storage_throughput': int(storage_throughput) if storage_throughput else None
+    }
+
+
+def restore_sizing(snapshot, instance_id, profile, backup=None):
+    """
+    The primary's sizing as recorded on the DR snapshot. A point-in-time
+    restore from backup takes the backup's storage, which a restore may not
+    shrink. When the instance class is unknown, either because the snapshot
+    was copied before the sizing was recorded or because there is no
+    snapshot, the backup's source instance (or the primary) is asked in its
+    region, which fails fast when that region is down.
+    """
+    sizing = snapshot_sizing(snapshot) if snapshot else dict.fromkeys(SIZING_TAGS)
+    if backup:
+        sizing.update({key: value for key, value in backup_sizing(backup).items() if value is not None})
+        source_instance_id, source_region = backup['DBInstanceIdentifier'], backup.get('Region')
+    else:
+        source_instance_id, source_region = instance_id, None
+    source_region = source_region or os.getenv('PRIMARY_REGION')
+    if sizing['instance_class'] or profile == PROFILE_MINIMAL or not source_region:
+        return sizing
+    try:
+        source_rds = get_client('rds', region_name=source_region,
+                                connect_timeout=3, read_timeout=5, retries={'max_attempts': 1})
+        db_instance = source_rds.describe_db_instances(DBInstanceIdentifier=source_instance_id)['DBInstances'][0]
+        return dict(source_sizing(db_instance), **{key: value for key, value in sizing.items() if value is not None})
+    except Exception as e:
+        logger.warning(f"Restore source has no recorded sizing and {source_instance_id} is unreachable: {str(e)}")
+        return sizing
+
+
+def step_up(instance_class, steps):
+    """db.r6g.large stepped up 2 is db.r6g.2xlarge; classes off the ladder are kept."""
+    family, _, size = instance_class.rpartition('.')
+    if size not in INSTANCE_SIZES:
+        return instance_class
+    index = min(INSTANCE_SIZES.index(size) + steps, len(INSTANCE_SIZES) - 1)
+    return f"{family}.{INSTANCE_SIZES[index]}"
+
+
+def storage_params(sizing):
+    """restore_db_instance_from_db_snapshot storage arguments for the sizing."""
+    params = {}
+    storage_type = sizing.get('storage_type')
+    if not storage_type:
+        return params
+    params['StorageType'] = storage_type
+    if sizing.get('allocated_storage'):
+        params['AllocatedStorage'] = int(sizing['allocated_storage'])
+
+    provisioned = storage_type in ('io1', 'io2') or (
+        storage_type == 'gp3' and int(sizing.get('allocated_storage') or 0) >= GP3_PROVISIONED_MIN_GIB)
+    if provisioned and sizing.get('iops'):
+        params['Iops'] = int(sizing['iops'])
+    if provisioned and storage_type == 'gp3' and sizing.get('storage_throughput'):
+        params['StorageThroughput'] = int(sizing['storage_throughput'])
+    return params
+
+
+def resolve_profile(profile, sizing, overrides=None, fast_instance_class=None, fast_size_steps=2,
+                    default_instance_class=MINIMAL_INSTANCE_CLASS):
+    """
+    Turn a profile and the source sizing into restore arguments.
+
+    overrides (instance_class, multi_az, storage_type, iops, storage_throughput)
+    take precedence over the source sizing. Returns (restore_params, downsize)
+    where downsize is None or {'instance_class', 'multi_az'} to apply once the
+    restored instance is available.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown restore profile '{profile}', expected one of {', '.join(PROFILES)}")
+
+    if profile == PROFILE_MINIMAL:
+        return {'DBInstanceClass': MINIMAL_INSTANCE_CLASS, 'MultiAZ': False}, None
+
+    target = dict(sizing)
+    target.update({key: value for key, value in (overrides or {}).items() if value is not None})
+    if not target.get('instance_class'):
+        logger.warning(f"Source instance class unknown, restoring into {default_instance_class}")
+        target['instance_class'] = default_instance_class
+    multi_az = bool(target.get('multi_az'))
+
+    params = {'DBInstanceClass': target['instance_class'], 'MultiAZ': multi_az}
+    params.update(storage_params(target))
+    if profile == PROFILE_MATCH_SOURCE:
+        return params, None
+
+    # Restore single-AZ on a larger class; Multi-AZ is added with the downsize
+    params['DBInstanceClass'] = fast_instance_class or step_up(target['instance_class'], fast_size_steps)
+    params['MultiAZ'] = False
+    downsize = {'instance_class': target['instance_class'], 'multi_az': multi_az}
+    if params['DBInstanceClass'] == downsize['instance_class'] and not multi_az:
+        return params, None
+    return params, downsize
+
+
+def downsize_tags(downsize):
+    if not downsize:
+        return []
+    return [
+        {'Key': DOWNSIZE_CLASS_TAG, 'Value': downsize['instance_class']},
+        {'Key': DOWNSIZE_MULTI_AZ_TAG, 'Value': str(downsize['multi_az']).lower()}
+    ]
+
+
+def apply_downsize(rds, db_instance, apply_immediately=False):
+    """
+    Apply the pending downsize recorded on a restored instance and clear it.
+    Without apply_immediately RDS applies it in the next maintenance window,
+    since an instance class change briefly interrupts connections.
+    Returns the modification, or None when nothing is pending.
+    """
+    tags = {tag['Key']: tag['Value'] for tag in db_instance.get('TagList', [])}
+    instance_class = tags.get(DOWNSIZE_CLASS_TAG)
+    if not instance_class:
+        return None
+
+    modification = {
+        'DBInstanceClass': instance_class,
+        'MultiAZ': tags.get(DOWNSIZE_MULTI_AZ_TAG) == 'true'
+    }
+    rds.modify_db_instance(
+        DBInstanceIdentifier=db_instance['DBInstanceIdentifier'],
+        ApplyImmediately=apply_immediately,
+        **modification
+    )
+    rds.remove_tags_from_resource(
+        ResourceName=db_instance['DBInstanceArn'],
+        TagKeys=[DOWNSIZE_CLASS_TAG, DOWNSIZE_MULTI_AZ_TAG]
+    )
+    logger.info(f"Downsizing {db_instance['DBInstanceIdentifier']} to {modification} "
+                f"({'immediately' if apply_immediately else 'in the next maintenance window'})")
+    return modification
@@ -1,8 +1,75 @@
 import os
-import boto3
-from datetime import datetime
+import json
+from datetime import datetime, timezone
 
+from dr_common import get_client
+from metrics import instrument_handler, metrics
+from restore_profiles import (PROFILE_MATCH_SOURCE, apply_downsize, downsize_tags, resolve_profile,
+                              restore_overrides, restore_sizing)
+from restore_sources import SOURCE_PITR, choose_restore_source, find_replicated_backup
+from snapshot_discovery import find_latest_snapshot, snapshot_recovery_point
+from standby import claim_for_failover
 
+# Prefix of the warm standby instances; empty when warm standby is disabled
+STANDBY_INSTANCE_PREFIX = os.getenv('STANDBY_INSTANCE_PREFIX', '')
+# Data the warm standby may be missing against the newest recovery point and still be used
+STANDBY_MAX_STALENESS_SECONDS = int(os.getenv('STANDBY_MAX_STALENESS_SECONDS', '7200'))
+ROUTE53_UPDATE_FUNCTION = os.getenv('ROUTE53_UPDATE_FUNCTION', '')
+
+# minimal, match_source or fast_then_downsize (see restore_profiles)
+RESTORE_PROFILE = os.getenv('RESTORE_PROFILE', PROFILE_MATCH_SOURCE)
+RESTORE_FAST_INSTANCE_CLASS = os.getenv('RESTORE_FAST_INSTANCE_CLASS') or None
+RESTORE_FAST_SIZE_STEPS = int(os.getenv('RESTORE_FAST_SIZE_STEPS', '2'))
+RESTORE_DOWNSIZE_APPLY_IMMEDIATELY = os.getenv('RESTORE_DOWNSIZE_APPLY_IMMEDIATELY', 'false').lower() == 'true'
+
+# snapshot: newest DR snapshot only; auto: also consider a point-in-time
+# restore from the automated backups replicated into the DR region
+RESTORE_MODE = os.getenv('RESTORE_MODE', 'snapshot')
+# Data a point-in-time restore must recover beyond the snapshot to be chosen
+PITR_MIN_RPO_GAIN_SECONDS = int(os.getenv('PITR_MIN_RPO_GAIN_SECONDS', '60'))
+
+# Restore complete: from a snapshot, or to a point in time
+RESTORE_COMPLETE_EVENT_IDS = ('RDS-EVENT-0043', 'RDS-EVENT-0019')
+
+
+def downsize_restored_instance(rds, event):
+    """Apply the pending downsize of a fast_then_downsize restore once it has completed."""
+    db_instance_id = event['detail']['SourceIdentifier']
+    db_instance = rds.describe_db_instances(DBInstanceIdentifier=db_instance_id)['DBInstances'][0]
+    modification = apply_downsize(rds, db_instance, apply_immediately=RESTORE_DOWNSIZE_APPLY_IMMEDIATELY)
+    if modification:
+        metrics.add('RestoreDownsizes')
+    return {
+        'statusCode': 200,
+        'body': json.dumps({'db_instance_id': db_instance_id, 'downsize': modification})
+    }
+
+
+def fail_over_to_standby(rds, newest_recovery_point):
+    """
+    Point the database record at the warm standby when one is available and
+    no more than STANDBY_MAX_STALENESS_SECONDS behind newest_recovery_point.
+    Returns the standby identifier, or None to fall back to a restore.
+    """
+    try:
+        standby = claim_for_failover(rds, STANDBY_INSTANCE_PREFIX, newest_recovery_point=newest_recovery_point,
+                                     max_staleness_seconds=STANDBY_MAX_STALENESS_SECONDS)
+    except Exception as e:
+        print(f"Could not use the warm standby, restoring instead: {str(e)}")
+        return None
+    if standby is None:
+        print("No available and current warm standby, restoring instead")
+        return None
+
+    get_client('lambda').invoke(
+        FunctionName=ROUTE53_UPDATE_FUNCTION,
+        InvocationType='Event',
+        Payload=json.dumps({'source': 'dr.standby', 'db_instance_id': standby['DBInstanceIdentifier']})
+    )
+    return standby['DBInstanceIdentifier']
+
+
+@instrument_handler
 def lambda_handler(event, context):
     required_env_vars = ['DR_REGION', 'RDS_INSTANCE_ID',
                          'SUBNET_GROUP_NAME', 'PARAMETER_GROUP_NAME', 'SECURITY_GROUP_ID']
@@ -19,37 +86,70 @@ def lambda_handler(event, context):
     subnet_group_name = os.environ['SUBNET_GROUP_NAME']
     source_snapshot_prefix = f"dr-snapshot-{instance_id}"
 
-    rds = boto3.client('rds', region_name=dr_region)
+    rds = get_client('rds', region_name=dr_region)
+
+    # The restore-complete event of a fast_then_downsize restore
+    if event.get('detail', {}).get('EventID') in RESTORE_COMPLETE_EVENT_IDS:
+        return downsize_restored_instance(rds, event)
 
     try:
-        all_snapshots = rds.describe_db_snapshots(
-            SnapshotType='manual')['DBSnapshots']
+        latest_snapshot = find_latest_snapshot(
+            rds, instance_id=instance_id, prefix=source_snapshot_prefix)
     except Exception as e:
         raise RuntimeError(f"Failed to fetch snapshots: {str(e)}")
 
-    available_snapshots = [
-        s for s in all_snapshots
-        if s.get('DBSnapshotIdentifier', '').startswith(source_snapshot_prefix)
-        and s.get('Status') == 'available'
-        and s.get('SnapshotCreateTime') is not None
-    ]
+    backup = None
+    if RESTORE_MODE == 'auto':
+        try:
+            backup = find_replicated_backup(rds, instance_id)
+        except Exception as e:
+            print(f"Could not read replicated automated backups, using snapshots only: {str(e)}")
+
+    restore_source = choose_restore_source(
+        latest_snapshot, backup, datetime.now(timezone.utc), min_rpo_gain_seconds=PITR_MIN_RPO_GAIN_SECONDS)
 
-    if not available_snapshots:
-        raise Exception("No available manual snapshots found in DR region")
+    # With a current warm standby the failover is only a DNS change
+    if STANDBY_INSTANCE_PREFIX and ROUTE53_UPDATE_FUNCTION:
+        standby_id = fail_over_to_standby(rds, restore_source['recovery_point'] if restore_source else None)
+        if standby_id:
+            print(f"Failing over to warm standby '{standby_id}'")
+            metrics.add('StandbyFailovers')
+            return {
+                'statusCode': 200,
+                'body': f"Failing over to warm standby '{standby_id}'"
+            }
 
-    latest_snapshot = max(available_snapshots,
-                          key=lambda x: x['SnapshotCreateTime'])
-    snapshot_id = latest_snapshot['DBSnapshotIdentifier']
+    if not restore_source:
+        raise Exception("No available manual snapshots or replicated automated backups found in DR region")
 
-    print(
-        f"Using snapshot: {snapshot_id} (Created at {latest_snapshot['SnapshotCreateTime']}) from {dr_region}")
+    source = restore_source['source']
+    recovery_point = restore_source['recovery_point']
+    print(f"Restoring from {source} with recovery point {recovery_point} "
+          f"(RPO {restore_source['rpo_seconds']}s): {restore_source['reason']}")
+    metrics.set_property('RestoreSource', source)
+    metrics.put('RecoveryPointAgeSeconds', restore_source['rpo_seconds'], 'Seconds')
+
+    if source == SOURCE_PITR:
+        source_description = f"automated backups {backup['DBInstanceAutomatedBackupsArn']} at the latest restorable time"
+    else:
+        source_description = f"snapshot '{latest_snapshot['DBSnapshotIdentifier']}'"
+        print(
+            f"Using snapshot: {latest_snapshot['DBSnapshotIdentifier']} (Created at {snapshot_recovery_point(latest_snapshot)}) from {dr_region}")
 
     try:
-        rds.restore_db_instance_from_db_snapshot(
-            DBInstanceIdentifier=target_instance_id,
-            DBSnapshotIdentifier=snapshot_id,
-            DBInstanceClass='db.t3.micro',
-            MultiAZ=False,
+        restore_params, downsize = resolve_profile(
+            RESTORE_PROFILE,
+            restore_sizing(latest_snapshot, instance_id, RESTORE_PROFILE,
+                           backup=backup if source == SOURCE_PITR else None),
+            overrides=restore_overrides(),
+            fast_instance_class=RESTORE_FAST_INSTANCE_CLASS,
+            fast_size_steps=RESTORE_FAST_SIZE_STEPS
+        )
+        print(f"Restore profile '{RESTORE_PROFILE}': {restore_params}, downsize afterwards: {downsize}")
+        metrics.set_property('RestoreProfile', RESTORE_PROFILE)
+        metrics.set_property('RestoreInstanceClass', restore_params['DBInstanceClass'])
+
+        restore_args = dict(
             PubliclyAccessible=True,
             VpcSecurityGroupIds=[security_group_id],
             DBParameterGroupName=parameter_group_name,
@@ -58,19 +158,38 @@ def lambda_handler(event, context):
                 {'Key': 'Name', 'Value': target_instance_id},
                 {'Key': 'ManagedBy', 'Value': 'Terraform'},
                 {'Key': 'Environment', 'Value': 'DR'},
-            ],
-            CopyTagsToSnapshot=True
+                {'Key': 'RestoreProfile', 'Value': RESTORE_PROFILE},
+                {'Key': 'RestoreSource', 'Value': source},
+                {'Key': 'RecoveryPoint', 'Value': recovery_point.isoformat()},
+            ] + downsize_tags(downsize),
+            CopyTagsToSnapshot=True,
+            **restore_params
         )
+        if source == SOURCE_PITR:
+            rds.restore_db_instance_to_point_in_time(
+                SourceDBInstanceAutomatedBackupsArn=backup['DBInstanceAutomatedBackupsArn'],
+                TargetDBInstanceIdentifier=target_instance_id,
+                UseLatestRestorableTime=True,
+                **restore_args
+            )
+        else:
+            rds.restore_db_instance_from_db_snapshot(
+                DBInstanceIdentifier=target_instance_id,
+                DBSnapshotIdentifier=latest_snapshot['DBSnapshotIdentifier'],
+                **restore_args
+            )
         print(
-            f"Started restoration of '{target_instance_id}' from snapshot '{snapshot_id}'")
+            f"Started restoration of '{target_instance_id}' from {source_description}")
+        metrics.add('RestoresStarted')
 
         return {
             'statusCode': 200,
-            'body': f"Restoring RDS instance '{target_instance_id}' from snapshot '{snapshot_id}'"
+            'body': f"Restoring RDS instance '{target_instance_id}' from {source_description}"
         }
 
     except Exception as e:
         print(f"Error restoring DB instance: {str(e)}")
+        metrics.add('RestoreErrors')
         return {
             'statusCode': 500,
             'body': f"Error restoring DB instance: {str(e)}"
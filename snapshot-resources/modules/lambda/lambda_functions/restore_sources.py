@@ -0,0 +1,70 @@
+import logging
+
+from snapshot_discovery import snapshot_recovery_point
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+SOURCE_SNAPSHOT = 'snapshot'
+SOURCE_PITR = 'pitr'
+
+# Statuses of automated backups that can be restored from in the DR region
+RESTORABLE_BACKUP_STATUSES = {'replicating', 'active', 'retained'}
+
+
+def find_replicated_backup(rds, instance_id):
+    """
+    The automated backups of the primary replicated into this region, or None.
+    With several (e.g. after the primary was recreated) the one restorable to
+    the latest time wins.
+    """
+    latest = None
+    paginator = rds.get_paginator('describe_db_instance_automated_backups')
+    # The instance exists only in the primary region, so filter rather than
+    # pass DBInstanceIdentifier, which must name an instance in this region
+    pages = paginator.paginate(Filters=[{'Name': 'db-instance-id', 'Values': [instance_id]}])
+    for page in pages:
+        for backup in page.get('DBInstanceAutomatedBackups', []):
+            if backup.get('Status') not in RESTORABLE_BACKUP_STATUSES:
+                continue
+            if not backup.get('RestoreWindow', {}).get('LatestTime'):
+                continue
+            if latest is None or backup['RestoreWindow']['LatestTime'] > latest['RestoreWindow']['LatestTime']:
+                latest = backup
+    return latest
+
+
+def choose_restore_source(snapshot, backup, now, min_rpo_gain_seconds=60):
+    """
+    Pick between the newest DR snapshot and a point-in-time restore to the
+    latest restorable time of the replicated backups.
+
+    A point-in-time restore replays transaction logs on top of a backup, so
+    it is slower than a snapshot restore; it is only chosen when it recovers
+    at least min_rpo_gain_seconds more data.
+
+    Returns {'source', 'recovery_point', 'rpo_seconds', 'reason'}.
+    """
+    snapshot_time = snapshot_recovery_point(snapshot) if snapshot else None
+    pitr_time = backup['RestoreWindow']['LatestTime'] if backup else None
+
+    def choice(source, recovery_point, reason):
+        return {
+            'source': source,
+            'recovery_point': recovery_point,
+            'rpo_seconds': round((now - recovery_point).total_seconds()),
+            'reason': reason
+        }
+
+    if pitr_time is None and snapshot_time is None:
+        return None
+    if pitr_time is None:
+        return choice(SOURCE_SNAPSHOT, snapshot_time, 'no replicated automated backups')
+    if snapshot_time is None:
+        return choice(SOURCE_PITR, pitr_time, 'no DR snapshot')
+
+    gain = (pitr_time - snapshot_time).total_seconds()
+    if gain >= min_rpo_gain_seconds:
+        return choice(SOURCE_PITR, pitr_time, f"point-in-time restore recovers {gain:.0f}s more data")
+    return choice(SOURCE_SNAPSHOT, snapshot_time,
+                  f"point-in-time restore gains only {gain:.0f}s, the snapshot restores faster")
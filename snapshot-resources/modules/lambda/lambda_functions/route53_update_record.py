@@ -1,32 +1,57 @@
-import boto3
 import os
 import json
 import logging
 
+from dr_common import get_client
+from metrics import instrument_handler, metrics
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Direct invocations by the DR Lambdas that pick the instance to switch to
+DIRECT_SOURCES = {
+    'dr.standby': 'Updated after failover to the warm standby',
+    'dr.hydration': 'Updated after hydrating the restored instance'
+}
+# Restore complete: from a snapshot, or to a point in time
+RESTORE_COMPLETE_EVENT_IDS = ('RDS-EVENT-0043', 'RDS-EVENT-0019')
+# With a cutover threshold the hydration stage switches DNS, not the restore event
+HYDRATION_CUTOVER_PERCENT = float(os.getenv('HYDRATION_CUTOVER_PERCENT', '0'))
+
 
+@instrument_handler
 def lambda_handler(event, context):
     logger.info(f"Received event: {json.dumps(event)}")
 
     event_detail = event.get('detail', {})
     event_id = event_detail.get('EventID')
 
-    if event_id != 'RDS-EVENT-0043':
+    # restore_rds_from_snapshot invokes this directly when failing over to the
+    # warm standby, hydrate_restored_instance once the restored instance is warm
+    direct_source = event.get('source') if event.get('source') in DIRECT_SOURCES else None
+    if direct_source:
+        event_detail = {'SourceIdentifier': event.get('db_instance_id')}
+    elif event_id not in RESTORE_COMPLETE_EVENT_IDS:
         logger.info(f"Ignoring event with ID: {event_id}")
         return {
             'statusCode': 200,
             'body': json.dumps({'message': f'Skipped non-target event: {event_id}'})
         }
         
+    if not direct_source:
+        tags = event_detail.get('Tags', {})
+        instance_name = tags.get('Name', '')
         
-    tags = event_detail.get('Tags', {})
-    instance_name = tags.get('Name', '')
-        
-    if instance_name != 'restored-instance':
-        print(f"Skipping Route 53 update: instance tag Name = {instance_name}")
-        return
+        if instance_name != 'restored-instance':
+            print(f"Skipping Route 53 update: instance tag Name = {instance_name}")
+            return
+
+        if HYDRATION_CUTOVER_PERCENT > 0:
+            logger.info(f"Deferring the Route 53 update until {HYDRATION_CUTOVER_PERCENT}% of the restored instance is hydrated")
+            return {
+                'statusCode': 200,
+                'body': json.dumps({'message': 'DNS update deferred to the hydration stage'})
+            }
 
     required_env_vars = ['HOSTED_ZONE_ID', 'RECORD_NAME', 'TTL', 'DR_REGION']
     missing_vars = [var for var in required_env_vars if var not in os.environ]
@@ -44,7 +69,7 @@ def lambda_handler(event, context):
         f"Using Hosted Zone ID: {hosted_zone_id}, Record Name: {record_name}, TTL: {ttl}")
 
     source_identifier = event_detail.get("SourceIdentifier")
-    rds = boto3.client('rds', region_name=dr_region)
+    rds = get_client('rds', region_name=dr_region)
     db_instance_info = rds.describe_db_instances(
         DBInstanceIdentifier=source_identifier)
     endpoint_address = db_instance_info['DBInstances'][0]['Endpoint']['Address']
@@ -57,13 +82,13 @@ def lambda_handler(event, context):
             "body": json.dumps({"error": "Could not find RDS endpoint in the event"})
         }
 
-    route53 = boto3.client('route53')
+    route53 = get_client('route53')
 
     try:
         response = route53.change_resource_record_sets(
             HostedZoneId=hosted_zone_id,
             ChangeBatch={
-                "Comment": "Updated after RDS snapshot restore",
+                "Comment": DIRECT_SOURCES.get(direct_source, "Updated after RDS restore"),
                 "Changes": [
                     {
                         "Action": "UPSERT",
@@ -80,6 +105,7 @@ def lambda_handler(event, context):
 
         logger.info(
             f"Successfully updated Route 53 record to: {endpoint_address}")
+        metrics.add('DNSUpdates')
 
         return {
             "statusCode": 200,
@@ -95,6 +121,7 @@ def lambda_handler(event, context):
 
     except Exception as e:
         logger.exception("Failed to update Route 53 record")
+        metrics.add('DNSUpdateErrors')
         return {
             "statusCode": 500,
             "body": json.dumps({
@@ -1,12 +1,46 @@
-import boto3
 import os
+import re
+import random
+import time
+import threading
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from dr_common import error_code, get_client
+from metrics import instrument_handler, metrics, timed
+from snapshot_discovery import iter_snapshots
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Identifiers produced by snapshot_creator / snapshot_cross_region_copy end with this timestamp
+SNAPSHOT_TIMESTAMP_SUFFIX = re.compile(r'-\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2}$')
+SNAPSHOT_TYPE_PREFIXES = {
+    'base': 'snapshot-',
+    'replica': 'dr-snapshot-'
+}
+
+DELETE_MAX_WORKERS = int(os.getenv('DELETE_MAX_WORKERS', '8'))
+DELETE_MAX_ATTEMPTS = int(os.getenv('DELETE_MAX_ATTEMPTS', '6'))
+BACKOFF_BASE_SECONDS = 0.25
+BACKOFF_MAX_SECONDS = 8.0
+THROTTLING_ERROR_CODES = {
+    'Throttling',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+    'TooManyRequestsException'
+}
+# Snapshot is already gone or busy (e.g. still being copied); retrying now will not help
+SKIPPABLE_ERROR_CODES = {
+    'DBSnapshotNotFound',
+    'DBSnapshotNotFoundFault',
+    'InvalidDBSnapshotState',
+    'InvalidDBSnapshotStateFault'
+}
 
+
+@instrument_handler
 def lambda_handler(event, context):
     try:
         event_detail = event.get('detail', {})
@@ -27,13 +61,25 @@ def lambda_handler(event, context):
         dr_region = os.environ['DR_REGION']
         instance_id = os.environ['RDS_INSTANCE_ID']
 
-        clean_snapshots(region=primary_region, prefix=f"snapshot-{instance_id}", snapshot_type='base')
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [
+                executor.submit(clean_snapshots, region=primary_region, prefix=f"snapshot-{instance_id}",
+                                snapshot_type='base', instance_id=instance_id),
+                executor.submit(clean_snapshots, region=dr_region, prefix=f"dr-snapshot-{instance_id}",
+                                snapshot_type='replica', instance_id=instance_id)
+            ]
+            summaries = [future.result() for future in futures]
 
-        clean_snapshots(region=dr_region, prefix=f"dr-snapshot-{instance_id}", snapshot_type='replica')
+        for summary in summaries:
+            metrics.add('SnapshotsDeleted', len(summary['deleted']))
+            metrics.add('SnapshotDeleteRetries', summary['retries'])
+            metrics.add('SnapshotDeletesSkipped', len(summary['skipped']))
+            metrics.add('SnapshotDeletesFailed', len(summary['failed']))
 
         return {
             'statusCode': 200,
-            'body': f"Old snapshots cleaned in {primary_region} and {dr_region}"
+            'body': f"Old snapshots cleaned in {primary_region} and {dr_region}",
+            'summary': summaries
         }
 
     except Exception as e:
@@ -41,35 +87,167 @@ def lambda_handler(event, context):
         raise
 
 
-def clean_snapshots(region, prefix, snapshot_type):
-    client = boto3.client('rds', region_name=region)
+def classify_snapshot(snapshot):
+    """
+    Determine the SnapshotType of a snapshot without an extra API call.
+    Uses the SnapshotType tag from the TagList returned by describe_db_snapshots,
+    falling back to the identifier convention of the snapshot Lambdas when the
+    tag is absent. Returns None when unknown.
+    """
+    tag_map = {tag['Key']: tag['Value'] for tag in snapshot.get('TagList', [])}
+    if 'SnapshotType' in tag_map:
+        return tag_map['SnapshotType']
+
+    snapshot_id = snapshot['DBSnapshotIdentifier']
+    if SNAPSHOT_TIMESTAMP_SUFFIX.search(snapshot_id):
+        for snapshot_type, prefix in SNAPSHOT_TYPE_PREFIXES.items():
+            if snapshot_id.startswith(prefix):
+                return snapshot_type
+    return None
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Bounds in-flight delete calls. The limit is halved whenever RDS throttles
+    and grows back by one per successful call, up to max_concurrency.
+    """
+
+    def __init__(self, max_concurrency):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= self.limit:
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, throttled=False):
+        with self.condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(1, self.limit // 2)
+            elif self.limit < self.max_concurrency:
+                self.limit += 1
+            self.condition.notify_all()
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+def delete_snapshot(client, snapshot_id, region, limiter):
+    """
+    Delete one snapshot, retrying throttled calls with jittered backoff.
+    Returns a (outcome, attempts) tuple where outcome is deleted, skipped or failed.
+    """
+    for attempt in range(DELETE_MAX_ATTEMPTS):
+        limiter.acquire()
+        throttled = False
+        try:
+            client.delete_db_snapshot(DBSnapshotIdentifier=snapshot_id)
+            logger.info(f"Deleted snapshot {snapshot_id} in {region}")
+            return 'deleted', attempt + 1
+        except Exception as e:
+            code = error_code(e)
+            if code in SKIPPABLE_ERROR_CODES:
+                logger.warning(f"Skipping snapshot {snapshot_id} in {region}: {code}")
+                return 'skipped', attempt + 1
+            if code not in THROTTLING_ERROR_CODES:
+                logger.error(f"Failed to delete snapshot {snapshot_id} in {region}: {e}")
+                return 'failed', attempt + 1
+            throttled = True
+        finally:
+            limiter.release(throttled=throttled)
+
+        if attempt + 1 == DELETE_MAX_ATTEMPTS:
+            break
+        delay = backoff_delay(attempt)
+        logger.info(f"Throttled deleting {snapshot_id} in {region}, retrying in {delay:.2f}s")
+        time.sleep(delay)
 
-    snapshots = client.describe_db_snapshots(
-        SnapshotType='manual'
-    )['DBSnapshots']
+    logger.error(f"Giving up on snapshot {snapshot_id} in {region} after {DELETE_MAX_ATTEMPTS} throttled attempts")
+    return 'failed', DELETE_MAX_ATTEMPTS
+
+
+def delete_snapshots(client, snapshot_ids, region, max_workers=DELETE_MAX_WORKERS):
+    """
+    Delete snapshots through a bounded thread pool and summarise the outcome.
+    """
+    summary = {
+        'region': region,
+        'deleted': [],
+        'skipped': [],
+        'failed': [],
+        # Throttled attempts that were retried, across all snapshots
+        'retries': 0
+    }
+    if not snapshot_ids:
+        return summary
+
+    limiter = AdaptiveConcurrencyLimiter(max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(delete_snapshot, client, snapshot_id, region, limiter): snapshot_id
+            for snapshot_id in snapshot_ids
+        }
+        for future, snapshot_id in futures.items():
+            outcome, attempts = future.result()
+            summary[outcome].append(snapshot_id)
+            summary['retries'] += attempts - 1
+
+    logger.info(
+        f"Cleanup in {region}: {len(summary['deleted'])} deleted, {summary['retries']} retries, "
+        f"{len(summary['skipped'])} skipped, {len(summary['failed'])} failed")
+    return summary
+
+
+def clean_snapshots(region, prefix, snapshot_type, instance_id=None):
+    with timed('CleanRegion'):
+        return _clean_snapshots(region, prefix, snapshot_type, instance_id)
+
+
+def _clean_snapshots(region, prefix, snapshot_type, instance_id=None):
+    client = get_client('rds', region_name=region)
+    # delete_snapshot retries throttled deletes itself and feeds them to the
+    # limiter, so the client must not retry them again underneath
+    delete_client = get_client('rds', region_name=region, max_pool_connections=DELETE_MAX_WORKERS,
+                               retries={'mode': 'standard', 'max_attempts': 1})
 
     filtered = []
-    for snap in snapshots:
-        if snap['DBSnapshotIdentifier'].startswith(prefix):
+    tag_lookups = 0
+    for snap in iter_snapshots(client, instance_id=instance_id):
+        if not snap['DBSnapshotIdentifier'].startswith(prefix):
+            continue
+
+        classification = classify_snapshot(snap)
+        if classification is None:
+            tag_lookups += 1
             tags = client.list_tags_for_resource(ResourceName=snap['DBSnapshotArn'])['TagList']
             tag_map = {tag['Key']: tag['Value'] for tag in tags}
-            if tag_map.get('SnapshotType') == snapshot_type:
-                if 'SnapshotCreateTime' in snap:
-                    filtered.append(snap)
-                else:
-                    logger.warning(f"Skipping snapshot {snap['DBSnapshotIdentifier']} as it has no SnapshotCreateTime")
+            classification = tag_map.get('SnapshotType')
+
+        if classification == snapshot_type:
+            if 'SnapshotCreateTime' in snap:
+                filtered.append(snap)
+            else:
+                logger.warning(f"Skipping snapshot {snap['DBSnapshotIdentifier']} as it has no SnapshotCreateTime")
+
+    if tag_lookups:
+        logger.info(f"Fetched tags for {tag_lookups} snapshots in {region} without a SnapshotType tag")
 
     if not filtered:
         logger.info(f"No snapshots found in {region} with prefix {prefix}")
-        return
+        return delete_snapshots(delete_client, [], region)
 
     filtered.sort(key=lambda x: x['SnapshotCreateTime'], reverse=True)
 
-    snapshots_to_delete = filtered[1:]
-    for snap in snapshots_to_delete:
-        snap_id = snap['DBSnapshotIdentifier']
-        logger.info(f"Deleting snapshot {snap_id} in {region}")
-        try:
-            client.delete_db_snapshot(DBSnapshotIdentifier=snap_id)
-        except Exception as e:
-            logger.error(f"Failed to delete snapshot {snap_id} in {region}: {e}")
\ No newline at end of file
+    snapshots_to_delete = [snap['DBSnapshotIdentifier'] for snap in filtered[1:]]
+    logger.info(f"Deleting {len(snapshots_to_delete)} snapshots in {region}, keeping {filtered[0]['DBSnapshotIdentifier']}")
+
+    summary = delete_snapshots(delete_client, snapshots_to_delete, region)
+    summary['kept'] = filtered[0]['DBSnapshotIdentifier']
+    return summary
@@ -1,13 +1,141 @@
-import boto3
 import os
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import logging
 import json
 
+from dr_common import get_client
+from metrics import instrument_handler, metrics
+from snapshot_discovery import iter_snapshots
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# 'always' snapshots on every run; 'change_aware' skips runs with nothing new to capture
+SNAPSHOT_SCHEDULING = os.getenv('SNAPSHOT_SCHEDULING', 'always')
+# WriteIOPS history used to measure the instance's idle write rate
+SNAPSHOT_IDLE_BASELINE_SECONDS = int(os.getenv('SNAPSHOT_IDLE_BASELINE_SECONDS', '86400'))
+# Since the last snapshot, every minute must stay within this multiple of the idle rate to skip
+SNAPSHOT_IDLE_WRITE_FACTOR = float(os.getenv('SNAPSHOT_IDLE_WRITE_FACTOR', '1.5'))
+# A snapshot is taken at least this often whatever the write activity, bounding RPO
+SNAPSHOT_MAX_INTERVAL_SECONDS = int(os.getenv('SNAPSHOT_MAX_INTERVAL_SECONDS', '3600'))
+WRITE_METRIC_PERIOD_SECONDS = 60
+# Quietest share of the history taken as the idle rate, and the fewest datapoints to trust it
+IDLE_BASELINE_PERCENTILE = 0.1
+IDLE_BASELINE_MIN_DATAPOINTS = 60
+
+
+def fetch_write_iops(cloudwatch, instance_id, start_time, end_time,
+                     period=WRITE_METRIC_PERIOD_SECONDS):
+    """
+    Return the instance's per-period WriteIOPS averages between start_time
+    and end_time as (timestamp, value) pairs, oldest first.
+    """
+    points = []
+    kwargs = {
+        'MetricDataQueries': [{
+            'Id': 'writes',
+            'MetricStat': {
+                'Metric': {
+                    'Namespace': 'AWS/RDS',
+                    'MetricName': 'WriteIOPS',
+                    'Dimensions': [{'Name': 'DBInstanceIdentifier', 'Value': instance_id}]
+                },
+                'Period': period,
+                'Stat': 'Average'
+            },
+            'ReturnData': True
+        }],
+        'StartTime': start_time,
+        'EndTime': end_time,
+        'ScanBy': 'TimestampAscending'
+    }
+    while True:
+        response = cloudwatch.get_metric_data(**kwargs)
+        for result in response['MetricDataResults']:
+            points.extend(zip(result['Timestamps'], result['Values']))
+        if not response.get('NextToken'):
+            break
+        kwargs['NextToken'] = response['NextToken']
+    return sorted(points)
+
+
+def write_activity(cloudwatch, instance_id, since, now):
+    """
+    Compare the WriteIOPS since the last snapshot with the instance's idle
+    write rate, the quietest IDLE_BASELINE_PERCENTILE of its per-minute
+    averages over the last SNAPSHOT_IDLE_BASELINE_SECONDS. Checkpoints and
+    log flushes keep even an idle instance writing, so the rate is measured
+    rather than fixed. Returns None when there is too little history to
+    measure it or no datapoint since the snapshot.
+    """
+    start_time = min(since, now - timedelta(seconds=SNAPSHOT_IDLE_BASELINE_SECONDS))
+    points = fetch_write_iops(cloudwatch, instance_id, start_time, now)
+    recent = [value for timestamp, value in points if timestamp >= since]
+    if len(points) < IDLE_BASELINE_MIN_DATAPOINTS or not recent:
+        return None
+
+    values = sorted(value for _, value in points)
+    idle_iops = values[int(len(values) * IDLE_BASELINE_PERCENTILE)]
+    return {
+        'idle_write_iops': round(idle_iops, 2),
+        'peak_write_iops': round(max(recent), 2),
+        'idle_write_limit': round(idle_iops * SNAPSHOT_IDLE_WRITE_FACTOR, 2)
+    }
+
+
+def scheduling_decision(rds, cloudwatch, instance_id, now=None):
+    """
+    Decide whether this run should take a snapshot.
+    Returns {'action': 'snapshot' | 'skip' | 'defer', 'reason': ...}.
+
+    A snapshot still being created defers the run to the next schedule. Write
+    activity no higher than the idle rate since the newest available snapshot
+    skips it, unless that snapshot is older than SNAPSHOT_MAX_INTERVAL_SECONDS.
+    Missing metrics never cause a skip.
+    """
+    now = now or datetime.now(timezone.utc)
+    prefix = f"snapshot-{instance_id}-"
+
+    latest = None
+    for snapshot in iter_snapshots(rds, instance_id=instance_id):
+        if not snapshot.get('DBSnapshotIdentifier', '').startswith(prefix):
+            continue
+        if snapshot.get('Status') == 'creating':
+            return {
+                'action': 'defer',
+                'reason': 'snapshot_in_progress',
+                'snapshot_id': snapshot['DBSnapshotIdentifier']
+            }
+        created_at = snapshot.get('SnapshotCreateTime')
+        if snapshot.get('Status') == 'available' and created_at is not None:
+            if latest is None or created_at > latest['SnapshotCreateTime']:
+                latest = snapshot
 
+    if latest is None:
+        return {'action': 'snapshot', 'reason': 'no_previous_snapshot'}
+
+    decision = {
+        'latest_snapshot_id': latest['DBSnapshotIdentifier'],
+        'seconds_since_snapshot': round((now - latest['SnapshotCreateTime']).total_seconds())
+    }
+    if decision['seconds_since_snapshot'] >= SNAPSHOT_MAX_INTERVAL_SECONDS:
+        return {'action': 'snapshot', 'reason': 'max_interval_reached', **decision}
+
+    try:
+        activity = write_activity(cloudwatch, instance_id, latest['SnapshotCreateTime'], now)
+    except Exception as e:
+        logger.warning(f"Could not read write activity for {instance_id}: {e}")
+        activity = None
+    if activity is None:
+        return {'action': 'snapshot', 'reason': 'write_metrics_unavailable', **decision}
+
+    decision.update(activity)
+    if activity['peak_write_iops'] <= activity['idle_write_limit']:
+        return {'action': 'skip', 'reason': 'no_changes', **decision}
+    return {'action': 'snapshot', 'reason': 'writes_since_snapshot', **decision}
+
+
+@instrument_handler
 def lambda_handler(event, context):
     try:
         required_env_vars = ['PRIMARY_REGION', 'RDS_INSTANCE_ID']
@@ -19,7 +147,26 @@ def lambda_handler(event, context):
 
         instance_id = os.environ['RDS_INSTANCE_ID']
         primary_region = os.environ['PRIMARY_REGION']
-        rds = boto3.client('rds', region_name=primary_region)
+        rds = get_client('rds', region_name=primary_region)
+
+        if SNAPSHOT_SCHEDULING == 'change_aware':
+            decision = scheduling_decision(
+                rds, get_client('cloudwatch', region_name=primary_region), instance_id)
+            logger.info(f"Snapshot scheduling decision: {decision}")
+            metrics.set_property('SchedulingReason', decision['reason'])
+            if 'peak_write_iops' in decision:
+                metrics.put('IdleWriteIOPS', decision['idle_write_iops'], 'Count/Second')
+                metrics.put('PeakWriteIOPSSinceSnapshot', decision['peak_write_iops'], 'Count/Second')
+
+            if decision['action'] != 'snapshot':
+                metrics.add('SnapshotsDeferred' if decision['action'] == 'defer' else 'SnapshotsSkipped')
+                return {
+                    'statusCode': 200,
+                    'body': json.dumps({
+                        'message': f"Snapshot {'deferred' if decision['action'] == 'defer' else 'skipped'}",
+                        **decision
+                    })
+                }
 
         timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d-%H-%M-%S')
         snapshot_id = f"snapshot-{instance_id}-{timestamp}"
@@ -41,6 +188,7 @@ def lambda_handler(event, context):
             Tags=tags
         )
         logger.info(f"Snapshot initiated: {response}")
+        metrics.add('SnapshotsCreated')
 
         return {
             'statusCode': 200,
@@ -1,19 +1,49 @@
-import boto3
 import os
 import json
+import time
 import logging
 from datetime import datetime, timezone
 
+from dr_common import get_client
+from metrics import instrument_handler, metrics
+from restore_profiles import sizing_tags, source_sizing
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# The primary's sizing is read once per container and refreshed after this long
+SOURCE_SIZING_TTL_SECONDS = int(os.getenv('SOURCE_SIZING_TTL_SECONDS', '3600'))
+
+# instance id -> (read at, sizing)
+_source_sizing = {}
+
+
+def get_source_sizing(primary_region, instance_id):
+    """
+    Sizing of the primary instance for the restore profiles, or {} when it
+    cannot be read; a copy is never held up by it.
+    """
+    cached = _source_sizing.get(instance_id)
+    if cached and time.time() - cached[0] < SOURCE_SIZING_TTL_SECONDS:
+        return cached[1]
+    try:
+        rds = get_client('rds', region_name=primary_region)
+        db_instance = rds.describe_db_instances(DBInstanceIdentifier=instance_id)['DBInstances'][0]
+    except Exception as e:
+        logger.warning(f"Could not read the sizing of {instance_id}, copying without it: {str(e)}")
+        return cached[1] if cached else {}
+    _source_sizing[instance_id] = (time.time(), source_sizing(db_instance))
+    return _source_sizing[instance_id][1]
+
 
+@instrument_handler
 def lambda_handler(event, context):
     try:
         event_detail = event['detail']
         event_id = event_detail.get('EventID')
         if event_id != 'RDS-EVENT-0042':
             logger.info(f"Ignoring event with ID: {event_id}")
+            metrics.add('EventsIgnored')
             return {
                 'statusCode': 200,
                 'body': json.dumps({'message': f'Skipped non-target event: {event_id}'})
@@ -39,7 +69,7 @@ def lambda_handler(event, context):
             f"Processing manual snapshot {snapshot_id} from {source_arn}")
         copied_at = event.get('time', datetime.now(timezone.utc).isoformat())
 
-        dr_rds = boto3.client('rds', region_name=dr_region)
+        dr_rds = get_client('rds', region_name=dr_region)
 
         tags = [
             {'Key': 'Source', 'Value': 'DR-Replication'},
@@ -53,6 +83,9 @@ def lambda_handler(event, context):
             {'Key': 'ManagedBy', 'Value': 'Terraform'},
             {'Key': 'ReplicationType', 'Value': 'cross-region'}
         ]
+        if os.getenv('RDS_INSTANCE_ID'):
+            # Lets restore_rds_from_snapshot size the restore without the primary region
+            tags += sizing_tags(get_source_sizing(primary_region, os.environ['RDS_INSTANCE_ID']))
 
         response = dr_rds.copy_db_snapshot(
             SourceDBSnapshotIdentifier=source_arn,
@@ -62,6 +95,7 @@ def lambda_handler(event, context):
         )
         logger.info(
             f"Successfully initiated DR copy of {snapshot_id}. New snapshot: dr-{snapshot_id}")
+        metrics.add('SnapshotCopiesStarted')
 
         return {
             'statusCode': 200,
@@ -0,0 +1,71 @@
+import logging
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# describe_db_snapshots accepts MaxRecords between 20 and 100
+SNAPSHOT_PAGE_SIZE = 100
+
+
+def iter_snapshots(rds, instance_id=None, snapshot_type='manual', page_size=SNAPSHOT_PAGE_SIZE):
+    """
+    Lazily yield DB snapshots page by page.
+    Filtering by instance and snapshot type is pushed down to the RDS API so
+    only snapshots of the protected instance are transferred.
+    """
+    params = {
+        'SnapshotType': snapshot_type,
+        'PaginationConfig': {'PageSize': page_size}
+    }
+    if instance_id:
+        params['DBInstanceIdentifier'] = instance_id
+
+    paginator = rds.get_paginator('describe_db_snapshots')
+    for page in paginator.paginate(**params):
+        for snapshot in page.get('DBSnapshots', []):
+            yield snapshot
+
+
+def snapshot_recovery_point(snapshot):
+    """
+    When the snapshot's data was taken. RDS resets SnapshotCreateTime on a
+    copy, so a DR copy carries the source's time in OriginalSnapshotCreateTime.
+    """
+    return snapshot.get('OriginalSnapshotCreateTime', snapshot.get('SnapshotCreateTime'))
+
+
+def select_latest_snapshot(snapshots, prefix, status='available'):
+    """
+    Pick the snapshot with the newest data matching the prefix and status in
+    a single pass. Returns None when nothing matches.
+    """
+    latest = None
+    for snapshot in snapshots:
+        if not snapshot.get('DBSnapshotIdentifier', '').startswith(prefix):
+            continue
+        if status and snapshot.get('Status') != status:
+            continue
+        created_at = snapshot_recovery_point(snapshot)
+        if created_at is None:
+            continue
+        if latest is None or created_at > snapshot_recovery_point(latest):
+            latest = snapshot
+    return latest
+
+
+def find_latest_snapshot(rds, instance_id, prefix, snapshot_type='manual', status='available'):
+    """
+    Find the newest available snapshot of an instance whose identifier starts with prefix.
+    """
+    latest = select_latest_snapshot(
+        iter_snapshots(rds, instance_id=instance_id, snapshot_type=snapshot_type),
+        prefix,
+        status=status
+    )
+    if latest:
+        logger.info(
+            f"Latest snapshot for {instance_id}: {latest['DBSnapshotIdentifier']} "
+            f"(Created at {snapshot_recovery_point(latest)})")
+    else:
+        logger.info(f"No {status} {snapshot_type} snapshots found for {instance_id} with prefix {prefix}")
+    return latest
@@ -0,0 +1,218 @@
+import logging
+from datetime import datetime, timezone
+
+from dr_common import error_code
+from restore_profiles import resolve_profile, restore_sizing
+from snapshot_discovery import find_latest_snapshot, snapshot_recovery_point
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# The standby alternates between two instances: the new one is restored next
+# to the current one and replaces it only once it is available (blue/green)
+SLOTS = ('blue', 'green')
+
+ROLE_TAG = 'StandbyRole'
+SOURCE_SNAPSHOT_TAG = 'SourceSnapshot'
+# Original creation time of the source snapshot: the standby's recovery point
+SOURCE_SNAPSHOT_TIME_TAG = 'SourceSnapshotTime'
+REFRESHED_AT_TAG = 'StandbyRefreshedAt'
+# pending: being restored; active: serves failover; retired: being deleted;
+# promoted: failover happened
+ROLE_PENDING = 'pending'
+ROLE_ACTIVE = 'active'
+ROLE_RETIRED = 'retired'
+ROLE_PROMOTED = 'promoted'
+
+RESTORE_FAILED_STATUSES = {'failed', 'incompatible-restore', 'incompatible-parameters', 'incompatible-network'}
+
+
+def slot_instance_id(prefix, slot):
+    return f"{prefix}-{slot}"
+
+
+def tag_map(db_instance):
+    return {tag['Key']: tag['Value'] for tag in db_instance.get('TagList', [])}
+
+
+def describe_slots(rds, prefix):
+    """
+    Return {slot: db_instance or None} for both standby slots.
+    """
+    slots = {}
+    for slot in SLOTS:
+        try:
+            response = rds.describe_db_instances(DBInstanceIdentifier=slot_instance_id(prefix, slot))
+            slots[slot] = response['DBInstances'][0]
+        except Exception as e:
+            if error_code(e) not in ('DBInstanceNotFound', 'DBInstanceNotFoundFault'):
+                raise
+            slots[slot] = None
+    return slots
+
+
+def find_standby(slots, role):
+    """Return (slot, db_instance) of the standby with the role, or (None, None)."""
+    for slot, db_instance in slots.items():
+        if db_instance and tag_map(db_instance).get(ROLE_TAG) == role:
+            return slot, db_instance
+    return None, None
+
+
+def set_role(rds, db_instance, role):
+    rds.add_tags_to_resource(ResourceName=db_instance['DBInstanceArn'], Tags=[{'Key': ROLE_TAG, 'Value': role}])
+
+
+def standby_recovery_point(rds, db_instance):
+    """
+    Recovery point of the snapshot the standby was restored from, or None when
+    unknown. Standbys restored before the time was tagged look up their
+    source snapshot.
+    """
+    tags = tag_map(db_instance)
+    if tags.get(SOURCE_SNAPSHOT_TIME_TAG):
+        return datetime.fromisoformat(tags[SOURCE_SNAPSHOT_TIME_TAG])
+    if not tags.get(SOURCE_SNAPSHOT_TAG):
+        return None
+    try:
+        response = rds.describe_db_snapshots(DBSnapshotIdentifier=tags[SOURCE_SNAPSHOT_TAG])
+        return snapshot_recovery_point(response['DBSnapshots'][0])
+    except Exception as e:
+        logger.warning(f"Could not read the source snapshot of {db_instance['DBInstanceIdentifier']}: {str(e)}")
+        return None
+
+
+def restore_standby(rds, instance_id, snapshot, config, now):
+    """
+    Start restoring the standby slot instance from the snapshot, sized by
+    the restore profile since the standby becomes the database on failover.
+    """
+    restore_params, _ = resolve_profile(
+        config['profile'],
+        restore_sizing(snapshot, config['instance_id'], config['profile']),
+        overrides=config['overrides']
+    )
+    rds.restore_db_instance_from_db_snapshot(
+        DBInstanceIdentifier=instance_id,
+        DBSnapshotIdentifier=snapshot['DBSnapshotIdentifier'],
+        PubliclyAccessible=True,
+        VpcSecurityGroupIds=[config['security_group_id']],
+        DBParameterGroupName=config['parameter_group_name'],
+        DBSubnetGroupName=config['subnet_group_name'],
+        Tags=[
+            {'Key': 'Name', 'Value': instance_id},
+            {'Key': 'ManagedBy', 'Value': 'Terraform'},
+            {'Key': 'Environment', 'Value': 'DR'},
+            {'Key': ROLE_TAG, 'Value': ROLE_PENDING},
+            {'Key': SOURCE_SNAPSHOT_TAG, 'Value': snapshot['DBSnapshotIdentifier']},
+            {'Key': SOURCE_SNAPSHOT_TIME_TAG, 'Value': snapshot_recovery_point(snapshot).isoformat()},
+            {'Key': REFRESHED_AT_TAG, 'Value': now.isoformat()}
+        ],
+        CopyTagsToSnapshot=True,
+        **restore_params
+    )
+
+
+def retire(rds, db_instance):
+    """Delete a standby that has been replaced or whose restore failed."""
+    # Retag first so a deleting instance is never mistaken for the active standby
+    set_role(rds, db_instance, ROLE_RETIRED)
+    rds.delete_db_instance(
+        DBInstanceIdentifier=db_instance['DBInstanceIdentifier'],
+        SkipFinalSnapshot=True,
+        DeleteAutomatedBackups=True
+    )
+
+
+def reconcile(rds, config, now=None):
+    """
+    Move the warm standby one step towards running from the latest DR snapshot.
+    Safe to call repeatedly, from schedules and RDS events alike.
+
+    config: instance_id, prefix, profile, overrides, security_group_id,
+    parameter_group_name, subnet_group_name, refresh_interval_seconds.
+
+    Returns {'action': ..., ...} describing what was done.
+    """
+    now = now or datetime.now(timezone.utc)
+    prefix = config['prefix']
+    slots = describe_slots(rds, prefix)
+
+    promoted_slot, _ = find_standby(slots, ROLE_PROMOTED)
+    if promoted_slot:
+        # After a failover the standby is the database; it must not be replaced
+        return {'action': 'failed_over', 'slot': promoted_slot}
+
+    active_slot, active = find_standby(slots, ROLE_ACTIVE)
+    pending_slot, pending = find_standby(slots, ROLE_PENDING)
+
+    if pending:
+        status = pending['DBInstanceStatus']
+        if status in RESTORE_FAILED_STATUSES:
+            retire(rds, pending)
+            return {'action': 'restore_failed', 'slot': pending_slot, 'status': status}
+        if status != 'available':
+            return {'action': 'waiting_for_restore', 'slot': pending_slot, 'status': status}
+
+        # Blue/green swap: the new standby takes over, the old one is deleted
+        set_role(rds, pending, ROLE_ACTIVE)
+        if active:
+            retire(rds, active)
+        return {
+            'action': 'swapped',
+            'slot': pending_slot,
+            'retired_slot': active_slot,
+            'source_snapshot': tag_map(pending).get(SOURCE_SNAPSHOT_TAG)
+        }
+
+    latest = find_latest_snapshot(rds, instance_id=config['instance_id'],
+                                  prefix=f"dr-snapshot-{config['instance_id']}")
+    if not latest:
+        return {'action': 'no_snapshot'}
+
+    if active:
+        active_tags = tag_map(active)
+        if active_tags.get(SOURCE_SNAPSHOT_TAG) == latest['DBSnapshotIdentifier']:
+            return {'action': 'up_to_date', 'slot': active_slot, 'source_snapshot': latest['DBSnapshotIdentifier']}
+        refreshed_at = active_tags.get(REFRESHED_AT_TAG)
+        if refreshed_at:
+            age = (now - datetime.fromisoformat(refreshed_at)).total_seconds()
+            if age < config['refresh_interval_seconds']:
+                return {'action': 'cadence_wait', 'slot': active_slot, 'seconds_until_refresh': round(config['refresh_interval_seconds'] - age)}
+
+    free_slot = next(slot for slot in SLOTS if slot != active_slot)
+    if slots[free_slot] is not None:
+        # Still being deleted after the previous swap, or left behind untagged
+        if tag_map(slots[free_slot]).get(ROLE_TAG) != ROLE_RETIRED:
+            retire(rds, slots[free_slot])
+        return {'action': 'waiting_for_slot', 'slot': free_slot, 'status': slots[free_slot]['DBInstanceStatus']}
+
+    restore_standby(rds, slot_instance_id(prefix, free_slot), latest, config, now)
+    return {'action': 'refresh_started', 'slot': free_slot, 'source_snapshot': latest['DBSnapshotIdentifier']}
+
+
+def claim_for_failover(rds, prefix, newest_recovery_point=None, max_staleness_seconds=0):
+    """
+    Return the available active standby and mark it promoted so the standby
+    manager stops replacing it, or None when there is no usable standby.
+
+    With newest_recovery_point, an active standby restored from a snapshot
+    more than max_staleness_seconds older is not used: a restore recovers
+    more data. A standby already promoted by an earlier run is kept.
+    """
+    slots = describe_slots(rds, prefix)
+    slot, db_instance = find_standby(slots, ROLE_PROMOTED)
+    if db_instance is None:
+        slot, db_instance = find_standby(slots, ROLE_ACTIVE)
+        if db_instance is not None and newest_recovery_point is not None:
+            recovery_point = standby_recovery_point(rds, db_instance)
+            if recovery_point is None or (newest_recovery_point - recovery_point).total_seconds() > max_staleness_seconds:
+                logger.info(f"Standby {db_instance['DBInstanceIdentifier']} ({slot}) recovers to {recovery_point}, "
+                            f"stale against {newest_recovery_point}")
+                return None
+    if db_instance is None or db_instance['DBInstanceStatus'] != 'available':
+        return None
+
+    set_role(rds, db_instance, ROLE_PROMOTED)
+    logger.info(f"Standby {db_instance['DBInstanceIdentifier']} ({slot}) claimed for failover")
+    return db_instance
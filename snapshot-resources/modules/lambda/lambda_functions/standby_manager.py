@@ -0,0 +1,67 @@
+import os
+import json
+import logging
+
+from dr_common import get_client
+from metrics import instrument_handler, metrics
+from restore_profiles import PROFILE_FAST_THEN_DOWNSIZE, PROFILE_MATCH_SOURCE, restore_overrides
+from standby import reconcile
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+ACTION_METRICS = {
+    'refresh_started': 'StandbyRefreshesStarted',
+    'swapped': 'StandbySwaps',
+    'restore_failed': 'StandbyRestoreFailures'
+}
+
+
+def standby_config():
+    profile = os.getenv('RESTORE_PROFILE', PROFILE_MATCH_SOURCE)
+    return {
+        'instance_id': os.environ['RDS_INSTANCE_ID'],
+        'prefix': os.environ['STANDBY_INSTANCE_PREFIX'],
+        # The standby is restored ahead of any failover, so there is no restore to speed up
+        'profile': PROFILE_MATCH_SOURCE if profile == PROFILE_FAST_THEN_DOWNSIZE else profile,
+        'overrides': restore_overrides(),
+        'security_group_id': os.environ['SECURITY_GROUP_ID'],
+        'parameter_group_name': os.environ['PARAMETER_GROUP_NAME'],
+        'subnet_group_name': os.environ['SUBNET_GROUP_NAME'],
+        'refresh_interval_seconds': int(os.getenv('STANDBY_REFRESH_INTERVAL_SECONDS', '3600'))
+    }
+
+
+@instrument_handler
+def lambda_handler(event, context):
+    """
+    Keep a warm standby restored from the latest DR snapshot. Runs on a
+    schedule and on DR snapshot copy and restore events; every run advances
+    the blue/green refresh by at most one step.
+    """
+    try:
+        required_env_vars = ['DR_REGION', 'RDS_INSTANCE_ID', 'STANDBY_INSTANCE_PREFIX',
+                             'SUBNET_GROUP_NAME', 'PARAMETER_GROUP_NAME', 'SECURITY_GROUP_ID']
+        missing_vars = [var for var in required_env_vars if var not in os.environ]
+        if missing_vars:
+            raise ValueError(
+                f"Missing environment variables: {', '.join(missing_vars)}")
+
+        logger.info(f"Reconciling warm standby for event: {json.dumps(event, default=str)}")
+        rds = get_client('rds', region_name=os.environ['DR_REGION'])
+
+        result = reconcile(rds, standby_config())
+        logger.info(f"Standby reconcile result: {result}")
+        metrics.set_property('StandbyAction', result['action'])
+        if result['action'] in ACTION_METRICS:
+            metrics.add(ACTION_METRICS[result['action']])
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps(result)
+        }
+
+    except Exception as e:
+        logger.error(f"Standby manager failed: {str(e)}", exc_info=True)
+        metrics.add('StandbyErrors')
+        raise
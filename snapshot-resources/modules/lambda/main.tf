@@ -1,32 +1,225 @@
+locals {
+  # Client factory and EMF metrics shared with the failover Lambdas in terraform/lambda_functions
+  dr_common_source = "${path.module}/../../../terraform/lambda_functions/dr_common.py"
+  metrics_source   = "${path.module}/../../../terraform/lambda_functions/metrics.py"
+
+  # Minimal Postgres client, used by the hydration stage to read the restored database
+  postgres_probe_source = "${path.module}/../../../terraform/lambda_functions/postgres_probe.py"
+
+  # Warm standby instances are <prefix>-blue and <prefix>-green
+  standby_instance_prefix = "${var.project_name}-standby"
+
+  # Explicit restore sizing, only for the values that are set
+  restore_override_env = {
+    for name, value in {
+      RESTORE_INSTANCE_CLASS     = var.restore_overrides.instance_class
+      RESTORE_MULTI_AZ           = var.restore_overrides.multi_az
+      RESTORE_STORAGE_TYPE       = var.restore_overrides.storage_type
+      RESTORE_IOPS               = var.restore_overrides.iops
+      RESTORE_STORAGE_THROUGHPUT = var.restore_overrides.storage_throughput
+    } : name => tostring(value) if value != null
+  }
+}
+
 data "archive_file" "snapshot_creator_zip" {
   type        = "zip"
-  source_file = "${path.module}/lambda_functions/snapshot_creator.py"
   output_path = "${path.module}/snapshot_creator.zip"
+
+  source {
+    content  = file("${path.module}/lambda_functions/snapshot_creator.py")
+    filename = "snapshot_creator.py"
+  }
+
+  source {
+    content  = file("${path.module}/lambda_functions/snapshot_discovery.py")
+    filename = "snapshot_discovery.py"
+  }
+
+  source {
+    content  = file(local.dr_common_source)
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file(local.metrics_source)
+    filename = "metrics.py"
+  }
 }
 
 data "archive_file" "snapshot_cross_region_copy_zip" {
   type        = "zip"
-  source_file = "${path.module}/lambda_functions/snapshot_cross_region_copy.py"
   output_path = "${path.module}/snapshot_cross_region_copy.zip"
+
+  source {
+    content  = file("${path.module}/lambda_functions/snapshot_cross_region_copy.py")
+    filename = "snapshot_cross_region_copy.py"
+  }
+
+  source {
+    content  = file("${path.module}/lambda_functions/restore_profiles.py")
+    filename = "restore_profiles.py"
+  }
+
+  source {
+    content  = file(local.dr_common_source)
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file(local.metrics_source)
+    filename = "metrics.py"
+  }
 }
 
 data "archive_file" "snapshot_cleaner_zip" {
   type        = "zip"
-  source_file = "${path.module}/lambda_functions/snapshot_cleaner.py"
   output_path = "${path.module}/snapshot_cleaner.zip"
+
+  source {
+    content  = file("${path.module}/lambda_functions/snapshot_cleaner.py")
+    filename = "snapshot_cleaner.py"
+  }
+
+  source {
+    content  = file("${path.module}/lambda_functions/snapshot_discovery.py")
+    filename = "snapshot_discovery.py"
+  }
+
+  source {
+    content  = file(local.dr_common_source)
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file(local.metrics_source)
+    filename = "metrics.py"
+  }
 }
 
 data "archive_file" "restore_rds_zip" {
   type        = "zip"
-  source_file = "${path.module}/lambda_functions/restore_rds_from_snapshot.py"
   output_path = "${path.module}/restore_rds.zip"
+
+  source {
+    content  = file("${path.module}/lambda_functions/restore_rds_from_snapshot.py")
+    filename = "restore_rds_from_snapshot.py"
+  }
+
+  source {
+    content  = file("${path.module}/lambda_functions/restore_sources.py")
+    filename = "restore_sources.py"
+  }
+
+  source {
+    content  = file("${path.module}/lambda_functions/restore_profiles.py")
+    filename = "restore_profiles.py"
+  }
+
+  source {
+    content  = file("${path.module}/lambda_functions/standby.py")
+    filename = "standby.py"
+  }
+
+  source {
+    content  = file("${path.module}/lambda_functions/snapshot_discovery.py")
+    filename = "snapshot_discovery.py"
+  }
+
+  source {
+    content  = file(local.dr_common_source)
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file(local.metrics_source)
+    filename = "metrics.py"
+  }
 }
 
+data "archive_file" "standby_manager_zip" {
+  type        = "zip"
+  output_path = "${path.module}/standby_manager.zip"
+
+  source {
+    content  = file("${path.module}/lambda_functions/standby_manager.py")
+    filename = "standby_manager.py"
+  }
+
+  source {
+    content  = file("${path.module}/lambda_functions/standby.py")
+    filename = "standby.py"
+  }
+
+  source {
+    content  = file("${path.module}/lambda_functions/restore_profiles.py")
+    filename = "restore_profiles.py"
+  }
+
+  source {
+    content  = file("${path.module}/lambda_functions/snapshot_discovery.py")
+    filename = "snapshot_discovery.py"
+  }
+
+  source {
+    content  = file(local.dr_common_source)
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file(local.metrics_source)
+    filename = "metrics.py"
+  }
+}
+
+
+data "archive_file" "hydrate_restored_instance_zip" {
+  type        = "zip"
+  output_path = "${path.module}/hydrate_restored_instance.zip"
+
+  source {
+    content  = file("${path.module}/lambda_functions/hydrate_restored_instance.py")
+    filename = "hydrate_restored_instance.py"
+  }
+
+  source {
+    content  = file("${path.module}/lambda_functions/hydration.py")
+    filename = "hydration.py"
+  }
+
+  source {
+    content  = file(local.postgres_probe_source)
+    filename = "postgres_probe.py"
+  }
+
+  source {
+    content  = file(local.dr_common_source)
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file(local.metrics_source)
+    filename = "metrics.py"
+  }
+}
 
 data "archive_file" "route53_update_record_zip" {
   type        = "zip"
-  source_file = "${path.module}/lambda_functions/route53_update_record.py"
   output_path = "${path.module}/route53_update_record.zip"
+
+  source {
+    content  = file("${path.module}/lambda_functions/route53_update_record.py")
+    filename = "route53_update_record.py"
+  }
+
+  source {
+    content  = file(local.dr_common_source)
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file(local.metrics_source)
+    filename = "metrics.py"
+  }
 }
 
 resource "aws_lambda_function" "snapshot_creator" {
@@ -40,8 +233,13 @@ resource "aws_lambda_function" "snapshot_creator" {
 
   environment {
     variables = {
-      RDS_INSTANCE_ID = var.rds_instance_id
-      PRIMARY_REGION  = var.primary_region
+      RDS_INSTANCE_ID                = var.rds_instance_id
+      PRIMARY_REGION                 = var.primary_region
+      METRICS_NAMESPACE              = "RDS/SnapshotDR"
+      SNAPSHOT_SCHEDULING            = var.snapshot_scheduling_mode
+      SNAPSHOT_IDLE_WRITE_FACTOR     = var.snapshot_idle_write_factor
+      SNAPSHOT_IDLE_BASELINE_SECONDS = var.snapshot_idle_baseline_seconds
+      SNAPSHOT_MAX_INTERVAL_SECONDS  = var.snapshot_max_interval_seconds
     }
   }
 
@@ -64,9 +262,10 @@ resource "aws_lambda_function" "snapshot_cross_region_copy" {
 
   environment {
     variables = {
-      PRIMARY_REGION  = var.primary_region
-      DR_REGION       = var.dr_region
-      RDS_INSTANCE_ID = var.rds_instance_id
+      PRIMARY_REGION    = var.primary_region
+      DR_REGION         = var.dr_region
+      RDS_INSTANCE_ID   = var.rds_instance_id
+      METRICS_NAMESPACE = "RDS/SnapshotDR"
     }
   }
 
@@ -90,9 +289,10 @@ resource "aws_lambda_function" "snapshot_cleaner" {
 
   environment {
     variables = {
-      PRIMARY_REGION  = var.primary_region
-      DR_REGION       = var.dr_region
-      RDS_INSTANCE_ID = var.rds_instance_id
+      PRIMARY_REGION    = var.primary_region
+      DR_REGION         = var.dr_region
+      RDS_INSTANCE_ID   = var.rds_instance_id
+      METRICS_NAMESPACE = "RDS/SnapshotDR"
     }
   }
 
@@ -115,13 +315,26 @@ resource "aws_lambda_function" "restore_rds" {
   source_code_hash = data.archive_file.restore_rds_zip.output_base64sha256
 
   environment {
-    variables = {
-      DR_REGION            = var.dr_region
-      SECURITY_GROUP_ID    = var.dr_security_group_id
-      PARAMETER_GROUP_NAME = var.dr_parameter_group_name
-      SUBNET_GROUP_NAME    = var.dr_subnet_group_name
-      RDS_INSTANCE_ID      = var.rds_instance_id
-    }
+    variables = merge(
+      {
+        DR_REGION                          = var.dr_region
+        PRIMARY_REGION                     = var.primary_region
+        SECURITY_GROUP_ID                  = var.dr_security_group_id
+        PARAMETER_GROUP_NAME               = var.dr_parameter_group_name
+        SUBNET_GROUP_NAME                  = var.dr_subnet_group_name
+        RDS_INSTANCE_ID                    = var.rds_instance_id
+        METRICS_NAMESPACE                  = "RDS/SnapshotDR"
+        STANDBY_INSTANCE_PREFIX            = var.standby_enabled ? local.standby_instance_prefix : ""
+        STANDBY_MAX_STALENESS_SECONDS      = var.standby_max_staleness_seconds
+        ROUTE53_UPDATE_FUNCTION            = aws_lambda_function.route53_update_record.function_name
+        RESTORE_PROFILE                    = var.restore_profile
+        RESTORE_FAST_INSTANCE_CLASS        = var.restore_fast_instance_class
+        RESTORE_DOWNSIZE_APPLY_IMMEDIATELY = var.restore_downsize_apply_immediately
+        RESTORE_MODE                       = var.pitr_enabled ? "auto" : "snapshot"
+        PITR_MIN_RPO_GAIN_SECONDS          = var.pitr_min_rpo_gain_seconds
+      },
+      local.restore_override_env
+    )
   }
 
   tags = merge(
@@ -144,10 +357,13 @@ resource "aws_lambda_function" "route53_update_record" {
 
   environment {
     variables = {
-      DR_REGION      = var.dr_region
-      HOSTED_ZONE_ID = var.route53_hosted_zone_id
-      RECORD_NAME    = var.route53_database_record_name
-      TTL            = var.route53_database_record_ttl
+      DR_REGION                 = var.dr_region
+      HOSTED_ZONE_ID            = var.route53_hosted_zone_id
+      RECORD_NAME               = var.route53_database_record_name
+      TTL                       = var.route53_database_record_ttl
+      METRICS_NAMESPACE         = "RDS/SnapshotDR"
+      # The hydration stage switches DNS itself once the threshold is reached
+      HYDRATION_CUTOVER_PERCENT = var.hydration_enabled ? var.hydration_cutover_percent : 0
     }
   }
 
@@ -159,4 +375,73 @@ resource "aws_lambda_function" "route53_update_record" {
   )
 }
 
+resource "aws_lambda_function" "standby_manager" {
+  count            = var.standby_enabled ? 1 : 0
+  provider         = aws.dr
+  filename         = data.archive_file.standby_manager_zip.output_path
+  function_name    = "${var.project_name}-standby-manager"
+  role             = var.standby_manager_lambda_role_arn
+  handler          = "standby_manager.lambda_handler"
+  runtime          = "python3.9"
+  timeout          = 120
+  source_code_hash = data.archive_file.standby_manager_zip.output_base64sha256
+
+  environment {
+    variables = merge(
+      {
+        DR_REGION                        = var.dr_region
+        PRIMARY_REGION                   = var.primary_region
+        RDS_INSTANCE_ID                  = var.rds_instance_id
+        SECURITY_GROUP_ID                = var.dr_security_group_id
+        PARAMETER_GROUP_NAME             = var.dr_parameter_group_name
+        SUBNET_GROUP_NAME                = var.dr_subnet_group_name
+        STANDBY_INSTANCE_PREFIX          = local.standby_instance_prefix
+        STANDBY_REFRESH_INTERVAL_SECONDS = var.standby_refresh_interval_seconds
+        # The standby is sized like a restore, since it becomes the database on failover
+        RESTORE_PROFILE                  = var.restore_profile
+        METRICS_NAMESPACE                = "RDS/SnapshotDR"
+      },
+      local.restore_override_env
+    )
+  }
+
+  tags = merge(
+    var.tags,
+    {
+      Name = "${var.project_name}-standby-manager"
+    }
+  )
+}
+
+resource "aws_lambda_function" "hydrate_restored_instance" {
+  count            = var.hydration_enabled ? 1 : 0
+  provider         = aws.dr
+  filename         = data.archive_file.hydrate_restored_instance_zip.output_path
+  function_name    = "${var.project_name}-hydrate-restored-instance"
+  role             = var.hydration_lambda_role_arn
+  handler          = "hydrate_restored_instance.lambda_handler"
+  runtime          = "python3.9"
+  timeout          = 900
+  source_code_hash = data.archive_file.hydrate_restored_instance_zip.output_base64sha256
+
+  environment {
+    variables = {
+      DR_REGION                  = var.dr_region
+      HYDRATION_SECRET_ARN       = var.hydration_secret_arn
+      HYDRATION_DATABASES        = join(",", var.hydration_databases)
+      HYDRATION_HOT_TABLES       = join(",", var.hydration_hot_tables)
+      HYDRATION_WORKERS          = var.hydration_workers
+      HYDRATION_CUTOVER_PERCENT  = var.hydration_cutover_percent
+      HYDRATION_MAX_WAIT_SECONDS = var.hydration_max_wait_seconds
+      ROUTE53_UPDATE_FUNCTION    = aws_lambda_function.route53_update_record.function_name
+      METRICS_NAMESPACE          = "RDS/SnapshotDR"
+    }
+  }
 
+  tags = merge(
+    var.tags,
+    {
+      Name = "${var.project_name}-hydrate-restored-instance"
+    }
+  )
+}
@@ -21,4 +21,19 @@ output "restore_rds_function" {
 output "route53_update_record_function" {
   value       = aws_lambda_function.route53_update_record
   description = "The Lambda function that updates Route53 DNS records, typically used during restoration to point to the newly restored database instance."
-}
\ No newline at end of file
+}
+
+output "standby_manager_function" {
+  value       = one(aws_lambda_function.standby_manager)
+  description = "The Lambda function that keeps the warm standby restored from the latest DR snapshot, or null when warm standby is disabled."
+}
+
+output "standby_instance_prefix" {
+  value       = local.standby_instance_prefix
+  description = "Identifier prefix of the warm standby instances (<prefix>-blue and <prefix>-green)."
+}
+
+output "hydrate_restored_instance_function" {
+  value       = one(aws_lambda_function.hydrate_restored_instance)
+  description = "The Lambda function that hydrates the storage of a snapshot-restored instance, or null when hydration is disabled."
+}
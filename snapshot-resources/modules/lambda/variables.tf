@@ -31,6 +31,18 @@ variable "restore_rds_lambda_role_arn" {
   description = "ARN of the IAM role used by the RDS restore Lambda function"
   type        = string
 }
+
+variable "standby_manager_lambda_role_arn" {
+  description = "ARN of the IAM role used by the warm standby manager Lambda function"
+  type        = string
+  default     = null
+}
+
+variable "hydration_lambda_role_arn" {
+  description = "ARN of the IAM role used by the post-restore hydration Lambda function"
+  type        = string
+  default     = null
+}
 variable "rds_instance_id" {
   description = "The identifier of the primary RDS instance"
   type        = string
@@ -73,3 +85,129 @@ variable "route53_database_record_name" {
   description = "The DNS record name (e.g., 'db.example.com') that will point to the RDS instance"
   type        = string
 }
+
+variable "snapshot_scheduling_mode" {
+  description = "Snapshot scheduling mode of the snapshot creator: \"always\" or \"change_aware\""
+  type        = string
+  default     = "always"
+}
+
+variable "snapshot_idle_write_factor" {
+  description = "A change-aware run is skipped when WriteIOPS since the last snapshot stayed within this multiple of the primary's measured idle rate"
+  type        = number
+  default     = 1.5
+}
+
+variable "snapshot_idle_baseline_seconds" {
+  description = "WriteIOPS history over which change-aware scheduling measures the primary's idle write rate"
+  type        = number
+  default     = 86400
+}
+
+variable "snapshot_max_interval_seconds" {
+  description = "Longest time between snapshots in change-aware mode, regardless of write activity"
+  type        = number
+  default     = 3600
+}
+
+variable "standby_enabled" {
+  description = "Keep a warm standby restored from the latest DR snapshot so failover is a DNS change"
+  type        = bool
+  default     = false
+}
+
+variable "standby_max_staleness_seconds" {
+  description = "How far the warm standby's source snapshot may lag the newest recovery point before failover restores instead"
+  type        = number
+  default     = 7200
+}
+
+variable "standby_refresh_interval_seconds" {
+  description = "Shortest time between warm standby refreshes; newer DR snapshots arriving sooner wait for the next refresh"
+  type        = number
+  default     = 3600
+}
+
+variable "hydration_enabled" {
+  description = "Read a snapshot-restored instance end to end after the restore so its storage is hydrated before applications use it"
+  type        = bool
+  default     = false
+}
+
+variable "hydration_secret_arn" {
+  description = "Secrets Manager ARN with username/password of a user that can read every table of the restored instance"
+  type        = string
+  default     = ""
+}
+
+variable "hydration_databases" {
+  description = "Databases of the restored instance to hydrate"
+  type        = list(string)
+  default     = ["postgres"]
+}
+
+variable "hydration_hot_tables" {
+  description = "Tables ('table' or 'schema.table') hydrated first, in this order; the rest follow largest first"
+  type        = list(string)
+  default     = []
+}
+
+variable "hydration_workers" {
+  description = "Parallel database connections used for hydration"
+  type        = number
+  default     = 4
+}
+
+variable "hydration_cutover_percent" {
+  description = "Percentage of the restored data read before DNS is switched to the restored instance; 0 switches DNS on restore"
+  type        = number
+  default     = 0
+}
+
+variable "hydration_max_wait_seconds" {
+  description = "Longest time DNS waits for the hydration threshold after the restore"
+  type        = number
+  default     = 900
+}
+
+variable "restore_profile" {
+  description = "Sizing of snapshot restores: \"minimal\", \"match_source\" or \"fast_then_downsize\""
+  type        = string
+  default     = "match_source"
+}
+
+variable "restore_overrides" {
+  description = "Explicit restore sizing taking precedence over the primary's"
+  type = object({
+    instance_class     = optional(string)
+    multi_az           = optional(bool)
+    storage_type       = optional(string)
+    iops               = optional(number)
+    storage_throughput = optional(number)
+  })
+  default = {}
+}
+
+variable "restore_fast_instance_class" {
+  description = "Instance class of a fast_then_downsize restore; empty for two sizes above the primary's"
+  type        = string
+  default     = ""
+}
+
+variable "restore_downsize_apply_immediately" {
+  description = "Downsize a fast_then_downsize restore as soon as it completes instead of in its next maintenance window"
+  type        = bool
+  default     = false
+}
+
+variable "pitr_enabled" {
+  description = "Let restores choose a point-in-time restore from the automated backups replicated into the DR region when it recovers more data than the newest DR snapshot"
+  type        = bool
+  default     = false
+}
+
+variable "pitr_min_rpo_gain_seconds" {
+  description = "Data a point-in-time restore must recover beyond the newest DR snapshot to be chosen over the faster snapshot restore"
+  type        = number
+  default     = 60
+}
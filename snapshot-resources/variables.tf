@@ -28,6 +28,165 @@ variable "tags" {
   }
 }
 
+variable "snapshot_schedule_expression" {
+  description = "How often the snapshot creator runs; with pitr_enabled snapshots can be much rarer, e.g. \"rate(1 hour)\""
+  type        = string
+  default     = "rate(5 minutes)"
+}
+
+variable "snapshot_scheduling_mode" {
+  description = "\"always\" snapshots on every run; \"change_aware\" skips scheduled snapshots while one is in progress or when the primary's writes since the last one stayed at its idle rate"
+  type        = string
+  default     = "always"
+
+  validation {
+    condition     = contains(["always", "change_aware"], var.snapshot_scheduling_mode)
+    error_message = "snapshot_scheduling_mode must be \"always\" or \"change_aware\"."
+  }
+}
+
+variable "snapshot_idle_write_factor" {
+  description = "A change-aware run is skipped when WriteIOPS since the last snapshot stayed within this multiple of the primary's measured idle rate"
+  type        = number
+  default     = 1.5
+}
+
+variable "snapshot_idle_baseline_seconds" {
+  description = "WriteIOPS history over which change-aware scheduling measures the primary's idle write rate"
+  type        = number
+  default     = 86400
+}
+
+variable "snapshot_max_interval_seconds" {
+  description = "Longest time between snapshots in change-aware mode, regardless of write activity"
+  type        = number
+  default     = 3600
+}
+
+variable "standby_enabled" {
+  description = "Keep a warm standby (\"pilot light\") restored from the latest DR snapshot so failover only changes DNS; it runs an extra instance in the DR region"
+  type        = bool
+  default     = false
+}
+
+variable "standby_max_staleness_seconds" {
+  description = "Failover uses the warm standby only when its source snapshot is at most this much older than the newest DR snapshot or point-in-time restore point; keep it above standby_refresh_interval_seconds plus the restore time"
+  type        = number
+  default     = 7200
+}
+
+variable "standby_refresh_interval_seconds" {
+  description = "Shortest time between warm standby refreshes; bounds how stale the standby may be relative to the newest DR snapshot"
+  type        = number
+  default     = 3600
+}
+
+variable "hydration_enabled" {
+  description = "After a snapshot restore, read the restored instance end to end so blocks loaded lazily from S3 are fetched before applications need them"
+  type        = bool
+  default     = false
+}
+
+variable "hydration_secret_arn" {
+  description = "Secrets Manager ARN with username/password used to read the restored database; required when hydration_enabled is true"
+  type        = string
+  default     = ""
+}
+
+variable "hydration_databases" {
+  description = "Databases of the restored instance to hydrate"
+  type        = list(string)
+  default     = ["postgres"]
+}
+
+variable "hydration_hot_tables" {
+  description = "Tables ('table' or 'schema.table') hydrated first, in this order; the rest follow largest first"
+  type        = list(string)
+  default     = []
+}
+
+variable "hydration_workers" {
+  description = "Parallel database connections used for hydration"
+  type        = number
+  default     = 4
+}
+
+variable "hydration_cutover_percent" {
+  description = "Percentage of the restored data read before DNS is switched to the restored instance; 0 switches DNS as soon as the restore completes"
+  type        = number
+  default     = 0
+
+  validation {
+    condition     = var.hydration_cutover_percent >= 0 && var.hydration_cutover_percent <= 100
+    error_message = "hydration_cutover_percent must be between 0 and 100."
+  }
+}
+
+variable "hydration_max_wait_seconds" {
+  description = "Longest time DNS waits for the hydration threshold after the restore completes"
+  type        = number
+  default     = 900
+}
+
+variable "restore_profile" {
+  description = "Sizing of snapshot restores: \"match_source\" restores with the primary's instance class, Multi-AZ and storage; \"fast_then_downsize\" restores on a larger single-AZ instance and brings it back to the primary's size afterwards; \"minimal\" restores a single-AZ db.t3.micro"
+  type        = string
+  default     = "match_source"
+
+  validation {
+    condition     = contains(["minimal", "match_source", "fast_then_downsize"], var.restore_profile)
+    error_message = "restore_profile must be \"minimal\", \"match_source\" or \"fast_then_downsize\"."
+  }
+}
+
+variable "restore_overrides" {
+  description = "Explicit restore sizing taking precedence over the primary's (instance_class, multi_az, storage_type, iops, storage_throughput)"
+  type = object({
+    instance_class     = optional(string)
+    multi_az           = optional(bool)
+    storage_type       = optional(string)
+    iops               = optional(number)
+    storage_throughput = optional(number)
+  })
+  default = {}
+}
+
+variable "restore_fast_instance_class" {
+  description = "Instance class of a fast_then_downsize restore; empty for two sizes above the primary's"
+  type        = string
+  default     = ""
+}
+
+variable "restore_downsize_apply_immediately" {
+  description = "Downsize a fast_then_downsize restore as soon as it completes (brief interruption) instead of in its next maintenance window"
+  type        = bool
+  default     = false
+}
+
+variable "pitr_enabled" {
+  description = "Replicate the primary's automated backups to the DR region and let restores pick a point-in-time restore to the latest restorable time when it recovers more data than the newest DR snapshot. The primary needs automated backups enabled"
+  type        = bool
+  default     = false
+}
+
+variable "backup_replication_retention_days" {
+  description = "Days the replicated automated backups are kept in the DR region"
+  type        = number
+  default     = 7
+}
+
+variable "backup_replication_kms_key_arn" {
+  description = "KMS key ARN in the DR region for the replicated backups; required when the primary is encrypted"
+  type        = string
+  default     = ""
+}
+
+variable "pitr_min_rpo_gain_seconds" {
+  description = "Data a point-in-time restore must recover beyond the newest DR snapshot to be chosen over the faster snapshot restore"
+  type        = number
+  default     = 60
+}
+
 variable "sns_email" {
   description = "SNS topic email for notifications"
   type        = string
@@ -0,0 +1,167 @@
+# Quorum probing of the primary from several vantage points. Detects a failure
+# in seconds and invokes dr_orchestrator directly, ahead of the Route 53
+# health check alarm, which remains as the fallback path.
+locals {
+  detector_vantage_points = { for vantage in var.detector_vantage_points : vantage.name => vantage }
+  detector_environment = {
+    PRIMARY_ENDPOINT            = data.aws_db_instance.primary.address
+    PRIMARY_PORT                = data.aws_db_instance.primary.port
+    DETECTOR_POSTGRES_HANDSHAKE = var.detector_postgres_handshake
+    PROBE_TIMEOUT_SECONDS       = 2
+  }
+}
+
+data "archive_file" "primary_detector_zip" {
+  type        = "zip"
+  output_path = "lambda_functions/primary_detector.zip"
+
+  source {
+    content  = file("lambda_functions/primary_detector.py")
+    filename = "primary_detector.py"
+  }
+
+  source {
+    content  = file("lambda_functions/endpoint_probe.py")
+    filename = "endpoint_probe.py"
+  }
+
+  source {
+    content  = file("lambda_functions/postgres_probe.py")
+    filename = "postgres_probe.py"
+  }
+
+  source {
+    content  = file("lambda_functions/dr_common.py")
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file("lambda_functions/metrics.py")
+    filename = "metrics.py"
+  }
+}
+
+resource "aws_iam_role" "primary_detector_role" {
+  provider = aws.secondary
+  name     = "dr-primary-detector-role"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Action    = "sts:AssumeRole"
+        Effect    = "Allow"
+        Principal = { Service = "lambda.amazonaws.com" }
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "primary_detector_vpc_access" {
+  provider   = aws.secondary
+  role       = aws_iam_role.primary_detector_role.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaVPCAccessExecutionRole"
+}
+
+resource "aws_iam_role_policy" "primary_detector_invoke_policy" {
+  provider = aws.secondary
+  name     = "dr-primary-detector-invoke-policy"
+  role     = aws_iam_role.primary_detector_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "lambda:InvokeFunction"
+        ]
+        Resource = concat(
+          [aws_lambda_function.dr_orchestrator.arn],
+          [for probe in aws_lambda_function.primary_detector_probe : probe.arn]
+        )
+      }
+    ]
+  })
+}
+
+resource "aws_lambda_function" "primary_detector_probe" {
+  for_each         = local.detector_vantage_points
+  provider         = aws.secondary
+  filename         = data.archive_file.primary_detector_zip.output_path
+  function_name    = "dr-primary-detector-probe-${each.key}"
+  role             = aws_iam_role.primary_detector_role.arn
+  handler          = "primary_detector.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = data.archive_file.primary_detector_zip.output_base64sha256
+  timeout          = 15
+  memory_size      = 128
+
+  dynamic "vpc_config" {
+    for_each = length(each.value.subnet_ids) > 0 ? [each.value] : []
+    content {
+      subnet_ids         = vpc_config.value.subnet_ids
+      security_group_ids = vpc_config.value.security_group_ids
+    }
+  }
+
+  environment {
+    variables = merge(local.detector_environment, {
+      VANTAGE_NAME = each.key
+    })
+  }
+}
+
+resource "aws_lambda_function" "primary_detector" {
+  provider         = aws.secondary
+  filename         = data.archive_file.primary_detector_zip.output_path
+  function_name    = "dr-primary-detector"
+  role             = aws_iam_role.primary_detector_role.arn
+  handler          = "primary_detector.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = data.archive_file.primary_detector_zip.output_base64sha256
+  # Probes for 55 seconds per scheduled run, with time left to invoke the orchestrator
+  timeout          = 70
+  memory_size      = 256
+
+  environment {
+    variables = merge(local.detector_environment, {
+      VANTAGE_NAME              = "coordinator"
+      VANTAGE_FUNCTIONS         = join(",", [for probe in aws_lambda_function.primary_detector_probe : probe.function_name])
+      ORCHESTRATOR_FUNCTION     = aws_lambda_function.dr_orchestrator.function_name
+      DETECTOR_QUORUM           = var.detector_quorum
+      DETECTOR_FAILURE_ROUNDS   = var.detector_failure_rounds
+      DETECTOR_INTERVAL_SECONDS = var.detector_interval_seconds
+      DETECTOR_RUN_SECONDS      = 55
+    })
+  }
+}
+
+resource "aws_cloudwatch_event_rule" "primary_detector_schedule" {
+  provider            = aws.secondary
+  name                = "dr-primary-detector-schedule"
+  description         = "Start a primary failure detector run every minute"
+  schedule_expression = "rate(1 minute)"
+
+  tags = {
+    Name        = "dr-primary-detector-schedule"
+    Environment = var.environment
+    TagName     = var.tag_name
+  }
+}
+
+resource "aws_cloudwatch_event_target" "primary_detector_schedule" {
+  provider  = aws.secondary
+  rule      = aws_cloudwatch_event_rule.primary_detector_schedule.name
+  target_id = "PrimaryFailureDetector"
+  arn       = aws_lambda_function.primary_detector.arn
+}
+
+resource "aws_lambda_permission" "allow_primary_detector_schedule" {
+  provider      = aws.secondary
+  statement_id  = "AllowExecutionFromPrimaryDetectorSchedule"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.primary_detector.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.primary_detector_schedule.arn
+}
@@ -1,7 +1,36 @@
 data "archive_file" "lambda_zip" {
   type        = "zip"
-  source_file = "lambda_functions/dr_orchestrator.py"
   output_path = "lambda_functions/dr_orchestrator.zip"
+
+  source {
+    content  = file("lambda_functions/dr_orchestrator.py")
+    filename = "dr_orchestrator.py"
+  }
+
+  source {
+    content  = file("lambda_functions/dr_common.py")
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file("lambda_functions/metrics.py")
+    filename = "metrics.py"
+  }
+
+  source {
+    content  = file("lambda_functions/tracing.py")
+    filename = "tracing.py"
+  }
+
+  source {
+    content  = file("lambda_functions/notifications.py")
+    filename = "notifications.py"
+  }
+
+  source {
+    content  = file("lambda_functions/fleet.py")
+    filename = "fleet.py"
+  }
 }
 
 resource "aws_lambda_function" "dr_orchestrator" {
@@ -15,12 +44,16 @@ resource "aws_lambda_function" "dr_orchestrator" {
 
   environment {
     variables = {
-      READ_REPLICA_ID        = var.read_replica_identifier
-      SNS_TOPIC_ARN          = aws_sns_topic.db_alerts.arn
-      SUCCESS_SNS_TOPIC_ARN  = aws_sns_topic.promotion_success.arn
-      ROUTE53_ZONE_ID        = aws_route53_zone.private.zone_id
-      ROUTE53_RECORD_NAME    = "database.myapp.internal"
-      STEP_FUNCTION_ARN      = aws_sfn_state_machine.disaster_recovery.arn
+      READ_REPLICA_ID           = var.read_replica_identifier
+      SNS_TOPIC_ARN             = aws_sns_topic.db_alerts.arn
+      SUCCESS_SNS_TOPIC_ARN     = aws_sns_topic.promotion_success.arn
+      ROUTE53_ZONE_ID           = aws_route53_zone.private.zone_id
+      ROUTE53_RECORD_NAME       = "database.myapp.internal"
+      STEP_FUNCTION_ARN         = aws_sfn_state_machine.disaster_recovery.arn
+      DR_DATABASES              = jsonencode(var.failover_databases)
+      DEDUP_WINDOW_SECONDS      = var.failover_dedup_window_seconds
+      NOTIFICATION_LEDGER_TABLE = aws_dynamodb_table.notification_ledger.name
+      ADDITIONAL_SNS_TOPIC_ARNS = join(",", var.additional_notification_topic_arns)
     }
   }
 
@@ -30,8 +63,32 @@ resource "aws_lambda_function" "dr_orchestrator" {
 
 data "archive_file" "validate_input_zip" {
   type        = "zip"
-  source_file = "lambda_functions/validate_input.py"
   output_path = "lambda_functions/validate_input.zip"
+
+  source {
+    content  = file("lambda_functions/validate_input.py")
+    filename = "validate_input.py"
+  }
+
+  source {
+    content  = file("lambda_functions/tracing.py")
+    filename = "tracing.py"
+  }
+
+  source {
+    content  = file("lambda_functions/dr_common.py")
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file("lambda_functions/metrics.py")
+    filename = "metrics.py"
+  }
+
+  source {
+    content  = file("lambda_functions/fleet.py")
+    filename = "fleet.py"
+  }
 }
 
 resource "aws_lambda_function" "validate_input" {
@@ -47,7 +104,9 @@ resource "aws_lambda_function" "validate_input" {
 
   environment {
     variables = {
-      READ_REPLICA_ID = var.read_replica_identifier
+      READ_REPLICA_ID     = var.read_replica_identifier
+      ROUTE53_RECORD_NAME = "database.myapp.internal"
+      DR_DATABASES        = jsonencode(var.failover_databases)
     }
   }
 }
@@ -55,8 +114,42 @@ resource "aws_lambda_function" "validate_input" {
 
 data "archive_file" "check_replica_status_zip" {
   type        = "zip"
-  source_file = "lambda_functions/check_replica_status.py"
   output_path = "lambda_functions/check_replica_status.zip"
+
+  source {
+    content  = file("lambda_functions/check_replica_status.py")
+    filename = "check_replica_status.py"
+  }
+
+  source {
+    content  = file("lambda_functions/readiness_store.py")
+    filename = "readiness_store.py"
+  }
+
+  source {
+    content  = file("lambda_functions/replica_lag.py")
+    filename = "replica_lag.py"
+  }
+
+  source {
+    content  = file("lambda_functions/fleet.py")
+    filename = "fleet.py"
+  }
+
+  source {
+    content  = file("lambda_functions/dr_common.py")
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file("lambda_functions/metrics.py")
+    filename = "metrics.py"
+  }
+
+  source {
+    content  = file("lambda_functions/tracing.py")
+    filename = "tracing.py"
+  }
 }
 
 resource "aws_lambda_function" "check_replica_status" {
@@ -72,7 +165,11 @@ resource "aws_lambda_function" "check_replica_status" {
 
   environment {
     variables = {
-      READ_REPLICA_ID = var.read_replica_identifier
+      READ_REPLICA_ID           = var.read_replica_identifier
+      READINESS_TABLE           = aws_dynamodb_table.replica_readiness.name
+      READINESS_MAX_AGE_SECONDS = var.readiness_max_age_seconds
+      RPO_MAX_LAG_SECONDS       = var.rpo_max_lag_seconds
+      RPO_GATE_MODE             = var.rpo_gate_mode
     }
   }
 }
@@ -81,8 +178,27 @@ resource "aws_lambda_function" "check_replica_status" {
 
 data "archive_file" "promote_replica_zip" {
   type        = "zip"
-  source_file = "lambda_functions/promote_replica.py"
   output_path = "lambda_functions/promote_replica.zip"
+
+  source {
+    content  = file("lambda_functions/promote_replica.py")
+    filename = "promote_replica.py"
+  }
+
+  source {
+    content  = file("lambda_functions/dr_common.py")
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file("lambda_functions/metrics.py")
+    filename = "metrics.py"
+  }
+
+  source {
+    content  = file("lambda_functions/tracing.py")
+    filename = "tracing.py"
+  }
 }
 
 resource "aws_lambda_function" "promote_replica" {
@@ -107,8 +223,32 @@ resource "aws_lambda_function" "promote_replica" {
 
 data "archive_file" "check_promotion_status_zip" {
   type        = "zip"
-  source_file = "lambda_functions/check_promotion_status.py"
   output_path = "lambda_functions/check_promotion_status.zip"
+
+  source {
+    content  = file("lambda_functions/check_promotion_status.py")
+    filename = "check_promotion_status.py"
+  }
+
+  source {
+    content  = file("lambda_functions/adaptive_polling.py")
+    filename = "adaptive_polling.py"
+  }
+
+  source {
+    content  = file("lambda_functions/dr_common.py")
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file("lambda_functions/metrics.py")
+    filename = "metrics.py"
+  }
+
+  source {
+    content  = file("lambda_functions/tracing.py")
+    filename = "tracing.py"
+  }
 }
 
 resource "aws_lambda_function" "check_promotion_status" {
@@ -124,7 +264,62 @@ resource "aws_lambda_function" "check_promotion_status" {
 
   environment {
     variables = {
-      READ_REPLICA_ID = var.read_replica_identifier
+      READ_REPLICA_ID                   = var.read_replica_identifier
+      PROMOTION_POLL_EXPECTED_DURATIONS = jsonencode(var.promotion_expected_phase_seconds)
+    }
+  }
+}
+
+
+data "archive_file" "promotion_event_callback_zip" {
+  type        = "zip"
+  output_path = "lambda_functions/promotion_event_callback.zip"
+
+  source {
+    content  = file("lambda_functions/promotion_event_callback.py")
+    filename = "promotion_event_callback.py"
+  }
+
+  source {
+    content  = file("lambda_functions/check_promotion_status.py")
+    filename = "check_promotion_status.py"
+  }
+
+  source {
+    content  = file("lambda_functions/adaptive_polling.py")
+    filename = "adaptive_polling.py"
+  }
+
+  source {
+    content  = file("lambda_functions/dr_common.py")
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file("lambda_functions/metrics.py")
+    filename = "metrics.py"
+  }
+
+  source {
+    content  = file("lambda_functions/tracing.py")
+    filename = "tracing.py"
+  }
+}
+
+resource "aws_lambda_function" "promotion_event_callback" {
+  provider = aws.secondary
+  filename         = data.archive_file.promotion_event_callback_zip.output_path
+  function_name    = "dr-promotion-event-callback"
+  role             = aws_iam_role.step_function_lambda_role.arn
+  handler          = "promotion_event_callback.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = data.archive_file.promotion_event_callback_zip.output_base64sha256
+  timeout          = 30
+  memory_size      = 128
+
+  environment {
+    variables = {
+      PROMOTION_WAITER_TABLE = aws_dynamodb_table.promotion_waiters.name
     }
   }
 }
@@ -132,8 +327,32 @@ resource "aws_lambda_function" "check_promotion_status" {
 
 data "archive_file" "update_route53_zip" {
   type        = "zip"
-  source_file = "lambda_functions/update_route53.py"
   output_path = "lambda_functions/update_route53.zip"
+
+  source {
+    content  = file("lambda_functions/update_route53.py")
+    filename = "update_route53.py"
+  }
+
+  source {
+    content  = file("lambda_functions/route53_records.py")
+    filename = "route53_records.py"
+  }
+
+  source {
+    content  = file("lambda_functions/dr_common.py")
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file("lambda_functions/metrics.py")
+    filename = "metrics.py"
+  }
+
+  source {
+    content  = file("lambda_functions/tracing.py")
+    filename = "tracing.py"
+  }
 }
 
 resource "aws_lambda_function" "update_route53" {
@@ -144,7 +363,7 @@ resource "aws_lambda_function" "update_route53" {
   handler          = "update_route53.lambda_handler"
   runtime          = "python3.9"
   source_code_hash = data.archive_file.update_route53_zip.output_base64sha256
-  timeout          = 300
+  timeout          = 60
   memory_size      = 256
 
   environment {
@@ -156,10 +375,87 @@ resource "aws_lambda_function" "update_route53" {
 }
 
 
+data "archive_file" "check_dns_change_status_zip" {
+  type        = "zip"
+  output_path = "lambda_functions/check_dns_change_status.zip"
+
+  source {
+    content  = file("lambda_functions/check_dns_change_status.py")
+    filename = "check_dns_change_status.py"
+  }
+
+  source {
+    content  = file("lambda_functions/adaptive_polling.py")
+    filename = "adaptive_polling.py"
+  }
+
+  source {
+    content  = file("lambda_functions/dr_common.py")
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file("lambda_functions/metrics.py")
+    filename = "metrics.py"
+  }
+
+  source {
+    content  = file("lambda_functions/tracing.py")
+    filename = "tracing.py"
+  }
+}
+
+resource "aws_lambda_function" "check_dns_change_status" {
+  provider = aws.secondary
+  filename         = data.archive_file.check_dns_change_status_zip.output_path
+  function_name    = "dr-check-dns-change-status"
+  role             = aws_iam_role.step_function_lambda_role.arn
+  handler          = "check_dns_change_status.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = data.archive_file.check_dns_change_status_zip.output_base64sha256
+  timeout          = 30
+  memory_size      = 128
+}
+
+
 data "archive_file" "verify_dns_update_zip" {
   type        = "zip"
-  source_file = "lambda_functions/verify_dns_update.py"
   output_path = "lambda_functions/verify_dns_update.zip"
+
+  source {
+    content  = file("lambda_functions/verify_dns_update.py")
+    filename = "verify_dns_update.py"
+  }
+
+  source {
+    content  = file("lambda_functions/endpoint_probe.py")
+    filename = "endpoint_probe.py"
+  }
+
+  source {
+    content  = file("lambda_functions/postgres_probe.py")
+    filename = "postgres_probe.py"
+  }
+
+  source {
+    content  = file("lambda_functions/route53_records.py")
+    filename = "route53_records.py"
+  }
+
+  source {
+    content  = file("lambda_functions/dr_common.py")
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file("lambda_functions/metrics.py")
+    filename = "metrics.py"
+  }
+
+  source {
+    content  = file("lambda_functions/tracing.py")
+    filename = "tracing.py"
+  }
 }
 
 resource "aws_lambda_function" "verify_dns_update" {
@@ -177,15 +473,88 @@ resource "aws_lambda_function" "verify_dns_update" {
     variables = {
       ROUTE53_ZONE_ID     = aws_route53_zone.private.zone_id
       ROUTE53_RECORD_NAME = "database.myapp.internal"
+      DB_PROBE_SECRET_ARN = var.db_probe_secret_arn
     }
   }
 }
 
 
+data "archive_file" "aggregate_failover_results_zip" {
+  type        = "zip"
+  output_path = "lambda_functions/aggregate_failover_results.zip"
+
+  source {
+    content  = file("lambda_functions/aggregate_failover_results.py")
+    filename = "aggregate_failover_results.py"
+  }
+
+  source {
+    content  = file("lambda_functions/tracing.py")
+    filename = "tracing.py"
+  }
+
+  source {
+    content  = file("lambda_functions/dr_common.py")
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file("lambda_functions/metrics.py")
+    filename = "metrics.py"
+  }
+
+  source {
+    content  = file("lambda_functions/fleet.py")
+    filename = "fleet.py"
+  }
+}
+
+resource "aws_lambda_function" "aggregate_failover_results" {
+  provider = aws.secondary
+  filename         = data.archive_file.aggregate_failover_results_zip.output_path
+  function_name    = "dr-aggregate-failover-results"
+  role             = aws_iam_role.step_function_lambda_role.arn
+  handler          = "aggregate_failover_results.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = data.archive_file.aggregate_failover_results_zip.output_base64sha256
+  timeout          = 30
+  memory_size      = 128
+}
+
+
 data "archive_file" "notify_success_zip" {
   type        = "zip"
-  source_file = "lambda_functions/notify_success.py"
   output_path = "lambda_functions/notify_success.zip"
+
+  source {
+    content  = file("lambda_functions/notify_success.py")
+    filename = "notify_success.py"
+  }
+
+  source {
+    content  = file("lambda_functions/fleet.py")
+    filename = "fleet.py"
+  }
+
+  source {
+    content  = file("lambda_functions/dr_common.py")
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file("lambda_functions/metrics.py")
+    filename = "metrics.py"
+  }
+
+  source {
+    content  = file("lambda_functions/tracing.py")
+    filename = "tracing.py"
+  }
+
+  source {
+    content  = file("lambda_functions/notifications.py")
+    filename = "notifications.py"
+  }
 }
 
 resource "aws_lambda_function" "notify_success" {
@@ -201,7 +570,9 @@ resource "aws_lambda_function" "notify_success" {
 
   environment {
     variables = {
-      SNS_TOPIC_ARN = aws_sns_topic.step_function_notifications.arn
+      SNS_TOPIC_ARN             = aws_sns_topic.step_function_notifications.arn
+      NOTIFICATION_LEDGER_TABLE = aws_dynamodb_table.notification_ledger.name
+      ADDITIONAL_SNS_TOPIC_ARNS = join(",", var.additional_notification_topic_arns)
     }
   }
 }
@@ -209,8 +580,37 @@ resource "aws_lambda_function" "notify_success" {
 
 data "archive_file" "notify_failure_zip" {
   type        = "zip"
-  source_file = "lambda_functions/notify_failure.py"
   output_path = "lambda_functions/notify_failure.zip"
+
+  source {
+    content  = file("lambda_functions/notify_failure.py")
+    filename = "notify_failure.py"
+  }
+
+  source {
+    content  = file("lambda_functions/fleet.py")
+    filename = "fleet.py"
+  }
+
+  source {
+    content  = file("lambda_functions/dr_common.py")
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file("lambda_functions/metrics.py")
+    filename = "metrics.py"
+  }
+
+  source {
+    content  = file("lambda_functions/tracing.py")
+    filename = "tracing.py"
+  }
+
+  source {
+    content  = file("lambda_functions/notifications.py")
+    filename = "notifications.py"
+  }
 }
 
 resource "aws_lambda_function" "notify_failure" {
@@ -226,7 +626,9 @@ resource "aws_lambda_function" "notify_failure" {
 
   environment {
     variables = {
-      SNS_TOPIC_ARN = aws_sns_topic.step_function_notifications.arn
+      SNS_TOPIC_ARN             = aws_sns_topic.step_function_notifications.arn
+      NOTIFICATION_LEDGER_TABLE = aws_dynamodb_table.notification_ledger.name
+      ADDITIONAL_SNS_TOPIC_ARNS = join(",", var.additional_notification_topic_arns)
     }
   }
 }
@@ -281,6 +683,26 @@ resource "aws_iam_role_policy" "step_function_lambda_rds_policy" {
 }
 
 
+resource "aws_iam_role_policy" "step_function_lambda_cloudwatch_policy" {
+  provider = aws.secondary
+  name     = "step-function-lambda-cloudwatch-policy"
+  role     = aws_iam_role.step_function_lambda_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "cloudwatch:GetMetricData"
+        ]
+        Resource = "*"
+      }
+    ]
+  })
+}
+
+
 resource "aws_iam_role_policy" "step_function_lambda_route53_policy" {
   provider = aws.secondary
   name     = "step-function-lambda-route53-policy"
@@ -305,6 +727,60 @@ resource "aws_iam_role_policy" "step_function_lambda_route53_policy" {
 }
 
 
+resource "aws_iam_role_policy" "step_function_lambda_promotion_callback_policy" {
+  provider = aws.secondary
+  name     = "step-function-lambda-promotion-callback-policy"
+  role     = aws_iam_role.step_function_lambda_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:PutItem",
+          "dynamodb:GetItem",
+          "dynamodb:DeleteItem"
+        ]
+        Resource = [
+          aws_dynamodb_table.promotion_waiters.arn
+        ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "states:SendTaskSuccess"
+        ]
+        Resource = "*"
+      }
+    ]
+  })
+}
+
+
+resource "aws_iam_role_policy" "step_function_lambda_probe_secret_policy" {
+  count    = var.db_probe_secret_arn == "" ? 0 : 1
+  provider = aws.secondary
+  name     = "step-function-lambda-probe-secret-policy"
+  role     = aws_iam_role.step_function_lambda_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "secretsmanager:GetSecretValue"
+        ]
+        Resource = [
+          var.db_probe_secret_arn
+        ]
+      }
+    ]
+  })
+}
+
+
 resource "aws_iam_role_policy" "step_function_lambda_sns_policy" {
   provider = aws.secondary
   name     = "step-function-lambda-sns-policy"
@@ -370,11 +846,22 @@ resource "aws_iam_role_policy" "lambda_step_function_policy" {
       {
         Effect = "Allow"
         Action = [
-          "states:StartExecution"
+          "states:StartExecution",
+          "states:ListExecutions"
         ]
         Resource = [
           aws_sfn_state_machine.disaster_recovery.arn
         ]
+      },
+      {
+        # Tells a running execution of the same name from one that has ended
+        Effect = "Allow"
+        Action = [
+          "states:DescribeExecution"
+        ]
+        Resource = [
+          "${replace(aws_sfn_state_machine.disaster_recovery.arn, ":stateMachine:", ":execution:")}:*"
+        ]
       }
     ]
   })
@@ -0,0 +1,144 @@
+import json
+import logging
+import os
+import time
+
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def new_poll_state(now=None):
+    """
+    Create a JSON-serialisable poll state.
+    It is carried in the Step Function payload between invocations.
+    """
+    return {
+        'started_at': time.time() if now is None else now,
+        'status': None,
+        'status_since': None,
+        'checks_in_status': 0,
+        'phases': []
+    }
+
+def record_status(poll_state, status, now=None):
+    """
+    Record an observed status. A status change closes the previous phase
+    and resets the backoff for the new one.
+    """
+    now = time.time() if now is None else now
+
+    if status != poll_state['status']:
+        if poll_state['status'] is not None:
+            poll_state['phases'].append({
+                'status': poll_state['status'],
+                'duration': round(now - poll_state['status_since'], 3)
+            })
+            logger.info(f"Status changed {poll_state['status']} -> {status}")
+        poll_state['status'] = status
+        poll_state['status_since'] = now
+        poll_state['checks_in_status'] = 0
+
+    poll_state['checks_in_status'] += 1
+    return poll_state
+
+def phase_history(poll_state, now=None):
+    """
+    Seconds spent in each status so far, including the current one.
+    Feed this back as expected_durations to tune later runs.
+    """
+    now = time.time() if now is None else now
+    history = {}
+    for phase in poll_state['phases']:
+        history[phase['status']] = round(history.get(phase['status'], 0) + phase['duration'], 3)
+    if poll_state['status'] is not None:
+        current = now - poll_state['status_since']
+        history[poll_state['status']] = round(history.get(poll_state['status'], 0) + current, 3)
+    return history
+
+
+class AdaptivePollingPolicy:
+    """
+    Exponential, capped polling interval that restarts at the minimum on every
+    status transition. When the expected duration of a status is known the
+    checks close in on when that phase should end.
+    """
+
+    def __init__(self, min_interval=2, initial_interval=5, max_interval=60,
+                 multiplier=2.0, deadline_seconds=300, expected_durations=None):
+        self.min_interval = min_interval
+        self.initial_interval = max(min_interval, initial_interval)
+        self.max_interval = max(self.initial_interval, max_interval)
+        self.multiplier = multiplier
+        self.deadline_seconds = deadline_seconds
+        self.expected_durations = expected_durations or {}
+
+    @classmethod
+    def from_env(cls, prefix, **defaults):
+        """
+        Build a policy from <prefix>_MIN_INTERVAL, _INITIAL_INTERVAL, _MAX_INTERVAL,
+        _MULTIPLIER, _DEADLINE_SECONDS and _EXPECTED_DURATIONS (a JSON object).
+        """
+        settings = dict(defaults)
+        for name, cast in (('min_interval', float), ('initial_interval', float),
+                           ('max_interval', float), ('multiplier', float),
+                           ('deadline_seconds', float), ('expected_durations', json.loads)):
+            value = os.environ.get(f"{prefix}_{name.upper()}")
+            if value:
+                settings[name] = cast(value)
+        return cls(**settings)
+
+    def remaining(self, poll_state, now=None):
+        now = time.time() if now is None else now
+        return self.deadline_seconds - (now - poll_state['started_at'])
+
+    def deadline_exceeded(self, poll_state, now=None):
+        return self.remaining(poll_state, now) <= 0
+
+    def next_interval(self, poll_state, now=None):
+        """Seconds to wait before the next check."""
+        now = time.time() if now is None else now
+        status = poll_state['status']
+        checks = max(poll_state['checks_in_status'] - 1, 0)
+
+        interval = min(self.initial_interval * (self.multiplier ** checks), self.max_interval)
+
+        expected = self.expected_durations.get(status)
+        if expected is not None:
+            time_left_in_phase = expected - (now - poll_state['status_since'])
+            if time_left_in_phase > 0:
+                # Close in on the expected end by halving the time left, so a phase
+                # ending early is noticed within half of what remained of it
+                interval = min(max(time_left_in_phase / 2, self.min_interval), self.max_interval)
+            else:
+                # Overdue: the transition is imminent, back off from the minimum in
+                # proportion to how late it is, not to the checks made closing in
+                interval = min(max(-time_left_in_phase * (self.multiplier - 1), self.min_interval), self.max_interval)
+
+        return max(self.min_interval, min(interval, self.remaining(poll_state, now)))
+
+
+def poll(check, policy, sleep=time.sleep, clock=time.time):
+    """
+    Call check() until it reports completion or the policy deadline passes.
+    check() must return a (status, done, result) tuple.
+    Returns (result, phase_history).
+    """
+    poll_state = new_poll_state(clock())
+
+    while True:
+        status, done, result = check()
+        now = clock()
+        record_status(poll_state, status, now)
+
+        if done:
+            return result, phase_history(poll_state, now)
+
+        if policy.deadline_exceeded(poll_state, now):
+            raise TimeoutError(
+                f"Polling did not complete within {policy.deadline_seconds} seconds "
+                f"(last status: {status}, phases: {phase_history(poll_state, now)})")
+
+        interval = policy.next_interval(poll_state, now)
+        logger.info(f"Status {status}, next check in {interval:.1f} seconds")
+        sleep(interval)
@@ -0,0 +1,62 @@
+import json
+import logging
+
+from fleet import format_report, summarize_results
+from metrics import instrument_handler
+from tracing import finish_span, start_span
+
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+@instrument_handler
+def lambda_handler(event, context):
+    """
+    Combine the per-database results of the failover Map into one report.
+    The Step Function routes to NotifySuccess only when every database failed over.
+    """
+    span = start_span('AggregateResults')
+    try:
+        logger.info(f"Aggregating failover results: {json.dumps(event, default=str)}")
+
+        results = event.get('failover_results', [])
+        skipped_databases = event.get('skipped_databases', [])
+
+        report = summarize_results(results, skipped_databases)
+        logger.info(f"Failover report:\n{format_report(report)}")
+
+        # Shared phases first, then every database's own pipeline
+        trace = list(event.get('trace') or [])
+        for result in results:
+            trace.extend(result.get('trace') or [])
+
+        aggregated = {
+            'execution_id': event.get('execution_id', 'Unknown'),
+            'alarm_name': event.get('alarm_name', 'Unknown'),
+            'failover_report': report,
+            'all_succeeded': report['all_succeeded'],
+            'trace': finish_span(span, {'trace': trace})
+        }
+
+        # Keep the detailed single-database fields for the notifications
+        if len(results) == 1 and not skipped_databases:
+            aggregated = {**results[0], **aggregated}
+
+        if not report['all_succeeded']:
+            failed_ids = [
+                database['read_replica_id'] for database in report['databases']
+                if database['failover_status'] != 'SUCCEEDED'
+            ]
+            aggregated['step_name'] = 'FailoverDatabases'
+            aggregated['read_replica_id'] = ', '.join(failed_ids)
+            aggregated['error'] = {
+                'Error': 'FleetFailoverIncomplete',
+                'Cause': f"{report['failed']} failed and {report['skipped']} skipped of {report['total']} databases: {failed_ids}"
+            }
+
+        return aggregated
+
+    except Exception as e:
+        span.finish('error')
+        logger.error(f"Failover result aggregation failed: {str(e)}")
+        raise e
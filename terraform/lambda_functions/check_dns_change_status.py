@@ -0,0 +1,75 @@
+import json
+import math
+import logging
+import time
+
+from adaptive_polling import AdaptivePollingPolicy, new_poll_state, phase_history, record_status
+from dr_common import LazyClient
+from metrics import instrument_handler, metrics
+from tracing import extend_trace, start_span
+
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+route53_client = LazyClient('route53')
+
+polling_policy = AdaptivePollingPolicy.from_env(
+    'DNS_CHANGE_POLL', min_interval=2, initial_interval=5, max_interval=15, deadline_seconds=600)
+
+@instrument_handler
+def lambda_handler(event, context):
+    """
+    Check whether the Route 53 change submitted by UpdateRoute53 is INSYNC.
+    Called in a short-interval Step Function loop so DNS verification can
+    start as soon as Route 53 has applied the change.
+    The result lands in $.dns_change, so the trace is carried there until
+    VerifyDNSUpdate folds it back into the state.
+    """
+    span = start_span('CheckDNSChangeStatus', database=event.get('read_replica_id'))
+    previous = event.get('dns_change') or {}
+    try:
+        logger.info(f"Checking Route 53 change status: {json.dumps(event)}")
+
+        change_id = event.get('change_id')
+
+        # Nothing was submitted, so there is nothing to wait for
+        if not change_id:
+            logger.info("No Route 53 change to wait for")
+            return {
+                'change_id': None,
+                'change_status': 'INSYNC',
+                'next_check_seconds': 0,
+                'trace': extend_trace(previous.get('trace') or event.get('trace'), span.finish())
+            }
+
+        response = route53_client.get_change(Id=change_id)
+        change_status = response['ChangeInfo']['Status']
+        logger.info(f"Route 53 change {change_id} status: {change_status}")
+
+        poll_state = record_status(previous.get('poll_state') or new_poll_state(), change_status)
+
+        next_check_seconds = 0
+        if change_status == 'INSYNC':
+            metrics.put('DNSChangeSyncDuration', round(time.time() - poll_state['started_at'], 3), 'Seconds')
+        else:
+            if polling_policy.deadline_exceeded(poll_state):
+                raise TimeoutError(
+                    f"Route 53 change {change_id} not INSYNC within {polling_policy.deadline_seconds} seconds")
+            next_check_seconds = math.ceil(polling_policy.next_interval(poll_state))
+            logger.info(f"Next change status check in {next_check_seconds} seconds")
+
+        return {
+            'change_id': change_id,
+            'change_status': change_status,
+            'poll_state': poll_state,
+            'poll_history': phase_history(poll_state),
+            'next_check_seconds': next_check_seconds,
+            'trace': extend_trace(previous.get('trace') or event.get('trace'), span.finish())
+        }
+
+    except Exception as e:
+        span.finish('error')
+        logger.error(f"Route 53 change status check failed: {str(e)}")
+        raise e
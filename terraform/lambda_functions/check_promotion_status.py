@@ -1,20 +1,29 @@
 import json
-import boto3
+import math
 import logging
 import os
+import time
 
+from adaptive_polling import AdaptivePollingPolicy, new_poll_state, phase_history, record_status
+from dr_common import LazyClient
+from metrics import instrument_handler, metrics
+from tracing import finish_span, span_start, start_span
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
-rds_client = boto3.client('rds')
+rds_client = LazyClient('rds')
 
+polling_policy = AdaptivePollingPolicy.from_env('PROMOTION_POLL', deadline_seconds=1800)
+
+@instrument_handler
 def lambda_handler(event, context):
     """
     Check if the read replica promotion has completed successfully.
     This step is called repeatedly by the Step Function until promotion is complete.
     """
+    span = start_span('CheckPromotionStatus', database=event.get('read_replica_id'))
     try:
         logger.info(f"Checking promotion status: {json.dumps(event)}")
         
@@ -33,58 +42,94 @@ def lambda_handler(event, context):
             raise ValueError(f"Database instance {read_replica_id} not found")
         
         db_instance = response['DBInstances'][0]
-        current_status = db_instance['DBInstanceStatus']
-        
-        logger.info(f"Current status: {current_status}")
-        
-        # Check if promotion is complete
-        # A promoted replica should:
-        # 1. Have status 'available'
-        # 2. No longer have ReadReplicaSourceDBInstanceIdentifier
-        # 3. No longer be a read replica
+        promotion_status = evaluate_promotion(db_instance)
         
-        is_promotion_complete = False
-        promotion_details = {}
+        # Track status transitions across invocations to schedule the next check
+        poll_state = record_status(event.get('poll_state') or new_poll_state(), promotion_status['current_status'])
         
-        if current_status == 'available':
-            # Check if it's still a read replica
-            if 'ReadReplicaSourceDBInstanceIdentifier' not in db_instance:
-                # Promotion is complete!
-                is_promotion_complete = True
-                promotion_details = {
-                    'status': 'completed',
-                    'endpoint': db_instance['Endpoint']['Address'],
-                    'port': db_instance['Endpoint']['Port'],
-                    'availability_zone': db_instance['AvailabilityZone'],
-                    'engine': db_instance['Engine'],
-                    'engine_version': db_instance['EngineVersion'],
-                    'instance_class': db_instance['DBInstanceClass'],
-                    'storage_type': db_instance['StorageType'],
-                    'allocated_storage': db_instance.get('AllocatedStorage'),
-                    'multi_az': db_instance.get('MultiAZ', False)
-                }
-                logger.info("Promotion completed successfully!")
-            else:
-                logger.info("Promotion still in progress - instance is still a read replica")
+        metrics.add('PromotionChecks')
+        next_check_seconds = 0
+        if promotion_status['promotion_complete']:
+            promoted_at = span_start(event.get('trace'), 'PromoteReplica', read_replica_id)
+            if promoted_at:
+                metrics.put('PromotionDuration', round(time.time() - promoted_at, 3), 'Seconds')
         else:
-            logger.info(f"Promotion still in progress - status: {current_status}")
-        
-        # Check for any pending modifications
-        pending_modifications = db_instance.get('PendingModifiedValues', {})
-        if pending_modifications:
-            logger.info(f"Pending modifications: {pending_modifications}")
+            if polling_policy.deadline_exceeded(poll_state):
+                raise TimeoutError(
+                    f"Promotion of {read_replica_id} did not complete within {polling_policy.deadline_seconds} seconds")
+            next_check_seconds = math.ceil(polling_policy.next_interval(poll_state))
+            logger.info(f"Next promotion check in {next_check_seconds} seconds")
         
+        # A timed-out event wait is re-entered; after a failed callback polling carries on alone
+        event_wait_timed_out = (event.get('promotion_event_error') or {}).get('Error') == 'States.Timeout'
+
         # Return status for Step Function decision
         return {
             'read_replica_id': read_replica_id,
-            'current_status': current_status,
-            'promotion_complete': is_promotion_complete,
-            'promotion_details': promotion_details,
-            'pending_modifications': pending_modifications,
-            'check_timestamp': context.get_remaining_time_in_millis(),
-            'execution_id': context.aws_request_id
+            'record_name': event.get('record_name'),
+            **promotion_status,
+            'poll_state': poll_state,
+            'poll_history': phase_history(poll_state),
+            'next_check_seconds': next_check_seconds,
+            'wait_for_event': event_wait_timed_out and not promotion_status['promotion_complete'],
+            'execution_id': event.get('execution_id', context.aws_request_id),
+            'trace': finish_span(span, event)
         }
         
     except Exception as e:
+        span.finish('error')
         logger.error(f"Promotion status check failed: {str(e)}")
-        raise e 
\ No newline at end of file
+        raise e
+
+def evaluate_promotion(db_instance):
+    """
+    Decide whether a described DB instance has finished promotion.
+    Shared with the promotion event callback so both paths agree on completion.
+    """
+    current_status = db_instance['DBInstanceStatus']
+    
+    logger.info(f"Current status: {current_status}")
+    
+    # Check if promotion is complete
+    # A promoted replica should:
+    # 1. Have status 'available'
+    # 2. No longer have ReadReplicaSourceDBInstanceIdentifier
+    # 3. No longer be a read replica
+    
+    is_promotion_complete = False
+    promotion_details = {}
+    
+    if current_status == 'available':
+        # Check if it's still a read replica
+        if 'ReadReplicaSourceDBInstanceIdentifier' not in db_instance:
+            # Promotion is complete!
+            is_promotion_complete = True
+            promotion_details = {
+                'status': 'completed',
+                'endpoint': db_instance['Endpoint']['Address'],
+                'port': db_instance['Endpoint']['Port'],
+                'availability_zone': db_instance['AvailabilityZone'],
+                'engine': db_instance['Engine'],
+                'engine_version': db_instance['EngineVersion'],
+                'instance_class': db_instance['DBInstanceClass'],
+                'storage_type': db_instance['StorageType'],
+                'allocated_storage': db_instance.get('AllocatedStorage'),
+                'multi_az': db_instance.get('MultiAZ', False)
+            }
+            logger.info("Promotion completed successfully!")
+        else:
+            logger.info("Promotion still in progress - instance is still a read replica")
+    else:
+        logger.info(f"Promotion still in progress - status: {current_status}")
+    
+    # Check for any pending modifications
+    pending_modifications = db_instance.get('PendingModifiedValues', {})
+    if pending_modifications:
+        logger.info(f"Pending modifications: {pending_modifications}")
+    
+    return {
+        'current_status': current_status,
+        'promotion_complete': is_promotion_complete,
+        'promotion_details': promotion_details,
+        'pending_modifications': pending_modifications
+    }
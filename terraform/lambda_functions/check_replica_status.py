@@ -1,86 +1,201 @@
 import json
-import boto3
 import logging
 import os
+import time
+from datetime import datetime, timezone
+
+from dr_common import LazyClient
+from fleet import describe_instances
+from metrics import instrument_handler, metrics
+from readiness_store import get_store, is_fresh, readiness_record
+from replica_lag import (RPO_GATE_MODE, decode_series, evaluate_lag_gate, fetch_lag_statistics,
+                         lag_statistics_as_of)
+from tracing import finish_span, start_span
 
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
-rds_client = boto3.client('rds')
+rds_client = LazyClient('rds')
+cloudwatch_client = LazyClient('cloudwatch')
 
+@instrument_handler
 def lambda_handler(event, context):
     """
-    Check the current status of the read replica before promotion.
-    This step ensures the replica is in a healthy state for promotion.
+    Check the current status of every read replica before promotion.
+    Fresh readiness records from the scheduled pre-flight job are used when
+    available; other replicas are described live in batches. Replicas that are
+    not ready are skipped so the rest of the fleet can still fail over.
     """
+    span = start_span('CheckReplicaStatus')
     try:
         logger.info(f"Checking replica status: {json.dumps(event)}")
         
-        # Get read replica ID from event (passed from previous step)
-        read_replica_id = event.get('read_replica_id')
-        
-        if not read_replica_id:
-            raise ValueError("read_replica_id is required in event")
-        
-        # Describe the read replica
-        response = rds_client.describe_db_instances(
-            DBInstanceIdentifier=read_replica_id
-        )
-        
-        if not response['DBInstances']:
-            raise ValueError(f"Read replica {read_replica_id} not found")
-        
-        db_instance = response['DBInstances'][0]
+        # Get databases from event (passed from previous step)
+        databases = event.get('databases')
         
-        # Check critical status fields
-        status = db_instance['DBInstanceStatus']
-        engine = db_instance['Engine']
-        engine_version = db_instance['EngineVersion']
+        if not databases:
+            raise ValueError("databases is required in event")
         
-        logger.info(f"Replica Status: {status}")
-        logger.info(f"Engine: {engine} {engine_version}")
+        records = load_readiness_records([database['read_replica_id'] for database in databases])
+        # The gate looks at the lag when the alarm fired, not at the lag that built up since
+        alarm_time = event.get('alarm_time')
+        attach_lag_statistics(records, datetime.fromtimestamp(alarm_time, timezone.utc) if alarm_time else None)
         
-        # Validate that it's actually a read replica
-        if 'ReadReplicaSourceDBInstanceIdentifier' not in db_instance:
-            raise ValueError(f"Instance {read_replica_id} is not a read replica")
+        # Operators can promote past an enforced RPO gate when losing recent writes is acceptable
+        enforce_rpo_gate = RPO_GATE_MODE == 'enforce' and not event.get('ignore_rpo_gate', False)
         
-        source_db = db_instance['ReadReplicaSourceDBInstanceIdentifier']
-        logger.info(f"Source DB: {source_db}")
+        ready_databases = []
+        skipped_databases = []
         
-        # Check if replica is available for promotion
-        if status != 'available':
-            raise ValueError(f"Read replica is not available for promotion. Status: {status}")
+        for database in databases:
+            read_replica_id = database['read_replica_id']
+            try:
+                if read_replica_id not in records:
+                    raise ValueError(f"Read replica {read_replica_id} not found")
+                
+                replica_status = check_replica(records[read_replica_id], enforce_rpo_gate)
+                ready_databases.append({
+                    **database,
+                    **replica_status,
+                    'execution_id': event.get('execution_id', context.aws_request_id),
+                    # Each database traces its own pipeline; aggregation merges them
+                    'trace': []
+                })
+            except ValueError as e:
+                logger.warning(f"Skipping {read_replica_id}: {e}")
+                skipped_databases.append({**database, 'reason': str(e)})
         
-        # Check replication lag (if available)
-        replication_lag = db_instance.get('ReplicaLag', 'Unknown')
-        logger.info(f"Replication Lag: {replication_lag}")
+        if not ready_databases:
+            raise ValueError(f"No read replica is ready for promotion: {skipped_databases}")
         
-        # Additional health checks
-        if 'DBInstanceStatus' in db_instance and db_instance['DBInstanceStatus'] != 'available':
-            raise ValueError(f"DB instance status is not available: {db_instance['DBInstanceStatus']}")
-        
-        # Check if there are any pending modifications
-        if db_instance.get('PendingModifiedValues'):
-            logger.warning(f"Pending modifications detected: {db_instance['PendingModifiedValues']}")
+        logger.info(f"{len(ready_databases)} replica(s) ready, {len(skipped_databases)} skipped")
+        metrics.add('ReplicasReady', len(ready_databases))
+        metrics.add('ReplicasSkipped', len(skipped_databases))
+        metrics.add('ReadinessFromSnapshot', sum(1 for database in ready_databases if database['readiness_source'] == 'snapshot'))
         
         # Return status information for next steps
         return {
-            'read_replica_id': read_replica_id,
-            'source_db_id': source_db,
-            'status': status,
-            'engine': engine,
-            'engine_version': engine_version,
-            'replication_lag': replication_lag,
-            'endpoint': db_instance['Endpoint']['Address'],
-            'port': db_instance['Endpoint']['Port'],
-            'availability_zone': db_instance['AvailabilityZone'],
-            'ready_for_promotion': True,
-            'check_timestamp': context.get_remaining_time_in_millis(),
-            'execution_id': context.aws_request_id
+            'databases': ready_databases,
+            'skipped_databases': skipped_databases,
+            'alarm_name': event.get('alarm_name', 'Unknown'),
+            'ignore_rpo_gate': bool(event.get('ignore_rpo_gate', False)),
+            'rpo_gate_enforced': enforce_rpo_gate,
+            'execution_id': event.get('execution_id', context.aws_request_id),
+            'trace': finish_span(span, event)
         }
         
     except Exception as e:
+        span.finish('error')
         logger.error(f"Replica status check failed: {str(e)}")
-        raise e 
\ No newline at end of file
+        raise e
+
+def load_readiness_records(read_replica_ids):
+    """
+    Return a readiness record per replica, keyed by identifier.
+    Records that are fresh and show a promotable replica come from the store;
+    missing, stale or unhealthy ones are confirmed with a live describe.
+    """
+    records = {}
+    
+    try:
+        store = get_store()
+        stored = store.get_many(read_replica_ids) if store is not None else {}
+    except Exception as e:
+        logger.warning(f"Could not read replica readiness records, describing live: {e}")
+        stored = {}
+    
+    for read_replica_id, record in stored.items():
+        if is_fresh(record) and record['status'] == 'available' and record['is_replica']:
+            records[read_replica_id] = {**record, 'readiness_source': 'snapshot'}
+    
+    live_ids = [read_replica_id for read_replica_id in read_replica_ids if read_replica_id not in records]
+    logger.info(f"Readiness from snapshot: {len(records)}, described live: {len(live_ids)}")
+    
+    if live_ids:
+        # Describe the remaining read replicas with as few calls as possible
+        for read_replica_id, db_instance in describe_instances(rds_client, live_ids).items():
+            records[read_replica_id] = {**readiness_record(db_instance), 'readiness_source': 'live'}
+    
+    return records
+
+def attach_lag_statistics(records, as_of=None):
+    """
+    Add ReplicaLag statistics as of the given time (default now) to every record.
+    Fresh pre-flight records carry their lag series, so they cost no request;
+    the others are queried with one batched CloudWatch request.
+    """
+    lag_statistics = {}
+    missing_ids = []
+    for read_replica_id, record in records.items():
+        if record.get('replication_lag_series') is None:
+            missing_ids.append(read_replica_id)
+        else:
+            lag_statistics[read_replica_id] = lag_statistics_as_of(decode_series(record['replication_lag_series']), as_of)
+    logger.info(f"Lag statistics from snapshot: {len(lag_statistics)}, queried: {len(missing_ids)}")
+    
+    if missing_ids:
+        try:
+            lag_statistics.update(fetch_lag_statistics(cloudwatch_client, missing_ids, end_time=as_of))
+        except Exception as e:
+            logger.warning(f"Could not fetch replica lag: {e}")
+    
+    for read_replica_id, statistics in lag_statistics.items():
+        records[read_replica_id]['replication_lag_stats'] = statistics
+        records[read_replica_id]['replication_lag'] = statistics['latest'] if statistics['latest'] is not None else 'Unknown'
+
+def check_replica(record, enforce_rpo_gate=True):
+    """
+    Validate one replica readiness record and return its details.
+    Raises ValueError when the replica cannot be promoted; a replica over the
+    RPO only does so when the gate is enforced.
+    """
+    read_replica_id = record['read_replica_id']
+    status = record['status']
+    
+    logger.info(f"{read_replica_id} Replica Status: {status} ({record['readiness_source']})")
+    logger.info(f"{read_replica_id} Engine: {record['engine']} {record['engine_version']}")
+    
+    # Validate that it's actually a read replica
+    if not record['is_replica']:
+        raise ValueError(f"Instance {read_replica_id} is not a read replica")
+    
+    logger.info(f"{read_replica_id} Source DB: {record['source_db_id']}")
+    
+    # Check if replica is available for promotion
+    if status != 'available':
+        raise ValueError(f"Read replica is not available for promotion. Status: {status}")
+    
+    # Check replication lag against the RPO
+    lag_statistics = record.get('replication_lag_stats') or {'latest': None}
+    rpo_gate_passed, rpo_gate_reason = evaluate_lag_gate(lag_statistics)
+    logger.info(f"{read_replica_id} Replication Lag: {record['replication_lag']} - {rpo_gate_reason}")
+    
+    if not rpo_gate_passed:
+        if enforce_rpo_gate:
+            raise ValueError(rpo_gate_reason)
+        logger.warning(f"{read_replica_id} over the RPO, promoting anyway: {rpo_gate_reason}")
+        metrics.add('RpoGateWarnings')
+    
+    # Check if there are any pending modifications
+    if record['pending_modifications']:
+        logger.warning(f"Pending modifications detected: {record['pending_modifications']}")
+    
+    return {
+        'read_replica_id': read_replica_id,
+        'source_db_id': record['source_db_id'],
+        'status': status,
+        'engine': record['engine'],
+        'engine_version': record['engine_version'],
+        'replication_lag': record['replication_lag'],
+        'replication_lag_stats': record.get('replication_lag_stats'),
+        'rpo_gate_passed': rpo_gate_passed,
+        'rpo_gate_reason': rpo_gate_reason,
+        'endpoint': record['endpoint'],
+        'port': record['port'],
+        'availability_zone': record['availability_zone'],
+        'readiness_source': record['readiness_source'],
+        'readiness_age_seconds': round(time.time() - record['recorded_at'], 1),
+        'ready_for_promotion': True
+    }
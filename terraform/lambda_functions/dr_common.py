@@ -0,0 +1,134 @@
+import os
+import threading
+from types import SimpleNamespace
+
+
+# Clients are cached per service, region and config so warm invocations reuse
+# them along with their connection pools
+_clients = {}
+_lock = threading.Lock()
+_session = None
+# True once use_session swapped in a session that does not need botocore
+_session_injected = False
+# Called after every API call made through these clients (tracing, metrics)
+_call_listeners = []
+
+MAX_POOL_CONNECTIONS = int(os.environ.get('DR_MAX_POOL_CONNECTIONS', '20'))
+RETRY_MODE = os.environ.get('DR_RETRY_MODE', 'standard')
+MAX_ATTEMPTS = int(os.environ.get('DR_MAX_ATTEMPTS', '5'))
+CONNECT_TIMEOUT_SECONDS = int(os.environ.get('DR_CONNECT_TIMEOUT_SECONDS', '5'))
+READ_TIMEOUT_SECONDS = int(os.environ.get('DR_READ_TIMEOUT_SECONDS', '30'))
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        # boto3/botocore are imported on first use rather than during Lambda init
+        import boto3
+        _session = boto3.session.Session()
+    return _session
+
+
+def use_session(session):
+    """
+    Create clients from the given session from now on and drop the cached
+    ones. Used by the local failover simulator to swap in fake AWS services.
+    """
+    global _session, _session_injected
+    with _lock:
+        _session = session
+        _session_injected = True
+        _clients.clear()
+
+
+def _client_config(settings):
+    try:
+        from botocore.config import Config
+    except ImportError:
+        if not _session_injected:
+            raise
+        # Injected sessions (the simulator's fakes) only read the settings
+        return SimpleNamespace(**settings)
+    return Config(**settings)
+
+
+def _create_client(service_name, region_name, config_overrides):
+    settings = {
+        'max_pool_connections': MAX_POOL_CONNECTIONS,
+        'retries': {'mode': RETRY_MODE, 'max_attempts': MAX_ATTEMPTS},
+        'connect_timeout': CONNECT_TIMEOUT_SECONDS,
+        'read_timeout': READ_TIMEOUT_SECONDS
+    }
+    settings.update(config_overrides)
+    client = _get_session().client(service_name, region_name=region_name, config=_client_config(settings))
+    client.meta.events.register('after-call', _after_call)
+    client.meta.events.register('after-call-error', _after_call_error)
+    return client
+
+
+def _after_call(event_name, parsed, **kwargs):
+    metadata = parsed.get('ResponseMetadata', {})
+    failed = metadata.get('HTTPStatusCode', 200) >= 300
+    code = parsed.get('Error', {}).get('Code') if failed else None
+    _notify_call_listeners(event_name, metadata.get('RetryAttempts', 0), failed, code)
+
+
+def _after_call_error(event_name, **kwargs):
+    _notify_call_listeners(event_name, 0, True, None)
+
+
+def _notify_call_listeners(event_name, retries, failed, code):
+    # Event names look like after-call.<service>.<Operation>
+    _, service_name, operation_name = event_name.split('.', 2)
+    for listener in _call_listeners:
+        try:
+            listener(service_name, operation_name, retries, failed, code)
+        except Exception:
+            pass
+
+
+def add_call_listener(listener):
+    """
+    Register listener(service_name, operation_name, retries, failed, error_code),
+    called after every API call made by clients from get_client.
+    """
+    if listener not in _call_listeners:
+        _call_listeners.append(listener)
+
+
+def get_client(service_name, region_name=None, **config_overrides):
+    """
+    Return a cached boto3 client for the service and region.
+    Keyword arguments override the default botocore Config for this client.
+    """
+    key = (service_name, region_name, repr(sorted(config_overrides.items())))
+    client = _clients.get(key)
+    if client is None:
+        # Sessions are not thread safe, so creation is serialised
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _create_client(service_name, region_name, config_overrides)
+                _clients[key] = client
+    return client
+
+
+class LazyClient:
+    """
+    Module-level stand-in for a boto3 client that is only created on first use.
+    """
+
+    def __init__(self, service_name, region_name=None, **config_overrides):
+        self._service_name = service_name
+        self._region_name = region_name
+        self._config_overrides = config_overrides
+
+    def __getattr__(self, name):
+        client = get_client(self._service_name, self._region_name, **self._config_overrides)
+        return getattr(client, name)
+
+
+def error_code(error):
+    """Return the AWS error code of a botocore ClientError, or None for other exceptions."""
+    response = getattr(error, 'response', None) or {}
+    return response.get('Error', {}).get('Code')
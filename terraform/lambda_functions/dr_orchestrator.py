@@ -1,53 +1,109 @@
-import boto3
 import os
 import json
+import hashlib
 import logging
+from datetime import datetime
+
+from dr_common import LazyClient
+from fleet import parse_databases
+from metrics import instrument_handler, metrics
+from notifications import notify
+from tracing import extend_trace, finish_span, start_span
 
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
-stepfunctions_client = boto3.client('stepfunctions')
-sns_client = boto3.client('sns')
+stepfunctions_client = LazyClient('stepfunctions')
 
 
 STEP_FUNCTION_ARN = os.environ['STEP_FUNCTION_ARN']
 SNS_TOPIC_ARN = os.environ['SNS_TOPIC_ARN']
 SUCCESS_SNS_TOPIC_ARN = os.environ['SUCCESS_SNS_TOPIC_ARN']
+# Alarms for the same replicas within one window map to the same execution name
+DEDUP_WINDOW_SECONDS = int(os.environ.get('DEDUP_WINDOW_SECONDS', '900'))
+# Executions started under one name and its suffixed retries within a window
+MAX_EXECUTION_ATTEMPTS = 5
 
+@instrument_handler
 def lambda_handler(event, context):
     """
     Lambda function that triggers the Step Function for disaster recovery.
     This replaces the direct disaster recovery logic with Step Function orchestration.
+    Every alarm record in the event is coalesced into one start, and no execution
+    is started while another failover of the workflow is still running.
     """
+    span = start_span('TriggerFailover')
     try:
         logger.info(f"Received SNS event: {json.dumps(event)}")
         
-        # Extract alarm information from SNS message
-        alarm_info = extract_alarm_info(event)
+        # Extract alarm information from every SNS record; the earliest alarm drives the failover
+        alarms = extract_alarms(event)
+        metrics.add('AlarmsReceived', len(alarms))
+        
+        # OK and INSUFFICIENT_DATA transitions share the alarm topics but never start a failover
+        ignored = [alarm for alarm in alarms if alarm['alarm_state'] != 'ALARM']
+        alarms = [alarm for alarm in alarms if alarm['alarm_state'] == 'ALARM']
+        if ignored:
+            logger.info(f"Ignoring {len(ignored)} non-ALARM state change(s): {[alarm['alarm_state'] for alarm in ignored]}")
+            metrics.add('AlarmsIgnored', len(ignored))
+        if not alarms:
+            span.finish()
+            return {
+                'statusCode': 200,
+                'body': 'No ALARM state change in the event, no failover started',
+                'ignored': True,
+                'alarm_records': len(ignored)
+            }
+        
+        alarm_info = alarms[0]
+        if len(alarms) > 1:
+            logger.info(f"Coalescing {len(alarms)} alarm records into one failover")
+            metrics.add('AlarmsCoalesced', len(alarms) - 1)
+        
+        alarm_time = parse_alarm_time(alarm_info.get('alarm_timestamp'))
+        read_replica_ids = failover_replica_ids()
+        execution_name = failover_execution_name(
+            read_replica_ids,
+            alarm_time if alarm_time is not None else span.start
+        )
+        
+        # A failover that is already promoting the replicas must not be raced by a second one
+        running_execution = find_running_execution(read_replica_ids)
+        if running_execution:
+            return suppress_duplicate(span, running_execution, 'in_flight', alarms)
         
         # Prepare input for Step Function
         step_function_input = {
             'alarm_name': alarm_info.get('alarm_name', 'Unknown'),
             'alarm_state': alarm_info.get('alarm_state', 'Unknown'),
             'alarm_description': alarm_info.get('alarm_description', 'No description'),
-            'trigger_timestamp': context.get_remaining_time_in_millis(),
-            'execution_id': context.aws_request_id,
-            'source': 'cloudwatch_alarm'
+            'coalesced_alarms': sorted({alarm['alarm_name'] for alarm in alarms}),
+            'execution_id': execution_name,
+            'source': 'cloudwatch_alarm',
+            # Epoch seconds of the state change; the RPO gate reads the lag as of this time
+            'alarm_time': alarm_time,
+            # The RTO timeline starts when the alarm fired, not when this Lambda ran
+            'trace': alarm_trace(alarm_info.get('alarm_timestamp'))
         }
         
+        # Close the span before starting so it is part of the execution input
+        step_function_input['trace'] = finish_span(span, step_function_input)
+        
         logger.info(f"Starting Step Function execution with input: {json.dumps(step_function_input)}")
         
-        # Start the Step Function execution
-        response = stepfunctions_client.start_execution(
-            stateMachineArn=STEP_FUNCTION_ARN,
-            name=f"dr-execution-{context.aws_request_id}",
-            input=json.dumps(step_function_input)
-        )
+        # Start the Step Function execution; the name is the idempotency key, so an
+        # alarm that raced past the running check cannot start a second execution
+        response, duplicate = start_failover_execution(execution_name, step_function_input)
+        if duplicate:
+            existing_arn, reason = duplicate
+            return suppress_duplicate(span, existing_arn, reason, alarms)
         
         execution_arn = response['executionArn']
+        execution_name = execution_arn.rsplit(':', 1)[1]
         logger.info(f"Step Function execution started: {execution_arn}")
+        metrics.add('FailoversStarted')
         
         # Send initial notification
         notification_message = f"""
@@ -56,9 +112,10 @@ def lambda_handler(event, context):
 Alarm: {alarm_info.get('alarm_name', 'Unknown')}
 State: {alarm_info.get('alarm_state', 'Unknown')}
 Description: {alarm_info.get('alarm_description', 'No description')}
+Alarm Records: {len(alarms)}
 
 Step Function Execution: {execution_arn}
-Execution ID: {context.aws_request_id}
+Execution ID: {execution_name}
 
 The disaster recovery process has been initiated via Step Function.
 You will receive notifications as the process progresses.
@@ -66,10 +123,11 @@ You will receive notifications as the process progresses.
 🔗 Step Function Console: https://console.aws.amazon.com/states/home?region=us-west-2#/executions/details/{execution_arn}
         """
         
-        sns_client.publish(
-            TopicArn=SUCCESS_SNS_TOPIC_ARN,
-            Subject="🚀 RDS Disaster Recovery: PROCESS INITIATED",
-            Message=notification_message
+        notify(
+            [SUCCESS_SNS_TOPIC_ARN],
+            "🚀 RDS Disaster Recovery: PROCESS INITIATED",
+            notification_message,
+            dedup_key=f"{execution_name}:initiated"
         )
         
         return {
@@ -77,19 +135,21 @@ You will receive notifications as the process progresses.
             'body': 'Disaster recovery Step Function execution started successfully',
             'execution_arn': execution_arn,
             'step_function_arn': STEP_FUNCTION_ARN,
-            'execution_id': context.aws_request_id
+            'execution_id': execution_name,
+            'suppressed': False,
+            'alarm_records': len(alarms)
         }
 
     except Exception as e:
+        span.finish('error')
         error_message = f"Failed to start disaster recovery Step Function: {str(e)}"
         logger.error(error_message)
         
-        # Send error notification
-        try:
-            sns_client.publish(
-                TopicArn=SNS_TOPIC_ARN,
-                Subject="❌ RDS Disaster Recovery: STEP FUNCTION START FAILED",
-                Message=f"""
+        # Send error notification; notify logs its own failures and never raises
+        notify(
+            [SNS_TOPIC_ARN],
+            "❌ RDS Disaster Recovery: STEP FUNCTION START FAILED",
+            f"""
 ❌ RDS DISASTER RECOVERY FAILED TO START ❌
 
 Error: {str(e)}
@@ -98,51 +158,180 @@ Execution ID: {context.aws_request_id}
 The disaster recovery process failed to start. Manual intervention may be required.
 
 🔗 Step Functions Console: https://console.aws.amazon.com/states/
-                """
-            )
-        except Exception as notify_error:
-            logger.error(f"Failed to send error notification: {notify_error}")
+                """,
+            dedup_key=f"{context.aws_request_id}:start-failed"
+        )
         
         raise e
 
-def extract_alarm_info(event):
+def extract_alarms(event):
     """
-    Extract alarm information from the SNS event.
+    Extract alarm information from every SNS record in the event, earliest first.
+    Events from the primary failure detector yield their own entry; direct
+    invocations and unparseable events yield a manual trigger.
     """
-    try:
-        # Parse SNS message
-        if 'Records' in event:
-            for record in event['Records']:
-                if record.get('EventSource') == 'aws:sns':
-                    sns_message = json.loads(record['Sns']['Message'])
-                    
-                    # Extract alarm information
-                    alarm_info = {
-                        'alarm_name': sns_message.get('AlarmName', 'Unknown'),
-                        'alarm_state': sns_message.get('NewStateValue', 'Unknown'),
-                        'alarm_description': sns_message.get('AlarmDescription', 'No description'),
-                        'alarm_reason': sns_message.get('NewStateReason', 'No reason provided'),
-                        'alarm_timestamp': sns_message.get('StateChangeTime', 'Unknown')
-                    }
-                    
-                    logger.info(f"Extracted alarm info: {alarm_info}")
-                    return alarm_info
+    alarms = []
+    if event.get('source') == 'dr.primary_detector':
+        alarms.append({
+            'alarm_name': event.get('alarm_name', 'primary-failure-detector'),
+            'alarm_state': event.get('state', 'Unknown'),
+            'alarm_description': event.get('description', 'Primary failure detected by quorum probing'),
+            'alarm_reason': event.get('reason', 'No reason provided'),
+            'alarm_timestamp': event.get('detected_at', 'Unknown')
+        })
+    
+    for record in event.get('Records', []):
+        if record.get('EventSource') != 'aws:sns':
+            continue
+        try:
+            sns_message = json.loads(record['Sns']['Message'])
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to extract alarm info: {e}")
+            continue
         
+        alarms.append({
+            'alarm_name': sns_message.get('AlarmName', 'Unknown'),
+            'alarm_state': sns_message.get('NewStateValue', 'Unknown'),
+            'alarm_description': sns_message.get('AlarmDescription', 'No description'),
+            'alarm_reason': sns_message.get('NewStateReason', 'No reason provided'),
+            'alarm_timestamp': sns_message.get('StateChangeTime', 'Unknown')
+        })
+    
+    if not alarms:
         # Fallback for direct invocation or other event types
-        return {
+        alarms.append({
             'alarm_name': 'Manual_Trigger',
             'alarm_state': 'ALARM',
             'alarm_description': 'Manually triggered disaster recovery',
             'alarm_reason': 'Manual trigger',
             'alarm_timestamp': 'Manual'
-        }
-        
+        })
+    
+    # Alarms without a parseable time sort last
+    alarms.sort(key=lambda alarm: parse_alarm_time(alarm['alarm_timestamp']) or float('inf'))
+    logger.info(f"Extracted alarm info: {alarms}")
+    return alarms
+
+def failover_replica_ids():
+    """The replicas this deployment fails over, as validate_input will resolve them."""
+    try:
+        databases = parse_databases(
+            os.environ.get('DR_DATABASES'),
+            default_replica_id=os.environ.get('READ_REPLICA_ID'),
+            default_record_name=os.environ.get('ROUTE53_RECORD_NAME')
+        )
+    except ValueError as e:
+        logger.warning(f"Could not resolve the failover databases, deduplicating on the workflow only: {e}")
+        return []
+    return [database['read_replica_id'] for database in databases]
+
+def failover_execution_name(read_replica_ids, alarm_time, window_seconds=DEDUP_WINDOW_SECONDS):
+    """
+    Deterministic execution name for the replicas and the window the alarm fell in.
+    Step Functions refuses a second execution with the same name.
+    """
+    return f"dr-{replica_set_digest(read_replica_ids)}-{int(alarm_time // window_seconds)}"
+
+def replica_set_digest(read_replica_ids):
+    return hashlib.sha256(','.join(sorted(read_replica_ids)).encode()).hexdigest()[:16]
+
+def execution_arn_for(execution_name):
+    return f"{STEP_FUNCTION_ARN.replace(':stateMachine:', ':execution:')}:{execution_name}"
+
+def start_failover_execution(execution_name, step_function_input):
+    """
+    Start the execution under its deterministic name. Returns (response, None),
+    or (None, (execution_arn, reason)) when an execution of that name is still
+    running or already failed the replicas over. A name whose execution ended
+    without failing over, e.g. an attempt that found no replica ready, is
+    retried with a numbered suffix.
+    """
+    for attempt in range(1, MAX_EXECUTION_ATTEMPTS + 1):
+        name = execution_name if attempt == 1 else f"{execution_name}-{attempt}"
+        try:
+            response = stepfunctions_client.start_execution(
+                stateMachineArn=STEP_FUNCTION_ARN,
+                name=name,
+                input=json.dumps({**step_function_input, 'execution_id': name})
+            )
+            return response, None
+        except stepfunctions_client.exceptions.ExecutionAlreadyExists:
+            existing_arn = execution_arn_for(name)
+            try:
+                existing = stepfunctions_client.describe_execution(executionArn=existing_arn)
+            except Exception as e:
+                logger.warning(f"Could not describe execution {name}, assuming it is still running: {e}")
+                return None, (existing_arn, 'already_started')
+            if existing['status'] == 'RUNNING':
+                return None, (existing_arn, 'already_started')
+            # NotifyFailure ends the workflow normally, so only the output tells a failed failover apart
+            if json.loads(existing.get('output') or '{}').get('final_status') == 'COMPLETED_SUCCESSFULLY':
+                return None, (existing_arn, 'already_succeeded')
+            logger.info(f"Execution {name} ended without failing over ({existing['status']}), starting a new attempt")
+    
+    raise RuntimeError(f"{MAX_EXECUTION_ATTEMPTS} executions named {execution_name} already ran in this window")
+
+def find_running_execution(read_replica_ids):
+    """
+    Return the ARN of a running execution that fails over the same replicas, or None.
+    Executions started here carry the digest of their replica set in the name;
+    any other running execution (e.g. started by hand) is assumed to cover them.
+    If the check fails the deterministic execution name still prevents
+    duplicates within one window.
+    """
+    prefix = f"dr-{replica_set_digest(read_replica_ids)}-"
+    params = {'stateMachineArn': STEP_FUNCTION_ARN, 'statusFilter': 'RUNNING'}
+    try:
+        while True:
+            response = stepfunctions_client.list_executions(**params)
+            for execution in response.get('executions', []):
+                if execution['name'].startswith(prefix) or not execution['name'].startswith('dr-'):
+                    return execution['executionArn']
+            if not response.get('nextToken'):
+                return None
+            params['nextToken'] = response['nextToken']
     except Exception as e:
-        logger.warning(f"Failed to extract alarm info: {e}")
-        return {
-            'alarm_name': 'Unknown',
-            'alarm_state': 'Unknown',
-            'alarm_description': 'Failed to parse alarm information',
-            'alarm_reason': str(e),
-            'alarm_timestamp': 'Unknown'
-        }
\ No newline at end of file
+        logger.warning(f"Could not list running executions: {e}")
+        return None
+
+def suppress_duplicate(span, execution_arn, reason, alarms):
+    """Report an alarm that did not start a failover because one already covers it."""
+    span.finish()
+    logger.warning(f"Failover already started ({reason}): {execution_arn}; suppressed {len(alarms)} alarm record(s)")
+    metrics.add('DuplicateFailoversSuppressed')
+    return {
+        'statusCode': 200,
+        'body': 'Disaster recovery already in progress, no new execution started',
+        'execution_arn': execution_arn,
+        'step_function_arn': STEP_FUNCTION_ARN,
+        'suppressed': True,
+        'suppressed_reason': reason,
+        'alarm_records': len(alarms)
+    }
+
+def parse_alarm_time(alarm_timestamp):
+    """Epoch seconds of a CloudWatch StateChangeTime, or None when it cannot be parsed."""
+    try:
+        # CloudWatch sends e.g. 2024-05-01T12:00:00.123+0000
+        return datetime.strptime(alarm_timestamp, '%Y-%m-%dT%H:%M:%S.%f%z').timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def alarm_trace(alarm_timestamp):
+    """
+    Start the trace with the alarm's state change time when it can be parsed.
+    """
+    alarm_time = parse_alarm_time(alarm_timestamp)
+    if alarm_time is None:
+        return []
+    
+    return extend_trace([], {
+        'name': 'AlarmStateChange',
+        'start': round(alarm_time, 3),
+        'end': round(alarm_time, 3),
+        'status': 'ok',
+        'invocations': 1,
+        'api_calls': 0,
+        'retries': 0,
+        'api_errors': 0
+    })
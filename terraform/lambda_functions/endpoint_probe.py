@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import socket
+import time
+
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+async def resolve(hostname, port, deadline, retry_interval=0.5):
+    """
+    Resolve a hostname to its unique IPv4 addresses, retrying until the deadline.
+    Returns an empty list if the name never resolves.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            infos = await loop.getaddrinfo(hostname, port, family=socket.AF_INET, type=socket.SOCK_STREAM)
+            return sorted({info[4][0] for info in infos})
+        except socket.gaierror as e:
+            if loop.time() + retry_interval >= deadline:
+                logger.warning(f"Could not resolve {hostname}: {e}")
+                return []
+            await asyncio.sleep(retry_interval)
+
+async def probe_address(address, port, deadline, connect_timeout=2.0, retry_interval=0.5):
+    """
+    Open a TCP connection to one address, retrying with short timeouts until the deadline.
+    """
+    loop = asyncio.get_running_loop()
+    attempts = 0
+    last_error = None
+
+    while True:
+        attempts += 1
+        timeout = max(0.05, min(connect_timeout, deadline - loop.time()))
+        started = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+            latency_ms = round((time.perf_counter() - started) * 1000, 2)
+            writer.close()
+            await writer.wait_closed()
+            return {
+                'address': address,
+                'port': port,
+                'reachable': True,
+                'latency_ms': latency_ms,
+                'attempts': attempts
+            }
+        except (OSError, asyncio.TimeoutError) as e:
+            last_error = str(e) or type(e).__name__
+
+        if loop.time() + retry_interval >= deadline:
+            return {
+                'address': address,
+                'port': port,
+                'reachable': False,
+                'latency_ms': None,
+                'attempts': attempts,
+                'error': last_error
+            }
+        await asyncio.sleep(retry_interval)
+
+async def verify_endpoint(record_name, endpoint, port, deadline_seconds=20.0,
+                          connect_timeout=2.0, retry_interval=0.5):
+    """
+    Resolve the DNS record and the database endpoint concurrently, then probe
+    every resolved address in parallel.
+    """
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    deadline = loop.time() + deadline_seconds
+
+    record_addresses, endpoint_addresses = await asyncio.gather(
+        resolve(record_name, port, deadline, retry_interval),
+        resolve(endpoint, port, deadline, retry_interval)
+    )
+    logger.info(f"DNS resolution: {record_name} -> {record_addresses}, {endpoint} -> {endpoint_addresses}")
+
+    addresses = sorted(set(record_addresses) | set(endpoint_addresses))
+    probes = await asyncio.gather(*[
+        probe_address(address, port, deadline, connect_timeout, retry_interval)
+        for address in addresses
+    ])
+
+    for probe in probes:
+        if probe['reachable']:
+            logger.info(f"Connected to {probe['address']}:{port} in {probe['latency_ms']} ms")
+        else:
+            logger.warning(f"Could not connect to {probe['address']}:{port}: {probe.get('error')}")
+
+    return {
+        'record_addresses': record_addresses,
+        'endpoint_addresses': endpoint_addresses,
+        'resolution_match': bool(record_addresses) and set(record_addresses) == set(endpoint_addresses),
+        'probes': list(probes),
+        'connectivity_verified': any(probe['reachable'] for probe in probes),
+        'duration_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+
+def run_verification(record_name, endpoint, port, **kwargs):
+    """Synchronous entry point for Lambda handlers."""
+    return asyncio.run(verify_endpoint(record_name, endpoint, port, **kwargs))
@@ -0,0 +1,114 @@
+import json
+import logging
+
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+# describe_db_instances accepts at most 100 values per filter
+DESCRIBE_BATCH_SIZE = 100
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def parse_databases(databases, default_replica_id=None, default_record_name=None):
+    """
+    Normalise the list of databases to fail over.
+    Accepts a list (or JSON string) of {'read_replica_id', 'record_name'} items;
+    falls back to the single replica and record the workflow was deployed with.
+    """
+    if isinstance(databases, str):
+        databases = json.loads(databases) if databases.strip() else []
+
+    if not databases:
+        if not default_replica_id:
+            raise ValueError("No databases to fail over: pass 'databases' or set READ_REPLICA_ID")
+        databases = [{'read_replica_id': default_replica_id, 'record_name': default_record_name}]
+
+    normalized = []
+    seen = set()
+    for database in databases:
+        read_replica_id = database.get('read_replica_id')
+        if not read_replica_id:
+            raise ValueError(f"read_replica_id is required for every database: {database}")
+        if read_replica_id in seen:
+            raise ValueError(f"Duplicate read_replica_id in databases: {read_replica_id}")
+        seen.add(read_replica_id)
+
+        record_name = database.get('record_name') or default_record_name
+        if not record_name:
+            raise ValueError(f"record_name is required for database {read_replica_id}")
+
+        normalized.append({'read_replica_id': read_replica_id, 'record_name': record_name})
+
+    return normalized
+
+def describe_instances(rds_client, instance_ids):
+    """
+    Describe many DB instances with one call per 100 identifiers.
+    Returns a dict keyed by identifier; missing instances are absent.
+    """
+    instances = {}
+    for batch in chunked(list(instance_ids), DESCRIBE_BATCH_SIZE):
+        paginator = rds_client.get_paginator('describe_db_instances')
+        pages = paginator.paginate(Filters=[{'Name': 'db-instance-id', 'Values': batch}])
+        for page in pages:
+            for db_instance in page['DBInstances']:
+                instances[db_instance['DBInstanceIdentifier']] = db_instance
+
+    logger.info(f"Described {len(instances)} of {len(instance_ids)} instances")
+    return instances
+
+def summarize_results(results, skipped=None):
+    """
+    Aggregate per-database Map results into one report.
+    Each result carries 'failover_status' of SUCCEEDED or FAILED.
+    """
+    succeeded = [result for result in results if result.get('failover_status') == 'SUCCEEDED']
+    failed = [result for result in results if result.get('failover_status') != 'SUCCEEDED']
+    skipped = skipped or []
+
+    return {
+        'total': len(results) + len(skipped),
+        'succeeded': len(succeeded),
+        'failed': len(failed),
+        'skipped': len(skipped),
+        'all_succeeded': not failed and not skipped and bool(succeeded),
+        'databases': [
+            {
+                'read_replica_id': result.get('read_replica_id', 'Unknown'),
+                'record_name': result.get('record_name', 'Unknown'),
+                'failover_status': result.get('failover_status', 'FAILED'),
+                'new_endpoint': result.get('new_endpoint'),
+                'error': result.get('error')
+            }
+            for result in succeeded + failed
+        ] + [
+            {
+                'read_replica_id': database['read_replica_id'],
+                'record_name': database.get('record_name', 'Unknown'),
+                'failover_status': 'SKIPPED',
+                'new_endpoint': None,
+                'error': database.get('reason')
+            }
+            for database in skipped
+        ]
+    }
+
+def format_report(report):
+    """Render one line per database for notifications."""
+    lines = [f"{report['succeeded']} succeeded, {report['failed']} failed, {report['skipped']} skipped of {report['total']}"]
+    for database in report['databases']:
+        line = f"• {database['read_replica_id']} ({database['record_name']}): {database['failover_status']}"
+        if database.get('new_endpoint'):
+            line += f" -> {database['new_endpoint']}"
+        if database.get('error'):
+            error = database['error']
+            if isinstance(error, dict):
+                error = error.get('Error', 'Unknown Error')
+            line += f" [{error}]"
+        lines.append(line)
+    return '\n'.join(lines)
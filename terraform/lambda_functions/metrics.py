@@ -0,0 +1,145 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from dr_common import add_call_listener
+
+
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'RDS/DisasterRecovery')
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+
+THROTTLING_ERROR_CODES = {'Throttling', 'ThrottlingException', 'RequestLimitExceeded',
+                          'TooManyRequestsException', 'PriorRequestNotComplete'}
+
+# CloudWatch limits per EMF document
+MAX_METRICS_PER_DOCUMENT = 100
+MAX_VALUES_PER_METRIC = 100
+
+
+class MetricsBuffer:
+    """
+    Buffers metrics for one invocation and writes them to stdout as CloudWatch
+    Embedded Metric Format documents on flush. No API calls are made;
+    CloudWatch extracts the metrics from the Lambda log stream.
+    """
+
+    def __init__(self, namespace=METRICS_NAMESPACE, writer=print):
+        self.namespace = namespace
+        self.writer = writer
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.dimensions = {}
+        self.properties = {}
+        self.values = {}
+        self.units = {}
+
+    def set_dimension(self, name, value):
+        self.dimensions[name] = str(value)
+
+    def set_property(self, name, value):
+        self.properties[name] = value
+
+    def put(self, name, value, unit='Count'):
+        """Record one observation; every observation is kept (latencies, sizes)."""
+        with self._lock:
+            self.values.setdefault(name, []).append(value)
+            self.units[name] = unit
+
+    def add(self, name, value=1, unit='Count'):
+        """Add to a counter that is emitted as a single summed value."""
+        with self._lock:
+            values = self.values.setdefault(name, [0])
+            values[0] += value
+            self.units[name] = unit
+
+    def documents(self, timestamp=None):
+        """Build the EMF documents for the buffered metrics."""
+        timestamp = int((timestamp if timestamp is not None else time.time()) * 1000)
+        names = sorted(self.values)
+        documents = []
+
+        for start in range(0, len(names), MAX_METRICS_PER_DOCUMENT):
+            batch = names[start:start + MAX_METRICS_PER_DOCUMENT]
+            document = {
+                '_aws': {
+                    'Timestamp': timestamp,
+                    'CloudWatchMetrics': [{
+                        'Namespace': self.namespace,
+                        'Dimensions': [sorted(self.dimensions)],
+                        'Metrics': [{'Name': name, 'Unit': self.units[name]} for name in batch]
+                    }]
+                },
+                **self.properties,
+                **self.dimensions
+            }
+            for name in batch:
+                values = self.values[name][-MAX_VALUES_PER_METRIC:]
+                document[name] = values[0] if len(values) == 1 else values
+            documents.append(document)
+
+        return documents
+
+    def flush(self):
+        with self._lock:
+            documents = self.documents() if self.values else []
+            self.values = {}
+            self.units = {}
+        if METRICS_ENABLED:
+            for document in documents:
+                self.writer(json.dumps(document, default=str))
+        return documents
+
+
+metrics = MetricsBuffer()
+
+
+def _on_api_call(service_name, operation_name, retries, failed, error_code=None):
+    metrics.add('ApiCalls')
+    if retries:
+        metrics.add('ApiRetries', retries)
+    if failed:
+        metrics.add('ApiErrors')
+    if error_code in THROTTLING_ERROR_CODES:
+        metrics.add('Throttles')
+
+
+add_call_listener(_on_api_call)
+
+
+@contextmanager
+def timed(name):
+    """Record the duration of the block in milliseconds as <name>Latency."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.put(f"{name}Latency", round((time.perf_counter() - started) * 1000, 3), 'Milliseconds')
+
+
+def instrument_handler(handler):
+    """
+    Wrap a Lambda handler: emits Invocations, Errors and HandlerLatency with a
+    FunctionName dimension, plus everything buffered during the invocation.
+    """
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        metrics.reset()
+        metrics.set_dimension('FunctionName', getattr(context, 'function_name', handler.__module__))
+        metrics.set_property('RequestId', getattr(context, 'aws_request_id', None))
+        metrics.add('Invocations')
+        started = time.perf_counter()
+        try:
+            return handler(event, context)
+        except Exception:
+            metrics.add('Errors')
+            raise
+        finally:
+            metrics.put('HandlerLatency', round((time.perf_counter() - started) * 1000, 3), 'Milliseconds')
+            metrics.flush()
+
+    return wrapper
@@ -0,0 +1,223 @@
+import hashlib
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from dr_common import error_code, get_client
+from metrics import metrics
+
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+# SNS rejects messages over 256 KB and subjects of 100 characters or more
+SNS_MESSAGE_LIMIT_BYTES = 262144
+SNS_SUBJECT_LIMIT = 99
+# Headroom below the limit for the spill-over footer
+MESSAGE_BUDGET_BYTES = int(os.environ.get('NOTIFICATION_MESSAGE_BUDGET_BYTES', '250000'))
+# Topics every notification of this function also goes to, comma separated
+ADDITIONAL_SNS_TOPIC_ARNS = os.environ.get('ADDITIONAL_SNS_TOPIC_ARNS', '')
+NOTIFICATION_LEDGER_TABLE = os.environ.get('NOTIFICATION_LEDGER_TABLE')
+NOTIFICATION_LEDGER_TTL_SECONDS = int(os.environ.get('NOTIFICATION_LEDGER_TTL_SECONDS', '86400'))
+# Characters per log event when spilling a message (up to 4 bytes each)
+LOG_PART_CHARS = 50000
+# Upper bound on the time a notification may add to the invocation
+NOTIFICATION_TIMEOUT_SECONDS = float(os.environ.get('NOTIFICATION_TIMEOUT_SECONDS', '10'))
+
+# Tight client settings so an SNS or DynamoDB brownout cannot stall the caller
+CLIENT_CONFIG = {
+    'connect_timeout': 2,
+    'read_timeout': 5,
+    'retries': {'mode': 'standard', 'max_attempts': 2}
+}
+
+# Dedup keys already handled by this container, for retried invocations
+_seen = set()
+
+
+def topic_targets(*topic_arns):
+    """
+    The given topics plus ADDITIONAL_SNS_TOPIC_ARNS, without blanks or repeats.
+    """
+    targets = []
+    for topic_arn in [*topic_arns, *ADDITIONAL_SNS_TOPIC_ARNS.split(',')]:
+        topic_arn = (topic_arn or '').strip()
+        if topic_arn and topic_arn not in targets:
+            targets.append(topic_arn)
+    return targets
+
+
+def topic_region(topic_arn):
+    # arn:aws:sns:<region>:<account>:<name>
+    parts = topic_arn.split(':')
+    return parts[3] if len(parts) > 5 and parts[3] else None
+
+
+def spill_reference(notification_id):
+    """Where the untruncated detail can be found: this invocation's log stream."""
+    log_group = os.environ.get('AWS_LAMBDA_LOG_GROUP_NAME', 'local')
+    log_stream = os.environ.get('AWS_LAMBDA_LOG_STREAM_NAME', 'local')
+    return f"CloudWatch Logs {log_group} / {log_stream}, notification {notification_id}"
+
+
+def _truncate_bytes(text, max_bytes):
+    encoded = text.encode('utf-8')
+    if len(encoded) <= max_bytes:
+        return text
+    # Drop a partial multi-byte character rather than fail to decode
+    return encoded[:max(max_bytes, 0)].decode('utf-8', errors='ignore')
+
+
+def _log_full_text(notification_id, message):
+    # CloudWatch Logs caps events at 256 KB as well, so the text is logged in parts
+    parts = [message[i:i + LOG_PART_CHARS] for i in range(0, len(message), LOG_PART_CHARS)]
+    for index, part in enumerate(parts, 1):
+        logger.info(f"Notification {notification_id} full text part {index}/{len(parts)}: {part}")
+
+
+def build_message(summary, detail='', budget_bytes=min(MESSAGE_BUDGET_BYTES, SNS_MESSAGE_LIMIT_BYTES), notification_id=None):
+    """
+    Fit summary and detail into budget_bytes. The summary is kept whole when it
+    fits; detail that does not fit is cut and the full text is written to the log
+    under a reference quoted in the message.
+
+    Returns (message, truncated).
+    """
+    message = f"{summary}{detail}"
+    if len(message.encode('utf-8')) <= budget_bytes:
+        return message, False
+
+    notification_id = notification_id or uuid.uuid4().hex[:12]
+    reference = spill_reference(notification_id)
+    _log_full_text(notification_id, message)
+
+    footer = f"\n\n✂️ Truncated to fit SNS. Full text: {reference}\n"
+    available = budget_bytes - len(footer.encode('utf-8'))
+    summary_bytes = len(summary.encode('utf-8'))
+    if summary_bytes >= available:
+        return _truncate_bytes(summary, available) + footer, True
+    return summary + _truncate_bytes(detail, available - summary_bytes) + footer, True
+
+
+def _ledger_client():
+    return get_client('dynamodb', **CLIENT_CONFIG)
+
+
+def _claim(dedup_key):
+    """
+    Record the notification in the ledger. Returns False when it was already
+    sent; any ledger failure lets the notification through.
+    """
+    if dedup_key in _seen:
+        return False
+    _seen.add(dedup_key)
+    if not NOTIFICATION_LEDGER_TABLE:
+        return True
+
+    try:
+        _ledger_client().put_item(
+            TableName=NOTIFICATION_LEDGER_TABLE,
+            Item={
+                'notification_key': {'S': dedup_key},
+                'expires_at': {'N': str(int(time.time()) + NOTIFICATION_LEDGER_TTL_SECONDS)}
+            },
+            ConditionExpression='attribute_not_exists(notification_key)'
+        )
+    except Exception as e:
+        if error_code(e) == 'ConditionalCheckFailedException':
+            return False
+        logger.warning(f"Notification ledger unavailable, sending without dedup: {e}")
+    return True
+
+
+def _release(dedup_key):
+    # Nothing was delivered, so a retry must be allowed to send it
+    _seen.discard(dedup_key)
+    if not NOTIFICATION_LEDGER_TABLE:
+        return
+    try:
+        _ledger_client().delete_item(
+            TableName=NOTIFICATION_LEDGER_TABLE,
+            Key={'notification_key': {'S': dedup_key}}
+        )
+    except Exception as e:
+        logger.warning(f"Failed to release notification ledger entry {dedup_key}: {e}")
+
+
+def _publish_one(topic_arn, subject, message):
+    client = get_client('sns', region_name=topic_region(topic_arn), **CLIENT_CONFIG)
+    response = client.publish(TopicArn=topic_arn, Subject=subject, Message=message)
+    return response['MessageId']
+
+
+def notify(topic_arns, subject, summary, detail='', dedup_key=None):
+    """
+    Publish one notification to every topic, concurrently when there are several.
+    Never raises: failures are logged and reported in the result.
+
+    dedup_key identifies the notification within an execution, e.g.
+    f"{execution_id}:failure"; a repeat with the same key is not sent again.
+    """
+    result = {'sent': [], 'failed': [], 'duplicate': False, 'truncated': False}
+    try:
+        targets = topic_targets(*topic_arns)
+        if not targets:
+            raise ValueError("No SNS topic configured for the notification")
+
+        key = hashlib.sha256(dedup_key.encode('utf-8')).hexdigest() if dedup_key else None
+        if key and not _claim(key):
+            logger.info(f"Notification {dedup_key} was already sent, skipping")
+            metrics.add('NotificationsDeduplicated')
+            result['duplicate'] = True
+            return result
+
+        message, truncated = build_message(summary, detail, notification_id=key[:12] if key else None)
+        subject = subject[:SNS_SUBJECT_LIMIT]
+        result['truncated'] = truncated
+        if truncated:
+            metrics.add('NotificationsTruncated')
+
+        if len(targets) == 1:
+            outcomes = {targets[0]: _attempt(targets[0], subject, message)}
+        else:
+            outcomes = _publish_concurrently(targets, subject, message)
+
+        for topic_arn, (message_id, error) in outcomes.items():
+            if error is None:
+                result['sent'].append({'topic_arn': topic_arn, 'message_id': message_id})
+            else:
+                logger.error(f"Failed to publish notification to {topic_arn}: {error}")
+                result['failed'].append({'topic_arn': topic_arn, 'error': error})
+
+        if key and not result['sent']:
+            _release(key)
+    except Exception as e:
+        logger.error(f"Notification failed: {e}")
+        result['failed'].append({'topic_arn': None, 'error': str(e)})
+
+    metrics.add('NotificationsSent', len(result['sent']))
+    if result['failed']:
+        metrics.add('NotificationsFailed', len(result['failed']))
+    return result
+
+
+def _attempt(topic_arn, subject, message):
+    try:
+        return _publish_one(topic_arn, subject, message), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _publish_concurrently(targets, subject, message):
+    executor = ThreadPoolExecutor(max_workers=len(targets))
+    futures = {executor.submit(_attempt, topic_arn, subject, message): topic_arn for topic_arn in targets}
+    done, _ = wait(futures, timeout=NOTIFICATION_TIMEOUT_SECONDS)
+    # Stragglers are abandoned rather than waited for
+    executor.shutdown(wait=False)
+    return {
+        topic_arn: future.result() if future in done else (None, f"Timed out after {NOTIFICATION_TIMEOUT_SECONDS}s")
+        for future, topic_arn in futures.items()
+    }
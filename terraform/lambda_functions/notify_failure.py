@@ -1,16 +1,20 @@
 import json
-import boto3
 import logging
 import os
+import time
 from datetime import datetime
 
+from fleet import format_report
+from metrics import instrument_handler, metrics
+from notifications import notify
+from tracing import format_breakdown, rto_breakdown
+
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
-sns_client = boto3.client('sns')
-
+@instrument_handler
 def lambda_handler(event, context):
     """
     Send a failure notification when any step in the disaster recovery process fails.
@@ -49,6 +53,20 @@ def lambda_handler(event, context):
         step_name = event.get('step_name', 'Unknown Step')
         step_timestamp = event.get('step_timestamp', 'Unknown')
         
+        # Per-database results when the fleet failover completed only partially
+        failover_report = event.get('failover_report')
+        fleet_section = ''
+        if failover_report:
+            fleet_section = f"""
+🗂️ FLEET RESULTS:
+{format_report(failover_report)}
+"""
+        
+        # Where the failover time went, from the spans recorded by each step
+        breakdown = rto_breakdown(event.get('trace'), now=time.time())
+        metrics.add('FailoversFailed')
+        metrics.put('FailedFailoverDuration', breakdown['total_ms'], 'Milliseconds')
+        
         # Create a comprehensive failure message
         current_time = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')
         
@@ -64,6 +82,9 @@ Execution ID: {execution_id}
 • Error Type: {error_type}
 • Error Message: {error_message}
 • Step Timestamp: {step_timestamp}
+{fleet_section}
+⏱️ RTO BREAKDOWN:
+{format_breakdown(breakdown)}
 
 🔍 TROUBLESHOOTING INFORMATION:
 • Check CloudWatch Logs for detailed error information
@@ -83,7 +104,11 @@ Execution ID: {execution_id}
 • CloudWatch Logs: https://console.aws.amazon.com/cloudwatch/
 • RDS Console: https://console.aws.amazon.com/rds/
 • Route 53 Console: https://console.aws.amazon.com/route53/
-
+"""
+        
+        # Step Function causes can be arbitrarily large, so the error context is
+        # the part cut to keep the message within the SNS limit
+        error_context = f"""
 📋 ERROR CONTEXT:
 {json.dumps(error_info, indent=2, default=str)}
 
@@ -92,18 +117,23 @@ This notification was sent by the RDS Disaster Recovery Step Function.
         """
         
         # Send the failure notification
-        response = sns_client.publish(
-            TopicArn=sns_topic_arn,
-            Subject="❌ RDS Disaster Recovery: FAILOVER FAILED - IMMEDIATE ATTENTION REQUIRED",
-            Message=failure_message
+        notification = notify(
+            [sns_topic_arn],
+            "❌ RDS Disaster Recovery: FAILOVER FAILED - IMMEDIATE ATTENTION REQUIRED",
+            failure_message,
+            error_context,
+            dedup_key=f"{execution_id}:failure:{read_replica_id}:{step_name}"
         )
+        message_id = notification['sent'][0]['message_id'] if notification['sent'] else None
         
-        logger.info(f"Failure notification sent: {response['MessageId']}")
+        if message_id:
+            logger.info(f"Failure notification sent: {message_id}")
         
-        # Return failure information
+        # Return failure information; a failed notification never hides the failover outcome
         return {
-            'notification_sent': True,
-            'message_id': response['MessageId'],
+            'notification_sent': bool(notification['sent']) or notification['duplicate'],
+            'message_id': message_id,
+            'notification': notification,
             'notification_type': 'failure',
             'timestamp': current_time,
             'execution_id': execution_id,
@@ -111,6 +141,8 @@ This notification was sent by the RDS Disaster Recovery Step Function.
             'error_type': error_type,
             'error_message': error_message,
             'failed_step': step_name,
+            'failover_report': failover_report,
+            'rto_breakdown': breakdown,
             'final_status': 'FAILED'
         }
         
@@ -1,16 +1,20 @@
 import json
-import boto3
 import logging
 import os
+import time
 from datetime import datetime
 
+from fleet import format_report
+from metrics import instrument_handler, metrics
+from notifications import notify
+from tracing import format_breakdown, rto_breakdown
+
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
-sns_client = boto3.client('sns')
-
+@instrument_handler
 def lambda_handler(event, context):
     """
     Send a success notification when the disaster recovery process completes successfully.
@@ -42,6 +46,22 @@ def lambda_handler(event, context):
         connectivity_verified = event.get('connectivity_verified', False)
         dns_verified = event.get('dns_verified', False)
         
+        # Per-database results when several databases were failed over
+        failover_report = event.get('failover_report')
+        fleet_section = ''
+        if failover_report and failover_report['total'] > 1:
+            fleet_section = f"""
+🗂️ FLEET RESULTS:
+{format_report(failover_report)}
+"""
+        
+        # Where the failover time went, from the spans recorded by each step
+        breakdown = rto_breakdown(event.get('trace'), now=time.time())
+        metrics.add('FailoversSucceeded')
+        metrics.put('FailoverRTO', breakdown['total_ms'], 'Milliseconds')
+        for phase in breakdown['phases']:
+            metrics.put(f"{phase['name']}Duration", phase['duration_ms'], 'Milliseconds')
+        
         # Create a comprehensive success message
         current_time = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')
         
@@ -62,12 +82,15 @@ Execution ID: {execution_id}
 • Route 53 Change ID: {change_id}
 • DNS Verification: {'✅ SUCCESS' if dns_verified else '❌ FAILED'}
 • Connectivity Test: {'✅ SUCCESS' if connectivity_verified else '❌ FAILED'}
+{fleet_section}
+⏱️ RTO BREAKDOWN:
+{format_breakdown(breakdown)}
 
 ✅ VERIFICATION STATUS:
 • Database Promotion: ✅ COMPLETED
 • DNS Update: ✅ COMPLETED
 • DNS Propagation: ✅ COMPLETED
-• Connectivity: {'✅ VERIFIED' if connectivity_verified else '⚠️ PENDING'}
+• Database Readiness: {readiness_status(event)}
 
 🎯 RESULT:
 The disaster recovery process has completed successfully. Your applications should now be connecting to the newly promoted primary database at {new_endpoint}.
@@ -88,26 +111,43 @@ This notification was sent by the RDS Disaster Recovery Step Function.
         """
         
         # Send the success notification
-        response = sns_client.publish(
-            TopicArn=sns_topic_arn,
-            Subject="✅ RDS Disaster Recovery: FAILOVER COMPLETED SUCCESSFULLY",
-            Message=success_message
+        notification = notify(
+            [sns_topic_arn],
+            "✅ RDS Disaster Recovery: FAILOVER COMPLETED SUCCESSFULLY",
+            success_message,
+            dedup_key=f"{execution_id}:success"
         )
+        message_id = notification['sent'][0]['message_id'] if notification['sent'] else None
         
-        logger.info(f"Success notification sent: {response['MessageId']}")
+        if message_id:
+            logger.info(f"Success notification sent: {message_id}")
         
-        # Return success information
+        # Return success information; a failed notification never hides the failover outcome
         return {
-            'notification_sent': True,
-            'message_id': response['MessageId'],
+            'notification_sent': bool(notification['sent']) or notification['duplicate'],
+            'message_id': message_id,
+            'notification': notification,
             'notification_type': 'success',
             'timestamp': current_time,
             'execution_id': execution_id,
             'read_replica_id': read_replica_id,
             'new_endpoint': new_endpoint,
+            'failover_report': failover_report,
+            'rto_breakdown': breakdown,
             'final_status': 'COMPLETED_SUCCESSFULLY'
         }
         
     except Exception as e:
         logger.error(f"Success notification failed: {str(e)}")
-        raise e 
\ No newline at end of file
+        raise e 
+
+
+def readiness_status(event):
+    """Describe how far the promoted database was verified by VerifyDNSUpdate."""
+    if event.get('writes_accepted'):
+        return '✅ ACCEPTING WRITES'
+    if event.get('connectivity_verified'):
+        return '✅ REACHABLE (writes not checked, no probe credentials)'
+    if event.get('failover_report'):
+        return '✅ VERIFIED PER DATABASE (see fleet results)'
+    return '❔ NOT REPORTED'
@@ -0,0 +1,290 @@
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import socket
+import ssl
+import struct
+import time
+
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+PROTOCOL_VERSION = 196608
+SSL_REQUEST_CODE = 80877103
+
+AUTH_OK = 0
+AUTH_CLEARTEXT = 3
+AUTH_MD5 = 5
+AUTH_SASL = 10
+AUTH_SASL_CONTINUE = 11
+AUTH_SASL_FINAL = 12
+
+
+class PostgresProbeError(Exception):
+    pass
+
+
+class PostgresServerError(PostgresProbeError):
+    """An ErrorResponse from the server; the connection itself is still usable."""
+
+
+class PostgresConnection:
+    """
+    Minimal PostgreSQL v3 frontend: SSLRequest, startup, password/md5/SCRAM
+    authentication and simple queries. Only what the readiness probe and the
+    post-restore hydration need.
+    """
+
+    def __init__(self, host, port, timeout):
+        self.started = time.perf_counter()
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.settimeout(timeout)
+        self.host = host
+        self.ssl = False
+        self.ttfb_ms = None
+
+    def elapsed_ms(self):
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+    def close(self):
+        try:
+            self.send(b'X', b'')
+        except OSError:
+            pass
+        self.sock.close()
+
+    def recv_exact(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise PostgresProbeError("Connection closed by server")
+            data += chunk
+        return data
+
+    def send(self, message_type, payload):
+        self.sock.sendall(message_type + struct.pack('!I', len(payload) + 4) + payload)
+
+    def read_message(self):
+        header = self.recv_exact(5)
+        message_type = header[:1]
+        length = struct.unpack('!I', header[1:])[0]
+        payload = self.recv_exact(length - 4)
+        if message_type == b'E':
+            raise PostgresServerError(parse_error(payload))
+        return message_type, payload
+
+    def negotiate_ssl(self):
+        """
+        Send SSLRequest and upgrade to TLS when the server accepts.
+        The single response byte is the time to first byte.
+        """
+        self.sock.sendall(struct.pack('!II', 8, SSL_REQUEST_CODE))
+        response = self.recv_exact(1)
+        self.ttfb_ms = self.elapsed_ms()
+
+        if response == b'S':
+            # The RDS CA bundle is not shipped with the Lambda runtime, so the
+            # certificate is not verified; prefer SCRAM/md5 users for the probe
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+            self.sock = context.wrap_socket(self.sock, server_hostname=self.host)
+            self.ssl = True
+        elif response != b'N':
+            raise PostgresProbeError(f"Unexpected SSLRequest response: {response!r}")
+
+    def startup(self, user, password, database, application_name='dr-readiness-probe'):
+        params = {'user': user, 'database': database, 'application_name': application_name}
+        body = struct.pack('!I', PROTOCOL_VERSION)
+        for key, value in params.items():
+            body += key.encode() + b'\x00' + value.encode() + b'\x00'
+        body += b'\x00'
+        self.sock.sendall(struct.pack('!I', len(body) + 4) + body)
+
+        scram = None
+        while True:
+            message_type, payload = self.read_message()
+            if message_type == b'R':
+                code = struct.unpack('!I', payload[:4])[0]
+                if code == AUTH_OK:
+                    continue
+                if code == AUTH_CLEARTEXT:
+                    if not self.ssl:
+                        raise PostgresProbeError("Refusing cleartext password authentication without TLS")
+                    self.send(b'p', password.encode() + b'\x00')
+                elif code == AUTH_MD5:
+                    self.send(b'p', md5_password(user, password, payload[4:8]))
+                elif code == AUTH_SASL:
+                    mechanisms = payload[4:].split(b'\x00')
+                    if b'SCRAM-SHA-256' not in mechanisms:
+                        raise PostgresProbeError(f"Unsupported SASL mechanisms: {mechanisms}")
+                    scram = ScramClient(password)
+                    first = scram.client_first()
+                    self.send(b'p', b'SCRAM-SHA-256\x00' + struct.pack('!I', len(first)) + first)
+                elif code == AUTH_SASL_CONTINUE:
+                    self.send(b'p', scram.client_final(payload[4:]))
+                elif code == AUTH_SASL_FINAL:
+                    scram.verify_server_final(payload[4:])
+                else:
+                    raise PostgresProbeError(f"Unsupported authentication method: {code}")
+            elif message_type == b'Z':
+                return
+
+    def query_scalar(self, sql):
+        """Run a simple query and return the first column of the first row as text."""
+        self.send(b'Q', sql.encode() + b'\x00')
+        value = None
+        while True:
+            message_type, payload = self.read_message()
+            if message_type == b'D' and value is None:
+                column_length = struct.unpack('!i', payload[2:6])[0]
+                value = None if column_length < 0 else payload[6:6 + column_length].decode()
+            elif message_type == b'Z':
+                return value
+
+    def query_rows(self, sql):
+        """
+        Run a simple query and return all rows as tuples of text (None for NULL).
+        A server error is raised only after ReadyForQuery, so the connection can
+        run the next query.
+        """
+        self.send(b'Q', sql.encode() + b'\x00')
+        rows = []
+        error = None
+        while True:
+            try:
+                message_type, payload = self.read_message()
+            except PostgresServerError as e:
+                error = error or e
+                continue
+            if message_type == b'D':
+                rows.append(parse_data_row(payload))
+            elif message_type == b'Z':
+                if error:
+                    raise error
+                return rows
+
+
+class ScramClient:
+    """SCRAM-SHA-256 without channel binding (RFC 7677)."""
+
+    def __init__(self, password):
+        self.password = password.encode()
+        self.nonce = base64.b64encode(os.urandom(18)).decode()
+        self.client_first_bare = f"n=,r={self.nonce}"
+        self.server_signature = None
+
+    def client_first(self):
+        return f"n,,{self.client_first_bare}".encode()
+
+    def client_final(self, server_first):
+        server_first = server_first.decode()
+        attributes = dict(item.split('=', 1) for item in server_first.split(','))
+        if not attributes['r'].startswith(self.nonce):
+            raise PostgresProbeError("SCRAM server nonce does not extend client nonce")
+
+        salted = hashlib.pbkdf2_hmac('sha256', self.password, base64.b64decode(attributes['s']), int(attributes['i']))
+        client_key = hmac.new(salted, b'Client Key', hashlib.sha256).digest()
+        stored_key = hashlib.sha256(client_key).digest()
+        without_proof = f"c=biws,r={attributes['r']}"
+        auth_message = f"{self.client_first_bare},{server_first},{without_proof}".encode()
+
+        client_signature = hmac.new(stored_key, auth_message, hashlib.sha256).digest()
+        proof = bytes(a ^ b for a, b in zip(client_key, client_signature))
+        server_key = hmac.new(salted, b'Server Key', hashlib.sha256).digest()
+        self.server_signature = hmac.new(server_key, auth_message, hashlib.sha256).digest()
+
+        return f"{without_proof},p={base64.b64encode(proof).decode()}".encode()
+
+    def verify_server_final(self, server_final):
+        attributes = dict(item.split('=', 1) for item in server_final.decode().split(','))
+        if base64.b64decode(attributes.get('v', '')) != self.server_signature:
+            raise PostgresProbeError("SCRAM server signature mismatch")
+
+
+def md5_password(user, password, salt):
+    inner = hashlib.md5(password.encode() + user.encode()).hexdigest()
+    return b'md5' + hashlib.md5(inner.encode() + salt).hexdigest().encode() + b'\x00'
+
+def parse_data_row(payload):
+    columns = []
+    offset = 2
+    for _ in range(struct.unpack('!H', payload[:2])[0]):
+        length = struct.unpack('!i', payload[offset:offset + 4])[0]
+        offset += 4
+        if length < 0:
+            columns.append(None)
+        else:
+            columns.append(payload[offset:offset + length].decode())
+            offset += length
+    return tuple(columns)
+
+def parse_error(payload):
+    fields = {}
+    for field in payload.split(b'\x00'):
+        if field:
+            fields[field[:1]] = field[1:].decode(errors='replace')
+    return f"{fields.get(b'S', 'ERROR')}: {fields.get(b'M', 'unknown error')}"
+
+def probe_once(host, port, user=None, password=None, database='postgres', timeout=3.0):
+    """
+    One readiness attempt. Without credentials only the SSLRequest handshake is checked.
+    """
+    result = {'handshake_ok': False, 'ssl': False, 'ttfb_ms': None}
+    connection = PostgresConnection(host, port, timeout)
+    try:
+        connection.negotiate_ssl()
+        result.update(handshake_ok=True, ssl=connection.ssl, ttfb_ms=connection.ttfb_ms)
+
+        if user and password:
+            connection.startup(user, password, database)
+            result['authenticated'] = True
+            connection.query_scalar('SELECT 1')
+            result['select1_ms'] = connection.elapsed_ms()
+            result['in_recovery'] = connection.query_scalar('SELECT pg_is_in_recovery()') == 't'
+    finally:
+        connection.close()
+    return result
+
+def probe_readiness(host, port, user=None, password=None, database='postgres',
+                    timeout=3.0, deadline_seconds=30.0, retry_interval=1.0):
+    """
+    Retry the probe until the database is ready or the deadline passes.
+    Ready means the handshake succeeds and, when credentials are given,
+    SELECT 1 succeeds and pg_is_in_recovery() is false (the database accepts writes).
+    ttfb_ms and select1_ms are measured from the start of the last connection,
+    ready_total_ms from the start of the probe.
+    """
+    started = time.perf_counter()
+    deadline = started + deadline_seconds
+    check_writes = bool(user and password)
+    summary = {
+        'host': host,
+        'port': port,
+        'checked_writes': check_writes,
+        'ready': False,
+        'attempts': 0
+    }
+
+    while True:
+        summary['attempts'] += 1
+        try:
+            result = probe_once(host, port, user, password, database, timeout)
+            summary.update(result)
+            summary.pop('error', None)
+            if not check_writes or result.get('in_recovery') is False:
+                summary['ready'] = True
+                summary['ready_total_ms'] = round((time.perf_counter() - started) * 1000, 2)
+                return summary
+        except (OSError, PostgresProbeError) as e:
+            summary['error'] = str(e)
+
+        if time.perf_counter() + retry_interval >= deadline:
+            logger.warning(f"Database {host}:{port} not ready after {summary['attempts']} attempts: {summary.get('error')}")
+            return summary
+        time.sleep(retry_interval)
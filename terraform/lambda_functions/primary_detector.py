@@ -0,0 +1,232 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+from dr_common import get_client
+from endpoint_probe import probe_address
+from metrics import instrument_handler, metrics
+from postgres_probe import PostgresProbeError, probe_once
+
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+PRIMARY_ENDPOINT = os.environ.get('PRIMARY_ENDPOINT')
+PRIMARY_PORT = int(os.environ.get('PRIMARY_PORT', '5432'))
+# Also require the Postgres SSLRequest handshake, not just a TCP accept
+DETECTOR_POSTGRES_HANDSHAKE = os.environ.get('DETECTOR_POSTGRES_HANDSHAKE', 'true').lower() == 'true'
+VANTAGE_NAME = os.environ.get('VANTAGE_NAME', 'coordinator')
+# Probe functions deployed at the other vantage points, comma separated
+VANTAGE_FUNCTIONS = [name for name in os.environ.get('VANTAGE_FUNCTIONS', '').split(',') if name]
+ORCHESTRATOR_FUNCTION = os.environ.get('ORCHESTRATOR_FUNCTION')
+# Vantage points that must see the primary fail in the same round
+DETECTOR_QUORUM = int(os.environ.get('DETECTOR_QUORUM', '2'))
+# Consecutive failed rounds before the failover is triggered
+DETECTOR_FAILURE_ROUNDS = int(os.environ.get('DETECTOR_FAILURE_ROUNDS', '3'))
+DETECTOR_INTERVAL_SECONDS = float(os.environ.get('DETECTOR_INTERVAL_SECONDS', '5'))
+PROBE_TIMEOUT_SECONDS = float(os.environ.get('PROBE_TIMEOUT_SECONDS', '2'))
+# The schedule starts a detector every minute; each one probes for this long
+DETECTOR_RUN_SECONDS = float(os.environ.get('DETECTOR_RUN_SECONDS', '55'))
+
+DETECTOR_ALARM_NAME = 'primary-failure-detector'
+
+
+async def probe_primary(host, port, vantage=VANTAGE_NAME, timeout=PROBE_TIMEOUT_SECONDS,
+                        handshake=DETECTOR_POSTGRES_HANDSHAKE):
+    """
+    One probe of the primary from this vantage point: a single TCP connect
+    and, when enabled, the Postgres SSLRequest handshake, within timeout.
+    """
+    loop = asyncio.get_running_loop()
+    result = {'vantage': vantage, 'healthy': False}
+
+    # A retry interval of the whole timeout means exactly one connect attempt
+    tcp = await probe_address(host, port, loop.time() + timeout, connect_timeout=timeout, retry_interval=timeout)
+    result['tcp_ms'] = tcp['latency_ms']
+    if not tcp['reachable']:
+        result['error'] = tcp.get('error')
+        return result
+
+    if handshake:
+        try:
+            postgres = await loop.run_in_executor(None, lambda: probe_once(host, port, timeout=timeout))
+            result['ttfb_ms'] = postgres['ttfb_ms']
+        except (OSError, PostgresProbeError) as e:
+            result['error'] = f"Postgres handshake failed: {e}"
+            return result
+
+    result['healthy'] = True
+    return result
+
+def quorum_decision(results, quorum=DETECTOR_QUORUM):
+    """
+    Combine one round of vantage results into 'down', 'up' or 'unknown'.
+    Vantage points that did not answer abstain. The primary is down when at
+    least quorum voters saw it fail and they outnumber the ones that reached it.
+    """
+    failed = sum(1 for result in results if result.get('healthy') is False)
+    healthy = sum(1 for result in results if result.get('healthy') is True)
+    if failed >= quorum and failed > healthy:
+        return 'down'
+    if healthy >= 1 and failed < quorum:
+        return 'up'
+    return 'unknown'
+
+
+class FailureDetector:
+    """
+    Declares the primary failed after failure_rounds consecutive 'down' rounds.
+    An 'up' round resets the count; an 'unknown' round neither counts nor resets.
+    """
+
+    def __init__(self, quorum=DETECTOR_QUORUM, failure_rounds=DETECTOR_FAILURE_ROUNDS):
+        self.quorum = quorum
+        self.failure_rounds = failure_rounds
+        self.consecutive_down = 0
+        self.first_down_at = None
+        self.failed = False
+
+    def observe(self, results, now=None):
+        now = now if now is not None else time.time()
+        state = quorum_decision(results, self.quorum)
+        if state == 'down':
+            if self.consecutive_down == 0:
+                self.first_down_at = now
+            self.consecutive_down += 1
+            self.failed = self.consecutive_down >= self.failure_rounds
+        elif state == 'up':
+            self.consecutive_down = 0
+            self.first_down_at = None
+        return state
+
+
+def _lambda_client():
+    # Fail fast: a vantage point that cannot answer within the round abstains
+    return get_client(
+        'lambda',
+        connect_timeout=2,
+        read_timeout=int(PROBE_TIMEOUT_SECONDS * 2) + 3,
+        retries={'mode': 'standard', 'max_attempts': 1}
+    )
+
+def invoke_vantage(function_name):
+    """Ask the probe function at another vantage point for its result; None when it does not answer."""
+    try:
+        response = _lambda_client().invoke(
+            FunctionName=function_name,
+            InvocationType='RequestResponse',
+            Payload=json.dumps({'mode': 'probe'})
+        )
+        if response.get('FunctionError'):
+            raise RuntimeError(response['Payload'].read().decode())
+        return json.loads(response['Payload'].read())
+    except Exception as e:
+        logger.warning(f"Vantage point {function_name} did not answer: {e}")
+        return {'vantage': function_name, 'healthy': None, 'error': str(e)}
+
+async def probe_round(host, port, vantage_functions=VANTAGE_FUNCTIONS):
+    """Probe locally and from every other vantage point concurrently."""
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(
+        probe_primary(host, port),
+        *[loop.run_in_executor(None, invoke_vantage, function_name) for function_name in vantage_functions]
+    )
+    return list(results)
+
+def alarm_time(timestamp):
+    # The CloudWatch StateChangeTime format dr_orchestrator parses
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + '+0000'
+
+def trigger_failover(detector, results):
+    """Invoke dr_orchestrator asynchronously with an ALARM for the detected failure."""
+    event = {
+        'source': 'dr.primary_detector',
+        'alarm_name': DETECTOR_ALARM_NAME,
+        'state': 'ALARM',
+        'description': f"{PRIMARY_ENDPOINT}:{PRIMARY_PORT} unreachable from a quorum of vantage points",
+        'reason': f"{detector.consecutive_down} consecutive rounds with at least {detector.quorum} failing vantage points",
+        # The alarm time is when the outage was first seen, so the RTO includes detection
+        'detected_at': alarm_time(detector.first_down_at),
+        'votes': results
+    }
+    get_client('lambda').invoke(
+        FunctionName=ORCHESTRATOR_FUNCTION,
+        InvocationType='Event',
+        Payload=json.dumps(event)
+    )
+    return event
+
+async def run_detector(host, port, remaining_seconds):
+    detector = FailureDetector()
+    loop = asyncio.get_running_loop()
+    stop_at = loop.time() + remaining_seconds
+    rounds = []
+
+    while loop.time() < stop_at:
+        round_started = loop.time()
+        results = await probe_round(host, port)
+        state = detector.observe(results)
+        rounds.append(state)
+        metrics.add('DetectorRounds')
+        if state == 'down':
+            metrics.add('DetectorDownRounds')
+            logger.warning(f"Primary down in round {len(rounds)} ({detector.consecutive_down}/{detector.failure_rounds}): {results}")
+
+        if detector.failed:
+            return detector, rounds, results
+
+        await asyncio.sleep(max(0.0, DETECTOR_INTERVAL_SECONDS - (loop.time() - round_started)))
+    return detector, rounds, None
+
+@instrument_handler
+def lambda_handler(event, context):
+    """
+    Primary failure detector. With {'mode': 'probe'} it answers one probe for
+    its vantage point. Otherwise it coordinates probing rounds for up to
+    DETECTOR_RUN_SECONDS and invokes dr_orchestrator when a quorum of vantage
+    points sees the primary fail for DETECTOR_FAILURE_ROUNDS rounds in a row.
+    """
+    try:
+        if not PRIMARY_ENDPOINT:
+            raise ValueError("PRIMARY_ENDPOINT environment variable is required")
+
+        if event.get('mode') == 'probe':
+            return asyncio.run(probe_primary(PRIMARY_ENDPOINT, PRIMARY_PORT))
+
+        # Leave time to invoke the orchestrator before the Lambda timeout
+        remaining_seconds = DETECTOR_RUN_SECONDS
+        if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+            remaining_seconds = min(remaining_seconds, context.get_remaining_time_in_millis() / 1000 - 10)
+
+        detector, rounds, results = asyncio.run(run_detector(PRIMARY_ENDPOINT, PRIMARY_PORT, remaining_seconds))
+
+        if not detector.failed:
+            return {
+                'statusCode': 200,
+                'primary_failed': False,
+                'rounds': len(rounds),
+                'down_rounds': rounds.count('down')
+            }
+
+        detection_seconds = time.time() - detector.first_down_at
+        logger.error(f"Primary {PRIMARY_ENDPOINT} failed, detected in {detection_seconds:.1f}s; invoking the orchestrator")
+        metrics.add('FailoversTriggered')
+        metrics.put('DetectionSeconds', detection_seconds, 'Seconds')
+        alarm = trigger_failover(detector, results)
+
+        return {
+            'statusCode': 200,
+            'primary_failed': True,
+            'rounds': len(rounds),
+            'down_rounds': rounds.count('down'),
+            'detection_seconds': round(detection_seconds, 1),
+            'alarm': alarm
+        }
+
+    except Exception as e:
+        logger.error(f"Primary failure detector failed: {str(e)}")
+        raise e
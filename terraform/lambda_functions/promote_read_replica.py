@@ -0,0 +1,244 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from adaptive_polling import AdaptivePollingPolicy, poll
+from dr_common import LazyClient
+from notifications import notify
+from route53_records import get_failover_records
+
+rds_client = LazyClient('rds')
+route53_client = LazyClient('route53')
+
+READ_REPLICA_ID = os.environ['READ_REPLICA_ID']
+SNS_TOPIC_ARN = os.environ['SNS_TOPIC_ARN']
+SUCCESS_SNS_TOPIC_ARN = os.environ['SUCCESS_SNS_TOPIC_ARN']
+ROUTE53_ZONE_ID = os.environ['ROUTE53_ZONE_ID']
+ROUTE53_RECORD_NAME = os.environ['ROUTE53_RECORD_NAME']
+# Build the Route 53 change batch while promotion is still in progress
+FAST_PATH = os.environ.get('FAILOVER_FAST_PATH', 'true').lower() == 'true'
+
+def lambda_handler(event, context):
+    # Identifies this failover's notifications so a retried invocation does not repeat them
+    notification_key = f"{event.get('execution_id') or getattr(context, 'aws_request_id', 'local')}:promote:{READ_REPLICA_ID}"
+    try:
+        started = time.monotonic()
+        
+        # Step 1: Promote read replica
+        print(f"Promoting read replica: {READ_REPLICA_ID}")
+        rds_response = rds_client.promote_read_replica(
+            DBInstanceIdentifier=READ_REPLICA_ID
+        )
+        
+        timings = {'promote_request_seconds': round(time.monotonic() - started, 3)}
+        
+        # The endpoint address does not change on promotion, so DNS can be prepared now
+        expected_endpoint = rds_response['DBInstance']['Endpoint']['Address']
+        change_batch = None
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            if FAST_PATH:
+                print(f"Preparing Route 53 change batch for {expected_endpoint} while promotion runs")
+                prepared_batch = executor.submit(build_failover_change_batch, expected_endpoint)
+            
+            # Step 2: Wait for promotion to complete and get new endpoint
+            print("Waiting for promotion to complete...")
+            promoted_endpoint, promotion_phases = wait_for_promotion_complete(READ_REPLICA_ID)
+            timings['promotion_seconds'] = round(time.monotonic() - started, 3)
+            
+            if FAST_PATH:
+                try:
+                    change_batch = prepared_batch.result()
+                except Exception as e:
+                    # The replica is already promoted; build the batch again inline
+                    print(f"Preparing the Route 53 change batch failed, rebuilding it: {e}")
+                    change_batch = None
+                if change_batch is not None and promoted_endpoint != expected_endpoint:
+                    print(f"Endpoint changed during promotion ({expected_endpoint} -> {promoted_endpoint}), rebuilding change batch")
+                    change_batch = None
+        
+        # Step 3: Update Route 53 - Make promoted instance the PRIMARY
+        print(f"Updating Route 53 DNS to make promoted instance primary: {promoted_endpoint}")
+        change_id = update_route53_for_failover(promoted_endpoint, change_batch)
+        timings['dns_insync_seconds'] = round(time.monotonic() - started, 3)
+        print(f"Failover timings: {timings}")
+        
+        success_message = f"""
+RDS Disaster Recovery Completed Successfully:
+- Read replica '{READ_REPLICA_ID}' promoted to primary
+- New endpoint: {promoted_endpoint}
+- Route 53 DNS updated - promoted instance is now PRIMARY
+- Applications will resolve to new database immediately
+
+Response: {rds_response}
+"""
+        
+        print(success_message)
+        
+        # Send success notification; notify logs its own failures and never raises
+        notify(
+            [SUCCESS_SNS_TOPIC_ARN],
+            "RDS DR: Failover Completed Successfully",
+            success_message,
+            dedup_key=f"{notification_key}:success"
+        )
+
+        return {
+            'statusCode': 200,
+            'body': success_message,
+            'promoted_endpoint': promoted_endpoint,
+            'change_id': change_id,
+            'promotion_phases': promotion_phases,
+            'timings': timings
+        }
+
+    except Exception as e:
+        error_message = f"RDS Disaster Recovery Failed: {str(e)}"
+        print(error_message)
+        
+        # Send error notification; the topic's region is taken from its ARN and a
+        # failed publish cannot replace the promotion error raised below
+        notify(
+            [SNS_TOPIC_ARN],
+            "RDS DR: Failover Failed",
+            error_message,
+            dedup_key=f"{notification_key}:failure"
+        )
+        
+        raise e
+
+def wait_for_promotion_complete(replica_id, max_wait_time=300):
+    """Wait for replica promotion to complete and return new endpoint and phase durations"""
+    policy = AdaptivePollingPolicy.from_env('PROMOTION_POLL', deadline_seconds=max_wait_time)
+
+    def check():
+        try:
+            response = rds_client.describe_db_instances(DBInstanceIdentifier=replica_id)
+            db_instance = response['DBInstances'][0]
+        except Exception as e:
+            print(f"Error checking promotion status: {e}")
+            return 'unknown', False, None
+
+        status = db_instance['DBInstanceStatus']
+        # Check if promotion is complete
+        if (status == 'available' and
+            'ReadReplicaSourceDBInstanceIdentifier' not in db_instance):
+            return status, True, db_instance['Endpoint']['Address']
+
+        return status, False, None
+
+    try:
+        endpoint, history = poll(check, policy)
+    except TimeoutError:
+        raise Exception(f"Promotion did not complete within {max_wait_time} seconds")
+
+    print(f"Promotion completed. New endpoint: {endpoint}")
+    print(f"Promotion phase durations: {history}")
+    return endpoint, history
+
+def build_failover_change_batch(promoted_endpoint):
+    """
+    Resolve the current failover records and build the single change batch that
+    makes the promoted instance PRIMARY and replaces the old secondary with a
+    placeholder. Safe to run while promotion is still in progress.
+    """
+    # Get current record sets
+    records = get_failover_records(route53_client, ROUTE53_ZONE_ID, ROUTE53_RECORD_NAME)
+    
+    # Find both primary and secondary records
+    primary_record = records.get('primary')
+    secondary_record = records.get('secondary')
+    
+    if not secondary_record:
+        raise Exception("Could not find secondary Route 53 record")
+    
+    changes = []
+    
+    # Option 1: Delete the old primary record (failed database)
+    if primary_record:
+        changes.append({
+            'Action': 'DELETE',
+            'ResourceRecordSet': primary_record
+        })
+        print("Scheduled deletion of old primary record")
+    
+    # Option 2: Update secondary to become the new primary
+    changes.append({
+        'Action': 'UPSERT',
+        'ResourceRecordSet': {
+            'Name': ROUTE53_RECORD_NAME,
+            'Type': 'CNAME',
+            'TTL': 60,
+            'SetIdentifier': 'primary',  # Make it primary now
+            'Failover': 'PRIMARY',
+            'ResourceRecords': [{'Value': promoted_endpoint}],
+            'HealthCheckId': secondary_record.get('HealthCheckId')  # Keep the health check
+        }
+    })
+    print("Scheduled promotion of secondary to primary")
+    
+    # Replace the old secondary with a placeholder that will fail health checks.
+    # A name can only have one SECONDARY record, so both changes go in this batch.
+    # This maintains the failover structure for future use.
+    changes.append({
+        'Action': 'DELETE',
+        'ResourceRecordSet': secondary_record
+    })
+    changes.append({
+        'Action': 'CREATE',
+        'ResourceRecordSet': {
+            'Name': ROUTE53_RECORD_NAME,
+            'Type': 'CNAME',
+            'TTL': 60,
+            'SetIdentifier': 'secondary-placeholder',
+            'Failover': 'SECONDARY',
+            'ResourceRecords': [{'Value': 'placeholder.invalid'}]  # Will fail health checks
+        }
+    })
+    print("Scheduled placeholder secondary record")
+    
+    return {
+        'Comment': 'DR Failover: Promote replica to primary, remove failed primary, add placeholder secondary',
+        'Changes': changes
+    }
+
+def submit_change_batch(change_batch):
+    """Apply the change batch and wait until Route 53 reports it INSYNC."""
+    change_response = route53_client.change_resource_record_sets(
+        HostedZoneId=ROUTE53_ZONE_ID,
+        ChangeBatch=change_batch
+    )
+    change_id = change_response['ChangeInfo']['Id']
+    print(f"Route 53 update initiated: {change_id}")
+    
+    # Wait for change to propagate
+    policy = AdaptivePollingPolicy.from_env(
+        'DNS_CHANGE_POLL', min_interval=2, initial_interval=5, max_interval=15, deadline_seconds=600)
+    
+    def check():
+        status = route53_client.get_change(Id=change_id)['ChangeInfo']['Status']
+        return status, status == 'INSYNC', status
+    
+    poll(check, policy)
+    return change_id
+
+def update_route53_for_failover(promoted_endpoint, change_batch=None):
+    """
+    Update Route 53 records to handle failover properly.
+    
+    Strategy: Make the promoted instance the new PRIMARY and 
+    disable/remove the old primary record.
+    A change batch prepared while promotion was running can be passed in.
+    """
+    try:
+        if change_batch is None:
+            change_batch = build_failover_change_batch(promoted_endpoint)
+        
+        change_id = submit_change_batch(change_batch)
+        
+        print(f"Route 53 DNS successfully updated. Promoted instance is now PRIMARY: {promoted_endpoint}")
+        return change_id
+        
+    except Exception as e:
+        print(f"Failed to update Route 53 record: {e}")
+        raise e
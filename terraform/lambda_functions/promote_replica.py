@@ -1,19 +1,24 @@
 import json
-import boto3
 import logging
 import os
 
+from dr_common import LazyClient
+from metrics import instrument_handler, metrics
+from tracing import finish_span, start_span
+
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-rds_client = boto3.client('rds')
+rds_client = LazyClient('rds')
 
+@instrument_handler
 def lambda_handler(event, context):
     """
     Promote the read replica to a standalone primary database.
     This is the critical step that initiates the failover process.
     """
+    span = start_span('PromoteReplica', database=event.get('read_replica_id'))
     try:
         logger.info(f"Promoting replica: {json.dumps(event)}")
         
@@ -32,6 +37,7 @@ def lambda_handler(event, context):
         )
         
         logger.info(f"Promotion initiated successfully: {json.dumps(response, default=str)}")
+        metrics.add('PromotionsInitiated')
         
         # Extract important information from the response
         db_instance = response['DBInstance']
@@ -43,6 +49,7 @@ def lambda_handler(event, context):
         # Return promotion information for next steps
         return {
             'read_replica_id': read_replica_id,
+            'record_name': event.get('record_name'),
             'promotion_initiated': True,
             'promotion_status': promotion_status,
             'new_endpoint': db_instance['Endpoint']['Address'],
@@ -50,13 +57,14 @@ def lambda_handler(event, context):
             'availability_zone': db_instance['AvailabilityZone'],
             'engine': db_instance['Engine'],
             'engine_version': db_instance['EngineVersion'],
-            'promotion_timestamp': context.get_remaining_time_in_millis(),
-            'execution_id': context.aws_request_id,
+            'execution_id': event.get('execution_id', context.aws_request_id),
+            'trace': finish_span(span, event),
             'response_metadata': {
                 'request_id': response['ResponseMetadata']['RequestId']
             }
         }
         
     except Exception as e:
+        span.finish('error')
         logger.error(f"Replica promotion failed: {str(e)}")
         raise e 
\ No newline at end of file
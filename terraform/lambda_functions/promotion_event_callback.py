@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+import time
+
+from check_promotion_status import evaluate_promotion
+from dr_common import LazyClient
+from metrics import instrument_handler, metrics
+from tracing import extend_trace, span_start
+
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+rds_client = LazyClient('rds')
+dynamodb_client = LazyClient('dynamodb')
+stepfunctions_client = LazyClient('stepfunctions')
+
+WAITER_TABLE_NAME = os.environ['PROMOTION_WAITER_TABLE']
+# Tokens outlive the Step Function wait so late events can still be matched and discarded
+WAITER_TTL_SECONDS = int(os.environ.get('PROMOTION_WAITER_TTL_SECONDS', '3600'))
+
+@instrument_handler
+def lambda_handler(event, context):
+    """
+    Resume the disaster recovery Step Function as soon as promotion finishes.
+    Invoked twice per failover:
+    - by the Step Function (waitForTaskToken) to register the task token
+    - by the RDS EventBridge rule when the replica emits an instance event
+    """
+    try:
+        logger.info(f"Promotion callback event: {json.dumps(event)}")
+
+        if event.get('source') == 'aws.rds':
+            return handle_rds_event(event)
+
+        return register_task_token(event)
+
+    except Exception as e:
+        logger.error(f"Promotion callback failed: {str(e)}")
+        raise e
+
+def register_task_token(event):
+    """
+    Store the task token for the replica, then check once in case the
+    promotion already completed before the token was stored.
+    """
+    task_token = event.get('task_token')
+    read_replica_id = event.get('read_replica_id')
+
+    if not task_token or not read_replica_id:
+        raise ValueError("task_token and read_replica_id are required in event")
+
+    dynamodb_client.put_item(
+        TableName=WAITER_TABLE_NAME,
+        Item={
+            'read_replica_id': {'S': read_replica_id},
+            'task_token': {'S': task_token},
+            'execution_id': {'S': event.get('execution_id', 'Unknown')},
+            'record_name': {'S': event.get('record_name') or ''},
+            'trace': {'S': json.dumps(event.get('trace') or [])},
+            'registered_at': {'N': str(time.time())},
+            'expires_at': {'N': str(int(time.time()) + WAITER_TTL_SECONDS)}
+        }
+    )
+    logger.info(f"Registered promotion waiter for {read_replica_id}")
+
+    completed = complete_if_promoted(read_replica_id)
+    return {
+        'read_replica_id': read_replica_id,
+        'waiter_registered': True,
+        'completed_on_registration': completed
+    }
+
+def handle_rds_event(event):
+    """
+    Handle an RDS instance event from the region.
+    Events for instances without a registered waiter are dropped; for the
+    others the event only triggers a check, and completion is confirmed with
+    describe_db_instances.
+    """
+    event_detail = event.get('detail', {})
+    read_replica_id = event_detail.get('SourceIdentifier')
+
+    if not read_replica_id:
+        logger.info("Ignoring RDS event without SourceIdentifier")
+        return {'read_replica_id': None, 'completed': False}
+
+    waiter = dynamodb_client.get_item(
+        TableName=WAITER_TABLE_NAME,
+        Key={'read_replica_id': {'S': read_replica_id}},
+        ProjectionExpression='read_replica_id',
+        ConsistentRead=True
+    )
+    if 'Item' not in waiter:
+        logger.info(f"Ignoring RDS event for {read_replica_id}: no execution is waiting for it")
+        return {'read_replica_id': read_replica_id, 'completed': False}
+
+    logger.info(f"RDS event {event_detail.get('EventID')} for {read_replica_id}: {event_detail.get('Message')}")
+
+    return {
+        'read_replica_id': read_replica_id,
+        'completed': complete_if_promoted(read_replica_id)
+    }
+
+def complete_if_promoted(read_replica_id):
+    """
+    Send task success for a registered waiter if the replica is promoted.
+    The waiter item is deleted atomically so only one caller resumes the execution.
+    """
+    response = rds_client.describe_db_instances(
+        DBInstanceIdentifier=read_replica_id
+    )
+
+    if not response['DBInstances']:
+        raise ValueError(f"Database instance {read_replica_id} not found")
+
+    promotion_status = evaluate_promotion(response['DBInstances'][0])
+    if not promotion_status['promotion_complete']:
+        return False
+
+    deleted = dynamodb_client.delete_item(
+        TableName=WAITER_TABLE_NAME,
+        Key={'read_replica_id': {'S': read_replica_id}},
+        ReturnValues='ALL_OLD'
+    )
+    waiter = deleted.get('Attributes')
+    if not waiter:
+        logger.info(f"No pending waiter for {read_replica_id}")
+        return False
+
+    output = {
+        'read_replica_id': read_replica_id,
+        **promotion_status,
+        'completion_source': 'rds_event',
+        'record_name': waiter.get('record_name', {}).get('S') or None,
+        'execution_id': waiter['execution_id']['S'],
+        'trace': json.loads(waiter.get('trace', {}).get('S', '[]'))
+    }
+
+    # The time spent waiting for the event becomes a span in the execution's trace
+    if 'registered_at' in waiter:
+        output['trace'] = extend_trace(output['trace'], {
+            'name': 'WaitForPromotionEvent',
+            'database': read_replica_id,
+            'start': round(float(waiter['registered_at']['N']), 3),
+            'end': round(time.time(), 3),
+            'status': 'ok',
+            'invocations': 1,
+            'api_calls': 0,
+            'retries': 0,
+            'api_errors': 0
+        })
+
+    try:
+        stepfunctions_client.send_task_success(
+            taskToken=waiter['task_token']['S'],
+            output=json.dumps(output, default=str)
+        )
+    except (stepfunctions_client.exceptions.TaskTimedOut,
+            stepfunctions_client.exceptions.InvalidToken,
+            stepfunctions_client.exceptions.TaskDoesNotExist) as e:
+        # The execution already fell back to polling
+        logger.warning(f"Task token for {read_replica_id} is no longer valid: {e}")
+        return False
+
+    logger.info(f"Resumed execution {waiter['execution_id']['S']} for promoted replica {read_replica_id}")
+    metrics.add('PromotionEventResumes')
+    promoted_at = span_start(output['trace'], 'PromoteReplica', read_replica_id)
+    if promoted_at:
+        metrics.put('PromotionDuration', round(time.time() - promoted_at, 3), 'Seconds')
+    return True
@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+import time
+
+from dr_common import get_client
+from fleet import chunked
+
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+READINESS_STORE = os.environ.get('READINESS_STORE', 'dynamodb')
+READINESS_TABLE = os.environ.get('READINESS_TABLE')
+READINESS_STORE_PATH = os.environ.get('READINESS_STORE_PATH', '/tmp/replica_readiness.json')
+# Records older than this are ignored and the replica is described live
+READINESS_MAX_AGE_SECONDS = int(os.environ.get('READINESS_MAX_AGE_SECONDS', '180'))
+READINESS_TTL_SECONDS = int(os.environ.get('READINESS_TTL_SECONDS', '86400'))
+
+# DynamoDB batch limits
+BATCH_GET_SIZE = 100
+BATCH_WRITE_SIZE = 25
+
+
+def readiness_record(db_instance, recorded_at=None):
+    """
+    Reduce a describe_db_instances entry to the fields the failover path needs.
+    """
+    endpoint = db_instance.get('Endpoint') or {}
+    return {
+        'read_replica_id': db_instance['DBInstanceIdentifier'],
+        'status': db_instance['DBInstanceStatus'],
+        'is_replica': 'ReadReplicaSourceDBInstanceIdentifier' in db_instance,
+        'source_db_id': db_instance.get('ReadReplicaSourceDBInstanceIdentifier'),
+        'engine': db_instance.get('Engine'),
+        'engine_version': db_instance.get('EngineVersion'),
+        'endpoint': endpoint.get('Address'),
+        'port': endpoint.get('Port'),
+        'availability_zone': db_instance.get('AvailabilityZone'),
+        'pending_modifications': db_instance.get('PendingModifiedValues') or {},
+        # describe_db_instances does not report lag; it is added from CloudWatch
+        'replication_lag': 'Unknown',
+        'recorded_at': recorded_at if recorded_at is not None else time.time()
+    }
+
+def is_fresh(record, max_age_seconds=READINESS_MAX_AGE_SECONDS, now=None):
+    now = now if now is not None else time.time()
+    return record is not None and now - record['recorded_at'] <= max_age_seconds
+
+
+class LocalReadinessStore:
+    """
+    JSON file backend for running the readiness path offline.
+    """
+
+    def __init__(self, path=READINESS_STORE_PATH):
+        self.path = path
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as f:
+            return json.load(f)
+
+    def put_many(self, records):
+        stored = self._load()
+        for record in records:
+            stored[record['read_replica_id']] = record
+        with open(self.path, 'w') as f:
+            json.dump(stored, f, default=str)
+
+    def get_many(self, read_replica_ids):
+        stored = self._load()
+        return {replica_id: stored[replica_id] for replica_id in read_replica_ids if replica_id in stored}
+
+
+class DynamoDBReadinessStore:
+    """
+    DynamoDB backend: one item per replica holding the JSON record,
+    read and written in batches.
+    """
+
+    def __init__(self, table_name=READINESS_TABLE, dynamodb_client=None):
+        if not table_name:
+            raise ValueError("READINESS_TABLE environment variable is required for the dynamodb readiness store")
+        self.table_name = table_name
+        self.dynamodb_client = dynamodb_client or get_client('dynamodb')
+
+    def put_many(self, records):
+        expires_at = str(int(time.time()) + READINESS_TTL_SECONDS)
+        for batch in chunked(list(records), BATCH_WRITE_SIZE):
+            request_items = {self.table_name: [
+                {'PutRequest': {'Item': {
+                    'read_replica_id': {'S': record['read_replica_id']},
+                    'record': {'S': json.dumps(record, default=str)},
+                    'expires_at': {'N': expires_at}
+                }}}
+                for record in batch
+            ]}
+            while request_items:
+                response = self.dynamodb_client.batch_write_item(RequestItems=request_items)
+                request_items = response.get('UnprocessedItems') or {}
+                if request_items:
+                    time.sleep(0.1)
+
+    def get_many(self, read_replica_ids):
+        records = {}
+        for batch in chunked(list(read_replica_ids), BATCH_GET_SIZE):
+            request_items = {self.table_name: {
+                'Keys': [{'read_replica_id': {'S': replica_id}} for replica_id in batch]
+            }}
+            while request_items:
+                response = self.dynamodb_client.batch_get_item(RequestItems=request_items)
+                for item in response['Responses'].get(self.table_name, []):
+                    record = json.loads(item['record']['S'])
+                    records[record['read_replica_id']] = record
+                request_items = response.get('UnprocessedKeys') or {}
+                if request_items:
+                    time.sleep(0.1)
+        return records
+
+
+def get_store(backend=READINESS_STORE):
+    """
+    Return the readiness store selected by READINESS_STORE (dynamodb, local or none).
+    With none the failover path always describes the replicas live.
+    """
+    if backend == 'none':
+        return None
+    if backend == 'local':
+        return LocalReadinessStore()
+    if backend == 'dynamodb':
+        return DynamoDBReadinessStore()
+    raise ValueError(f"Unknown readiness store: {backend}")
@@ -0,0 +1,82 @@
+import json
+import logging
+import os
+import time
+
+from dr_common import LazyClient
+from fleet import describe_instances, parse_databases
+from metrics import instrument_handler, metrics
+from readiness_store import get_store, readiness_record
+from replica_lag import encode_series, fetch_replica_lag, lag_statistics
+
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+rds_client = LazyClient('rds')
+cloudwatch_client = LazyClient('cloudwatch')
+
+@instrument_handler
+def lambda_handler(event, context):
+    """
+    Scheduled pre-flight check that records the readiness of every DR replica.
+    check_replica_status reads these records at failover time instead of
+    describing the replicas on the critical path.
+    """
+    try:
+        logger.info(f"Recording replica readiness: {json.dumps(event)}")
+
+        databases = parse_databases(
+            os.environ.get('DR_DATABASES'),
+            default_replica_id=os.environ.get('READ_REPLICA_ID'),
+            default_record_name=os.environ.get('ROUTE53_RECORD_NAME')
+        )
+        read_replica_ids = [database['read_replica_id'] for database in databases]
+
+        db_instances = describe_instances(rds_client, read_replica_ids)
+        recorded_at = time.time()
+        records = [readiness_record(db_instance, recorded_at) for db_instance in db_instances.values()]
+
+        # describe_db_instances does not report lag, so it comes from CloudWatch in one batch
+        try:
+            lag_series = fetch_replica_lag(cloudwatch_client, list(db_instances)) if db_instances else {}
+        except Exception as e:
+            logger.warning(f"Could not fetch replica lag: {e}")
+            lag_series = {}
+        for record in records:
+            points = lag_series.get(record['read_replica_id'])
+            if points is not None:
+                statistics = lag_statistics(points)
+                record['replication_lag'] = statistics['latest'] if statistics['latest'] is not None else 'Unknown'
+                record['replication_lag_stats'] = statistics
+                # Kept so the failover can gate on the lag sampled before the alarm
+                record['replication_lag_series'] = encode_series(points)
+
+        get_store().put_many(records)
+
+        missing = sorted(set(read_replica_ids) - set(db_instances))
+        if missing:
+            logger.warning(f"Replicas not found: {missing}")
+
+        not_ready = sorted(
+            record['read_replica_id'] for record in records
+            if record['status'] != 'available' or not record['is_replica']
+        )
+        if not_ready:
+            logger.warning(f"Replicas not ready for promotion: {not_ready}")
+
+        logger.info(f"Recorded readiness for {len(records)} replica(s)")
+        metrics.add('ReplicasRecorded', len(records))
+        metrics.add('ReplicasMissing', len(missing))
+        metrics.add('ReplicasNotReady', len(not_ready))
+        return {
+            'recorded': len(records),
+            'missing': missing,
+            'not_ready': not_ready,
+            'recorded_at': recorded_at
+        }
+
+    except Exception as e:
+        logger.error(f"Recording replica readiness failed: {str(e)}")
+        raise e
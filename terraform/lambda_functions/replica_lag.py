@@ -0,0 +1,156 @@
+import logging
+import math
+import os
+from datetime import datetime, timedelta, timezone
+
+from fleet import chunked
+
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+LAG_WINDOW_SECONDS = int(os.environ.get('LAG_WINDOW_SECONDS', '900'))
+LAG_PERIOD_SECONDS = int(os.environ.get('LAG_PERIOD_SECONDS', '60'))
+# Largest acceptable data loss; a replica lagging more than this is not promoted
+RPO_MAX_LAG_SECONDS = float(os.environ.get('RPO_MAX_LAG_SECONDS', '300'))
+# Lag growing faster than this (seconds of lag per second) blocks promotion; empty disables
+RPO_MAX_LAG_SLOPE = os.environ.get('RPO_MAX_LAG_SLOPE', '')
+# During a regional outage the metric may stop arriving; allow or block in that case
+LAG_GATE_ON_MISSING = os.environ.get('LAG_GATE_ON_MISSING', 'allow')
+# advisory reports a replica over the RPO and still promotes it; enforce skips it
+RPO_GATE_MODE = os.environ.get('RPO_GATE_MODE', 'advisory')
+
+# get_metric_data accepts at most 500 queries per request
+METRIC_QUERIES_PER_REQUEST = 500
+
+
+def fetch_replica_lag(cloudwatch_client, read_replica_ids, window_seconds=LAG_WINDOW_SECONDS,
+                      period=LAG_PERIOD_SECONDS, end_time=None):
+    """
+    Fetch the ReplicaLag series of many replicas with one get_metric_data
+    request per 500 replicas. Returns {replica_id: [(timestamp, seconds), ...]}
+    oldest first; replicas without datapoints map to an empty list.
+    """
+    end_time = end_time or datetime.now(timezone.utc)
+    start_time = end_time - timedelta(seconds=window_seconds)
+    series = {replica_id: [] for replica_id in read_replica_ids}
+
+    for batch in chunked(list(read_replica_ids), METRIC_QUERIES_PER_REQUEST):
+        # Query ids must start with a lowercase letter, so map them back by position
+        query_ids = {f"lag{index}": replica_id for index, replica_id in enumerate(batch)}
+        params = {
+            'MetricDataQueries': [
+                {
+                    'Id': query_id,
+                    'MetricStat': {
+                        'Metric': {
+                            'Namespace': 'AWS/RDS',
+                            'MetricName': 'ReplicaLag',
+                            'Dimensions': [{'Name': 'DBInstanceIdentifier', 'Value': replica_id}]
+                        },
+                        'Period': period,
+                        'Stat': 'Maximum'
+                    },
+                    'ReturnData': True
+                }
+                for query_id, replica_id in query_ids.items()
+            ],
+            'StartTime': start_time,
+            'EndTime': end_time,
+            'ScanBy': 'TimestampAscending'
+        }
+
+        while True:
+            response = cloudwatch_client.get_metric_data(**params)
+            for result in response['MetricDataResults']:
+                series[query_ids[result['Id']]].extend(zip(result['Timestamps'], result['Values']))
+            if not response.get('NextToken'):
+                break
+            params['NextToken'] = response['NextToken']
+
+    for replica_id in series:
+        series[replica_id].sort(key=lambda point: point[0])
+    return series
+
+def lag_statistics(points):
+    """
+    Summarise one lag series in a single pass: latest, max, p95 and the
+    least-squares slope in seconds of lag per second of wall time.
+    """
+    if not points:
+        return {'datapoints': 0, 'latest': None, 'max': None, 'p95': None, 'slope': None}
+
+    origin = points[0][0]
+    n = len(points)
+    sum_t = sum_v = sum_tt = sum_tv = 0.0
+    for timestamp, value in points:
+        t = (timestamp - origin).total_seconds()
+        sum_t += t
+        sum_v += value
+        sum_tt += t * t
+        sum_tv += t * value
+
+    denominator = n * sum_tt - sum_t * sum_t
+    slope = (n * sum_tv - sum_t * sum_v) / denominator if denominator else 0.0
+
+    values = sorted(value for _, value in points)
+    # Nearest-rank percentile
+    p95 = values[max(0, math.ceil(0.95 * n) - 1)]
+
+    return {
+        'datapoints': n,
+        'latest': points[-1][1],
+        'latest_timestamp': points[-1][0].isoformat(),
+        'max': values[-1],
+        'p95': p95,
+        'slope': round(slope, 6)
+    }
+
+def lag_statistics_as_of(points, as_of=None):
+    """
+    Statistics of the datapoints sampled at or before as_of (a datetime).
+    Once the primary is down, ReplicaLag keeps growing with the clock while no
+    new writes exist, so later datapoints overstate the data at risk.
+    """
+    if as_of is not None:
+        points = [point for point in points if point[0] <= as_of]
+    return lag_statistics(points)
+
+def encode_series(points):
+    """A lag series as JSON-friendly [iso timestamp, seconds] pairs for the readiness record."""
+    return [[timestamp.isoformat(), value] for timestamp, value in points]
+
+def decode_series(encoded):
+    return [(datetime.fromisoformat(timestamp), value) for timestamp, value in encoded]
+
+def evaluate_lag_gate(stats, max_lag_seconds=RPO_MAX_LAG_SECONDS, max_slope=RPO_MAX_LAG_SLOPE,
+                      on_missing=LAG_GATE_ON_MISSING):
+    """
+    Decide whether the replica is within the RPO. Returns (passed, reason).
+    """
+    if stats['latest'] is None:
+        if on_missing == 'block':
+            return False, "No ReplicaLag datapoints in the window"
+        return True, "No ReplicaLag datapoints in the window; gate skipped"
+
+    if stats['latest'] > max_lag_seconds:
+        return False, f"Replica lag {stats['latest']}s exceeds RPO of {max_lag_seconds}s"
+
+    if max_slope not in (None, '') and stats['slope'] > float(max_slope):
+        return False, f"Replica lag growing at {stats['slope']}s/s (limit {max_slope}s/s)"
+
+    return True, f"Replica lag {stats['latest']}s within RPO of {max_lag_seconds}s"
+
+def fetch_lag_statistics(cloudwatch_client, read_replica_ids, **kwargs):
+    """
+    Fetch and summarise lag for many replicas. Returns {replica_id: statistics}.
+    """
+    if not read_replica_ids:
+        return {}
+
+    series = fetch_replica_lag(cloudwatch_client, read_replica_ids, **kwargs)
+    statistics = {replica_id: lag_statistics(points) for replica_id, points in series.items()}
+
+    logger.info(f"Replica lag statistics: {statistics}")
+    return statistics
@@ -0,0 +1,53 @@
+import logging
+
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def normalize_record_name(record_name):
+    """Route 53 returns fully qualified names with a trailing dot."""
+    return record_name.rstrip('.').lower() + '.'
+
+def iter_record_sets(route53_client, zone_id, record_name, record_type='CNAME'):
+    """
+    Yield the record sets for one name and type.
+    Listing starts at the record itself and stops as soon as Route 53 moves
+    past it, so large zones are never scanned in full.
+    """
+    target_name = normalize_record_name(record_name)
+    params = {
+        'HostedZoneId': zone_id,
+        'StartRecordName': target_name,
+        'StartRecordType': record_type
+    }
+
+    while True:
+        response = route53_client.list_resource_record_sets(**params)
+
+        for record in response['ResourceRecordSets']:
+            if record['Name'].lower() != target_name or record['Type'] != record_type:
+                return
+            yield record
+
+        if not response.get('IsTruncated'):
+            return
+
+        params['StartRecordName'] = response['NextRecordName']
+        params['StartRecordType'] = response['NextRecordType']
+        if 'NextRecordIdentifier' in response:
+            params['StartRecordIdentifier'] = response['NextRecordIdentifier']
+        else:
+            params.pop('StartRecordIdentifier', None)
+
+def get_failover_records(route53_client, zone_id, record_name, record_type='CNAME'):
+    """
+    Return the record sets for a failover record keyed by SetIdentifier.
+    """
+    records = {
+        record['SetIdentifier']: record
+        for record in iter_record_sets(route53_client, zone_id, record_name, record_type)
+        if 'SetIdentifier' in record
+    }
+    logger.info(f"Found {record_type} record sets for {record_name}: {sorted(records)}")
+    return records
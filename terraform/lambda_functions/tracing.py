@@ -0,0 +1,189 @@
+import threading
+import time
+
+from dr_common import add_call_listener
+
+
+# Spans currently open in this invocation; API calls are counted against all of them
+_active_spans = []
+_lock = threading.Lock()
+
+
+class Span:
+    """
+    Wall-clock record of one Step Function state: start, end and the AWS API
+    calls and retries made while it was open.
+    """
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = {key: value for key, value in attributes.items() if value is not None}
+        self.start = time.time()
+        self.end = None
+        self.status = 'ok'
+        self.api_calls = 0
+        self.retries = 0
+        self.api_errors = 0
+
+    def record_call(self, retries, failed):
+        self.api_calls += 1
+        self.retries += retries
+        if failed:
+            self.api_errors += 1
+
+    def finish(self, status='ok'):
+        if self.end is None:
+            self.end = time.time()
+            self.status = status
+            with _lock:
+                if self in _active_spans:
+                    _active_spans.remove(self)
+        return self
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            **self.attributes,
+            'start': round(self.start, 3),
+            'end': round(self.end if self.end is not None else time.time(), 3),
+            'status': self.status,
+            'invocations': 1,
+            'api_calls': self.api_calls,
+            'retries': self.retries,
+            'api_errors': self.api_errors
+        }
+
+
+def _on_api_call(service_name, operation_name, retries, failed, error_code=None):
+    with _lock:
+        spans = list(_active_spans)
+    for span in spans:
+        span.record_call(retries, failed)
+
+
+add_call_listener(_on_api_call)
+
+
+def start_span(name, **attributes):
+    """Open a span; close it with finish_span when the state's work is done."""
+    span = Span(name, **attributes)
+    with _lock:
+        _active_spans.append(span)
+    return span
+
+
+def extend_trace(trace, span):
+    """
+    Return a copy of the trace with the span appended. Repeated invocations of
+    the same state (polling loops) are merged so the payload stays small.
+    """
+    trace = list(trace or [])
+    record = span.to_dict() if isinstance(span, Span) else dict(span)
+
+    if trace:
+        last = trace[-1]
+        if last['name'] == record['name'] and last.get('database') == record.get('database'):
+            trace[-1] = {
+                **last,
+                'end': record['end'],
+                'status': record['status'],
+                'invocations': last.get('invocations', 1) + record['invocations'],
+                'api_calls': last.get('api_calls', 0) + record['api_calls'],
+                'retries': last.get('retries', 0) + record['retries'],
+                'api_errors': last.get('api_errors', 0) + record['api_errors']
+            }
+            return trace
+
+    trace.append(record)
+    return trace
+
+
+def finish_span(span, event, status='ok'):
+    """Close the span and return the event's trace extended with it."""
+    span.finish(status)
+    return extend_trace((event or {}).get('trace'), span)
+
+
+def span_start(trace, name, database=None):
+    """Start time of the first span with the name (and database), or None."""
+    for record in trace or []:
+        if record['name'] == name and record.get('database') == database:
+            return record['start']
+    return None
+
+
+def rto_breakdown(trace, now=None):
+    """
+    Summarise a trace into per-phase durations. Time between a span and the
+    previous span of the same database (or the shared fleet phases) is
+    reported as waited_ms: Wait states, callbacks and Step Function overhead.
+    Phases run for several databases report the slowest one.
+    """
+    trace = sorted(trace or [], key=lambda record: record['start'])
+    if not trace:
+        return {'total_ms': 0, 'phases': []}
+
+    phases = {}
+    lane_end = {}
+    shared_end = None
+
+    for record in trace:
+        database = record.get('database')
+        if database:
+            previous_end = lane_end.get(database, shared_end)
+        else:
+            # Shared phases after the Map follow the slowest database
+            previous_end = max([shared_end or 0, *lane_end.values()]) or None
+        waited_ms = max(0.0, (record['start'] - previous_end) * 1000) if previous_end else 0.0
+        duration_ms = (record['end'] - record['start']) * 1000
+
+        if database:
+            lane_end[database] = record['end']
+        else:
+            shared_end = max(shared_end or 0, record['end'], *lane_end.values())
+
+        phase = phases.setdefault(record['name'], {
+            'name': record['name'],
+            'databases': 0,
+            'duration_ms': 0.0,
+            'waited_ms': 0.0,
+            'invocations': 0,
+            'api_calls': 0,
+            'retries': 0,
+            'api_errors': 0
+        })
+        phase['databases'] += 1
+        phase['duration_ms'] = round(max(phase['duration_ms'], duration_ms), 1)
+        phase['waited_ms'] = round(max(phase['waited_ms'], waited_ms), 1)
+        phase['invocations'] += record.get('invocations', 1)
+        phase['api_calls'] += record.get('api_calls', 0)
+        phase['retries'] += record.get('retries', 0)
+        phase['api_errors'] += record.get('api_errors', 0)
+
+    end = now if now is not None else max(record['end'] for record in trace)
+    return {
+        'started_at': trace[0]['start'],
+        'total_ms': round((end - trace[0]['start']) * 1000, 1),
+        'phases': list(phases.values())
+    }
+
+
+def format_breakdown(breakdown):
+    """Render the RTO breakdown for notifications, one line per phase."""
+    if not breakdown['phases']:
+        return 'No trace recorded'
+
+    lines = [f"Total: {breakdown['total_ms'] / 1000:.1f}s"]
+    for phase in breakdown['phases']:
+        line = f"• {phase['name']}: {phase['duration_ms'] / 1000:.1f}s"
+        if phase['waited_ms'] >= 100:
+            line += f" (after {phase['waited_ms'] / 1000:.1f}s waiting)"
+        if phase['databases'] > 1:
+            line += f" slowest of {phase['databases']}"
+        line += f", {phase['api_calls']} API calls"
+        if phase['retries']:
+            line += f", {phase['retries']} retries"
+        if phase['invocations'] > phase['databases']:
+            line += f", {phase['invocations']} invocations"
+        lines.append(line)
+    return '\n'.join(lines)
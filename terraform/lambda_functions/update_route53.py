@@ -1,55 +1,51 @@
 import json
-import boto3
 import logging
 import os
-import time
+
+from dr_common import LazyClient
+from metrics import instrument_handler
+from route53_records import get_failover_records
+from tracing import finish_span, start_span
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 # Initialize AWS clients
-route53_client = boto3.client('route53')
+route53_client = LazyClient('route53')
 
+@instrument_handler
 def lambda_handler(event, context):
     """
     Update Route 53 DNS records to point to the newly promoted database.
     This step ensures applications can connect to the new primary database.
     """
+    span = start_span('UpdateRoute53', database=event.get('read_replica_id'))
     try:
         logger.info(f"Updating Route 53: {json.dumps(event)}")
       
         zone_id = os.environ.get('ROUTE53_ZONE_ID')
-        record_name = os.environ.get('ROUTE53_RECORD_NAME')
+        # Fleet executions carry the record per database
+        record_name = event.get('record_name') or os.environ.get('ROUTE53_RECORD_NAME')
         
         # Get promotion details from previous steps
         promotion_details = event.get('promotion_details', {})
         new_endpoint = promotion_details.get('endpoint')
         
         if not zone_id or not record_name:
-            raise ValueError("ROUTE53_ZONE_ID and ROUTE53_RECORD_NAME environment variables are required")
+            raise ValueError("ROUTE53_ZONE_ID and a record_name (event or ROUTE53_RECORD_NAME) are required")
         
         if not new_endpoint:
             raise ValueError("New endpoint is required from promotion details")
         
         logger.info(f"Updating Route 53 zone {zone_id} for record {record_name} to point to {new_endpoint}")
         
-        # Get current record sets to understand the current configuration
-        response = route53_client.list_resource_record_sets(
-            HostedZoneId=zone_id
-        )
+        # Seek directly to the failover record sets instead of listing the zone
+        records = get_failover_records(route53_client, zone_id, record_name)
         
         # Find the current primary and secondary records
-        primary_record = None
-        secondary_record = None
-        
-        for record in response['ResourceRecordSets']:
-            if (record['Name'].rstrip('.') == record_name and 
-                record.get('Type') == 'CNAME'):
-                if record.get('SetIdentifier') == 'primary':
-                    primary_record = record
-                elif record.get('SetIdentifier') == 'secondary':
-                    secondary_record = record
+        primary_record = records.get('primary')
+        secondary_record = records.get('secondary')
         
         logger.info(f"Found primary record: {primary_record is not None}")
         logger.info(f"Found secondary record: {secondary_record is not None}")
@@ -122,12 +118,15 @@ def lambda_handler(event, context):
         if not changes:
             logger.warning("No Route 53 changes to apply")
             return {
+                'read_replica_id': event.get('read_replica_id'),
                 'route53_zone_id': zone_id,
                 'record_name': record_name,
                 'new_endpoint': new_endpoint,
                 'changes_applied': 0,
                 'dns_updated': False,
-                'message': 'No changes required'
+                'message': 'No changes required',
+                'execution_id': event.get('execution_id', context.aws_request_id),
+                'trace': finish_span(span, event)
             }
         
         change_response = route53_client.change_resource_record_sets(
@@ -138,34 +137,24 @@ def lambda_handler(event, context):
         change_id = change_response['ChangeInfo']['Id']
         logger.info(f"Route 53 update initiated: {change_id}")
         
-        # Wait for the change to be propagated
-        logger.info("Waiting for Route 53 change to propagate...")
-        try:
-            waiter = route53_client.get_waiter('resource_record_sets_changed')
-            waiter.wait(
-                Id=change_id,
-                WaiterConfig={
-                    'Delay': 30,
-                    'MaxAttempts': 20
-                }
-            )
-            logger.info("Route 53 DNS successfully updated and propagated")
-        except Exception as wait_error:
-            logger.warning(f"Route 53 change initiated but propagation wait failed: {str(wait_error)}")
-            # Continue anyway as the change might still be processing
+        # Propagation is tracked by the CheckDNSChangeStatus step rather than blocking here
         
         # Return update information for next steps
         return {
+            'read_replica_id': event.get('read_replica_id'),
             'route53_zone_id': zone_id,
             'record_name': record_name,
             'new_endpoint': new_endpoint,
+            'new_port': promotion_details.get('port'),
             'change_id': change_id,
+            'change_status': change_response['ChangeInfo']['Status'],
             'changes_applied': len(changes),
             'dns_updated': True,
-            'update_timestamp': context.get_remaining_time_in_millis(),
-            'execution_id': context.aws_request_id
+            'execution_id': event.get('execution_id', context.aws_request_id),
+            'trace': finish_span(span, event)
         }
         
     except Exception as e:
+        span.finish('error')
         logger.error(f"Route 53 update failed: {str(e)}")
         raise e 
\ No newline at end of file
@@ -2,44 +2,55 @@ import json
 import os
 import logging
 
+from fleet import parse_databases
+from metrics import instrument_handler
+from tracing import finish_span, start_span
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+@instrument_handler
 def lambda_handler(event, context):
     """
     Validate input parameters for the disaster recovery workflow.
     This is the first step in the Step Function.
     """
+    span = start_span('ValidateInput')
     try:
         logger.info(f"Validating input: {json.dumps(event)}")
         
-       
-        read_replica_id = os.environ.get('READ_REPLICA_ID')
-        
-        if not read_replica_id:
-            raise ValueError("READ_REPLICA_ID environment variable is required")
-        
       
         if not event:
             raise ValueError("Event input is required")
         
+        # A list of databases can be passed per execution or configured on the function;
+        # without either the single READ_REPLICA_ID deployment is failed over
+        databases = parse_databases(
+            event.get('databases') or os.environ.get('DR_DATABASES'),
+            default_replica_id=os.environ.get('READ_REPLICA_ID'),
+            default_record_name=os.environ.get('ROUTE53_RECORD_NAME')
+        )
+        
         # Add validation for any additional parameters that might be passed
         # For example, if you want to pass specific alarm information
         alarm_name = event.get('alarm_name', 'Unknown')
         alarm_state = event.get('alarm_state', 'Unknown')
         
-        logger.info(f"Validation successful - Read Replica ID: {read_replica_id}")
+        logger.info(f"Validation successful - {len(databases)} database(s): {[database['read_replica_id'] for database in databases]}")
         logger.info(f"Alarm Name: {alarm_name}, Alarm State: {alarm_state}")
         
         # Return validated data for next steps
         return {
-            'read_replica_id': read_replica_id,
+            'databases': databases,
             'alarm_name': alarm_name,
             'alarm_state': alarm_state,
-            'validation_timestamp': context.get_remaining_time_in_millis(),
-            'execution_id': context.aws_request_id
+            'ignore_rpo_gate': bool(event.get('ignore_rpo_gate', False)),
+            'alarm_time': event.get('alarm_time'),
+            'execution_id': event.get('execution_id', context.aws_request_id),
+            'trace': finish_span(span, event)
         }
         
     except Exception as e:
+        span.finish('error')
         logger.error(f"Validation failed: {str(e)}")
         raise e 
\ No newline at end of file
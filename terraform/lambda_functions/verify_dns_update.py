@@ -1,35 +1,52 @@
 import json
-import boto3
 import logging
 import os
-import socket
-import time
 
+from dr_common import LazyClient, get_client
+from endpoint_probe import run_verification
+from metrics import instrument_handler
+from postgres_probe import probe_readiness
+from route53_records import get_failover_records
+from tracing import extend_trace, start_span
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
-route53_client = boto3.client('route53')
+route53_client = LazyClient('route53')
 
+PROBE_DEADLINE_SECONDS = float(os.environ.get('PROBE_DEADLINE_SECONDS', '20'))
+PROBE_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('PROBE_CONNECT_TIMEOUT_SECONDS', '2'))
+DB_PROBE_SECRET_ARN = os.environ.get('DB_PROBE_SECRET_ARN')
+DB_PROBE_DATABASE = os.environ.get('DB_PROBE_DATABASE', 'postgres')
+DB_READY_DEADLINE_SECONDS = float(os.environ.get('DB_READY_DEADLINE_SECONDS', '60'))
+
+# Cached across warm invocations
+probe_credentials = {}
+
+@instrument_handler
 def lambda_handler(event, context):
     """
     Verify that the DNS update has been properly propagated and is working correctly.
     This step ensures the failover is complete and functional.
     """
+    span = start_span('VerifyDNSUpdate', database=event.get('read_replica_id'))
+    # Includes the CheckDNSChangeStatus spans carried in $.dns_change
+    trace = (event.get('dns_change') or {}).get('trace') or event.get('trace')
     try:
         logger.info(f"Verifying DNS update: {json.dumps(event)}")
         
        
         zone_id = os.environ.get('ROUTE53_ZONE_ID')
-        record_name = os.environ.get('ROUTE53_RECORD_NAME')
+        # Fleet executions carry the record per database
+        record_name = event.get('record_name') or os.environ.get('ROUTE53_RECORD_NAME')
         
         # Get update information from previous steps
         new_endpoint = event.get('new_endpoint')
         change_id = event.get('change_id')
         
         if not zone_id or not record_name:
-            raise ValueError("ROUTE53_ZONE_ID and ROUTE53_RECORD_NAME environment variables are required")
+            raise ValueError("ROUTE53_ZONE_ID and a record_name (event or ROUTE53_RECORD_NAME) are required")
         
         if not new_endpoint:
             raise ValueError("New endpoint is required from previous steps")
@@ -46,26 +63,23 @@ def lambda_handler(event, context):
                 if change_status != 'INSYNC':
                     logger.warning(f"Route 53 change not yet synchronized: {change_status}")
                     return {
+                        'read_replica_id': event.get('read_replica_id'),
+                        'record_name': record_name,
                         'dns_verified': False,
                         'change_status': change_status,
-                        'verification_message': f"Route 53 change not yet synchronized: {change_status}"
+                        'connectivity_verified': False,
+                        'writes_accepted': False,
+                        'writes_checked': False,
+                        'verification_message': f"Route 53 change not yet synchronized: {change_status}",
+                        'execution_id': event.get('execution_id', context.aws_request_id),
+                        'trace': extend_trace(trace, span.finish())
                     }
             except Exception as e:
                 logger.warning(f"Could not verify Route 53 change status: {e}")
         
         # Step 2: Verify the current DNS records
         try:
-            response = route53_client.list_resource_record_sets(
-                HostedZoneId=zone_id
-            )
-            
-            primary_record = None
-            for record in response['ResourceRecordSets']:
-                if (record['Name'].rstrip('.') == record_name and 
-                    record.get('Type') == 'CNAME' and
-                    record.get('SetIdentifier') == 'primary'):
-                    primary_record = record
-                    break
+            primary_record = get_failover_records(route53_client, zone_id, record_name).get('primary')
             
             if not primary_record:
                 raise ValueError("Primary DNS record not found")
@@ -82,72 +96,95 @@ def lambda_handler(event, context):
             logger.error(f"DNS record verification failed: {e}")
             raise e
         
-        # Step 3: Verify DNS resolution (basic connectivity check)
+        # Steps 3 and 4: Resolve both names concurrently and probe every resolved address in parallel
+        # Extract hostname and port from the endpoint
+        if ':' in new_endpoint:
+            hostname, port_str = new_endpoint.split(':', 1)
+            port = int(port_str)
+        else:
+            hostname = new_endpoint
+            # Prefer the real port reported by the promotion steps
+            port = int(event.get('new_port') or event.get('promotion_details', {}).get('port') or 5432)
+        
+        logger.info(f"Testing resolution and connectivity for {record_name} and {hostname}:{port}")
+        
         try:
-            # Try to resolve the DNS name
-            resolved_ip = socket.gethostbyname(record_name)
-            logger.info(f"DNS resolution successful: {record_name} -> {resolved_ip}")
-            
-            # Try to resolve the new endpoint
-            endpoint_ip = socket.gethostbyname(new_endpoint)
-            logger.info(f"Endpoint resolution successful: {new_endpoint} -> {endpoint_ip}")
+            probe_result = run_verification(
+                record_name,
+                hostname,
+                port,
+                deadline_seconds=PROBE_DEADLINE_SECONDS,
+                connect_timeout=PROBE_CONNECT_TIMEOUT_SECONDS
+            )
+            connectivity_verified = probe_result['connectivity_verified']
             
-            # Verify they resolve to the same IP (or at least both resolve)
-            if resolved_ip == endpoint_ip:
+            if probe_result['resolution_match']:
                 logger.info("DNS resolution verification: Both names resolve to same IP")
             else:
                 logger.info("DNS resolution verification: Names resolve to different IPs (expected during propagation)")
-            
-        except socket.gaierror as e:
-            logger.warning(f"DNS resolution warning: {e}")
-            # Don't fail the verification for DNS resolution issues
-            # as they might be temporary during propagation
-        
-        # Step 4: Verify the database endpoint is reachable (basic connectivity)
-        try:
-            # Extract hostname and port from the endpoint
-            if ':' in new_endpoint:
-                hostname, port_str = new_endpoint.split(':', 1)
-                port = int(port_str)
-            else:
-                hostname = new_endpoint
-                port = 5432  # Default PostgreSQL port
-            
-            logger.info(f"Testing connectivity to {hostname}:{port}")
-            
-            # Create a socket and try to connect
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(10)  # 10 second timeout
-            
-            result = sock.connect_ex((hostname, port))
-            sock.close()
-            
-            if result == 0:
-                logger.info("Database connectivity test successful")
-                connectivity_verified = True
-            else:
-                logger.warning(f"Database connectivity test failed with error code: {result}")
-                connectivity_verified = False
                 
         except Exception as e:
             logger.warning(f"Database connectivity test failed: {e}")
+            probe_result = {'error': str(e)}
+            connectivity_verified = False
+        
+        # Step 5: Verify the database speaks PostgreSQL and, with credentials, accepts writes
+        try:
+            user, password = get_probe_credentials()
+            database_readiness = probe_readiness(
+                hostname,
+                port,
+                user=user,
+                password=password,
+                database=DB_PROBE_DATABASE,
+                timeout=PROBE_CONNECT_TIMEOUT_SECONDS,
+                deadline_seconds=DB_READY_DEADLINE_SECONDS
+            )
+            logger.info(f"Database readiness: {database_readiness}")
+            connectivity_verified = connectivity_verified and database_readiness['ready']
+        except Exception as e:
+            logger.warning(f"Database readiness probe failed: {e}")
+            database_readiness = {'ready': False, 'error': str(e)}
             connectivity_verified = False
         
         # Return verification results
         verification_result = {
+            'read_replica_id': event.get('read_replica_id'),
             'dns_verified': True,
             'record_name': record_name,
             'new_endpoint': new_endpoint,
             'change_id': change_id,
             'connectivity_verified': connectivity_verified,
-            'verification_timestamp': context.get_remaining_time_in_millis(),
-            'execution_id': context.aws_request_id,
-            'verification_message': 'DNS update verified successfully'
+            'connectivity_probe': probe_result,
+            'database_readiness': database_readiness,
+            'writes_accepted': database_readiness.get('in_recovery') is False,
+            # Without probe credentials only the handshake was checked
+            'writes_checked': database_readiness.get('checked_writes', False),
+            'execution_id': event.get('execution_id', context.aws_request_id),
+            'verification_message': 'DNS update verified successfully',
+            'trace': extend_trace(trace, span.finish())
         }
         
         logger.info("DNS update verification completed successfully")
         return verification_result
         
     except Exception as e:
+        span.finish('error')
         logger.error(f"DNS update verification failed: {str(e)}")
-        raise e 
\ No newline at end of file
+        raise e
+
+def get_probe_credentials():
+    """
+    Read the probe user and password from Secrets Manager when DB_PROBE_SECRET_ARN is set.
+    Returns (None, None) otherwise, which limits the probe to the protocol handshake.
+    """
+    if not DB_PROBE_SECRET_ARN:
+        return None, None
+    
+    if not probe_credentials:
+        secrets_client = get_client('secretsmanager')
+        secret = json.loads(secrets_client.get_secret_value(SecretId=DB_PROBE_SECRET_ARN)['SecretString'])
+        probe_credentials['username'] = secret['username']
+        probe_credentials['password'] = secret['password']
+    
+    return probe_credentials['username'], probe_credentials['password']
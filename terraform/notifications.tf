@@ -68,4 +68,68 @@ resource "aws_lambda_permission" "allow_us_east1_sns" {
   function_name = aws_lambda_function.dr_orchestrator.function_name
   principal     = "sns.amazonaws.com"
   source_arn    = aws_sns_topic.route53_alarm.arn
-}
\ No newline at end of file
+}
+
+
+# One item per notification sent by an execution, so retried notify steps
+# and repeated alarms do not page twice
+resource "aws_dynamodb_table" "notification_ledger" {
+  provider     = aws.secondary
+  name         = "dr-notification-ledger"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "notification_key"
+
+  attribute {
+    name = "notification_key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = {
+    Name        = "dr-notification-ledger"
+    Environment = var.environment
+    TagName     = var.tag_name
+  }
+}
+
+locals {
+  notification_lambda_roles = {
+    step_function = aws_iam_role.step_function_lambda_role.id
+    orchestrator  = aws_iam_role.lambda_rds_failover_role.id
+  }
+}
+
+resource "aws_iam_role_policy" "notification_policy" {
+  for_each = local.notification_lambda_roles
+  provider = aws.secondary
+  name     = "dr-notification-policy"
+  role     = each.value
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = concat([
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:PutItem",
+          "dynamodb:DeleteItem"
+        ]
+        Resource = [
+          aws_dynamodb_table.notification_ledger.arn
+        ]
+      }
+    ], length(var.additional_notification_topic_arns) == 0 ? [] : [
+      {
+        Effect = "Allow"
+        Action = [
+          "sns:Publish"
+        ]
+        Resource = var.additional_notification_topic_arns
+      }
+    ])
+  })
+}
@@ -0,0 +1,63 @@
+# Task tokens of Step Function executions waiting for a replica promotion
+resource "aws_dynamodb_table" "promotion_waiters" {
+  provider     = aws.secondary
+  name         = "dr-promotion-waiters"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "read_replica_id"
+
+  attribute {
+    name = "read_replica_id"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = {
+    Name        = "dr-promotion-waiters"
+    Environment = var.environment
+    TagName     = var.tag_name
+  }
+}
+
+# Any instance event in the region triggers a completion check. Replicas can
+# be passed in the execution input, so the rule cannot list them; the callback
+# drops events for instances without a waiter and confirms promotion with
+# describe_db_instances before resuming.
+resource "aws_cloudwatch_event_rule" "replica_instance_events" {
+  provider    = aws.secondary
+  name        = "dr-replica-instance-events"
+  description = "Capture RDS instance events for the read replicas during promotion"
+
+  event_pattern = jsonencode({
+    source      = ["aws.rds"]
+    detail-type = ["RDS DB Instance Event"]
+    detail = {
+      SourceType = ["DB_INSTANCE"]
+    }
+  })
+
+  tags = {
+    Name        = "dr-replica-instance-events"
+    Environment = var.environment
+    TagName     = var.tag_name
+  }
+}
+
+resource "aws_cloudwatch_event_target" "replica_instance_events_callback" {
+  provider  = aws.secondary
+  rule      = aws_cloudwatch_event_rule.replica_instance_events.name
+  target_id = "PromotionEventCallback"
+  arn       = aws_lambda_function.promotion_event_callback.arn
+}
+
+resource "aws_lambda_permission" "allow_replica_instance_events" {
+  provider      = aws.secondary
+  statement_id  = "AllowExecutionFromReplicaInstanceEvents"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.promotion_event_callback.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.replica_instance_events.arn
+}
@@ -0,0 +1,131 @@
+# Latest readiness of each DR replica, written by the scheduled pre-flight job
+# and read by check_replica_status so failover skips describe_db_instances
+resource "aws_dynamodb_table" "replica_readiness" {
+  provider     = aws.secondary
+  name         = "dr-replica-readiness"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "read_replica_id"
+
+  attribute {
+    name = "read_replica_id"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = {
+    Name        = "dr-replica-readiness"
+    Environment = var.environment
+    TagName     = var.tag_name
+  }
+}
+
+data "archive_file" "record_replica_readiness_zip" {
+  type        = "zip"
+  output_path = "lambda_functions/record_replica_readiness.zip"
+
+  source {
+    content  = file("lambda_functions/record_replica_readiness.py")
+    filename = "record_replica_readiness.py"
+  }
+
+  source {
+    content  = file("lambda_functions/readiness_store.py")
+    filename = "readiness_store.py"
+  }
+
+  source {
+    content  = file("lambda_functions/replica_lag.py")
+    filename = "replica_lag.py"
+  }
+
+  source {
+    content  = file("lambda_functions/fleet.py")
+    filename = "fleet.py"
+  }
+
+  source {
+    content  = file("lambda_functions/dr_common.py")
+    filename = "dr_common.py"
+  }
+
+  source {
+    content  = file("lambda_functions/metrics.py")
+    filename = "metrics.py"
+  }
+}
+
+resource "aws_lambda_function" "record_replica_readiness" {
+  provider = aws.secondary
+  filename         = data.archive_file.record_replica_readiness_zip.output_path
+  function_name    = "dr-record-replica-readiness"
+  role             = aws_iam_role.step_function_lambda_role.arn
+  handler          = "record_replica_readiness.lambda_handler"
+  runtime          = "python3.9"
+  source_code_hash = data.archive_file.record_replica_readiness_zip.output_base64sha256
+  timeout          = 60
+  memory_size      = 128
+
+  environment {
+    variables = {
+      READ_REPLICA_ID     = var.read_replica_identifier
+      ROUTE53_RECORD_NAME = "database.myapp.internal"
+      DR_DATABASES        = jsonencode(var.failover_databases)
+      READINESS_TABLE     = aws_dynamodb_table.replica_readiness.name
+    }
+  }
+}
+
+resource "aws_cloudwatch_event_rule" "replica_readiness_schedule" {
+  provider            = aws.secondary
+  name                = "dr-replica-readiness-schedule"
+  description         = "Record DR replica readiness ahead of a failover"
+  schedule_expression = var.readiness_schedule_expression
+
+  tags = {
+    Name        = "dr-replica-readiness-schedule"
+    Environment = var.environment
+    TagName     = var.tag_name
+  }
+}
+
+resource "aws_cloudwatch_event_target" "replica_readiness_schedule" {
+  provider  = aws.secondary
+  rule      = aws_cloudwatch_event_rule.replica_readiness_schedule.name
+  target_id = "RecordReplicaReadiness"
+  arn       = aws_lambda_function.record_replica_readiness.arn
+}
+
+resource "aws_lambda_permission" "allow_replica_readiness_schedule" {
+  provider      = aws.secondary
+  statement_id  = "AllowExecutionFromReplicaReadinessSchedule"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.record_replica_readiness.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.replica_readiness_schedule.arn
+}
+
+resource "aws_iam_role_policy" "step_function_lambda_readiness_policy" {
+  provider = aws.secondary
+  name     = "step-function-lambda-readiness-policy"
+  role     = aws_iam_role.step_function_lambda_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:BatchGetItem",
+          "dynamodb:BatchWriteItem"
+        ]
+        Resource = [
+          aws_dynamodb_table.replica_readiness.arn
+        ]
+      }
+    ]
+  })
+}
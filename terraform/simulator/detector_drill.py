@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import sys
+import time
+
+
+SIMULATOR_DIR = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.join(os.path.dirname(SIMULATOR_DIR), 'lambda_functions')
+sys.path.insert(0, LAMBDA_DIR)
+
+from primary_detector import FailureDetector, probe_primary  # noqa: E402
+
+
+# Each drill fails the fake primary after HEALTHY_ROUNDS rounds; faults are
+# (kind, vantage points affected) with kind one of down, partition, hang
+DRILLS = {
+    'primary-down': {
+        'description': 'The primary stops accepting connections; every vantage point sees it',
+        'fault': ('down', None),
+        'expect_failover': True
+    },
+    'handshake-hang': {
+        'description': 'TCP still accepts but Postgres never answers the SSLRequest',
+        'fault': ('hang', None),
+        'expect_failover': True
+    },
+    'single-partition': {
+        'description': 'One vantage point loses its route to a healthy primary',
+        'fault': ('partition', ['b']),
+        'expect_failover': False
+    },
+    'minority-flap': {
+        'description': 'Two of three vantage points fail on alternate rounds only',
+        'fault': ('flap', ['a', 'b']),
+        'expect_failover': False
+    }
+}
+VANTAGE_POINTS = ['coordinator', 'a', 'b']
+HEALTHY_ROUNDS = 3
+
+
+class FakePrimary:
+    """
+    Local TCP listener answering the Postgres SSLRequest with 'N', or hanging
+    without an answer. Stopping it closes the port.
+    """
+
+    def __init__(self):
+        self.hang = False
+        self.server = None
+        self.port = None
+
+    async def handle(self, reader, writer):
+        try:
+            await reader.readexactly(8)
+            if self.hang:
+                await asyncio.sleep(3600)
+            writer.write(b'N')
+            await writer.drain()
+            await reader.read()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def closed_port():
+    # Bound and released, so connecting is refused like an unroutable primary
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+async def run_drill(name, drill, quorum, failure_rounds, interval, timeout, max_rounds):
+    primary = FakePrimary()
+    await primary.start()
+    refused_port = closed_port()
+    detector = FailureDetector(quorum=quorum, failure_rounds=failure_rounds)
+    kind, affected = drill['fault']
+    affected = affected or VANTAGE_POINTS
+    fault_at = None
+    rounds = []
+
+    for round_number in range(1, max_rounds + 1):
+        started = time.monotonic()
+        faulty = round_number > HEALTHY_ROUNDS
+        if faulty and fault_at is None:
+            fault_at = started
+            if kind == 'down':
+                await primary.stop()
+            elif kind == 'hang':
+                primary.hang = True
+
+        def target(vantage):
+            if not faulty or vantage not in affected:
+                return primary.port
+            if kind == 'partition' or (kind == 'flap' and round_number % 2 == 0):
+                return refused_port
+            return primary.port
+
+        results = await asyncio.gather(*[
+            probe_primary('127.0.0.1', target(vantage), vantage=vantage, timeout=timeout, handshake=True)
+            for vantage in VANTAGE_POINTS
+        ])
+        rounds.append(detector.observe(results, now=started))
+        if detector.failed:
+            break
+        await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    if kind != 'down':
+        await primary.stop()
+    detected = detector.failed
+    return {
+        'drill': name,
+        'description': drill['description'],
+        'failover': detected,
+        'expected': drill['expect_failover'],
+        'rounds': rounds,
+        'detection_seconds': round(time.monotonic() - fault_at, 2) if detected else None,
+        'ok': detected == drill['expect_failover']
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Drive the primary failure detector against local fake Postgres endpoints '
+                    'and check its quorum decisions and detection time.')
+    parser.add_argument('drills', nargs='*', help='Drills to run (default: all)')
+    parser.add_argument('--list', action='store_true', help='List the drills and exit')
+    parser.add_argument('--quorum', type=int, default=2)
+    parser.add_argument('--failure-rounds', type=int, default=3)
+    parser.add_argument('--interval', type=float, default=0.5, help='Seconds between rounds')
+    parser.add_argument('--timeout', type=float, default=0.3, help='Probe timeout in seconds')
+    parser.add_argument('--max-rounds', type=int, default=12)
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, drill in DRILLS.items():
+            print(f"{name:18} {drill['description']}")
+        return 0
+
+    logging.getLogger().setLevel(logging.CRITICAL)
+    unknown = [name for name in args.drills if name not in DRILLS]
+    if unknown:
+        parser.error(f"Unknown drills: {unknown}")
+
+    failures = 0
+    for name in args.drills or list(DRILLS):
+        report = asyncio.run(run_drill(name, DRILLS[name], args.quorum, args.failure_rounds,
+                                       args.interval, args.timeout, args.max_rounds))
+        failures += not report['ok']
+        detection = f"{report['detection_seconds']}s" if report['failover'] else '-'
+        print(f"{'PASS' if report['ok'] else 'FAIL'}  {name:18} failover={str(report['failover']):5} "
+              f"detection={detection:7} rounds={' '.join(report['rounds'])}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,960 @@
+import copy
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+
+logger = logging.getLogger(__name__)
+
+
+# Defaults for every timing model; scenarios override individual values
+DEFAULT_TIMING = {
+    # Latency of every AWS API call
+    'api_latency_seconds': 0.05,
+    # Probability that one API attempt is throttled and retried by the client
+    'throttle_rate': 0.0,
+    # promote_read_replica until the instance is available without a source
+    'promotion_seconds': 300.0,
+    # Relative +/- spread applied per instance to promotion_seconds
+    'promotion_jitter': 0.1,
+    # Promotion completion until the RDS event reaches EventBridge targets; None drops the event
+    'rds_event_delay_seconds': 5.0,
+    # change_resource_record_sets until get_change reports INSYNC
+    'insync_delay_seconds': 40.0,
+    # Alarm state change until the orchestrator Lambda is invoked through SNS
+    'alarm_delivery_seconds': 1.0,
+    # Added to the first invocation of each function
+    'cold_start_seconds': 0.4,
+    # Added to every invocation
+    'invoke_overhead_seconds': 0.02,
+    # Step Functions transition overhead per state
+    'state_transition_seconds': 0.02,
+    # DNS resolution, TCP connect and PostgreSQL handshake in VerifyDNSUpdate
+    'probe_seconds': 0.5,
+    # ReplicaLag reported for healthy replicas
+    'replica_lag_seconds': 2.0,
+    # Primary failure until the alarm changes state; ReplicaLag grows with the clock from the failure on
+    'outage_to_alarm_seconds': 120.0
+}
+
+MAX_BACKOFF_SECONDS = 20
+
+
+class TimingModel:
+    """
+    Durations and failure rates the fakes apply. Unknown settings are rejected
+    so a typo in a scenario does not silently run with the default.
+    """
+
+    def __init__(self, **overrides):
+        unknown = set(overrides) - set(DEFAULT_TIMING)
+        if unknown:
+            raise ValueError(f"Unknown timing settings: {sorted(unknown)}")
+        for name, value in {**DEFAULT_TIMING, **overrides}.items():
+            setattr(self, name, value)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in DEFAULT_TIMING}
+
+
+class VirtualClock:
+    """Simulated wall clock; patched over time.time and time.sleep during a run."""
+
+    def __init__(self, start):
+        self.now = float(start)
+        # Benchmarked Lambdas advance the clock from their own threads
+        self._lock = threading.Lock()
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        with self._lock:
+            self.now += max(0.0, seconds)
+
+    sleep = advance
+
+
+class WallClock:
+    """
+    Real time for benchmarks of code that runs its own threads: advance sleeps
+    the calling thread, so the modelled latency of concurrent calls overlaps.
+    """
+
+    # Bound at import, since runs patch time.time and time.sleep with the clock
+    _time = time.time
+    _sleep = time.sleep
+
+    @property
+    def now(self):
+        return WallClock._time()
+
+    def time(self):
+        return WallClock._time()
+
+    def advance(self, seconds):
+        WallClock._sleep(max(0.0, seconds))
+
+    sleep = advance
+
+
+class Process:
+    """A generator driven by the Scheduler with a callback for its result."""
+
+    def __init__(self, generator, on_done=None):
+        self.generator = generator
+        self.on_done = on_done
+
+
+class Sleep:
+    """Resume the process after the given number of simulated seconds."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __call__(self, scheduler, process):
+        scheduler.call_at(scheduler.clock.now + max(0.0, self.seconds),
+                          lambda: scheduler.step(process, None))
+
+
+class WaitForToken:
+    """Resume with ('success' | 'failure' | 'timeout', payload) when the task token is settled."""
+
+    def __init__(self, token, timeout_seconds=None):
+        self.token = token
+        self.timeout_seconds = timeout_seconds
+
+    def __call__(self, scheduler, process):
+        scheduler.wait_for_token(process, self.token, self.timeout_seconds)
+
+
+class Join:
+    """Run child generators with bounded concurrency and resume with their results in order."""
+
+    def __init__(self, generators, max_concurrency=0):
+        self.generators = list(generators)
+        self.max_concurrency = max_concurrency
+
+    def __call__(self, scheduler, process):
+        scheduler.join(process, self.generators, self.max_concurrency)
+
+
+class Scheduler:
+    """
+    Discrete-event loop over simulated time. Processes yield Sleep, WaitForToken
+    or Join commands; callbacks run in timestamp order with the clock set to
+    their time, so independent branches overlap the way they would in AWS.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._queue = []
+        self._sequence = itertools.count()
+        self._tokens = {}
+
+    def call_at(self, at, callback):
+        heapq.heappush(self._queue, (at, next(self._sequence), callback))
+
+    def spawn(self, generator, at=None, on_done=None):
+        process = Process(generator, on_done)
+        self.call_at(self.clock.now if at is None else at, lambda: self.step(process, None))
+        return process
+
+    def step(self, process, value, error=None):
+        try:
+            if error is not None:
+                command = process.generator.throw(error)
+            else:
+                command = process.generator.send(value)
+        except StopIteration as stop:
+            if process.on_done:
+                process.on_done(stop.value, None)
+            return
+        except Exception as e:
+            if process.on_done is None:
+                raise
+            process.on_done(None, e)
+            return
+        command(self, process)
+
+    def run(self, until=None):
+        while self._queue:
+            at, _, callback = self._queue[0]
+            if until is not None and at > until:
+                break
+            heapq.heappop(self._queue)
+            self.clock.now = at
+            callback()
+
+    def open_token(self, token):
+        self._tokens[token] = {'state': 'pending', 'outcome': None, 'process': None}
+
+    def settle_token(self, token, status, payload):
+        """Complete a pending task token; False when it is unknown, settled or timed out."""
+        entry = self._tokens.get(token)
+        if entry is None or entry['state'] != 'pending':
+            return False
+        entry['state'] = 'settled'
+        entry['outcome'] = (status, payload)
+        if entry['process'] is not None:
+            process = entry['process']
+            self.call_at(self.clock.now, lambda: self.step(process, entry['outcome']))
+        return True
+
+    def token_state(self, token):
+        entry = self._tokens.get(token)
+        return entry['state'] if entry else None
+
+    def wait_for_token(self, process, token, timeout_seconds):
+        entry = self._tokens[token]
+        if entry['state'] == 'settled':
+            self.call_at(self.clock.now, lambda: self.step(process, entry['outcome']))
+            return
+        entry['process'] = process
+        if timeout_seconds:
+            def expire():
+                if entry['state'] == 'pending':
+                    entry['state'] = 'timed_out'
+                    self.step(process, ('timeout', None))
+            self.call_at(self.clock.now + timeout_seconds, expire)
+
+    def join(self, process, generators, max_concurrency):
+        results = [None] * len(generators)
+        pending = list(enumerate(generators))
+        state = {'running': 0, 'remaining': len(generators), 'error': None}
+        limit = max_concurrency or len(generators) or 1
+
+        def start_next():
+            while pending and state['running'] < limit and state['error'] is None:
+                index, generator = pending.pop(0)
+                state['running'] += 1
+                self.spawn(generator, on_done=lambda result, error, index=index: finished(index, result, error))
+
+        def finished(index, result, error):
+            state['running'] -= 1
+            state['remaining'] -= 1
+            if error is not None and state['error'] is None:
+                state['error'] = error
+                self.call_at(self.clock.now, lambda: self.step(process, None, error))
+                return
+            results[index] = result
+            if state['error'] is None:
+                if state['remaining'] == 0:
+                    self.call_at(self.clock.now, lambda: self.step(process, results))
+                else:
+                    start_next()
+
+        if not generators:
+            self.call_at(self.clock.now, lambda: self.step(process, []))
+            return
+        start_next()
+
+
+class FakeClientError(Exception):
+    """Carries a botocore-style response so dr_common.error_code works unchanged."""
+
+    def __init__(self, code, message, operation_name=None, status_code=400):
+        super().__init__(f"An error occurred ({code}) when calling the {operation_name} operation: {message}")
+        self.response = {
+            'Error': {'Code': code, 'Message': message},
+            'ResponseMetadata': {'HTTPStatusCode': status_code}
+        }
+        self.operation_name = operation_name
+
+
+class FakeExceptions:
+    """client.exceptions: one FakeClientError subclass per error code, created on demand."""
+
+    _classes = {}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name not in self._classes:
+            self._classes[name] = type(name, (FakeClientError,), {})
+        return self._classes[name]
+
+
+def raise_error(code, message):
+    raise getattr(FakeExceptions(), code)(code, message)
+
+def operation_name(method_name):
+    return ''.join(part.capitalize() for part in method_name.split('_')).replace('Db', 'DB')
+
+
+class FakeEvents:
+    """The subset of botocore's event system dr_common registers on."""
+
+    def __init__(self):
+        self._handlers = []
+
+    def register(self, event_name, handler):
+        self._handlers.append((event_name, handler))
+
+    def emit(self, event_name, **kwargs):
+        for registered, handler in self._handlers:
+            if event_name == registered or event_name.startswith(registered + '.'):
+                handler(event_name=event_name, **kwargs)
+
+
+class FakePaginator:
+    def __init__(self, client, method_name, token_key, marker_key, limit_key=None):
+        self._client = client
+        self._method_name = method_name
+        self._token_key = token_key
+        self._marker_key = marker_key
+        self._limit_key = limit_key
+
+    def paginate(self, **params):
+        # PaginationConfig is botocore's; PageSize becomes the operation's limit parameter
+        page_size = params.pop('PaginationConfig', {}).get('PageSize')
+        if page_size and self._limit_key:
+            params[self._limit_key] = page_size
+        while True:
+            page = getattr(self._client, self._method_name)(**params)
+            yield page
+            token = page.get(self._token_key)
+            if not token:
+                return
+            params = {**params, self._marker_key: token}
+
+
+class FakeClient:
+    """
+    boto3-like client over a fake service backend. Every call pays the modelled
+    latency, may be throttled and retried like botocore's standard retry mode,
+    and fires after-call events so the tracing and metrics listeners see it.
+    """
+
+    def __init__(self, aws, service_name, backend, max_attempts):
+        self._aws = aws
+        self._service_name = service_name
+        self._backend = backend
+        self._max_attempts = max_attempts
+        self.meta = SimpleNamespace(events=FakeEvents(), service_model=SimpleNamespace(service_name=service_name))
+        self.exceptions = FakeExceptions()
+
+    def __getattr__(self, name):
+        method = getattr(self._backend, name, None)
+        if name.startswith('_') or not callable(method):
+            raise AttributeError(f"Fake {self._service_name} client has no operation {name}")
+        return lambda **params: self._call(name, method, params)
+
+    def get_paginator(self, method_name):
+        return FakePaginator(self, method_name, *self._backend.PAGINATION[method_name])
+
+    def _call(self, method_name, method, params):
+        aws = self._aws
+        name = operation_name(method_name)
+        event_name = f"after-call.{self._service_name}.{name}"
+        aws.record_call(self._service_name, name)
+
+        attempt = 0
+        while True:
+            aws.clock.advance(aws.timing.api_latency_seconds)
+            if aws.random.random() < aws.timing.throttle_rate:
+                aws.record_throttle()
+                if attempt + 1 < self._max_attempts:
+                    attempt += 1
+                    aws.record_retry(self._service_name, name)
+                    # Standard mode: full jitter, exponential base 2, capped at 20 seconds
+                    aws.clock.advance(aws.random.uniform(0, min(MAX_BACKOFF_SECONDS, 2 ** attempt)))
+                    continue
+                error = FakeClientError('Throttling', 'Rate exceeded', name)
+                return self._fail(event_name, error, attempt)
+
+            try:
+                response = method(**params)
+            except FakeClientError as error:
+                error.operation_name = name
+                return self._fail(event_name, error, attempt)
+
+            # Callers get copies, never the backend's own state
+            response = copy.deepcopy(response)
+            response['ResponseMetadata'] = {
+                'RequestId': aws.new_id('req'),
+                'HTTPStatusCode': 200,
+                'RetryAttempts': attempt
+            }
+            self.meta.events.emit(event_name, parsed=response, http_response=None, model=None)
+            return response
+
+    def _fail(self, event_name, error, attempt):
+        self._aws.record_error()
+        error.response['ResponseMetadata']['RetryAttempts'] = attempt
+        self.meta.events.emit(event_name, parsed=error.response, http_response=None, model=None)
+        raise error
+
+
+class FakeSession:
+    """Stands in for boto3.session.Session in dr_common.use_session."""
+
+    def __init__(self, aws):
+        self._aws = aws
+
+    def client(self, service_name, region_name=None, config=None):
+        backend = self._aws.backends.get(service_name)
+        if backend is None:
+            raise ValueError(f"The simulator has no fake for the {service_name} service")
+        retries = getattr(config, 'retries', None) or {}
+        return FakeClient(self._aws, service_name, backend, retries.get('max_attempts', 3))
+
+
+class FakeRDS:
+    """
+    Read replicas whose promotion runs through modifying and rebooting on the
+    simulated clock, with an instance event published when it completes, and
+    the manual snapshots the snapshot Lambdas list and delete.
+    """
+
+    PAGINATION = {
+        'describe_db_instances': ('Marker', 'Marker', 'MaxRecords'),
+        'describe_db_snapshots': ('Marker', 'Marker', 'MaxRecords')
+    }
+    # Share of the promotion spent in each status before the instance is available
+    PROMOTION_PHASES = (('modifying', 0.75), ('rebooting', 1.0))
+    PAGE_SIZE = 100
+
+    def __init__(self, aws):
+        self._aws = aws
+        self.instances = {}
+        self.snapshots = {}
+        self.snapshot_tags = {}
+        # Simulated time the primary fails, if it does
+        self.outage_at = None
+
+    def add_instance(self, instance_id, source_id=None, lag_seconds=None, status='available'):
+        self.instances[instance_id] = {
+            'id': instance_id,
+            'source_id': source_id,
+            'status': status,
+            'lag_seconds': self._aws.timing.replica_lag_seconds if lag_seconds is None else lag_seconds,
+            'promotion_started': None,
+            'promotion_completes': None
+        }
+
+    def lag_at(self, instance_id, at):
+        """ReplicaLag of the replica at the given time; it grows by a second per second once the primary is down."""
+        instance = self.instances[instance_id]
+        if self.outage_at is None or at <= self.outage_at:
+            return float(instance['lag_seconds'])
+        return float(instance['lag_seconds']) + at - self.outage_at
+
+    def endpoint(self, instance_id):
+        return f"{instance_id}.sim.{self._aws.region}.rds.amazonaws.com"
+
+    def _status(self, instance):
+        if instance['promotion_started'] is None:
+            return instance['status'], instance['source_id']
+        now = self._aws.clock.now
+        if now >= instance['promotion_completes']:
+            return 'available', None
+        elapsed = (now - instance['promotion_started']) / (instance['promotion_completes'] - instance['promotion_started'])
+        for status, until in self.PROMOTION_PHASES:
+            if elapsed < until:
+                return status, instance['source_id']
+        return 'available', None
+
+    def is_promoted(self, instance_id):
+        instance = self.instances.get(instance_id)
+        return instance is not None and self._status(instance) == ('available', None)
+
+    def instance_for_endpoint(self, address):
+        instance_id = address.split('.', 1)[0]
+        return instance_id if address == self.endpoint(instance_id) and instance_id in self.instances else None
+
+    def _describe(self, instance):
+        status, source_id = self._status(instance)
+        description = {
+            'DBInstanceIdentifier': instance['id'],
+            'DBInstanceArn': f"arn:aws:rds:{self._aws.region}:000000000000:db:{instance['id']}",
+            'DBInstanceStatus': status,
+            'DBInstanceClass': 'db.r6g.large',
+            'Engine': 'postgres',
+            'EngineVersion': '15.4',
+            'Endpoint': {'Address': self.endpoint(instance['id']), 'Port': 5432},
+            'AvailabilityZone': f"{self._aws.region}a",
+            'StorageType': 'gp3',
+            'AllocatedStorage': 100,
+            'MultiAZ': False,
+            'PendingModifiedValues': {}
+        }
+        if source_id:
+            description['ReadReplicaSourceDBInstanceIdentifier'] = source_id
+        return description
+
+    def describe_db_instances(self, DBInstanceIdentifier=None, Filters=None, Marker=None, MaxRecords=None):
+        if DBInstanceIdentifier:
+            if DBInstanceIdentifier not in self.instances:
+                raise_error('DBInstanceNotFound', f"DBInstance {DBInstanceIdentifier} not found.")
+            return {'DBInstances': [self._describe(self.instances[DBInstanceIdentifier])]}
+
+        instance_ids = sorted(self.instances)
+        for instance_filter in Filters or []:
+            if instance_filter['Name'] == 'db-instance-id':
+                instance_ids = [instance_id for instance_id in instance_ids if instance_id in instance_filter['Values']]
+
+        start = int(Marker or 0)
+        page_size = MaxRecords or self.PAGE_SIZE
+        page = instance_ids[start:start + page_size]
+        response = {'DBInstances': [self._describe(self.instances[instance_id]) for instance_id in page]}
+        if start + page_size < len(instance_ids):
+            response['Marker'] = str(start + page_size)
+        return response
+
+    def promote_read_replica(self, DBInstanceIdentifier, **kwargs):
+        instance = self.instances.get(DBInstanceIdentifier)
+        if instance is None:
+            raise_error('DBInstanceNotFound', f"DBInstance {DBInstanceIdentifier} not found.")
+        status, source_id = self._status(instance)
+        if not source_id or status != 'available':
+            raise_error('InvalidDBInstanceState', f"DBInstance {DBInstanceIdentifier} is not a read replica that can be promoted.")
+
+        aws = self._aws
+        jitter = aws.timing.promotion_jitter
+        duration = aws.timing.promotion_seconds * aws.random.uniform(1 - jitter, 1 + jitter)
+        instance['promotion_started'] = aws.clock.now
+        instance['promotion_completes'] = aws.clock.now + duration
+
+        if aws.timing.rds_event_delay_seconds is not None:
+            aws.publish_event(instance['promotion_completes'] + aws.timing.rds_event_delay_seconds, {
+                'source': 'aws.rds',
+                'detail-type': 'RDS DB Instance Event',
+                'detail': {
+                    'SourceType': 'DB_INSTANCE',
+                    'SourceIdentifier': DBInstanceIdentifier,
+                    'EventID': 'RDS-EVENT-0026',
+                    'Message': 'Finished applying modification to convert to a standalone DB instance'
+                }
+            })
+
+        return {'DBInstance': self._describe(instance)}
+
+    def add_snapshot(self, snapshot_id, instance_id, created_at, snapshot_type='manual', status='available',
+                     tags=None, describe_tags=True, original_created_at=None):
+        """
+        describe_tags=False leaves TagList out of the description, as older API responses did.
+        original_created_at is the source snapshot's creation time for a copy, which RDS
+        reports as OriginalSnapshotCreateTime while SnapshotCreateTime is the copy's.
+        """
+        self.snapshot_tags[snapshot_id] = [{'Key': key, 'Value': value} for key, value in (tags or {}).items()]
+        self.snapshots[snapshot_id] = {
+            'DBSnapshotIdentifier': snapshot_id,
+            'DBSnapshotArn': f"arn:aws:rds:{self._aws.region}:000000000000:snapshot:{snapshot_id}",
+            'DBInstanceIdentifier': instance_id,
+            'SnapshotCreateTime': datetime.fromtimestamp(created_at, timezone.utc),
+            'OriginalSnapshotCreateTime': datetime.fromtimestamp(
+                created_at if original_created_at is None else original_created_at, timezone.utc),
+            'SnapshotType': snapshot_type,
+            'Status': status,
+            'Engine': 'postgres',
+            'AllocatedStorage': 100,
+            'StorageType': 'gp3'
+        }
+        if describe_tags:
+            self.snapshots[snapshot_id]['TagList'] = self.snapshot_tags[snapshot_id]
+
+    def describe_db_snapshots(self, DBInstanceIdentifier=None, DBSnapshotIdentifier=None, SnapshotType=None,
+                              Marker=None, MaxRecords=None, **kwargs):
+        if DBSnapshotIdentifier:
+            if DBSnapshotIdentifier not in self.snapshots:
+                raise_error('DBSnapshotNotFound', f"DBSnapshot {DBSnapshotIdentifier} not found.")
+            return {'DBSnapshots': [self.snapshots[DBSnapshotIdentifier]]}
+
+        # The marker is the last identifier returned, so concurrent deletes do not shift later pages
+        snapshots = [
+            snapshot for snapshot_id, snapshot in sorted(list(self.snapshots.items()))
+            if (not Marker or snapshot_id > Marker)
+            and (not DBInstanceIdentifier or snapshot['DBInstanceIdentifier'] == DBInstanceIdentifier)
+            and (not SnapshotType or snapshot['SnapshotType'] == SnapshotType)
+        ]
+        page_size = MaxRecords or self.PAGE_SIZE
+        response = {'DBSnapshots': snapshots[:page_size]}
+        if len(snapshots) > page_size:
+            response['Marker'] = snapshots[page_size - 1]['DBSnapshotIdentifier']
+        return response
+
+    def delete_db_snapshot(self, DBSnapshotIdentifier):
+        snapshot = self.snapshots.pop(DBSnapshotIdentifier, None)
+        self.snapshot_tags.pop(DBSnapshotIdentifier, None)
+        if snapshot is None:
+            raise_error('DBSnapshotNotFound', f"DBSnapshot {DBSnapshotIdentifier} not found.")
+        return {'DBSnapshot': {**snapshot, 'Status': 'deleted'}}
+
+    def list_tags_for_resource(self, ResourceName):
+        snapshot = next((snapshot for snapshot in self.snapshots.values() if snapshot['DBSnapshotArn'] == ResourceName), None)
+        if snapshot is None:
+            raise_error('DBSnapshotNotFound', f"DBSnapshot {ResourceName} not found.")
+        return {'TagList': self.snapshot_tags[snapshot['DBSnapshotIdentifier']]}
+
+
+class FakeRoute53:
+    """One hosted zone whose changes become INSYNC after the modelled delay."""
+
+    PAGINATION = {}
+
+    def __init__(self, aws):
+        self._aws = aws
+        self.records = {}
+        self.changes = {}
+
+    @staticmethod
+    def _key(record_set):
+        return (record_set['Name'].rstrip('.').lower() + '.', record_set['Type'], record_set.get('SetIdentifier', ''))
+
+    def add_failover_record(self, record_name, primary_value, secondary_value, ttl=60):
+        for set_identifier, value in (('primary', primary_value), ('secondary', secondary_value)):
+            record_set = {
+                'Name': record_name.rstrip('.').lower() + '.',
+                'Type': 'CNAME',
+                'SetIdentifier': set_identifier,
+                'Failover': set_identifier.upper(),
+                'TTL': ttl,
+                'ResourceRecords': [{'Value': value}]
+            }
+            self.records[self._key(record_set)] = record_set
+
+    def resolve(self, record_name):
+        record_set = self.records.get((record_name.rstrip('.').lower() + '.', 'CNAME', 'primary'))
+        return record_set['ResourceRecords'][0]['Value'] if record_set else None
+
+    def list_resource_record_sets(self, HostedZoneId, StartRecordName=None, StartRecordType=None,
+                                  StartRecordIdentifier=None, MaxItems='100'):
+        start = (StartRecordName.rstrip('.').lower() + '.' if StartRecordName else '', StartRecordType or '',
+                 StartRecordIdentifier or '')
+        keys = [key for key in sorted(self.records) if key >= start]
+        page = keys[:int(MaxItems)]
+        response = {'ResourceRecordSets': [self.records[key] for key in page], 'IsTruncated': len(keys) > len(page)}
+        if response['IsTruncated']:
+            name, record_type, set_identifier = keys[len(page)]
+            response.update(NextRecordName=name, NextRecordType=record_type)
+            if set_identifier:
+                response['NextRecordIdentifier'] = set_identifier
+        return response
+
+    def change_resource_record_sets(self, HostedZoneId, ChangeBatch):
+        records = dict(self.records)
+        for change in ChangeBatch['Changes']:
+            record_set = {key: value for key, value in change['ResourceRecordSet'].items() if value is not None}
+            key = self._key(record_set)
+            action = change['Action']
+            if action == 'DELETE':
+                if records.get(key) != {**record_set, 'Name': key[0]}:
+                    raise_error('InvalidChangeBatch', f"Tried to delete resource record set {key} but it was not found or values do not match")
+                del records[key]
+            elif action == 'CREATE':
+                if key in records:
+                    raise_error('InvalidChangeBatch', f"Tried to create resource record set {key} but it already exists")
+                records[key] = {**record_set, 'Name': key[0]}
+            else:
+                records[key] = {**record_set, 'Name': key[0]}
+
+        # Batches are applied atomically
+        self.records = records
+        change_id = f"/change/{self._aws.new_id('C').upper()}"
+        self.changes[change_id] = {
+            'submitted_at': self._aws.clock.now,
+            'insync_at': self._aws.clock.now + self._aws.timing.insync_delay_seconds
+        }
+        return {'ChangeInfo': self._change_info(change_id)}
+
+    def _change_info(self, change_id):
+        change = self.changes[change_id]
+        return {
+            'Id': change_id,
+            'Status': 'INSYNC' if self._aws.clock.now >= change['insync_at'] else 'PENDING',
+            'SubmittedAt': datetime.fromtimestamp(change['submitted_at'], timezone.utc)
+        }
+
+    def get_change(self, Id):
+        change_id = Id if Id.startswith('/change/') else f"/change/{Id}"
+        if change_id not in self.changes:
+            raise_error('NoSuchChange', f"Could not find resource with ID: {Id}")
+        return {'ChangeInfo': self._change_info(change_id)}
+
+
+class FakeSNS:
+    """Records published messages and enforces the SNS size limits."""
+
+    PAGINATION = {}
+    MAX_MESSAGE_BYTES = 262144
+    MAX_SUBJECT_LENGTH = 100
+
+    def __init__(self, aws):
+        self._aws = aws
+        self.messages = []
+
+    def publish(self, TopicArn=None, Message=None, Subject=None, **kwargs):
+        if Message is None:
+            raise_error('InvalidParameter', 'Message is required')
+        if len(Message.encode('utf-8')) > self.MAX_MESSAGE_BYTES:
+            raise_error('InvalidParameter', 'Invalid parameter: Message too long')
+        if Subject is not None and len(Subject) > self.MAX_SUBJECT_LENGTH:
+            raise_error('InvalidParameter', 'Invalid parameter: Subject')
+        message_id = self._aws.new_id('msg')
+        self.messages.append({
+            'topic_arn': TopicArn,
+            'subject': Subject,
+            'message': Message,
+            'message_id': message_id,
+            'published_at': self._aws.clock.now
+        })
+        return {'MessageId': message_id}
+
+
+class FakeStepFunctions:
+    """
+    Accepts start_execution for the simulated state machine and settles task
+    tokens issued by waitForTaskToken states.
+    """
+
+    PAGINATION = {}
+
+    def __init__(self, aws):
+        self._aws = aws
+        self.executions = {}
+        # Called with (execution_arn, input) when an execution starts
+        self.on_start = None
+
+    def start_execution(self, stateMachineArn, input='{}', name=None, **kwargs):
+        name = name or self._aws.new_id('exec')
+        execution_arn = f"{stateMachineArn.replace(':stateMachine:', ':execution:')}:{name}"
+        existing = self.executions.get(execution_arn)
+        if existing is not None:
+            # Only a running execution started with the same input is idempotent
+            if existing['input'] != input or existing['status'] != 'RUNNING':
+                raise_error('ExecutionAlreadyExists', f"Execution Already Exists: '{execution_arn}'")
+            return {'executionArn': execution_arn, 'startDate': existing['start_date']}
+
+        start_date = datetime.fromtimestamp(self._aws.clock.now, timezone.utc)
+        self.executions[execution_arn] = {
+            'input': input, 'start_date': start_date, 'name': name,
+            'state_machine_arn': stateMachineArn, 'status': 'RUNNING', 'output': None
+        }
+        if self.on_start:
+            self.on_start(execution_arn, json.loads(input))
+        return {'executionArn': execution_arn, 'startDate': start_date}
+
+    def finish_execution(self, execution_arn, status, output=None):
+        self.executions[execution_arn].update(status=status, output=output)
+
+    def describe_execution(self, executionArn):
+        execution = self.executions.get(executionArn)
+        if execution is None:
+            raise_error('ExecutionDoesNotExist', f"Execution Does Not Exist: '{executionArn}'")
+        response = {
+            'executionArn': executionArn,
+            'stateMachineArn': execution['state_machine_arn'],
+            'name': execution['name'],
+            'status': execution['status'],
+            'startDate': execution['start_date'],
+            'input': execution['input']
+        }
+        if execution['output'] is not None:
+            response['output'] = json.dumps(execution['output'])
+        return response
+
+    def list_executions(self, stateMachineArn, statusFilter=None, maxResults=100, nextToken=None, **kwargs):
+        matching = [
+            {'executionArn': arn, 'stateMachineArn': stateMachineArn, 'name': execution['name'],
+             'status': execution['status'], 'startDate': execution['start_date']}
+            for arn, execution in self.executions.items()
+            if execution['state_machine_arn'] == stateMachineArn
+            and (statusFilter is None or execution['status'] == statusFilter)
+        ]
+        # Newest first, like the real API
+        matching.reverse()
+        offset = int(nextToken or 0)
+        page = matching[offset:offset + maxResults]
+        response = {'executions': page}
+        if offset + maxResults < len(matching):
+            response['nextToken'] = str(offset + maxResults)
+        return response
+
+    def _settle(self, token, status, payload):
+        state = self._aws.scheduler.token_state(token)
+        if state is None:
+            raise_error('TaskDoesNotExist', 'Task does not exist anymore')
+        if not self._aws.scheduler.settle_token(token, status, payload):
+            raise_error('TaskTimedOut', 'Task Timed Out')
+        return {}
+
+    def send_task_success(self, taskToken, output):
+        return self._settle(taskToken, 'success', json.loads(output))
+
+    def send_task_failure(self, taskToken, error=None, cause=None):
+        return self._settle(taskToken, 'failure', {'Error': error, 'Cause': cause})
+
+
+class FakeDynamoDB:
+    """Hash-key tables with the item operations the DR Lambdas use."""
+
+    PAGINATION = {}
+
+    def __init__(self, aws):
+        self._aws = aws
+        self.tables = {}
+
+    def create_table(self, table_name, hash_key):
+        self.tables[table_name] = {'hash_key': hash_key, 'items': {}}
+
+    def _table(self, table_name):
+        if table_name not in self.tables:
+            raise_error('ResourceNotFoundException', f"Requested resource not found: Table: {table_name} not found")
+        return self.tables[table_name]
+
+    def _key(self, table, item):
+        value = item[table['hash_key']]
+        return next(iter(value.values()))
+
+    def put_item(self, TableName, Item, ConditionExpression=None, **kwargs):
+        table = self._table(TableName)
+        key = self._key(table, Item)
+        # Only the attribute_not_exists(<hash key>) guard the Lambdas use is modelled
+        if ConditionExpression and ConditionExpression.startswith('attribute_not_exists') and key in table['items']:
+            raise_error('ConditionalCheckFailedException', 'The conditional request failed')
+        table['items'][key] = copy.deepcopy(Item)
+        return {}
+
+    def get_item(self, TableName, Key, **kwargs):
+        table = self._table(TableName)
+        item = table['items'].get(self._key(table, Key))
+        return {'Item': item} if item else {}
+
+    def delete_item(self, TableName, Key, ReturnValues='NONE', **kwargs):
+        table = self._table(TableName)
+        item = table['items'].pop(self._key(table, Key), None)
+        return {'Attributes': item} if item and ReturnValues == 'ALL_OLD' else {}
+
+    def batch_get_item(self, RequestItems):
+        responses = {}
+        for table_name, request in RequestItems.items():
+            table = self._table(table_name)
+            responses[table_name] = [
+                table['items'][self._key(table, key)]
+                for key in request['Keys'] if self._key(table, key) in table['items']
+            ]
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def batch_write_item(self, RequestItems):
+        for table_name, requests in RequestItems.items():
+            table = self._table(table_name)
+            for request in requests:
+                if 'PutRequest' in request:
+                    item = request['PutRequest']['Item']
+                    table['items'][self._key(table, item)] = copy.deepcopy(item)
+                else:
+                    table['items'].pop(self._key(table, request['DeleteRequest']['Key']), None)
+        return {'UnprocessedItems': {}}
+
+
+class FakeCloudWatch:
+    """Serves the ReplicaLag series of each replica in the RDS fake, up to EndTime."""
+
+    PAGINATION = {}
+
+    def __init__(self, aws):
+        self._aws = aws
+
+    def get_metric_data(self, MetricDataQueries, StartTime, EndTime, **kwargs):
+        results = []
+        for query in MetricDataQueries:
+            stat = query['MetricStat']
+            dimensions = {dimension['Name']: dimension['Value'] for dimension in stat['Metric']['Dimensions']}
+            instance_id = dimensions.get('DBInstanceIdentifier')
+
+            timestamps, values = [], []
+            if instance_id in self._aws.rds.instances and stat['Metric']['MetricName'] == 'ReplicaLag':
+                # A window ending in the future (datetime.now is not on the simulated clock)
+                # keeps its width but ends at the simulated now
+                end = min(EndTime, datetime.fromtimestamp(self._aws.clock.now, timezone.utc))
+                points = int((EndTime - StartTime).total_seconds() // stat['Period'])
+                timestamps = [end - timedelta(seconds=stat['Period'] * index) for index in reversed(range(points))]
+                values = [self._aws.rds.lag_at(instance_id, timestamp.timestamp()) for timestamp in timestamps]
+
+            results.append({
+                'Id': query['Id'],
+                'Label': 'ReplicaLag',
+                'Timestamps': timestamps,
+                'Values': values,
+                'StatusCode': 'Complete'
+            })
+        return {'MetricDataResults': results}
+
+
+class FakeAWS:
+    """
+    The simulated account: service backends sharing one clock, random source
+    and scheduler, plus counters for the benchmark report.
+    """
+
+    def __init__(self, clock, timing, random, scheduler, region='eu-west-1'):
+        self.clock = clock
+        self.timing = timing
+        self.random = random
+        self.scheduler = scheduler
+        self.region = region
+        self._ids = itertools.count(1)
+
+        self.rds = FakeRDS(self)
+        self.route53 = FakeRoute53(self)
+        self.sns = FakeSNS(self)
+        self.stepfunctions = FakeStepFunctions(self)
+        self.dynamodb = FakeDynamoDB(self)
+        self.cloudwatch = FakeCloudWatch(self)
+        self.backends = {
+            'rds': self.rds,
+            'route53': self.route53,
+            'sns': self.sns,
+            'stepfunctions': self.stepfunctions,
+            'dynamodb': self.dynamodb,
+            'cloudwatch': self.cloudwatch
+        }
+
+        self.calls = {}
+        self.retries = 0
+        self.retries_by_operation = {}
+        self.throttles = 0
+        self.errors = 0
+        # Counters are updated from the threads of the Lambdas under test
+        self._counter_lock = threading.Lock()
+        # EventBridge targets: callables receiving every published event
+        self.event_targets = []
+
+    def session(self):
+        return FakeSession(self)
+
+    def new_id(self, prefix):
+        return f"{prefix}-{next(self._ids):06d}"
+
+    def record_call(self, service_name, operation):
+        key = f"{service_name}.{operation}"
+        with self._counter_lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+
+    def record_retry(self, service_name, operation):
+        key = f"{service_name}.{operation}"
+        with self._counter_lock:
+            self.retries += 1
+            self.retries_by_operation[key] = self.retries_by_operation.get(key, 0) + 1
+
+    def record_throttle(self):
+        with self._counter_lock:
+            self.throttles += 1
+
+    def record_error(self):
+        with self._counter_lock:
+            self.errors += 1
+
+    def publish_event(self, at, event):
+        """Deliver an EventBridge event to every target at the given simulated time."""
+        def deliver():
+            logger.debug(f"Delivering {event['detail-type']} for {event['detail'].get('SourceIdentifier')}")
+            for target in self.event_targets:
+                target(event)
+        self.scheduler.call_at(at, deliver)
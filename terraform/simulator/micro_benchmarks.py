@@ -0,0 +1,497 @@
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import ExitStack, contextmanager, redirect_stdout
+from datetime import datetime, timezone
+from unittest import mock
+
+from fake_aws import FakeAWS, Scheduler, TimingModel, VirtualClock, WallClock
+from state_machine import load_lambda_handlers
+
+
+SIMULATOR_DIR = os.path.dirname(os.path.abspath(__file__))
+TERRAFORM_DIR = os.path.dirname(SIMULATOR_DIR)
+LAMBDA_DIR = os.path.join(TERRAFORM_DIR, 'lambda_functions')
+SNAPSHOT_LAMBDA_DIR = os.path.join(os.path.dirname(TERRAFORM_DIR), 'snapshot-resources', 'modules', 'lambda',
+                                   'lambda_functions')
+# Terraform files whose aws_lambda_function resources the cold-start benchmark imports
+HANDLER_FILES = [
+    os.path.join(TERRAFORM_DIR, 'lambda.tf'),
+    os.path.join(TERRAFORM_DIR, 'readiness.tf'),
+    os.path.join(TERRAFORM_DIR, 'detector.tf'),
+    os.path.join(os.path.dirname(SNAPSHOT_LAMBDA_DIR), 'main.tf')
+]
+
+REGION = 'eu-west-1'
+INSTANCE_ID = 'primary-db'
+# 2026-01-01T00:00:00Z, as in simulate_failover
+SIMULATION_START = 1767225600.0
+# The snapshot Lambdas name snapshots <prefix>-<instance>-<timestamp>
+SNAPSHOT_TIMESTAMP_FORMAT = '%Y-%m-%d-%H-%M-%S'
+# Variables some handlers read at import time
+COLD_START_ENVIRONMENT = {
+    'AWS_DEFAULT_REGION': REGION,
+    'METRICS_ENABLED': 'false',
+    'READ_REPLICA_ID': 'dr-replica-001',
+    'STEP_FUNCTION_ARN': f"arn:aws:states:{REGION}:000000000000:stateMachine:rds-disaster-recovery-workflow",
+    'PROMOTION_WAITER_TABLE': 'dr-promotion-waiters',
+    'SNS_TOPIC_ARN': f"arn:aws:sns:{REGION}:000000000000:dr-notifications",
+    'SUCCESS_SNS_TOPIC_ARN': f"arn:aws:sns:{REGION}:000000000000:dr-promotion-success"
+}
+# Run in a fresh interpreter per handler, as in a new Lambda execution environment
+COLD_START_SCRIPT = '''
+import importlib, json, sys, time
+module_name, paths, region = sys.argv[1], json.loads(sys.argv[2]), sys.argv[3]
+sys.path[:0] = paths
+started = time.perf_counter()
+importlib.import_module(module_name)
+result = {
+    'import_ms': round((time.perf_counter() - started) * 1000, 2),
+    'sdk_imported_at_init': [name for name in ('boto3', 'botocore') if name in sys.modules],
+    'first_client_ms': None
+}
+try:
+    import boto3
+except ImportError:
+    pass
+else:
+    import dr_common
+    started = time.perf_counter()
+    dr_common.get_client('rds', region_name=region)
+    result['first_client_ms'] = round((time.perf_counter() - started) * 1000, 2)
+print(json.dumps(result))
+'''
+
+
+def fake_account(timing=None, seed=0, clock=None):
+    clock = clock or VirtualClock(SIMULATION_START)
+    return FakeAWS(clock, TimingModel(**(timing or {})), random.Random(seed), Scheduler(clock), region=REGION)
+
+def fresh_modules():
+    """Drop previously imported Lambda modules so each benchmark imports them cold."""
+    for directory in (SNAPSHOT_LAMBDA_DIR, LAMBDA_DIR):
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+    directories = {LAMBDA_DIR, SNAPSHOT_LAMBDA_DIR}
+    for name, module in list(sys.modules.items()):
+        if os.path.dirname(os.path.abspath(getattr(module, '__file__', None) or '')) in directories:
+            del sys.modules[name]
+
+@contextmanager
+def lambda_environment(aws, environment=None):
+    """Fresh Lambda modules with the given environment, clients from the fakes and the fake account's clock."""
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.dict(os.environ, {
+            'AWS_DEFAULT_REGION': REGION,
+            'METRICS_ENABLED': 'false',
+            **(environment or {})
+        }))
+        stack.enter_context(mock.patch.object(time, 'time', aws.clock.time))
+        stack.enter_context(mock.patch.object(time, 'sleep', aws.clock.sleep))
+        # Some handlers print their progress; keep the report readable
+        stack.enter_context(redirect_stdout(io.StringIO()))
+        fresh_modules()
+        import dr_common
+        dr_common.use_session(aws.session())
+        yield
+
+def snapshot_id(prefix, created_at):
+    return f"{prefix}-{INSTANCE_ID}-{datetime.fromtimestamp(created_at, timezone.utc).strftime(SNAPSHOT_TIMESTAMP_FORMAT)}"
+
+def api_report(aws):
+    return {
+        'api_calls': sum(aws.calls.values()),
+        'api_retries': aws.retries,
+        'throttles': aws.throttles,
+        'api_errors': aws.errors,
+        'api_calls_by_operation': dict(sorted(aws.calls.items()))
+    }
+
+
+def bench_snapshot_discovery(snapshots=10000, other_snapshots=2000):
+    """
+    find_latest_snapshot over snapshots of the protected instance, oldest
+    listed first so the newest one is on the last page, next to snapshots of
+    another instance and a newer snapshot that is still being created.
+    """
+    aws = fake_account()
+    prefix = 'dr-snapshot'
+    newest_at = SIMULATION_START - 3600
+    for index in range(snapshots):
+        created_at = newest_at - index * 300
+        aws.rds.add_snapshot(snapshot_id(prefix, created_at), INSTANCE_ID, created_at)
+    for index in range(other_snapshots):
+        aws.rds.add_snapshot(f"{prefix}-other-db-{index:06d}", 'other-db', newest_at + index)
+    aws.rds.add_snapshot(snapshot_id(prefix, newest_at + 300), INSTANCE_ID, newest_at + 300, status='creating')
+
+    with lambda_environment(aws):
+        import dr_common
+        from snapshot_discovery import SNAPSHOT_PAGE_SIZE, find_latest_snapshot
+
+        started = aws.clock.now
+        latest = find_latest_snapshot(dr_common.get_client('rds', region_name=REGION), INSTANCE_ID,
+                                      prefix=f"{prefix}-{INSTANCE_ID}")
+
+    pages = -(-(snapshots + 1) // SNAPSHOT_PAGE_SIZE)
+    return {
+        **api_report(aws),
+        'seconds': round(aws.clock.now - started, 2),
+        'details': f"{snapshots} snapshots in {aws.calls.get('rds.DescribeDBSnapshots', 0)} pages",
+        'checks': {
+            'newest available snapshot found': bool(latest) and latest['DBSnapshotIdentifier'] == snapshot_id(prefix, newest_at),
+            'other instances filtered server-side': aws.calls.get('rds.DescribeDBSnapshots') == pages
+        }
+    }
+
+def seed_cleaner_snapshots(aws, per_type, untagged):
+    """
+    per_type base and replica snapshots of the instance, one every 5 minutes.
+    Base snapshots predate tagging and have an empty TagList; the newest
+    untagged base snapshots were named by hand, so only their tags (which the
+    describe response leaves out) tell what they are.
+    """
+    newest_at = SIMULATION_START - 3600
+    for index in range(per_type):
+        created_at = newest_at - index * 300
+        aws.rds.add_snapshot(snapshot_id('snapshot', created_at), INSTANCE_ID, created_at, tags={})
+        aws.rds.add_snapshot(snapshot_id('dr-snapshot', created_at), INSTANCE_ID, created_at,
+                             tags={'SnapshotType': 'replica'})
+    for index in range(untagged):
+        aws.rds.add_snapshot(f"snapshot-{INSTANCE_ID}-manual-{index:04d}", INSTANCE_ID, newest_at - 30 - index,
+                             tags={'SnapshotType': 'base'}, describe_tags=False)
+    return snapshot_id('snapshot', newest_at), snapshot_id('dr-snapshot', newest_at)
+
+def run_cleaner(aws):
+    """Invoke snapshot_cleaner for the copy-finished event; both regions share the fake RDS."""
+    with lambda_environment(aws, {
+        'PRIMARY_REGION': 'eu-central-1',
+        'DR_REGION': REGION,
+        'RDS_INSTANCE_ID': INSTANCE_ID
+    }):
+        import snapshot_cleaner
+        started = aws.clock.now
+        result = snapshot_cleaner.lambda_handler({'detail': {'EventID': 'RDS-EVENT-0060'}}, None)
+    return result['summary'], aws.clock.now - started
+
+def bench_snapshot_cleaner(per_type=200, untagged=20):
+    """snapshot_cleaner keeping the newest of each type and deleting the rest."""
+    aws = fake_account()
+    newest_base, newest_replica = seed_cleaner_snapshots(aws, per_type, untagged)
+    summaries, seconds = run_cleaner(aws)
+
+    deleted = sum(len(summary['deleted']) for summary in summaries)
+    tag_lookups = aws.calls.get('rds.ListTagsForResource', 0)
+    return {
+        **api_report(aws),
+        'seconds': round(seconds, 2),
+        'details': f"{deleted} deleted, {tag_lookups} tag lookups, "
+                   f"{aws.calls.get('rds.DescribeDBSnapshots', 0)} describe pages",
+        'checks': {
+            'newest of each type kept': sorted(aws.rds.snapshots) == sorted([newest_base, newest_replica]),
+            'tags fetched only when describe left them out': tag_lookups == untagged
+        }
+    }
+
+def bench_snapshot_cleaner_throttled(per_type=200, untagged=20, throttle_rate=0.2):
+    """
+    The same clean with a fifth of all API attempts throttled. delete_snapshot
+    owns the retries of deletes, so the client must not retry them as well,
+    and it only backs off between attempts.
+    """
+    aws = fake_account({'throttle_rate': throttle_rate})
+    seed_cleaner_snapshots(aws, per_type, untagged)
+    backoffs = []
+    aws.clock.sleep = lambda seconds: (backoffs.append(seconds), aws.clock.advance(seconds))
+    summaries, seconds = run_cleaner(aws)
+
+    deleted = sum(len(summary['deleted']) for summary in summaries)
+    failed = sum(len(summary['failed']) for summary in summaries)
+    retries = sum(summary['retries'] for summary in summaries)
+    return {
+        **api_report(aws),
+        'seconds': round(seconds, 2),
+        'details': f"{deleted} deleted, {failed} failed, {aws.calls.get('rds.DeleteDBSnapshot', 0)} delete attempts, "
+                   f"{retries} retried, {round(sum(backoffs), 1)}s backoff",
+        'checks': {
+            'deletes not retried by the client': not aws.retries_by_operation.get('rds.DeleteDBSnapshot'),
+            'backoff only between attempts': len(backoffs) == retries,
+            'every old snapshot deleted or failed': deleted + failed == 2 * per_type + untagged - 2
+        }
+    }
+
+def run_promote_read_replica(fast_path):
+    """
+    One promote_read_replica run on the wall clock with a scaled-down timing
+    model. Returns the handler result and the fake account.
+    """
+    aws = fake_account({
+        'api_latency_seconds': 0.2,
+        'promotion_seconds': 2.0,
+        'promotion_jitter': 0.0,
+        'insync_delay_seconds': 0.0,
+        'rds_event_delay_seconds': None
+    }, clock=WallClock())
+    replica_id = 'dr-replica-001'
+    record_name = 'db001.myapp.internal'
+    aws.rds.add_instance(replica_id, source_id='arn:aws:rds:eu-central-1:000000000000:db:primary-001')
+    aws.route53.add_failover_record(record_name, 'primary-001.eu-central-1.rds.amazonaws.com',
+                                    aws.rds.endpoint(replica_id))
+
+    polling = {'MIN_INTERVAL': '0.05', 'INITIAL_INTERVAL': '0.05', 'MAX_INTERVAL': '0.05'}
+    with lambda_environment(aws, {
+        'READ_REPLICA_ID': replica_id,
+        'ROUTE53_ZONE_ID': 'ZSIMULATEDZONE',
+        'ROUTE53_RECORD_NAME': record_name,
+        'SNS_TOPIC_ARN': f"arn:aws:sns:{REGION}:000000000000:dr-notifications",
+        'SUCCESS_SNS_TOPIC_ARN': f"arn:aws:sns:{REGION}:000000000000:dr-promotion-success",
+        'FAILOVER_FAST_PATH': str(fast_path).lower(),
+        **{f"PROMOTION_POLL_{name}": value for name, value in polling.items()},
+        **{f"DNS_CHANGE_POLL_{name}": value for name, value in polling.items()}
+    }):
+        import promote_read_replica
+        result = promote_read_replica.lambda_handler({}, None)
+    return result, aws
+
+def bench_promote_fast_path():
+    """
+    promote_read_replica with and without FAILOVER_FAST_PATH, timed in real
+    seconds from promotion completing to the DNS change being INSYNC. The fast
+    path has the change batch ready, so it should save the record lookup.
+    """
+    timings = {}
+    for fast_path in (False, True):
+        result, aws = run_promote_read_replica(fast_path)
+        timings[fast_path] = round(result['timings']['dns_insync_seconds'] - result['timings']['promotion_seconds'], 2)
+
+    return {
+        **api_report(aws),
+        'seconds': timings[True],
+        'details': f"promotion to INSYNC {timings[True]}s with the fast path, {timings[False]}s without "
+                   f"({aws.timing.api_latency_seconds}s per API call)",
+        'checks': {
+            'DNS in sync at least one API call sooner': timings[False] - timings[True] >= aws.timing.api_latency_seconds * 0.8,
+            'promoted record points at the replica': aws.route53.resolve('db001.myapp.internal') == result['promoted_endpoint']
+        }
+    }
+
+# Promotion phases in order, with their mean seconds, each drawn within +/- POLLING_JITTER
+PROMOTION_PHASES = [('modifying', 60.0), ('rebooting', 180.0)]
+POLLING_JITTER = 0.2
+
+def promotion_sequences(runs, seed=0):
+    rng = random.Random(seed)
+    return [[(status, seconds * rng.uniform(1 - POLLING_JITTER, 1 + POLLING_JITTER))
+             for status, seconds in PROMOTION_PHASES] for _ in range(runs)]
+
+def poll_promotion(adaptive_polling, policy, phases):
+    """
+    Poll one modifying -> rebooting -> available sequence on a virtual clock.
+    Returns (seconds from available to detection, checks, phase history).
+    """
+    clock = VirtualClock(0.0)
+    available_at = sum(seconds for _, seconds in phases)
+    checks = []
+
+    def check():
+        checks.append(clock.time())
+        elapsed = 0.0
+        for status, seconds in phases:
+            elapsed += seconds
+            if clock.time() < elapsed:
+                return status, False, None
+        return 'available', True, None
+
+    _, history = adaptive_polling.poll(check, policy, sleep=clock.sleep, clock=clock.time)
+    return clock.time() - available_at, len(checks), history
+
+def bench_adaptive_polling(runs=50):
+    """
+    adaptive_polling.poll over simulated promotions against fixed 30 and 60
+    second polling. The adaptive policy of each run is tuned with the median
+    phase durations of the runs before it, as fed back from phase_history.
+    """
+    fresh_modules()
+    import adaptive_polling
+
+    def fixed(interval):
+        return lambda histories: adaptive_polling.AdaptivePollingPolicy(
+            min_interval=interval, initial_interval=interval, max_interval=interval,
+            multiplier=1.0, deadline_seconds=3600)
+
+    def untuned(histories):
+        return adaptive_polling.AdaptivePollingPolicy(deadline_seconds=3600)
+
+    def tuned(histories):
+        expected = {status: statistics.median(history[status] for history in histories)
+                    for status, _ in PROMOTION_PHASES if histories}
+        return adaptive_polling.AdaptivePollingPolicy(deadline_seconds=3600, expected_durations=expected)
+
+    sequences = promotion_sequences(runs)
+    results = {}
+    for name, policy_for in (('tuned', tuned), ('untuned', untuned), ('fixed-30s', fixed(30)), ('fixed-60s', fixed(60))):
+        latencies, checks, histories = [], 0, []
+        for phases in sequences:
+            latency, run_checks, history = poll_promotion(adaptive_polling, policy_for(histories), phases)
+            latencies.append(latency)
+            checks += run_checks
+            histories.append(history)
+        results[name] = {'mean_latency': round(statistics.mean(latencies), 1), 'checks': checks}
+
+    return {
+        'api_calls': results['tuned']['checks'],
+        'api_retries': 0,
+        'seconds': results['tuned']['mean_latency'],
+        'details': ', '.join(f"{name} {result['mean_latency']}s/{result['checks'] / runs:.1f} checks"
+                             for name, result in results.items()) + f" (mean detection latency over {runs} promotions)",
+        'results': results,
+        'checks': {
+            'tuned adaptive detects sooner than fixed 30s polling': results['tuned']['mean_latency'] < results['fixed-30s']['mean_latency'],
+            'tuned adaptive detects sooner than fixed 60s polling': results['tuned']['mean_latency'] < results['fixed-60s']['mean_latency']
+        }
+    }
+
+def cold_start(module_name):
+    completed = subprocess.run(
+        [sys.executable, '-c', COLD_START_SCRIPT, module_name, json.dumps([SNAPSHOT_LAMBDA_DIR, LAMBDA_DIR]), REGION],
+        env={**os.environ, **COLD_START_ENVIRONMENT}, capture_output=True, text=True)
+    if completed.returncode:
+        return {'handler': module_name, 'error': completed.stderr.strip().splitlines()[-1]}
+    return {'handler': module_name, **json.loads(completed.stdout)}
+
+def bench_cold_start():
+    """
+    Import every deployed handler in a fresh interpreter, timing module init
+    and, when boto3 is installed, the first client from dr_common. boto3 and
+    botocore must not be imported until a handler makes its first call.
+    """
+    modules = sorted(set(load_lambda_handlers(HANDLER_FILES).values()))
+    handlers = [cold_start(module_name) for module_name in modules]
+    imported = [handler for handler in handlers if 'error' not in handler]
+    slowest = max(imported, key=lambda handler: handler['import_ms'], default=None)
+    first_client = [handler['first_client_ms'] for handler in imported if handler['first_client_ms'] is not None]
+
+    details = f"{len(imported)}/{len(handlers)} handlers imported"
+    if slowest:
+        details += f", slowest {slowest['handler']} {slowest['import_ms']}ms"
+    details += f", first client {max(first_client)}ms" if first_client else ', first client not measured without boto3'
+    return {
+        'api_calls': 0,
+        'api_retries': 0,
+        'seconds': round(sum(handler['import_ms'] for handler in imported) / 1000, 2),
+        'details': details,
+        'handlers': handlers,
+        'checks': {
+            'every handler imports': len(imported) == len(handlers),
+            'boto3 and botocore deferred to the first call': not any(handler['sdk_imported_at_init'] for handler in imported)
+        }
+    }
+
+
+BENCHMARKS = {
+    'snapshot-discovery': {
+        'description': 'Newest DR snapshot among 10,000 of the instance, on the last page',
+        'run': bench_snapshot_discovery,
+        'deterministic': True
+    },
+    'snapshot-cleaner': {
+        'description': 'Cleaner over 200 base and 200 replica snapshots, 20 with tags only from ListTagsForResource',
+        'run': bench_snapshot_cleaner,
+        'deterministic': True
+    },
+    'snapshot-cleaner-throttled': {
+        'description': 'The same clean with a fifth of all API attempts throttled',
+        'run': bench_snapshot_cleaner_throttled,
+        # Thread scheduling decides which attempts are throttled
+        'deterministic': False
+    },
+    'promote-fast-path': {
+        'description': 'promote_read_replica from promotion to INSYNC with and without FAILOVER_FAST_PATH (real time)',
+        'run': bench_promote_fast_path,
+        # Polls run on the wall clock
+        'deterministic': False
+    },
+    'adaptive-polling': {
+        'description': 'Mean detection latency of adaptive polling over 50 simulated promotions against fixed 30s and 60s polling',
+        'run': bench_adaptive_polling,
+        'deterministic': True
+    },
+    'cold-start': {
+        'description': 'Init time of every deployed handler in a fresh interpreter; boto3 must load lazily (real time)',
+        'run': bench_cold_start,
+        'deterministic': False
+    }
+}
+
+
+def format_report(name, report):
+    failed = [check for check, ok in report['checks'].items() if not ok]
+    line = (f"{'FAIL' if failed else 'PASS'}  {name:28} api_calls={report['api_calls']:<6} "
+            f"retries={report['api_retries']:<5} time={report['seconds']}s  {report['details']}")
+    return line + ''.join(f"\n      check failed: {check}" for check in failed)
+
+def regressions(reports, baseline, tolerance):
+    """Deterministic benchmarks whose API calls grew by more than the tolerance."""
+    previous = {report['benchmark']: report for report in baseline}
+    found = []
+    for report in reports:
+        before = previous.get(report['benchmark'])
+        if not before or not BENCHMARKS[report['benchmark']]['deterministic']:
+            continue
+        if before['api_calls'] and report['api_calls'] > before['api_calls'] * (1 + tolerance):
+            found.append(f"{report['benchmark']}: api_calls {before['api_calls']} -> {report['api_calls']}")
+    return found
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Run the DR and snapshot Lambdas against the fake AWS services and report '
+                    'API calls, retries and time per benchmark. Times are simulated at the '
+                    'modelled API latency and summed across threads, unless the benchmark '
+                    'says otherwise.')
+    parser.add_argument('benchmarks', nargs='*', help='Benchmarks to run (default: all)')
+    parser.add_argument('--list', action='store_true', help='List the benchmarks and exit')
+    parser.add_argument('--output', help='Write the reports as JSON to this file')
+    parser.add_argument('--baseline', help='Compare API calls with reports previously written by --output')
+    parser.add_argument('--tolerance', type=float, default=0.05,
+                        help='Relative growth tolerated against the baseline before exiting non-zero')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, benchmark in BENCHMARKS.items():
+            print(f"{name:28} {benchmark['description']}")
+        return 0
+
+    logging.getLogger().setLevel(logging.CRITICAL)
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {unknown}")
+
+    reports = []
+    for name in args.benchmarks or list(BENCHMARKS):
+        report = {'benchmark': name, **BENCHMARKS[name]['run']()}
+        reports.append(report)
+        print(format_report(name, report))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+    failures = [report for report in reports if not all(report['checks'].values())]
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(reports, json.load(f), args.tolerance)
+        if found:
+            print('\nRegressions against the baseline:')
+            print('\n'.join(f"• {line}" for line in found))
+            return 1
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
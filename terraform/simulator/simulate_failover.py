@@ -0,0 +1,482 @@
+import argparse
+import importlib
+import json
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from fake_aws import FakeAWS, Scheduler, TimingModel, VirtualClock
+from state_machine import load_lambda_handlers, load_state_machine_definition, load_variable_defaults, StateMachine
+
+
+logger = logging.getLogger(__name__)
+
+
+SIMULATOR_DIR = os.path.dirname(os.path.abspath(__file__))
+TERRAFORM_DIR = os.path.dirname(SIMULATOR_DIR)
+LAMBDA_DIR = os.path.join(TERRAFORM_DIR, 'lambda_functions')
+
+REGION = 'eu-west-1'
+ZONE_ID = 'ZSIMULATEDZONE'
+STATE_MACHINE_ARN = f"arn:aws:states:{REGION}:000000000000:stateMachine:rds-disaster-recovery-workflow"
+WAITER_TABLE = 'dr-promotion-waiters'
+READINESS_TABLE = 'dr-replica-readiness'
+LEDGER_TABLE = 'dr-notification-ledger'
+
+# 2026-01-01T00:00:00Z; the alarm fires a minute in so a pre-flight snapshot can run first
+SIMULATION_START = 1767225600.0
+ALARM_OFFSET_SECONDS = 60.0
+PREFLIGHT_OFFSET_SECONDS = 30.0
+# Executions still running after this are reported as TIMED_OUT
+MAX_SIMULATED_SECONDS = 6 * 3600
+
+SCENARIOS = {
+    'baseline': {
+        'description': 'One replica; the RDS event resumes the workflow',
+        'databases': 1
+    },
+    'event-lost': {
+        'description': 'The RDS event never arrives; each short callback timeout checks the status and waits again',
+        'databases': 1,
+        'timing': {'rds_event_delay_seconds': None}
+    },
+    'slow-dns': {
+        'description': 'Route 53 takes two minutes to report INSYNC',
+        'databases': 1,
+        'timing': {'insync_delay_seconds': 120.0}
+    },
+    'fleet': {
+        'description': '25 replicas through the Map with the default MaxConcurrency',
+        'databases': 25
+    },
+    'throttled-fleet': {
+        'description': '25 replicas with a fifth of all API attempts throttled',
+        'databases': 25,
+        'timing': {'throttle_rate': 0.2}
+    },
+    'lagging-replica': {
+        'description': 'Three replicas, one over the enforced RPO lag gate and skipped',
+        'databases': 3,
+        'lagging_replicas': 1,
+        'variables': {'rpo_gate_mode': 'enforce'}
+    },
+    'late-alarm': {
+        'description': 'The alarm reaches the orchestrator 5 minutes late; lag grown since must not trip the enforced RPO gate',
+        'databases': 3,
+        'alarm_deliveries': [(300, 1)],
+        'variables': {'rpo_gate_mode': 'enforce'}
+    },
+    'retry-in-window': {
+        'description': 'Replicas are backing up when the alarm fires; a redelivery 5 minutes later must start a new execution',
+        'databases': 1,
+        'replica_busy_seconds': 120,
+        'alarm_deliveries': [(0, 1), (300, 1)]
+    },
+    'preflight-snapshot': {
+        'description': '10 replicas with readiness read from the scheduled pre-flight snapshot',
+        'databases': 10,
+        'preflight': True
+    },
+    'alarm-storm': {
+        'description': 'Three alarm deliveries, one batching two records; one failover must start',
+        'databases': 3,
+        # (seconds after the first delivery, alarm records in the delivery)
+        'alarm_deliveries': [(0, 2), (20, 1), (240, 1)]
+    }
+}
+
+
+class LambdaRuntime:
+    """
+    Runs the handler modules in-process on the simulated clock. Payloads and
+    results go through JSON like a real invocation, and every invocation is
+    metered with cold starts and overhead from the timing model.
+    """
+
+    def __init__(self, aws, handlers):
+        self.aws = aws
+        self.handlers = handlers
+        self.modules = {}
+        self.stats = {}
+        # (function_name, error) of failed event invocations, which nothing else sees
+        self.async_errors = []
+
+    def load(self):
+        for function_name, module_name in self.handlers.items():
+            self.modules[function_name] = importlib.import_module(module_name)
+
+    def function_for(self, module_name):
+        return next(name for name, module in self.handlers.items() if module == module_name)
+
+    def invoke(self, function_name, payload):
+        clock = self.aws.clock
+        timing = self.aws.timing
+        stats = self.stats.setdefault(function_name, {
+            'invocations': 0,
+            'errors': 0,
+            'cold_starts': 0,
+            'seconds': 0.0
+        })
+
+        started = clock.now
+        if stats['invocations'] == 0:
+            stats['cold_starts'] += 1
+            clock.advance(timing.cold_start_seconds)
+        clock.advance(timing.invoke_overhead_seconds)
+        stats['invocations'] += 1
+
+        context = SimpleNamespace(
+            function_name=function_name,
+            aws_request_id=str(uuid.UUID(int=self.aws.random.getrandbits(128))),
+            memory_limit_in_mb=128,
+            get_remaining_time_in_millis=lambda: 900000
+        )
+        try:
+            result = self.modules[function_name].lambda_handler(json.loads(json.dumps(payload)), context)
+            # Lambda rejects results that are not JSON serialisable
+            return json.loads(json.dumps(result))
+        except Exception:
+            stats['errors'] += 1
+            raise
+        finally:
+            stats['seconds'] += clock.now - started
+
+    def invoke_async(self, function_name, payload):
+        """Event invocations (SNS, EventBridge): errors are recorded, not raised."""
+        try:
+            self.invoke(function_name, payload)
+        except Exception as e:
+            logger.warning(f"Asynchronous invocation of {function_name} failed: {e}")
+            self.async_errors.append((function_name, f"{type(e).__name__}: {e}"))
+
+
+def seed_databases(aws, count, lagging_replicas=0):
+    """Create the replicas and their failover record pairs; returns the DR_DATABASES list."""
+    databases = []
+    for index in range(1, count + 1):
+        replica_id = f"dr-replica-{index:03d}"
+        record_name = f"db{index:03d}.myapp.internal"
+        source_arn = f"arn:aws:rds:eu-central-1:000000000000:db:primary-{index:03d}"
+
+        aws.rds.add_instance(replica_id, source_id=source_arn,
+                             lag_seconds=3600.0 if index <= lagging_replicas else None)
+        aws.route53.add_failover_record(record_name, f"primary-{index:03d}.eu-central-1.rds.amazonaws.com",
+                                        aws.rds.endpoint(replica_id))
+        databases.append({'read_replica_id': replica_id, 'record_name': record_name})
+
+    aws.dynamodb.create_table(WAITER_TABLE, 'read_replica_id')
+    aws.dynamodb.create_table(READINESS_TABLE, 'read_replica_id')
+    aws.dynamodb.create_table(LEDGER_TABLE, 'notification_key')
+    return databases
+
+def lambda_environment(databases, variables):
+    """The union of the environment variables lambda.tf and readiness.tf set."""
+    return {
+        'AWS_DEFAULT_REGION': REGION,
+        'READ_REPLICA_ID': databases[0]['read_replica_id'],
+        'ROUTE53_ZONE_ID': ZONE_ID,
+        'ROUTE53_RECORD_NAME': databases[0]['record_name'],
+        'DR_DATABASES': json.dumps(databases),
+        'STEP_FUNCTION_ARN': STATE_MACHINE_ARN,
+        'SNS_TOPIC_ARN': f"arn:aws:sns:{REGION}:000000000000:dr-notifications",
+        'SUCCESS_SNS_TOPIC_ARN': f"arn:aws:sns:{REGION}:000000000000:dr-promotion-success",
+        'PROMOTION_WAITER_TABLE': WAITER_TABLE,
+        'READINESS_STORE': 'dynamodb',
+        'READINESS_TABLE': READINESS_TABLE,
+        'NOTIFICATION_LEDGER_TABLE': LEDGER_TABLE,
+        'READINESS_MAX_AGE_SECONDS': str(variables['readiness_max_age_seconds']),
+        'RPO_MAX_LAG_SECONDS': str(variables['rpo_max_lag_seconds']),
+        'RPO_GATE_MODE': variables['rpo_gate_mode'],
+        'DB_PROBE_SECRET_ARN': '',
+        'METRICS_ENABLED': 'false'
+    }
+
+def fake_probes(aws):
+    """Stand-ins for the network probes in VerifyDNSUpdate, answered from the fakes."""
+
+    def run_verification(record_name, endpoint, port, **kwargs):
+        aws.clock.advance(aws.timing.probe_seconds / 2)
+        resolved = aws.route53.resolve(record_name)
+        reachable = aws.rds.instance_for_endpoint(endpoint) is not None
+        return {
+            'record_addresses': [resolved] if resolved else [],
+            'endpoint_addresses': [endpoint],
+            'resolution_match': resolved == endpoint,
+            'probes': [{'address': endpoint, 'port': port, 'reachable': reachable,
+                        'latency_ms': 1.0 if reachable else None, 'attempts': 1}],
+            'connectivity_verified': reachable,
+            'duration_ms': aws.timing.probe_seconds * 500
+        }
+
+    def probe_readiness(host, port, user=None, password=None, **kwargs):
+        aws.clock.advance(aws.timing.probe_seconds / 2)
+        instance_id = aws.rds.instance_for_endpoint(host)
+        promoted = bool(instance_id) and aws.rds.is_promoted(instance_id)
+        return {
+            'host': host,
+            'port': port,
+            'checked_writes': bool(user and password),
+            'ready': promoted,
+            'handshake_ok': instance_id is not None,
+            'in_recovery': not promoted,
+            'attempts': 1
+        }
+
+    return run_verification, probe_readiness
+
+def fresh_lambda_modules():
+    """
+    Drop previously imported Lambda modules so each scenario starts cold and
+    reads its own environment at import time, like a new deployment.
+    """
+    if LAMBDA_DIR not in sys.path:
+        sys.path.insert(0, LAMBDA_DIR)
+    for name, module in list(sys.modules.items()):
+        if os.path.dirname(os.path.abspath(getattr(module, '__file__', None) or '')) == LAMBDA_DIR:
+            del sys.modules[name]
+
+def alarm_event(alarm_time, records=1):
+    state_change_time = datetime.fromtimestamp(alarm_time, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + '+0000'
+    return {'Records': [{
+        'EventSource': 'aws:sns',
+        'Sns': {'Message': json.dumps({
+            'AlarmName': 'rds-primary-unavailable' if index == 0 else f'rds-primary-unavailable-{index}',
+            'NewStateValue': 'ALARM',
+            'AlarmDescription': 'Simulated primary failure',
+            'NewStateReason': 'Threshold crossed',
+            'StateChangeTime': state_change_time
+        })}
+    } for index in range(records)]}
+
+def run_scenario(name, scenario, seed=0):
+    """Simulate one alarm-to-notification failover and return its benchmark report."""
+    clock = VirtualClock(SIMULATION_START)
+    scheduler = Scheduler(clock)
+    timing = TimingModel(**scenario.get('timing', {}))
+    aws = FakeAWS(clock, timing, random.Random(seed), scheduler, region=REGION)
+
+    variables = {**load_variable_defaults(os.path.join(TERRAFORM_DIR, 'variables.tf')), **scenario.get('variables', {})}
+    definition = load_state_machine_definition(os.path.join(TERRAFORM_DIR, 'stepfunction.tf'), variables)
+    handlers = load_lambda_handlers([os.path.join(TERRAFORM_DIR, 'lambda.tf'), os.path.join(TERRAFORM_DIR, 'readiness.tf')])
+    databases = seed_databases(aws, scenario.get('databases', 1), scenario.get('lagging_replicas', 0))
+
+    alarm_time = SIMULATION_START + ALARM_OFFSET_SECONDS
+    aws.rds.outage_at = alarm_time - timing.outage_to_alarm_seconds
+    executions = []
+
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.dict(os.environ, lambda_environment(databases, variables)))
+        stack.enter_context(mock.patch.object(time, 'time', clock.time))
+        stack.enter_context(mock.patch.object(time, 'sleep', clock.sleep))
+
+        fresh_lambda_modules()
+        import dr_common
+        dr_common.use_session(aws.session())
+
+        runtime = LambdaRuntime(aws, handlers)
+        runtime.load()
+        run_verification, probe_readiness = fake_probes(aws)
+        verify_module = runtime.modules[runtime.function_for('verify_dns_update')]
+        stack.enter_context(mock.patch.object(verify_module, 'run_verification', run_verification))
+        stack.enter_context(mock.patch.object(verify_module, 'probe_readiness', probe_readiness))
+
+        machine = StateMachine(definition, runtime.invoke, scheduler, timing.state_transition_seconds)
+
+        def start_execution(execution_arn, execution_input):
+            execution = {'arn': execution_arn, 'status': 'RUNNING', 'started_at': clock.now}
+            executions.append(execution)
+
+            def finished(output, error):
+                execution.update(status='FAILED' if error else 'SUCCEEDED', output=output or {},
+                                 error=str(error) if error else None, ended_at=clock.now)
+                aws.stepfunctions.finish_execution(execution_arn, execution['status'], output)
+
+            scheduler.spawn(machine.execute(execution_input, {'Execution': {'Id': execution_arn}}), on_done=finished)
+
+        aws.stepfunctions.on_start = start_execution
+        # The promotion_events.tf rule targets the callback with every replica instance event
+        callback_function = runtime.function_for('promotion_event_callback')
+        aws.event_targets.append(lambda event: runtime.invoke_async(callback_function, event))
+
+        if scenario.get('replica_busy_seconds'):
+            for database in databases:
+                instance = aws.rds.instances[database['read_replica_id']]
+                instance['status'] = 'backing-up'
+                scheduler.call_at(alarm_time + scenario['replica_busy_seconds'],
+                                  lambda instance=instance: instance.update(status='available'))
+        if scenario.get('preflight'):
+            scheduler.call_at(SIMULATION_START + PREFLIGHT_OFFSET_SECONDS, lambda: runtime.invoke_async(
+                runtime.function_for('record_replica_readiness'), {'source': 'aws.events'}))
+        for offset, records in scenario.get('alarm_deliveries', [(0, 1)]):
+            scheduler.call_at(alarm_time + timing.alarm_delivery_seconds + offset, lambda records=records: runtime.invoke_async(
+                runtime.function_for('dr_orchestrator'), alarm_event(alarm_time, records)))
+
+        scheduler.run(until=alarm_time + MAX_SIMULATED_SECONDS)
+        format_breakdown = importlib.import_module('tracing').format_breakdown
+
+    return build_report(name, scenario, seed, aws, runtime, machine, executions, alarm_time, format_breakdown)
+
+def build_report(name, scenario, seed, aws, runtime, machine, executions, alarm_time, format_breakdown):
+    # A retried failover is judged by its last execution
+    execution = executions[-1] if executions else {'status': 'NOT_STARTED'}
+    if not executions and runtime.async_errors:
+        function_name, error = runtime.async_errors[0]
+        execution['error'] = f"{function_name} failed: {error}"
+    if execution['status'] == 'RUNNING':
+        execution['status'] = 'TIMED_OUT'
+    output = execution.get('output') or {}
+    failover_report = output.get('failover_report') or {}
+    breakdown = output.get('rto_breakdown')
+
+    return {
+        'scenario': name,
+        'description': scenario.get('description', ''),
+        'seed': seed,
+        'status': execution['status'],
+        'final_status': output.get('final_status'),
+        'error': execution.get('error'),
+        'databases': scenario.get('databases', 1),
+        'databases_failed_over': failover_report.get('succeeded', 1 if output.get('final_status') == 'COMPLETED_SUCCESSFULLY' else 0),
+        'rto_seconds': round(execution['ended_at'] - alarm_time, 1) if 'ended_at' in execution else None,
+        'api_calls': sum(aws.calls.values()),
+        'api_retries': aws.retries,
+        'throttles': aws.throttles,
+        'api_errors': aws.errors,
+        'api_calls_by_operation': dict(sorted(aws.calls.items())),
+        'lambda_invocations': sum(stats['invocations'] for stats in runtime.stats.values()),
+        'lambda_seconds': round(sum(stats['seconds'] for stats in runtime.stats.values()), 2),
+        'lambda_functions': {name: {**stats, 'seconds': round(stats['seconds'], 2)}
+                             for name, stats in sorted(runtime.stats.items())},
+        'state_transitions': machine.transitions,
+        'executions_started': len(executions),
+        'notifications': len(aws.sns.messages),
+        'rto_breakdown': breakdown,
+        'rto_breakdown_text': format_breakdown(breakdown) if breakdown else None,
+        'timing': aws.timing.to_dict()
+    }
+
+
+def format_table(reports, baseline=None):
+    """One row per scenario; with a baseline, relative changes follow each metric."""
+    columns = (
+        ('Scenario', lambda report: report['scenario'], 18),
+        ('Status', lambda report: report['final_status'] or report['status'], 24),
+        ('DBs', lambda report: f"{report['databases_failed_over']}/{report['databases']}", 7),
+        ('RTO s', lambda report: report['rto_seconds'], 15),
+        ('API calls', lambda report: report['api_calls'], 14),
+        ('Retries', lambda report: report['api_retries'], 8),
+        ('Lambdas', lambda report: report['lambda_invocations'], 8),
+        ('Lambda s', lambda report: report['lambda_seconds'], 14)
+    )
+    compared = {'rto_seconds': 'RTO s', 'api_calls': 'API calls', 'lambda_seconds': 'Lambda s'}
+    previous = {report['scenario']: report for report in baseline or []}
+
+    lines = [' '.join(title.ljust(width) for title, _, width in columns)]
+    for report in reports:
+        cells = []
+        for title, value, width in columns:
+            cell = str(value(report))
+            key = next((key for key, label in compared.items() if label == title), None)
+            before = previous.get(report['scenario'], {}).get(key) if key else None
+            if before and report.get(key) is not None:
+                cell += f" ({(report[key] - before) / before:+.0%})"
+            cells.append(cell.ljust(width))
+        lines.append(' '.join(cells))
+    return '\n'.join(lines)
+
+def regressions(reports, baseline, tolerance):
+    """Scenarios whose RTO, API calls or Lambda-seconds grew by more than the tolerance."""
+    previous = {report['scenario']: report for report in baseline}
+    found = []
+    for report in reports:
+        before = previous.get(report['scenario'])
+        if not before:
+            continue
+        if report['status'] != before['status'] or report['final_status'] != before['final_status']:
+            found.append(f"{report['scenario']}: outcome changed from {before['final_status']} to {report['final_status']}")
+        for key in ('rto_seconds', 'api_calls', 'lambda_seconds'):
+            if before.get(key) and report.get(key) is not None and report[key] > before[key] * (1 + tolerance):
+                found.append(f"{report['scenario']}: {key} {before[key]} -> {report[key]}")
+    return found
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Simulate the DR Step Function against fake RDS, Route 53, SNS and Step Functions '
+                    'and report RTO, API calls and Lambda-seconds per scenario.')
+    parser.add_argument('scenarios', nargs='*', help='Scenarios to run (default: all)')
+    parser.add_argument('--list', action='store_true', help='List the scenarios and exit')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for jitter and throttling')
+    parser.add_argument('--timing', action='append', default=[], metavar='NAME=VALUE',
+                        help='Override a timing model setting for every scenario')
+    parser.add_argument('--phases', action='store_true', help='Print the RTO breakdown of each scenario')
+    parser.add_argument('--output', help='Write the reports as JSON to this file')
+    parser.add_argument('--baseline', help='Compare with reports previously written by --output')
+    parser.add_argument('--tolerance', type=float, default=0.05,
+                        help='Relative growth tolerated against the baseline before exiting non-zero')
+    parser.add_argument('--verbose', action='store_true', help='Show the Lambda logs')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, scenario in SCENARIOS.items():
+            print(f"{name:20} {scenario['description']}")
+        return 0
+
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.DEBUG if args.verbose else logging.CRITICAL)
+    logging.getLogger().addHandler(handler)
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {unknown}")
+
+    overrides = {}
+    for setting in args.timing:
+        name, _, value = setting.partition('=')
+        overrides[name] = None if value == 'none' else float(value)
+
+    reports = []
+    for name in args.scenarios or list(SCENARIOS):
+        scenario = SCENARIOS[name]
+        if overrides:
+            scenario = {**scenario, 'timing': {**scenario.get('timing', {}), **overrides}}
+        reports.append(run_scenario(name, scenario, seed=args.seed))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(format_table(reports, baseline))
+    if args.phases:
+        for report in reports:
+            print(f"\n{report['scenario']}:\n{report['rto_breakdown_text'] or report['error'] or 'No trace recorded'}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+    # A scenario that never started measured nothing, so it must not pass as a benchmark
+    not_started = [report for report in reports if report['status'] == 'NOT_STARTED']
+    if not_started:
+        print('\nScenarios that never started a failover:')
+        print('\n'.join(f"• {report['scenario']}: {report['error'] or 'no execution started'}" for report in not_started))
+        return 1
+
+    if baseline:
+        found = regressions(reports, baseline, args.tolerance)
+        if found:
+            print('\nRegressions against the baseline:')
+            print('\n'.join(f"• {line}" for line in found))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,421 @@
+import copy
+import json
+import logging
+import re
+
+from fake_aws import Join, Sleep, WaitForToken
+
+
+logger = logging.getLogger(__name__)
+
+
+WAIT_FOR_TASK_TOKEN = 'arn:aws:states:::lambda:invoke.waitForTaskToken'
+LAMBDA_ARN_PREFIX = 'arn:aws:lambda:simulated:000000000000:function:'
+# An inline Map without MaxConcurrency runs at most this many iterations at once
+INLINE_MAP_MAX_CONCURRENCY = 40
+
+
+class StateError(Exception):
+    """A Step Functions error: the name Catch and Retry match on, plus its cause."""
+
+    def __init__(self, error, cause=''):
+        super().__init__(f"{error}: {cause}")
+        self.error = error
+        self.cause = cause
+
+
+class HclParser:
+    """
+    Parses the literal HCL expressions this configuration uses inside
+    jsonencode() and variable defaults: objects, tuples, strings, numbers,
+    booleans, null and references, which are passed to resolve_reference.
+    """
+
+    TOKEN = re.compile(r'''
+        (?P<space>\s+|\#[^\n]*|//[^\n]*)
+      | (?P<string>"(?:[^"\\]|\\.)*")
+      | (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<name>[A-Za-z_][\w\-]*(?:\.[A-Za-z_][\w\-]*|\[\d+\])*)
+      | (?P<punct>[{}\[\]=,:()])
+    ''', re.VERBOSE)
+
+    def __init__(self, text, resolve_reference):
+        self.text = text
+        self.offset = 0
+        self.resolve_reference = resolve_reference
+
+    def _scan(self):
+        # Tokens are read on demand so trailing unsupported syntax is never reached
+        offset = self.offset
+        while offset < len(self.text):
+            match = self.TOKEN.match(self.text, offset)
+            if not match:
+                raise ValueError(f"Unsupported HCL near: {self.text[offset:offset + 40]!r}")
+            if match.lastgroup != 'space':
+                return (match.lastgroup, match.group()), match.end()
+            offset = match.end()
+        return (None, None), offset
+
+    def _next(self):
+        token, self.offset = self._scan()
+        if token[0] is None:
+            raise ValueError("Unexpected end of HCL expression")
+        return token
+
+    def _peek(self):
+        return self._scan()[0]
+
+    def parse_value(self):
+        kind, text = self._next()
+        if kind == 'string':
+            return json.loads(text)
+        if kind == 'number':
+            return float(text) if '.' in text else int(text)
+        if text == '{':
+            return self._parse_object()
+        if text == '[':
+            return self._parse_tuple()
+        if kind == 'name':
+            if text in ('true', 'false'):
+                return text == 'true'
+            if text == 'null':
+                return None
+            if self._peek()[1] == '(':
+                raise ValueError(f"Function calls are not supported: {text}(...)")
+            return self.resolve_reference(text)
+        raise ValueError(f"Unexpected token {text!r}")
+
+    def _parse_object(self):
+        result = {}
+        while True:
+            kind, text = self._peek()
+            if text == '}':
+                self._next()
+                return result
+            if text == ',':
+                self._next()
+                continue
+            kind, key = self._next()
+            key = json.loads(key) if kind == 'string' else key
+            separator = self._peek()[1]
+            if separator in ('=', ':'):
+                self._next()
+            result[key] = self.parse_value()
+
+    def _parse_tuple(self):
+        result = []
+        while True:
+            text = self._peek()[1]
+            if text == ']':
+                self._next()
+                return result
+            if text == ',':
+                self._next()
+                continue
+            result.append(self.parse_value())
+
+
+def _matching_paren(text, start):
+    """Index just past the bracket closing the one at start, skipping strings."""
+    pairs = {'(': ')', '{': '}', '[': ']'}
+    stack = []
+    position = start
+    while position < len(text):
+        char = text[position]
+        if char == '"':
+            position += 1
+            while text[position] != '"':
+                position += 2 if text[position] == '\\' else 1
+        elif char in pairs:
+            stack.append(pairs[char])
+        elif stack and char == stack[-1]:
+            stack.pop()
+            if not stack:
+                return position + 1
+        position += 1
+    raise ValueError("Unbalanced brackets")
+
+def _blocks(text, block_type):
+    """Yield (labels, body) for every top-level block of the given type."""
+    pattern = re.compile(rf'^{block_type}((?:\s+"[^"]+")+)\s*\{{', re.MULTILINE)
+    for match in pattern.finditer(text):
+        end = _matching_paren(text, match.end() - 1)
+        yield re.findall(r'"([^"]+)"', match.group(1)), text[match.end():end - 1]
+
+def load_variable_defaults(path):
+    """Defaults of the variables declared in a variables.tf file."""
+    with open(path) as f:
+        text = f.read()
+
+    defaults = {}
+    for (name,), body in _blocks(text, 'variable'):
+        match = re.search(r'^\s*default\s*=', body, re.MULTILINE)
+        if match:
+            parser = HclParser(body[match.end():], lambda reference: None)
+            defaults[name] = parser.parse_value()
+    return defaults
+
+def load_lambda_handlers(paths):
+    """Map aws_lambda_function resource names to their handler module."""
+    handlers = {}
+    for path in paths:
+        with open(path) as f:
+            text = f.read()
+        for labels, body in _blocks(text, 'resource'):
+            if labels[0] != 'aws_lambda_function':
+                continue
+            match = re.search(r'^\s*handler\s*=\s*"([\w.]+)\.lambda_handler"', body, re.MULTILINE)
+            if match:
+                handlers[labels[1]] = match.group(1)
+    return handlers
+
+def load_state_machine_definition(path, variables, resource_name='disaster_recovery'):
+    """
+    Read the ASL definition of an aws_sfn_state_machine from its Terraform file.
+    Lambda ARNs resolve to simulated ARNs ending in the resource name and
+    var.* references to the given variables.
+    """
+    with open(path) as f:
+        text = f.read()
+
+    for labels, body in _blocks(text, 'resource'):
+        if labels != ['aws_sfn_state_machine', resource_name]:
+            continue
+        match = re.search(r'definition\s*=\s*jsonencode\(', body)
+        end = _matching_paren(body, match.end() - 1)
+
+        def resolve(reference):
+            parts = reference.split('.')
+            if parts[0] == 'aws_lambda_function' and len(parts) == 3 and parts[2] == 'arn':
+                return f"{LAMBDA_ARN_PREFIX}{parts[1]}"
+            if parts[0] == 'var' and parts[1] in variables:
+                return variables[parts[1]]
+            raise ValueError(f"Cannot resolve {reference} in the state machine definition")
+
+        return HclParser(body[match.end():end - 1], resolve).parse_value()
+
+    raise ValueError(f"aws_sfn_state_machine.{resource_name} not found in {path}")
+
+
+def get_path(data, path, context=None):
+    """Read a $ or $$ reference path (dotted fields only)."""
+    if path.startswith('$$'):
+        value, fields = context or {}, path[2:]
+    else:
+        value, fields = data, path[1:]
+    for field in filter(None, fields.split('.')):
+        if not isinstance(value, dict) or field not in value:
+            raise StateError('States.Runtime', f"The JSONPath {path} could not be found in the input")
+        value = value[field]
+    return value
+
+def apply_result_path(data, path, result):
+    """Merge a state result into its input as ResultPath does."""
+    if path == '$':
+        return result
+    if path is None:
+        return data
+    if not isinstance(data, dict):
+        raise StateError('States.Runtime', f"Cannot apply ResultPath {path} to a non-object input")
+    output = copy.deepcopy(data)
+    target = output
+    fields = path[2:].split('.')
+    for field in fields[:-1]:
+        target = target.setdefault(field, {})
+    target[fields[-1]] = result
+    return output
+
+def resolve_parameters(parameters, data, context):
+    """Build a Parameters payload; keys ending in .$ are paths into the input or context."""
+    if isinstance(parameters, dict):
+        resolved = {}
+        for key, value in parameters.items():
+            if key.endswith('.$'):
+                resolved[key[:-2]] = get_path(data, value, context)
+            else:
+                resolved[key] = resolve_parameters(value, data, context)
+        return resolved
+    if isinstance(parameters, list):
+        return [resolve_parameters(value, data, context) for value in parameters]
+    return parameters
+
+def error_matches(error_equals, error):
+    for name in error_equals:
+        if name == error or name == 'States.ALL':
+            return True
+        if name == 'States.TaskFailed' and error != 'States.Timeout':
+            return True
+    return False
+
+
+COMPARATORS = {
+    'BooleanEquals': lambda value, expected: value is expected,
+    'StringEquals': lambda value, expected: value == expected,
+    'NumericEquals': lambda value, expected: value == expected,
+    'NumericGreaterThan': lambda value, expected: value > expected,
+    'NumericGreaterThanEquals': lambda value, expected: value >= expected,
+    'NumericLessThan': lambda value, expected: value < expected,
+    'NumericLessThanEquals': lambda value, expected: value <= expected
+}
+
+
+class StateMachine:
+    """
+    Interprets the Task, Choice, Wait, Pass, Map, Succeed and Fail states of a
+    definition as a Scheduler process. invoke(function_name, payload) runs the
+    Lambda synchronously on the simulated clock and returns its result.
+    """
+
+    def __init__(self, definition, invoke, scheduler, transition_seconds=0.0):
+        self.definition = definition
+        self.invoke = invoke
+        self.scheduler = scheduler
+        self.transition_seconds = transition_seconds
+        self.transitions = 0
+        self.state_visits = {}
+        self._tokens = 0
+
+    def execute(self, data, context):
+        """Generator running the whole definition; returns the execution output."""
+        return self._run(self.definition, data, context)
+
+    def _run(self, graph, data, context):
+        name = graph['StartAt']
+        while True:
+            state = graph['States'][name]
+            self.transitions += 1
+            self.state_visits[name] = self.state_visits.get(name, 0) + 1
+            if self.transition_seconds:
+                yield Sleep(self.transition_seconds)
+
+            try:
+                next_name, data = yield from self._run_state(name, state, data, context)
+            except StateError as error:
+                catcher = next((catcher for catcher in state.get('Catch', [])
+                                if error_matches(catcher['ErrorEquals'], error.error)), None)
+                if catcher is None:
+                    raise
+                logger.debug(f"{name} caught {error.error}, continuing at {catcher['Next']}")
+                data = apply_result_path(data, catcher.get('ResultPath', '$'),
+                                         {'Error': error.error, 'Cause': error.cause})
+                next_name = catcher['Next']
+
+            if next_name is None:
+                return data
+            name = next_name
+
+    def _run_state(self, name, state, data, context):
+        kind = state['Type']
+        next_name = None if state.get('End') else state.get('Next')
+
+        if kind == 'Task':
+            result = yield from self._run_task_with_retry(name, state, data, context)
+            return next_name, apply_result_path(data, state.get('ResultPath', '$'), result)
+
+        if kind == 'Pass':
+            result = state['Result'] if 'Result' in state else data
+            return next_name, apply_result_path(data, state.get('ResultPath', '$'), result)
+
+        if kind == 'Wait':
+            seconds = state['Seconds'] if 'Seconds' in state else get_path(data, state['SecondsPath'])
+            yield Sleep(float(seconds))
+            return next_name, data
+
+        if kind == 'Choice':
+            for rule in state.get('Choices', []):
+                if self._evaluate(rule, data):
+                    return rule['Next'], data
+            if 'Default' not in state:
+                raise StateError('States.NoChoiceMatched', f"No choice matched in {name}")
+            return state['Default'], data
+
+        if kind == 'Map':
+            items = get_path(data, state.get('ItemsPath', '$'))
+            processor = state.get('ItemProcessor') or state['Iterator']
+            branches = [self._run(processor, item, context) for item in items]
+            try:
+                results = yield Join(branches, state.get('MaxConcurrency') or INLINE_MAP_MAX_CONCURRENCY)
+            except StateError:
+                raise
+            except Exception as e:
+                raise StateError(type(e).__name__, str(e))
+            return next_name, apply_result_path(data, state.get('ResultPath', '$'), results)
+
+        if kind == 'Succeed':
+            return None, data
+
+        if kind == 'Fail':
+            raise StateError(state.get('Error', 'States.Fail'), state.get('Cause', ''))
+
+        raise StateError('States.Runtime', f"Unsupported state type {kind} in {name}")
+
+    def _evaluate(self, rule, data):
+        if 'And' in rule:
+            return all(self._evaluate(child, data) for child in rule['And'])
+        if 'Or' in rule:
+            return any(self._evaluate(child, data) for child in rule['Or'])
+        if 'Not' in rule:
+            return not self._evaluate(rule['Not'], data)
+        if 'IsPresent' in rule:
+            try:
+                get_path(data, rule['Variable'])
+                return rule['IsPresent']
+            except StateError:
+                return not rule['IsPresent']
+
+        value = get_path(data, rule['Variable'])
+        for comparator, compare in COMPARATORS.items():
+            if comparator in rule:
+                return compare(value, rule[comparator])
+        raise StateError('States.Runtime', f"Unsupported choice rule {sorted(rule)}")
+
+    def _run_task_with_retry(self, name, state, data, context):
+        attempt = 0
+        while True:
+            try:
+                return (yield from self._run_task(name, state, data, context))
+            except StateError as error:
+                retrier = next((retrier for retrier in state.get('Retry', [])
+                                if error_matches(retrier['ErrorEquals'], error.error)), None)
+                if retrier is None or attempt >= retrier.get('MaxAttempts', 3):
+                    raise
+                interval = retrier.get('IntervalSeconds', 1) * retrier.get('BackoffRate', 2.0) ** attempt
+                attempt += 1
+                yield Sleep(interval)
+
+    def _run_task(self, name, state, data, context):
+        resource = state['Resource']
+        payload = data
+        if resource == WAIT_FOR_TASK_TOKEN:
+            self._tokens += 1
+            token = f"token-{self._tokens:06d}"
+            self.scheduler.open_token(token)
+            task_context = {**context, 'Task': {'Token': token}}
+            parameters = resolve_parameters(state.get('Parameters', {}), data, task_context)
+            self._invoke(parameters['FunctionName'], parameters.get('Payload', data))
+            # Let earlier simulated events run before waiting
+            yield Sleep(0)
+            status, result = yield WaitForToken(token, state.get('TimeoutSeconds'))
+            if status == 'timeout':
+                raise StateError('States.Timeout', f"{name} timed out waiting for the task token")
+            if status == 'failure':
+                raise StateError(result.get('Error') or 'States.TaskFailed', result.get('Cause') or '')
+            return result
+
+        if 'Parameters' in state:
+            payload = resolve_parameters(state['Parameters'], data, context)
+        result = self._invoke(resource, payload)
+        # The invocation moved the clock; yield so other branches catch up
+        yield Sleep(0)
+        return result
+
+    def _invoke(self, function_arn, payload):
+        if not function_arn.startswith(LAMBDA_ARN_PREFIX):
+            raise StateError('States.Runtime', f"Unsupported task resource {function_arn}")
+        try:
+            return self.invoke(function_arn[len(LAMBDA_ARN_PREFIX):], payload)
+        except StateError:
+            raise
+        except Exception as e:
+            # Unhandled Lambda errors surface with the exception class as the error name
+            raise StateError(type(e).__name__, str(e))
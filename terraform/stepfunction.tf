@@ -4,7 +4,7 @@ resource "aws_sfn_state_machine" "disaster_recovery" {
   role_arn = aws_iam_role.step_function_role.arn
 
   definition = jsonencode({
-    Comment = "RDS Disaster Recovery Workflow - Promotes read replica and updates DNS"
+    Comment = "RDS Disaster Recovery Workflow - Promotes read replicas and updates DNS"
     StartAt = "ValidateInput"
     
     States = {
@@ -22,7 +22,7 @@ resource "aws_sfn_state_machine" "disaster_recovery" {
       "CheckReplicaStatus" = {
         Type = "Task"
         Resource = aws_lambda_function.check_replica_status.arn
-        Next = "PromoteReplica"
+        Next = "PromoteDatabases"
         Catch = [{
           ErrorEquals = ["States.ALL"]
           Next = "NotifyFailure"
@@ -30,27 +30,39 @@ resource "aws_sfn_state_machine" "disaster_recovery" {
         }]
       }
       
-      "PromoteReplica" = {
-        Type = "Task"
-        Resource = aws_lambda_function.promote_replica.arn
-        Next = "WaitForPromotion"
-        Catch = [{
-          ErrorEquals = ["States.ALL"]
-          Next = "NotifyFailure"
-          ResultPath = "$.error"
-        }]
-      }
-      
-      "WaitForPromotion" = {
-        Type = "Wait"
-        Seconds = 60
-        Next = "CheckPromotionStatus"
-      }
+      # Issues every PromoteReadReplica call up front; MaxConcurrency bounds only
+      # these RDS calls, not the minutes each promotion then takes
+      "PromoteDatabases" = {
+        Type = "Map"
+        ItemsPath = "$.databases"
+        MaxConcurrency = var.failover_max_concurrency
+        ResultPath = "$.databases"
+        Next = "FailoverDatabases"
+        ItemProcessor = {
+          ProcessorConfig = {
+            Mode = "INLINE"
+          }
+          StartAt = "PromoteReplica"
+          States = {
+            "PromoteReplica" = {
+              Type = "Task"
+              Resource = aws_lambda_function.promote_replica.arn
+              End = true
+              Catch = [{
+                ErrorEquals = ["States.ALL"]
+                Next = "PromotionFailed"
+                ResultPath = "$.error"
+              }]
+            }
       
-      "CheckPromotionStatus" = {
-        Type = "Task"
-        Resource = aws_lambda_function.check_promotion_status.arn
-        Next = "IsPromotionComplete"
+            "PromotionFailed" = {
+              Type = "Pass"
+              Result = "FAILED"
+              ResultPath = "$.failover_status"
+              End = true
+            }
+          }
+        }
         Catch = [{
           ErrorEquals = ["States.ALL"]
           Next = "NotifyFailure"
@@ -58,22 +70,197 @@ resource "aws_sfn_state_machine" "disaster_recovery" {
         }]
       }
       
-      "IsPromotionComplete" = {
-        Type = "Choice"
-        Choices = [
-          {
-            Variable = "$.promotion_complete"
-            BooleanEquals = true
-            Next = "UpdateRoute53"
+      # Each promoted database waits for its promotion and runs its DNS pipeline
+      # independently. Inline Maps run up to 40 iterations at once, and the
+      # Route 53 calls are spread out by the promotions finishing at different times.
+      "FailoverDatabases" = {
+        Type = "Map"
+        ItemsPath = "$.databases"
+        ResultPath = "$.failover_results"
+        Next = "AggregateResults"
+        ItemProcessor = {
+          ProcessorConfig = {
+            Mode = "INLINE"
           }
-        ]
-        Default = "WaitForPromotion"
-      }
+          StartAt = "IsPromotionInitiated"
+          States = {
+            "IsPromotionInitiated" = {
+              Type = "Choice"
+              Choices = [
+                {
+                  Variable = "$.failover_status"
+                  IsPresent = true
+                  Next = "DatabaseFailed"
+                }
+              ]
+              Default = "WaitForPromotionEvent"
+            }
       
-      "UpdateRoute53" = {
-        Type = "Task"
-        Resource = aws_lambda_function.update_route53.arn
-        Next = "WaitForDNSPropagation"
+            # Resumed by promotion_event_callback when RDS reports the replica promoted.
+            # On timeout the status is checked and the wait re-entered, so a lost event
+            # costs at most one timeout; any other callback failure falls back to polling.
+            "WaitForPromotionEvent" = {
+              Type = "Task"
+              Resource = "arn:aws:states:::lambda:invoke.waitForTaskToken"
+              Parameters = {
+                FunctionName = aws_lambda_function.promotion_event_callback.arn
+                Payload = {
+                  "task_token.$"      = "$$.Task.Token"
+                  "read_replica_id.$" = "$.read_replica_id"
+                  "execution_id.$"    = "$.execution_id"
+                  "record_name.$"     = "$.record_name"
+                  "trace.$"           = "$.trace"
+                }
+              }
+              TimeoutSeconds = var.promotion_event_timeout_seconds
+              Next = "IsPromotionComplete"
+              Catch = [{
+                ErrorEquals = ["States.ALL"]
+                Next = "CheckPromotionStatus"
+                ResultPath = "$.promotion_event_error"
+              }]
+            }
+      
+            # Interval is computed by check_promotion_status from the observed status transitions
+            "WaitForPromotion" = {
+              Type = "Wait"
+              SecondsPath = "$.next_check_seconds"
+              Next = "CheckPromotionStatus"
+            }
+      
+            "CheckPromotionStatus" = {
+              Type = "Task"
+              Resource = aws_lambda_function.check_promotion_status.arn
+              Next = "IsPromotionComplete"
+              Catch = [{
+                ErrorEquals = ["States.ALL"]
+                Next = "DatabaseFailed"
+                ResultPath = "$.error"
+              }]
+            }
+      
+            "IsPromotionComplete" = {
+              Type = "Choice"
+              Choices = [
+                {
+                  Variable = "$.promotion_complete"
+                  BooleanEquals = true
+                  Next = "UpdateRoute53"
+                },
+                {
+                  Variable = "$.wait_for_event"
+                  BooleanEquals = true
+                  Next = "WaitForPromotionEvent"
+                }
+              ]
+              Default = "WaitForPromotion"
+            }
+      
+            "UpdateRoute53" = {
+              Type = "Task"
+              Resource = aws_lambda_function.update_route53.arn
+              Next = "CheckDNSChangeStatus"
+              Catch = [{
+                ErrorEquals = ["States.ALL"]
+                Next = "DatabaseFailed"
+                ResultPath = "$.error"
+              }]
+            }
+      
+            "CheckDNSChangeStatus" = {
+              Type = "Task"
+              Resource = aws_lambda_function.check_dns_change_status.arn
+              ResultPath = "$.dns_change"
+              Next = "IsDNSChangeInSync"
+              Catch = [{
+                ErrorEquals = ["States.ALL"]
+                Next = "DatabaseFailed"
+                ResultPath = "$.error"
+              }]
+            }
+      
+            "IsDNSChangeInSync" = {
+              Type = "Choice"
+              Choices = [
+                {
+                  Variable = "$.dns_change.change_status"
+                  StringEquals = "INSYNC"
+                  Next = "VerifyDNSUpdate"
+                }
+              ]
+              Default = "WaitForDNSChange"
+            }
+      
+            "WaitForDNSChange" = {
+              Type = "Wait"
+              SecondsPath = "$.dns_change.next_check_seconds"
+              Next = "CheckDNSChangeStatus"
+            }
+      
+            "VerifyDNSUpdate" = {
+              Type = "Task"
+              Resource = aws_lambda_function.verify_dns_update.arn
+              Next = "IsDatabaseAcceptingWrites"
+              Catch = [{
+                ErrorEquals = ["States.ALL"]
+                Next = "DatabaseFailed"
+                ResultPath = "$.error"
+              }]
+            }
+      
+            # Done only once the database accepts writes, or answers the handshake
+            # when no probe credentials are configured
+            "IsDatabaseAcceptingWrites" = {
+              Type = "Choice"
+              Choices = [
+                {
+                  Variable = "$.writes_accepted"
+                  BooleanEquals = true
+                  Next = "DatabaseFailedOver"
+                },
+                {
+                  And = [
+                    {
+                      Variable = "$.writes_checked"
+                      BooleanEquals = false
+                    },
+                    {
+                      Variable = "$.connectivity_verified"
+                      BooleanEquals = true
+                    }
+                  ]
+                  Next = "DatabaseFailedOver"
+                }
+              ]
+              Default = "DatabaseNotReady"
+            }
+      
+            "DatabaseNotReady" = {
+              Type = "Pass"
+              Result = {
+                Error = "DatabaseNotReady"
+                Cause = "The promoted database did not accept writes before the readiness deadline"
+              }
+              ResultPath = "$.error"
+              Next = "DatabaseFailed"
+            }
+      
+            "DatabaseFailedOver" = {
+              Type = "Pass"
+              Result = "SUCCEEDED"
+              ResultPath = "$.failover_status"
+              End = true
+            }
+      
+            # A failed database is recorded instead of failing the whole Map
+            "DatabaseFailed" = {
+              Type = "Pass"
+              Result = "FAILED"
+              ResultPath = "$.failover_status"
+              End = true
+            }
+          }
+        }
         Catch = [{
           ErrorEquals = ["States.ALL"]
           Next = "NotifyFailure"
@@ -81,16 +268,10 @@ resource "aws_sfn_state_machine" "disaster_recovery" {
         }]
       }
       
-      "WaitForDNSPropagation" = {
-        Type = "Wait"
-        Seconds = 120
-        Next = "VerifyDNSUpdate"
-      }
-      
-      "VerifyDNSUpdate" = {
+      "AggregateResults" = {
         Type = "Task"
-        Resource = aws_lambda_function.verify_dns_update.arn
-        Next = "NotifySuccess"
+        Resource = aws_lambda_function.aggregate_failover_results.arn
+        Next = "AllDatabasesFailedOver"
         Catch = [{
           ErrorEquals = ["States.ALL"]
           Next = "NotifyFailure"
@@ -98,6 +279,18 @@ resource "aws_sfn_state_machine" "disaster_recovery" {
         }]
       }
       
+      "AllDatabasesFailedOver" = {
+        Type = "Choice"
+        Choices = [
+          {
+            Variable = "$.all_succeeded"
+            BooleanEquals = true
+            Next = "NotifySuccess"
+          }
+        ]
+        Default = "NotifyFailure"
+      }
+      
       "NotifySuccess" = {
         Type = "Task"
         Resource = aws_lambda_function.notify_success.arn
@@ -162,8 +355,11 @@ resource "aws_iam_role_policy" "step_function_lambda_policy" {
           aws_lambda_function.check_replica_status.arn,
           aws_lambda_function.promote_replica.arn,
           aws_lambda_function.check_promotion_status.arn,
+          aws_lambda_function.promotion_event_callback.arn,
           aws_lambda_function.update_route53.arn,
+          aws_lambda_function.check_dns_change_status.arn,
           aws_lambda_function.verify_dns_update.arn,
+          aws_lambda_function.aggregate_failover_results.arn,
           aws_lambda_function.notify_success.arn,
           aws_lambda_function.notify_failure.arn
         ]
@@ -128,4 +128,135 @@ variable "notification_email" {
     condition = can(regex("^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\\.[a-zA-Z]{2,}$", var.notification_email))
     error_message = "Notification email must be a valid email address."
   }
-}
\ No newline at end of file
+}
+
+variable "promotion_event_timeout_seconds" {
+  description = "Seconds to wait for the RDS promotion event before checking the status and waiting again; bounds how late a lost event is noticed"
+  type        = number
+  default     = 60
+
+  validation {
+    condition = var.promotion_event_timeout_seconds >= 10
+    error_message = "Promotion event timeout must be at least 10 seconds."
+  }
+}
+
+variable "promotion_expected_phase_seconds" {
+  description = "Expected seconds per RDS status during promotion, e.g. { modifying = 60, rebooting = 180 }, taken from the poll_history of earlier failovers; status checks close in on each expected end"
+  type        = map(number)
+  default     = {}
+}
+
+variable "db_probe_secret_arn" {
+  description = "Secrets Manager ARN with username/password used to confirm the promoted database accepts writes (empty for handshake-only probing)"
+  type        = string
+  default     = ""
+}
+
+variable "failover_databases" {
+  description = "Replicas failed over together with their Route 53 record names (empty fails over read_replica_identifier only)"
+  type = list(object({
+    read_replica_id = string
+    record_name     = string
+  }))
+  default = []
+}
+
+variable "failover_max_concurrency" {
+  description = "Maximum number of PromoteReadReplica calls in flight in one execution; promotion waits and DNS updates are not bounded by it"
+  type        = number
+  default     = 10
+
+  validation {
+    condition = var.failover_max_concurrency >= 1 && var.failover_max_concurrency <= 40
+    error_message = "Failover concurrency must be between 1 and 40."
+  }
+}
+
+variable "failover_dedup_window_seconds" {
+  description = "Alarms for the same replicas within one window of this many seconds start a single failover execution"
+  type        = number
+  default     = 900
+
+  validation {
+    condition = var.failover_dedup_window_seconds >= 60
+    error_message = "Failover deduplication window must be at least 60 seconds."
+  }
+}
+
+variable "additional_notification_topic_arns" {
+  description = "Further SNS topics, in any region, that receive every DR notification alongside the default topics"
+  type        = list(string)
+  default     = []
+}
+
+variable "readiness_schedule_expression" {
+  description = "How often replica readiness is recorded ahead of a failover"
+  type        = string
+  default     = "rate(1 minute)"
+}
+
+variable "readiness_max_age_seconds" {
+  description = "Readiness records older than this are ignored and the replica is described live during failover"
+  type        = number
+  default     = 180
+}
+
+variable "rpo_max_lag_seconds" {
+  description = "ReplicaLag, sampled at or before the alarm, above which a replica fails the RPO gate"
+  type        = number
+  default     = 300
+}
+
+variable "rpo_gate_mode" {
+  description = "advisory promotes replicas over the RPO and reports them; enforce skips them unless the execution sets ignore_rpo_gate"
+  type        = string
+  default     = "advisory"
+
+  validation {
+    condition = contains(["advisory", "enforce"], var.rpo_gate_mode)
+    error_message = "RPO gate mode must be advisory or enforce."
+  }
+}
+
+variable "detector_vantage_points" {
+  description = "Probe functions the primary failure detector polls in addition to itself; subnets place a vantage point in a VPC"
+  type = list(object({
+    name               = string
+    subnet_ids         = list(string)
+    security_group_ids = list(string)
+  }))
+  default = [
+    { name = "a", subnet_ids = [], security_group_ids = [] },
+    { name = "b", subnet_ids = [], security_group_ids = [] }
+  ]
+}
+
+variable "detector_quorum" {
+  description = "Vantage points, out of the detector and detector_vantage_points, that must see the primary fail in the same round"
+  type        = number
+  default     = 2
+
+  validation {
+    condition     = var.detector_quorum >= 1
+    error_message = "Detector quorum must be at least 1."
+  }
+}
+
+variable "detector_interval_seconds" {
+  description = "Seconds between probing rounds of the primary failure detector"
+  type        = number
+  default     = 5
+}
+
+variable "detector_failure_rounds" {
+  description = "Consecutive failed rounds before the detector starts a failover"
+  type        = number
+  default     = 3
+}
+
+variable "detector_postgres_handshake" {
+  description = "Require the Postgres SSLRequest handshake to succeed, not only the TCP connect"
+  type        = bool
+  default     = true
+}